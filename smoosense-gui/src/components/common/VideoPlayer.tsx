@@ -10,13 +10,16 @@ export interface VideoPlayerProps {
   className?: string
   showControlsAtHover?: boolean
   alwaysAutoPlay?: boolean
+  // Image shown until the video can play
+  poster?: string
 }
 
 const VideoPlayer = memo(function VideoPlayer({
   src,
   className = '',
   showControlsAtHover = true,
-  alwaysAutoPlay = false
+  alwaysAutoPlay = false,
+  poster
 }: VideoPlayerProps) {
   const videoRef = useRef<HTMLVideoElement>(null)
   const [isPlaying, setIsPlaying] = useState(false)
@@ -109,6 +112,7 @@ const VideoPlayer = memo(function VideoPlayer({
       <video
         ref={videoRef}
         src={videoUrl}
+        poster={poster}
         className={finalClassName}
         muted={galleryVideoMuted}
         autoPlay={shouldAutoPlay}
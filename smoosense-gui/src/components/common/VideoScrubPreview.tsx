@@ -0,0 +1,107 @@
+'use client'
+
+import { memo, useRef, useState } from 'react'
+import { useAppSelector } from '@/lib/hooks'
+import {
+  fetchVideoPreviewInfo,
+  videoPreviewUrl,
+  type VideoPreviewInfo
+} from '@/lib/api/videoPreviews'
+import { Play } from 'lucide-react'
+
+interface VideoScrubPreviewProps {
+  src: string
+  onPlay: () => void
+  onError: () => void
+}
+
+/**
+ * Poster frame of a video, scrubbed through the keyframes of its sprite sheet on hover, so that
+ * the video is only loaded once played
+ */
+const VideoScrubPreview = memo(function VideoScrubPreview({
+  src,
+  onPlay,
+  onError
+}: VideoScrubPreviewProps) {
+  const cropMediaToFitCover = useAppSelector((state) => state.ui.cropMediaToFitCover)
+  const [info, setInfo] = useState<VideoPreviewInfo | null>(null)
+  const [tile, setTile] = useState<number | null>(null)
+  const [box, setBox] = useState({ width: 0, height: 0 })
+  const requestedInfo = useRef(false)
+
+  const posterUrl = videoPreviewUrl(src, 'poster')
+  const spriteUrl = videoPreviewUrl(src, 'sprite')
+
+  const handleMouseEnter = () => {
+    if (!requestedInfo.current) {
+      requestedInfo.current = true
+      fetchVideoPreviewInfo(src).then(setInfo).catch(() => {
+        // Without the sprite description, hovering shows the poster only
+      })
+    }
+  }
+
+  const handleMouseMove = (e: React.MouseEvent<HTMLDivElement>) => {
+    if (!info) {
+      return
+    }
+    const rect = e.currentTarget.getBoundingClientRect()
+    const fraction = rect.width > 0 ? (e.clientX - rect.left) / rect.width : 0
+    setBox({ width: rect.width, height: rect.height })
+    setTile(Math.min(info.tiles - 1, Math.max(0, Math.floor(fraction * info.tiles))))
+  }
+
+  const fit = cropMediaToFitCover ? 'object-cover' : 'object-contain'
+
+  // Size of a tile fitted in the preview like the poster is, cropped by the parent when covering
+  const tileStyle = (): React.CSSProperties => {
+    if (!info || tile === null) {
+      return {}
+    }
+    const scales = [box.width / info.tile_width, box.height / info.tile_height]
+    const scale = cropMediaToFitCover ? Math.max(...scales) : Math.min(...scales)
+    const width = info.tile_width * scale
+    const height = info.tile_height * scale
+    return {
+      width,
+      height,
+      left: (box.width - width) / 2,
+      top: (box.height - height) / 2,
+      backgroundImage: `url("${spriteUrl}")`,
+      backgroundSize: `${info.tiles * width}px ${height}px`,
+      backgroundPosition: `${-tile * width}px 0`
+    }
+  }
+
+  return (
+    <div
+      className="relative w-full h-full overflow-hidden bg-black/5"
+      onMouseEnter={handleMouseEnter}
+      onMouseMove={handleMouseMove}
+      onMouseLeave={() => setTile(null)}
+      onClick={onPlay}
+    >
+      <img
+        src={posterUrl ?? undefined}
+        alt="Video preview"
+        className={`w-full h-full ${fit}`}
+        onError={onError}
+      />
+      {info && tile !== null && spriteUrl && (
+        <div className="absolute" style={tileStyle()} />
+      )}
+      {info && tile !== null && (
+        <div
+          className="absolute bottom-0 left-0 h-1 bg-white/80"
+          style={{ width: `${((tile + 1) / info.tiles) * 100}%` }}
+        />
+      )}
+      {tile === null && (
+        <Play className="h-8 w-8 text-white/80 absolute top-1/2 left-1/2 transform -translate-x-1/2 -translate-y-1/2 bg-black/50 rounded-full p-1 pointer-events-none" />
+      )}
+    </div>
+  )
+})
+
+export default VideoScrubPreview
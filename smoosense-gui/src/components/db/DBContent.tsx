@@ -5,23 +5,20 @@ import { ResizablePanels } from '@/components/ui/resizable-panels'
 import { Badge } from '@/components/ui/badge'
 import { AlertCircle, Database, Loader2, Table } from 'lucide-react'
 import { pathJoin } from '@/lib/utils/pathUtils'
+import { LanceTableInfo, pendingTableInfo, streamLanceTables } from '@/lib/api/lanceTables'
 import TablePreview from './TablePreview'
 
-export interface TableInfo {
-  name: string
-  cnt_rows: number | null
-  cnt_columns: number | null
-  cnt_versions: number | null
-  cnt_indices: number | null
-}
+export type TableInfo = LanceTableInfo
 
 function TablesList({
   tables,
+  loadedTables,
   selectedTable,
   onTableClick,
   onTableDoubleClick
 }: {
   tables: TableInfo[]
+  loadedTables: Set<string>
   selectedTable: string | null
   onTableClick: (tableName: string) => void
   onTableDoubleClick: (tableName: string) => void
@@ -43,6 +40,9 @@ function TablesList({
               <span className="font-medium">{table.name}</span>
             </div>
             <div className="flex items-center gap-2">
+              {!loadedTables.has(table.name) && (
+                <Loader2 className="h-3 w-3 animate-spin text-muted-foreground" />
+              )}
               {table.cnt_rows !== null && table.cnt_columns !== null && (
                 <Badge variant="secondary" className="text-xs">
                   {table.cnt_rows.toLocaleString()} × {table.cnt_columns}
@@ -63,6 +63,7 @@ function TablesList({
 
 export default function DBContent({ dbPath }: { dbPath: string }) {
   const [tables, setTables] = useState<TableInfo[]>([])
+  const [loadedTables, setLoadedTables] = useState<Set<string>>(new Set())
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [selectedTable, setSelectedTable] = useState<string | null>(null)
@@ -70,25 +71,38 @@ export default function DBContent({ dbPath }: { dbPath: string }) {
   useEffect(() => {
     if (!dbPath) return
 
+    const controller = new AbortController()
+
+    // Show the table names as soon as they are listed, then fill in each table's info as it arrives
     const fetchTables = async () => {
       setLoading(true)
       setError(null)
+      setLoadedTables(new Set())
       try {
-        const response = await fetch(`/api/lance/list-tables?dbPath=${encodeURIComponent(dbPath)}&dbType=lance`)
-        if (!response.ok) {
-          const errorData = await response.json()
-          throw new Error(errorData.error || 'Failed to fetch tables')
-        }
-        const data = await response.json()
-        setTables(data)
+        await streamLanceTables(
+          dbPath,
+          (names) => {
+            setTables(names.map(pendingTableInfo))
+            setLoading(false)
+          },
+          (table) => {
+            setTables((current) => current.map((t) => (t.name === table.name ? table : t)))
+            setLoadedTables((current) => new Set(current).add(table.name))
+          },
+          controller.signal
+        )
       } catch (err) {
+        if (controller.signal.aborted) return
         setError(err instanceof Error ? err.message : 'Failed to load tables')
       } finally {
-        setLoading(false)
+        if (!controller.signal.aborted) {
+          setLoading(false)
+        }
       }
     }
 
     fetchTables()
+    return () => controller.abort()
   }, [dbPath])
 
   const handleTableClick = (tableName: string) => {
@@ -150,7 +164,7 @@ export default function DBContent({ dbPath }: { dbPath: string }) {
         maxSize={80}
         className="h-full"
       >
-        <TablesList tables={tables} selectedTable={selectedTable} onTableClick={handleTableClick} onTableDoubleClick={handleTableDoubleClick} />
+        <TablesList tables={tables} loadedTables={loadedTables} selectedTable={selectedTable} onTableClick={handleTableClick} onTableDoubleClick={handleTableDoubleClick} />
         <TablePreview dbPath={dbPath} tableName={selectedTable} tableInfo={selectedTableInfo} />
       </ResizablePanels>
     </div>
@@ -1,29 +1,19 @@
 'use client'
 
-import { useEffect, useState } from 'react'
-import { AlertCircle, Loader2 } from 'lucide-react'
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { AlertCircle, Loader2, RefreshCw } from 'lucide-react'
 import { AgGridReact } from 'ag-grid-react'
 import { ColDef, GridOptions, GridReadyEvent } from 'ag-grid-community'
 import { AllCommunityModule, ModuleRegistry } from 'ag-grid-community'
 import { useAGGridTheme, useAGGridDefaultColDef, useAGGridOptions, useAppSelector } from '@/lib/hooks'
 import { formatRelativeTime, formatDate } from '@/lib/utils/timeUtils'
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from '@/components/ui/tooltip'
-import { getApi } from '@/lib/utils/apiUtils'
+import { cn } from '@/lib/utils'
+import { fetchLanceVersions, LanceVersionInfo, VERSIONS_PAGE_SIZE } from '@/lib/api/lanceTables'
 
 ModuleRegistry.registerModules([AllCommunityModule])
 
-export interface VersionInfo {
-  version: number
-  timestamp: number
-  total_data_files: number | null
-  total_rows: number | null
-  rows_add: number | null
-  rows_remove: number | null
-  columns_add: string[]
-  columns_remove: string[]
-  indices_add: string[]
-  indices_remove: string[]
-}
+export type VersionInfo = LanceVersionInfo
 
 interface LanceVersionsProps {
   dbPath: string
@@ -34,6 +24,8 @@ export default function LanceVersions({ dbPath, tableName }: LanceVersionsProps)
   const [versions, setVersions] = useState<VersionInfo[] | null>(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  const [refreshing, setRefreshing] = useState(false)
+  const versionsRef = useRef<VersionInfo[]>([])
 
   // Hooks must be called unconditionally at the top
   const theme = useAGGridTheme()
@@ -41,15 +33,48 @@ export default function LanceVersions({ dbPath, tableName }: LanceVersionsProps)
   const baseGridOptions = useAGGridOptions()
   const rowHeight = useAppSelector((state) => state.ui.rowHeight)
 
-  useEffect(() => {
-    getApi({
-      relativeUrl: `lance/list-versions?dbPath=${encodeURIComponent(dbPath)}&tableName=${encodeURIComponent(tableName)}&dbType=lance`,
-      setData: (data) => setVersions(data as VersionInfo[]),
-      setLoading,
-      setError,
-    })
+  // Append the versions committed after the last loaded one, page by page
+  const loadNewVersions = useCallback(async (signal?: AbortSignal) => {
+    for (;;) {
+      const loaded = versionsRef.current
+      const sinceVersion = loaded.length > 0 ? loaded[loaded.length - 1].version : undefined
+      const page = await fetchLanceVersions(dbPath, tableName, { sinceVersion, limit: VERSIONS_PAGE_SIZE }, signal)
+      versionsRef.current = [...loaded, ...page.versions]
+      setVersions(versionsRef.current)
+      setLoading(false)
+      if (page.versions.length >= page.total) {
+        return
+      }
+    }
   }, [dbPath, tableName])
 
+  useEffect(() => {
+    const controller = new AbortController()
+    versionsRef.current = []
+    setVersions(null)
+    setError(null)
+    setLoading(true)
+    loadNewVersions(controller.signal)
+      .catch((err) => {
+        if (!controller.signal.aborted) {
+          setError(err instanceof Error ? err.message : 'Failed to load versions')
+        }
+      })
+      .finally(() => {
+        if (!controller.signal.aborted) {
+          setLoading(false)
+        }
+      })
+    return () => controller.abort()
+  }, [loadNewVersions])
+
+  const handleRefresh = () => {
+    setRefreshing(true)
+    loadNewVersions()
+      .catch((err) => setError(err instanceof Error ? err.message : 'Failed to load versions'))
+      .finally(() => setRefreshing(false))
+  }
+
   if (loading) {
     return (
       <div className="h-full flex items-center justify-center">
@@ -202,15 +227,28 @@ export default function LanceVersions({ dbPath, tableName }: LanceVersionsProps)
 
   return (
     <TooltipProvider>
-      <div className="h-full w-full">
-        <AgGridReact
-          theme={theme}
-          rowData={versions}
-          columnDefs={columnDefs}
-          defaultColDef={defaultColDef}
-          onGridReady={onGridReady}
-          {...gridOptions}
-        />
+      <div className="h-full w-full flex flex-col">
+        <div className="flex items-center justify-end gap-2 px-2 py-1 text-xs text-muted-foreground">
+          <span>{versions.length.toLocaleString()} {versions.length === 1 ? 'version' : 'versions'}</span>
+          <button
+            onClick={handleRefresh}
+            className="border border-border rounded p-1 hover:bg-muted cursor-pointer flex items-center justify-center"
+            title="Load new versions"
+            disabled={refreshing}
+          >
+            <RefreshCw className={cn('h-3 w-3', refreshing && 'animate-spin')} />
+          </button>
+        </div>
+        <div className="flex-1 min-h-0">
+          <AgGridReact
+            theme={theme}
+            rowData={versions}
+            columnDefs={columnDefs}
+            defaultColDef={defaultColDef}
+            onGridReady={onGridReady}
+            {...gridOptions}
+          />
+        </div>
       </div>
     </TooltipProvider>
   )
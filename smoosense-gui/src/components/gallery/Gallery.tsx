@@ -1,11 +1,14 @@
 'use client'
 
+import { useEffect } from 'react'
 import { useAppSelector, useAppDispatch } from '@/lib/hooks'
 import { useRenderType } from '@/lib/hooks'
 import { useProcessedRowData } from '@/lib/hooks/useProcessedRowData'
 import { setJustClickedRowId } from '@/lib/features/viewing/viewingSlice'
 import { handPickRow } from '@/lib/features/handPickedRows/handPickedRowsSlice'
 import { isVisualType } from '@/lib/utils/renderTypeUtils'
+import { RenderType } from '@/lib/utils/agGridCellRenderers'
+import { prefetchVideoPreviews } from '@/lib/api/videoPreviews'
 import { toast } from 'sonner'
 import GalleryControls from './GalleryControls'
 import GalleryItem from './GalleryItem'
@@ -18,6 +21,20 @@ export default function Gallery() {
   const columnForGalleryCaption = useAppSelector((state) => state.ui.columnForGalleryCaption)
   const galleryItemWidth = useAppSelector((state) => state.ui.galleryItemWidth)
   const galleryItemHeight = useAppSelector((state) => state.ui.galleryItemHeight)
+  const isVideoGallery = renderTypeColumns?.[columnForGalleryVisual] === RenderType.VideoUrl
+
+  // Have the server make the posters and sprite sheets of the videos of the page in advance
+  useEffect(() => {
+    if (!isVideoGallery || !rowData) {
+      return
+    }
+    const urls = rowData
+      .map((row) => row[columnForGalleryVisual])
+      .filter((value): value is string => typeof value === 'string' && value !== '')
+    prefetchVideoPreviews(urls).catch(() => {
+      // Previews are then made when shown
+    })
+  }, [isVideoGallery, rowData, columnForGalleryVisual])
 
   if (!rowData || rowData.length === 0) {
     return (
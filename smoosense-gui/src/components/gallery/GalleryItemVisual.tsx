@@ -1,7 +1,7 @@
 'use client'
 
 import { RenderType } from '@/lib/utils/agGridCellRenderers'
-import { proxyedUrl } from '@/lib/utils/urlUtils'
+import { proxyedUrl, thumbnailSize } from '@/lib/utils/urlUtils'
 import { parseBbox, buildBboxVizUrl } from '@/lib/utils/bboxUtils'
 import ImageBlock from '@/components/common/ImageBlock'
 import ImageMask from '@/components/viz/ImageMask'
@@ -36,6 +36,8 @@ export default function GalleryItemVisual({
           src={String(visualValue)}
           alt={`Row ${index + 1}`}
           className="w-full h-full"
+          // Twice the tile height, so that landscape images still cover the tile when cropped
+          thumbnailSize={thumbnailSize(2 * galleryItemHeight)}
         />
       )}
 
@@ -1,18 +1,42 @@
 'use client'
 
+import { useState } from 'react'
 import VideoPlayer from '@/components/common/VideoPlayer'
+import VideoScrubPreview from '@/components/common/VideoScrubPreview'
+import { useAppSelector } from '@/lib/hooks'
+import { videoPreviewUrl } from '@/lib/api/videoPreviews'
 
 interface GalleryVideoItemProps {
   visualValue: string
 }
 
 export default function GalleryVideoItem({ visualValue }: GalleryVideoItemProps) {
+  const autoPlayAllVideos = useAppSelector((state) => state.ui.autoPlayAllVideos)
+  const [playing, setPlaying] = useState(false)
+  const [previewFailed, setPreviewFailed] = useState(false)
+  const posterUrl = previewFailed ? null : videoPreviewUrl(visualValue, 'poster')
+
+  // Videos are only loaded once played, unless they all play anyway
+  if (posterUrl && !autoPlayAllVideos && !playing) {
+    return (
+      <div className="group relative w-full h-full">
+        <VideoScrubPreview
+          src={visualValue}
+          onPlay={() => setPlaying(true)}
+          onError={() => setPreviewFailed(true)}
+        />
+      </div>
+    )
+  }
+
   return (
     <div className="group relative w-full h-full">
       <VideoPlayer
         src={visualValue}
         className="w-full h-full group-hover:opacity-100"
+        poster={posterUrl ?? undefined}
+        alwaysAutoPlay={playing}
       />
     </div>
   )
-}
\ No newline at end of file
+}
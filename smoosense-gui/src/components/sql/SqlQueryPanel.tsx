@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react'
 import _ from 'lodash'
 import { useAppSelector, useAppDispatch } from '@/lib/hooks'
 import { setSqlQuery, setSqlResult } from '@/lib/features/ui/uiSlice'
-import { executeQuery, generateSqlKey, type RowObject, type QueryResult } from '@/lib/api/queries'
+import { executeQueryStream, generateSqlKey, type RowObject, type QueryResult } from '@/lib/api/queries'
 import BasicAGTable from '@/components/common/BasicAGTable'
 import CodeMirror from '@uiw/react-codemirror'
 import { sql } from '@codemirror/lang-sql'
@@ -15,6 +15,11 @@ import { Play, Loader2 } from 'lucide-react'
 import { CLS } from '@/lib/utils/styles'
 import { useTheme } from 'next-themes'
 
+// Rows kept in the browser for a query; the server stops streaming beyond that
+const MAX_RESULT_ROWS = 100000
+// Interval between re-renders of the table while rows are arriving
+const PROGRESS_INTERVAL_MS = 250
+
 export default function SqlQueryPanel() {
   const tablePath = useAppSelector((state) => state.ui.tablePath)
   const queryEngine = useAppSelector((state) => state.ui.queryEngine)
@@ -54,7 +59,7 @@ export default function SqlQueryPanel() {
 
   // Transform data for BasicAGTable only when needed
   const getTableData = (): RowObject[] => {
-    if (!currentResult || currentResult.status !== 'success') {
+    if (!currentResult || currentResult.status === 'error') {
       return []
     }
     
@@ -93,9 +98,15 @@ export default function SqlQueryPanel() {
     // Clear previous results to show loading state
     setCurrentResult(null)
 
+    // Show the first rows while the rest are still arriving
+    const showProgress = _.throttle(setCurrentResult, PROGRESS_INTERVAL_MS)
     try {
       const sqlKey = generateSqlKey('user_query')
-      const result = await executeQuery(sqlQuery, sqlKey, dispatch, queryEngine, tablePath)
+      const result = await executeQueryStream(sqlQuery, sqlKey, dispatch, queryEngine, tablePath, {
+        onRows: showProgress,
+        maxRows: MAX_RESULT_ROWS,
+      })
+      showProgress.cancel()
 
       // Save to Redux store
       dispatch(setSqlResult(result))
@@ -103,6 +114,7 @@ export default function SqlQueryPanel() {
       // Update local state with raw result
       setCurrentResult(result)
     } catch (error) {
+      showProgress.cancel()
       const errorMessage = error instanceof Error ? error.message : 'Unknown error occurred'
       const errorResult: QueryResult = {
         column_names: [],
@@ -173,13 +185,22 @@ export default function SqlQueryPanel() {
           <div className="text-xs text-muted-foreground">
             <span>
               {currentResult.rows.length} rows • {Math.round(currentResult.runtime * 1000)}ms
+              {currentResult.truncated && ' • truncated, add a LIMIT to see other rows'}
+            </span>
+          </div>
+        )}
+        {isLoading && currentResult && currentResult.status === 'running' && (
+          <div className="flex items-center gap-2 text-xs text-muted-foreground">
+            <Loader2 className="h-3 w-3 animate-spin" />
+            <span>
+              {currentResult.rows.length} rows so far • {formatElapsedTime(elapsedTime)}
             </span>
           </div>
         )}
       </div>
       
       <div className="flex-1 overflow-hidden">
-        {isLoading && (
+        {isLoading && !currentResult && (
           <div className="flex items-center justify-center h-full text-muted-foreground">
             <div className="flex flex-col items-center gap-3">
               <Loader2 className="h-8 w-8 animate-spin" />
@@ -208,7 +229,7 @@ export default function SqlQueryPanel() {
           </div>
         )}
 
-        {currentResult && currentResult.status === 'success' && currentResult.rows.length > 0 && (
+        {currentResult && currentResult.status !== 'error' && currentResult.rows.length > 0 && (
           <BasicAGTable data={getTableData()} />
         )}
 
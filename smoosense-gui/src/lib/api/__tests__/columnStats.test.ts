@@ -0,0 +1,50 @@
+import { clearTableColumnStats, fetchTableColumnStats } from '../columnStats'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+describe('fetchTableColumnStats', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+    clearTableColumnStats()
+  })
+
+  it('should fetch once per table and share the result', async () => {
+    const tableStats = { table_path: '/data/t.parquet', cnt_all: 3, columns: {}, cached: false }
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => tableStats,
+    } as Response)
+
+    const results = await Promise.all([
+      fetchTableColumnStats('/data/t.parquet', 'duckdb'),
+      fetchTableColumnStats('/data/t.parquet', 'duckdb'),
+    ])
+
+    expect(results).toEqual([tableStats, tableStats])
+    expect(mockFetch).toHaveBeenCalledTimes(1)
+    expect(mockFetch).toHaveBeenCalledWith(
+      `${API_PREFIX}/column-stats?tablePath=%2Fdata%2Ft.parquet&queryEngine=duckdb`
+    )
+  })
+
+  it('should resolve to null when the server cannot compute stats', async () => {
+    jest.spyOn(console, 'warn').mockImplementation(() => {})
+    mockFetch.mockResolvedValueOnce({
+      ok: false,
+      statusText: 'Internal Server Error',
+    } as Response)
+
+    expect(await fetchTableColumnStats('/data/t.parquet', 'duckdb')).toBeNull()
+    expect(await fetchTableColumnStats('/data/t.parquet', 'duckdb')).toBeNull()
+    expect(mockFetch).toHaveBeenCalledTimes(1)
+  })
+
+  it('should not fetch for unsupported query engines', async () => {
+    expect(await fetchTableColumnStats('db.table', 'athena')).toBeNull()
+    expect(mockFetch).not.toHaveBeenCalled()
+  })
+})
@@ -0,0 +1,91 @@
+import { fetchLanceVersions, streamLanceTables } from '../lanceTables'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+describe('streamLanceTables', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should report the names, then each table', async () => {
+    const lines = [
+      { type: 'tables', names: ['a', 'b'] },
+      { type: 'table', name: 'b', cnt_rows: 2, cnt_columns: 1, cnt_versions: 1, cnt_indices: 0 },
+      { type: 'table', name: 'a', cnt_rows: 5, cnt_columns: 3, cnt_versions: 2, cnt_indices: 1 },
+      { type: 'end', runtime: 0.1, cached: 1 },
+    ]
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      text: async () => lines.map((line) => JSON.stringify(line)).join('\n'),
+    } as Response)
+
+    const onNames = jest.fn()
+    const onTable = jest.fn()
+    await streamLanceTables('/data/db', onNames, onTable)
+
+    expect(mockFetch.mock.calls[0][0]).toBe(
+      `${API_PREFIX}/lance/list-tables/stream?dbPath=%2Fdata%2Fdb&dbType=lance`
+    )
+    expect(onNames).toHaveBeenCalledWith(['a', 'b'])
+    expect(onTable.mock.calls.map(([table]) => table.name)).toEqual(['b', 'a'])
+    expect(onTable.mock.calls[1][0]).toEqual({
+      name: 'a', cnt_rows: 5, cnt_columns: 3, cnt_versions: 2, cnt_indices: 1,
+    })
+  })
+
+  it('should throw the server error', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: false,
+      status: 400,
+      json: async () => ({ error: 'Directory does not exist: /nope' }),
+    } as Response)
+
+    await expect(streamLanceTables('/nope', jest.fn(), jest.fn())).rejects.toThrow(
+      'Directory does not exist: /nope'
+    )
+  })
+})
+
+describe('fetchLanceVersions', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should fetch the versions after sinceVersion with their total', async () => {
+    const version = {
+      version: 4, timestamp: 1700000000, total_data_files: 2, total_rows: 10, rows_add: 1, rows_remove: 0,
+      columns_add: [], columns_remove: [], indices_add: ['i_idx'], indices_remove: [],
+    }
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      headers: new Headers({ 'X-Total-Versions': '7' }),
+      json: async () => [version],
+    } as unknown as Response)
+
+    const page = await fetchLanceVersions('/data/db', 't', { sinceVersion: 3, limit: 1 })
+
+    expect(page).toEqual({ versions: [version], total: 7 })
+    expect(mockFetch.mock.calls[0][0]).toBe(
+      `${API_PREFIX}/lance/list-versions?dbPath=%2Fdata%2Fdb&tableName=t&dbType=lance&sinceVersion=3&limit=1`
+    )
+  })
+
+  it('should fetch all versions by default', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      headers: new Headers(),
+      json: async () => [],
+    } as unknown as Response)
+
+    const page = await fetchLanceVersions('/data/db', 't')
+
+    expect(page).toEqual({ versions: [], total: 0 })
+    expect(mockFetch.mock.calls[0][0]).toBe(
+      `${API_PREFIX}/lance/list-versions?dbPath=%2Fdata%2Fdb&tableName=t&dbType=lance`
+    )
+  })
+})
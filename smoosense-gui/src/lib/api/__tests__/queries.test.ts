@@ -1,4 +1,4 @@
-import { getColumnMetadata } from '../queries'
+import { executeQuery, executeQueryBatch, executeQueryStream, getColumnMetadata } from '../queries'
 import { API_PREFIX } from '@/lib/utils/urlUtils'
 
 // Mock fetch for testing
@@ -171,6 +171,7 @@ describe('getColumnMetadata', () => {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'Accept': 'application/vnd.apache.arrow.stream, application/json;q=0.9',
       },
       body: JSON.stringify({
         query: "SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM '/test/file.csv')",
@@ -520,4 +521,174 @@ describe('getColumnMetadata', () => {
       expect(result[0].stats).toBeNull()
     })
   })
-})
\ No newline at end of file
+})
+
+describe('executeQuery cancellation', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('cancels the query on the server when the signal is aborted', async () => {
+    mockFetch.mockImplementationOnce((_url, init) => new Promise((_resolve, reject) => {
+      init?.signal?.addEventListener('abort', () => reject(new Error('The operation was aborted')))
+    }))
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => ({ query_id: 'query_1', was_running: true }),
+    } as Response)
+
+    const controller = new AbortController()
+    const pending = executeQuery('SELECT 1', 'test', mockDispatch, 'duckdb', '/test/file.csv', {
+      signal: controller.signal,
+      timeout: 5,
+    })
+    controller.abort()
+    const result = await pending
+
+    expect(result.status).toBe('error')
+    const requestBody = JSON.parse(mockFetch.mock.calls[0][1]?.body as string)
+    expect(requestBody.timeout).toBe(5)
+    expect(requestBody.queryId).toMatch(/^query_/)
+    expect(mockFetch).toHaveBeenCalledWith(`${API_PREFIX}/query/cancel`, expect.objectContaining({
+      method: 'POST',
+      body: JSON.stringify({ queryId: requestBody.queryId }),
+    }))
+  })
+})
+
+describe('executeQueryBatch', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should post all queries at once and order the streamed results', async () => {
+    const lines = [
+      { index: 1, status: 'success', column_names: ['b'], rows: [[2]], runtime: 0.1, combined: 2 },
+      { index: 0, status: 'success', column_names: ['a'], rows: [[1]], runtime: 0.1, combined: 2 },
+    ]
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      text: async () => lines.map((line) => JSON.stringify(line)).join('\n') + '\n',
+    } as Response)
+
+    const onResult = jest.fn()
+    const results = await executeQueryBatch(
+      ['SELECT 1 AS a', 'SELECT 2 AS b'], 'duckdb', '/data/t.parquet', { onResult }
+    )
+
+    expect(mockFetch).toHaveBeenCalledTimes(1)
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/query/batch`)
+    expect(JSON.parse(init?.body as string)).toMatchObject({
+      queries: ['SELECT 1 AS a', 'SELECT 2 AS b'],
+      queryEngine: 'duckdb',
+      tablePath: '/data/t.parquet',
+    })
+    expect(onResult).toHaveBeenCalledTimes(2)
+    expect(onResult.mock.calls[0][0].index).toBe(1)
+    expect(results.map((result) => result.column_names)).toEqual([['a'], ['b']])
+  })
+
+  it('should throw on HTTP errors', async () => {
+    mockFetch.mockResolvedValueOnce({ ok: false, status: 400 } as Response)
+    await expect(executeQueryBatch(['SELECT 1'], 'duckdb', '/t.parquet')).rejects.toThrow(
+      'HTTP error! status: 400'
+    )
+  })
+})
+
+describe('executeQuery with batch', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should send the queries of a table issued together as one batch', async () => {
+    const lines = [
+      { index: 1, status: 'success', column_names: ['b'], rows: [[2]], runtime: 0.1 },
+      { index: 0, status: 'error', column_names: [], rows: [], runtime: 0.1, error: 'bad' },
+    ]
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      text: async () => lines.map((line) => JSON.stringify(line)).join('\n') + '\n',
+    } as Response)
+
+    const [first, second] = await Promise.all([
+      executeQuery('SELECT a', 'k1', mockDispatch, 'duckdb', '/t.parquet', { batch: true, timeout: 5 }),
+      executeQuery('SELECT 2 AS b', 'k2', mockDispatch, 'duckdb', '/t.parquet', { batch: true, timeout: 9 }),
+    ])
+
+    expect(mockFetch).toHaveBeenCalledTimes(1)
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/query/batch`)
+    expect(JSON.parse(init?.body as string)).toMatchObject({
+      queries: ['SELECT a', 'SELECT 2 AS b'],
+      tablePath: '/t.parquet',
+      timeout: 9,
+    })
+    expect(first.status).toBe('error')
+    expect(first.error).toBe('bad')
+    expect(second.rows).toEqual([[2]])
+  })
+
+  it('should fail every query of a batch whose request fails', async () => {
+    mockFetch.mockResolvedValueOnce({ ok: false, status: 500 } as Response)
+
+    const results = await Promise.all([
+      executeQuery('SELECT 1', 'k1', mockDispatch, 'duckdb', '/t.parquet', { batch: true }),
+      executeQuery('SELECT 2', 'k2', mockDispatch, 'duckdb', '/t.parquet', { batch: true }),
+    ])
+
+    expect(results.map((result) => result.error)).toEqual([
+      'HTTP error! status: 500',
+      'HTTP error! status: 500',
+    ])
+  })
+})
+
+describe('executeQueryStream', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should report rows as they arrive and resolve to the complete result', async () => {
+    const lines = [
+      { type: 'schema', column_names: ['a'] },
+      { type: 'rows', rows: [[1], [2]] },
+      { type: 'rows', rows: [[3]] },
+      { type: 'end', status: 'success', error: null, num_rows: 3, truncated: true, runtime: 0.2 },
+    ]
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      text: async () => lines.map((line) => JSON.stringify(line)).join('\n') + '\n',
+    } as Response)
+
+    const onRows = jest.fn()
+    const result = await executeQueryStream(
+      'SELECT a FROM t', 'sql_1', mockDispatch, 'duckdb', '/data/t.parquet', { onRows, maxRows: 3 }
+    )
+
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/query/stream`)
+    expect(JSON.parse(init?.body as string)).toMatchObject({ query: 'SELECT a FROM t', maxRows: 3 })
+    expect(onRows).toHaveBeenCalledTimes(2)
+    expect(onRows.mock.calls[0][0].status).toBe('running')
+    expect(result).toMatchObject({
+      column_names: ['a'],
+      rows: [[1], [2], [3]],
+      status: 'success',
+      truncated: true,
+    })
+    expect(mockDispatch).toHaveBeenCalledTimes(2)
+  })
+
+  it('should return the error of a failed query', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      text: async () => JSON.stringify({ type: 'end', status: 'error', error: 'Binder Error', runtime: 0 }),
+    } as Response)
+
+    const result = await executeQueryStream('SELECT x', 'sql_2', mockDispatch, 'duckdb', '/t.parquet')
+    expect(result.status).toBe('error')
+    expect(result.error).toBe('Binder Error')
+  })
+})
@@ -0,0 +1,121 @@
+import { fetchRowPage, fetchRowSample, resetRowCursor } from '../rows'
+import { API_PREFIX, forgetSignedUrls, proxyedUrl } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+const request = {
+  tablePath: '/data/t.parquet',
+  queryEngine: 'duckdb',
+  condition: 'x > 1',
+  sorting: [{ field: 'x', direction: 'desc' as const }],
+  pageSize: 100,
+  pageNumber: 400000,
+}
+
+const pageResponse = (cursorId: string | null) => ({
+  ok: true,
+  json: async () => ({
+    column_names: ['x'],
+    rows: [[2]],
+    cursor_id: cursorId,
+    cursor_reused: false,
+    strategy: 'positions',
+    num_rows: 40000000,
+    page_number: 400000,
+    page_size: 100,
+    runtime: 0.01,
+  }),
+} as Response)
+
+describe('fetchRowPage', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+    resetRowCursor()
+  })
+
+  it('should send the cursor of the previous page along', async () => {
+    mockFetch.mockResolvedValueOnce(pageResponse('cursor-1'))
+    mockFetch.mockResolvedValueOnce(pageResponse('cursor-1'))
+
+    const result = await fetchRowPage(request)
+    expect(result.rows).toEqual([[2]])
+    await fetchRowPage({ ...request, pageNumber: 400001 })
+
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/rows/page`)
+    expect(JSON.parse(init?.body as string)).toEqual({ ...request, cursorId: null })
+    expect(JSON.parse(mockFetch.mock.calls[1][1]?.body as string).cursorId).toBe('cursor-1')
+  })
+
+  it('should throw the server error', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: false,
+      status: 400,
+      json: async () => ({ error: 'pageSize must be a positive integer' }),
+    } as Response)
+
+    await expect(fetchRowPage(request)).rejects.toThrow('pageSize must be a positive integer')
+  })
+})
+
+describe('fetchRowSample', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should post the sample request and return the seed', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => ({
+        column_names: ['x'],
+        rows: [[5], [3]],
+        seed: 42,
+        strategy: 'blocks',
+        runtime: 0.01,
+      }),
+    } as Response)
+
+    const sampleRequest = {
+      tablePath: '/data/t.parquet',
+      queryEngine: 'duckdb',
+      condition: '(x > 1) AND (y = 2)',
+      size: 2,
+    }
+    const result = await fetchRowSample(sampleRequest)
+    expect(result.seed).toBe(42)
+    expect(result.rows).toEqual([[5], [3]])
+
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/rows/sample`)
+    expect(JSON.parse(init?.body as string)).toEqual(sampleRequest)
+  })
+
+  it('should remember the signed URLs of the rows', async () => {
+    const signed = 'https://bucket.s3.amazonaws.com/a.jpg?X-Amz-Signature=abc'
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => ({
+        column_names: ['image'],
+        rows: [['s3://bucket/a.jpg']],
+        seed: 42,
+        strategy: 'blocks',
+        signed_urls: { 's3://bucket/a.jpg': signed },
+        signed_urls_expire_at: Date.now() / 1000 + 3000,
+        runtime: 0.01,
+      }),
+    } as Response)
+
+    await fetchRowSample({
+      tablePath: '/data/t.parquet',
+      queryEngine: 'duckdb',
+      condition: null,
+      size: 1,
+      signUrls: true,
+    })
+    expect(proxyedUrl('s3://bucket/a.jpg')).toBe(signed)
+    forgetSignedUrls()
+  })
+})
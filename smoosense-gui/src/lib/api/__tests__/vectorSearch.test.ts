@@ -0,0 +1,49 @@
+import { searchVectors } from '../vectorSearch'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+describe('searchVectors', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should post the search and return the neighbors', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => ({
+        column_names: ['id', '_distance', '_rowid'],
+        rows: [[7, 0, 7], [3, 0.5, 3]],
+        column: 'vector',
+        k: 2,
+        strategy: 'index',
+        index: { name: 'vector_idx', type: 'IVF_PQ' },
+        report: null,
+        runtime: 0.01,
+      }),
+    } as Response)
+
+    const request = { tablePath: '/data/t.lance', rowId: 7, k: 2, columns: ['id'] }
+    const result = await searchVectors(request)
+
+    expect(result.rows).toEqual([[7, 0, 7], [3, 0.5, 3]])
+    const [url, init] = mockFetch.mock.calls[0]
+    expect(url).toBe(`${API_PREFIX}/lance/search`)
+    expect(JSON.parse(init?.body as string)).toEqual(request)
+  })
+
+  it('should throw the server error', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: false,
+      status: 400,
+      json: async () => ({ error: 'vector must be a list of 8 numbers' }),
+    } as Response)
+
+    await expect(searchVectors({ tablePath: '/data/t.lance', vector: [1] })).rejects.toThrow(
+      'vector must be a list of 8 numbers'
+    )
+  })
+})
@@ -0,0 +1,53 @@
+import { fetchVideoPreviewInfo, prefetchVideoPreviews, videoPreviewUrl } from '../videoPreviews'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+const LOCAL_URL = 'http://localhost:8000/./api/get-file?path=%2Fdata%2Fclip.mp4&redirect=false'
+
+describe('videoPreviews', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should make preview URLs of videos served by the backend', () => {
+    expect(videoPreviewUrl('s3://bucket/clip.mp4', 'poster')).toBe(
+      `${API_PREFIX}/video-preview?path=s3%3A%2F%2Fbucket%2Fclip.mp4&kind=poster`
+    )
+    expect(videoPreviewUrl(LOCAL_URL, 'sprite')).toBe(
+      'http://localhost:8000/./api/video-preview?path=%2Fdata%2Fclip.mp4&kind=sprite'
+    )
+    expect(videoPreviewUrl('https://cdn.example.com/clip.mp4', 'poster')).toBeNull()
+  })
+
+  it('should fetch the sprite description', async () => {
+    const info = {
+      duration: 4, width: 320, height: 240, tiles: 4, tile_width: 160, tile_height: 120,
+      timestamps: [0, 1, 2, 3],
+    }
+    mockFetch.mockResolvedValueOnce({ ok: true, json: async () => info } as Response)
+
+    expect(await fetchVideoPreviewInfo('s3://bucket/clip.mp4')).toEqual(info)
+    expect(mockFetch.mock.calls[0][0]).toBe(
+      `${API_PREFIX}/video-preview?path=s3%3A%2F%2Fbucket%2Fclip.mp4&kind=info`
+    )
+  })
+
+  it('should prefetch the previews of videos served by the backend', async () => {
+    mockFetch.mockResolvedValue({ ok: true, json: async () => ({ scheduled: 1 }) } as Response)
+
+    const scheduled = await prefetchVideoPreviews([
+      's3://bucket/clip.mp4', LOCAL_URL, 'https://cdn.example.com/clip.mp4',
+    ])
+
+    expect(scheduled).toBe(2)
+    const bodies = mockFetch.mock.calls.map(([url, init]) => [url, JSON.parse(init?.body as string)])
+    expect(bodies).toEqual([
+      [`${API_PREFIX}/video-preview/prefetch`, { paths: ['s3://bucket/clip.mp4'] }],
+      ['http://localhost:8000/./api/video-preview/prefetch', { paths: ['/data/clip.mp4'] }],
+    ])
+  })
+})
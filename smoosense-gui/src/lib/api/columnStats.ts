@@ -0,0 +1,72 @@
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Base statistics of one column, computed by the server over the whole (unfiltered) table
+export interface TableColumnStatsEntry {
+  duckdb_type: string
+  cnt_null: number
+  cnt_not_null: number
+  min: string | number | boolean | null
+  max: string | number | boolean | null
+  /** null for nested and binary columns */
+  approx_cnt_distinct: number | null
+  /** Exact distinct count, only for columns with at most 1000 distinct values */
+  cnt_distinct: number | null
+  /** Value counts sorted by count, only for columns with at most 1000 distinct values */
+  top_values: Array<{ value: string | number | boolean; cnt: number }> | null
+}
+
+export interface TableColumnStats {
+  table_path: string
+  cnt_all: number
+  columns: Record<string, TableColumnStatsEntry>
+  /** Whether the server read the statistics from its sidecar cache */
+  cached: boolean
+}
+
+// Query engines the server can compute statistics with
+const SUPPORTED_QUERY_ENGINES = ['duckdb', 'lance']
+
+// One request per table, shared by all columns
+const pendingStats = new Map<string, Promise<TableColumnStats | null>>()
+
+/**
+ * Fetch base statistics of every column of a table from /api/column-stats.
+ *
+ * The server computes them in one pass and persists them per file fingerprint, so this is
+ * cheap after the first time a table is opened. Resolves to null when the statistics are
+ * not available, in which case callers should fall back to querying.
+ */
+export function fetchTableColumnStats(
+  tablePath: string,
+  queryEngine: string
+): Promise<TableColumnStats | null> {
+  if (!SUPPORTED_QUERY_ENGINES.includes(queryEngine)) {
+    return Promise.resolve(null)
+  }
+  const key = `${queryEngine}:${tablePath}`
+  let pending = pendingStats.get(key)
+  if (!pending) {
+    const params = new URLSearchParams({ tablePath, queryEngine })
+    pending = fetch(`${API_PREFIX}/column-stats?${params}`)
+      .then(async (response) => {
+        if (!response.ok) {
+          throw new Error(`Failed to load column stats: ${response.statusText}`)
+        }
+        return (await response.json()) as TableColumnStats
+      })
+      .catch((error) => {
+        // Remembered as null, so that other columns do not retry a failing computation
+        console.warn('Column stats unavailable, falling back to queries:', error)
+        return null
+      })
+    pendingStats.set(key, pending)
+  }
+  return pending
+}
+
+/**
+ * Forget fetched statistics, e.g. after the table was modified
+ */
+export function clearTableColumnStats(): void {
+  pendingStats.clear()
+}
@@ -0,0 +1,93 @@
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+import { readNdjson } from './queries'
+import { throwIfNotOk } from './rows'
+
+export interface LanceTableInfo {
+  name: string
+  cnt_rows: number | null
+  cnt_columns: number | null
+  cnt_versions: number | null
+  cnt_indices: number | null
+}
+
+/** Placeholder of a table whose info has not arrived yet */
+export function pendingTableInfo(name: string): LanceTableInfo {
+  return { name, cnt_rows: null, cnt_columns: null, cnt_versions: null, cnt_indices: null }
+}
+
+/**
+ * List the tables of a Lance database via /api/lance/list-tables/stream: `onNames` is called
+ * with all table names first, then `onTable` with the info of each table as it is computed.
+ */
+export async function streamLanceTables(
+  dbPath: string,
+  onNames: (names: string[]) => void,
+  onTable: (table: LanceTableInfo) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const params = new URLSearchParams({ dbPath, dbType: 'lance' })
+  const response = await fetch(`${API_PREFIX}/lance/list-tables/stream?${params}`, {
+    ...(signal ? { signal } : {}),
+  })
+
+  await throwIfNotOk(response)
+  await readNdjson(response, (line) => {
+    if (line.type === 'tables') {
+      onNames(line.names as string[])
+    } else if (line.type === 'table') {
+      // eslint-disable-next-line @typescript-eslint/no-unused-vars
+      const { type, ...table } = line
+      onTable(table as unknown as LanceTableInfo)
+    }
+  })
+}
+
+export interface LanceVersionInfo {
+  version: number
+  timestamp: number
+  total_data_files: number | null
+  total_rows: number | null
+  rows_add: number | null
+  rows_remove: number | null
+  columns_add: string[]
+  columns_remove: string[]
+  indices_add: string[]
+  indices_remove: string[]
+}
+
+export interface LanceVersionsPage {
+  /** Versions sorted by version number */
+  versions: LanceVersionInfo[]
+  /** Number of versions after sinceVersion */
+  total: number
+}
+
+/** Versions fetched per request when loading the history of a table */
+export const VERSIONS_PAGE_SIZE = 500
+
+/**
+ * Fetch versions of a Lance table via /api/lance/list-versions, optionally only those
+ * committed after `sinceVersion`, and at most `limit` of them.
+ */
+export async function fetchLanceVersions(
+  dbPath: string,
+  tableName: string,
+  { sinceVersion, limit }: { sinceVersion?: number; limit?: number } = {},
+  signal?: AbortSignal
+): Promise<LanceVersionsPage> {
+  const params = new URLSearchParams({ dbPath, tableName, dbType: 'lance' })
+  if (sinceVersion !== undefined) {
+    params.set('sinceVersion', String(sinceVersion))
+  }
+  if (limit !== undefined) {
+    params.set('limit', String(limit))
+  }
+  const response = await fetch(`${API_PREFIX}/lance/list-versions?${params}`, {
+    ...(signal ? { signal } : {}),
+  })
+
+  await throwIfNotOk(response)
+  const versions = (await response.json()) as LanceVersionInfo[]
+  const total = Number(response.headers.get('X-Total-Versions') ?? versions.length)
+  return { versions, total }
+}
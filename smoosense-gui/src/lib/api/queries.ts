@@ -3,6 +3,7 @@ import { computeTypeShortcuts, type TypeShortcuts } from '@/lib/utils/duckdbType
 import { isStructType, flattenStructFields } from '@/lib/utils/structParser'
 import { addExecution } from '@/lib/features/sqlHistory/sqlHistorySlice'
 import { API_PREFIX } from '@/lib/utils/urlUtils'
+import { ARROW_STREAM_MIMETYPE, readArrowStream } from '@/lib/utils/arrowIpc'
 import type { AppDispatch } from '@/lib/store'
 
 
@@ -12,6 +13,8 @@ interface QueryResult {
   runtime: number
   status: 'running' | 'success' | 'error'
   error?: string
+  // Set by streamed queries that stopped at the server's row or byte cap
+  truncated?: boolean
 }
 
 // Specific types for transformed results
@@ -28,6 +31,50 @@ interface Stats {
   allNull: boolean // true if cntNull === cntAll
 }
 
+interface QueryOptions {
+  // Aborting the signal abandons the request and cancels the query on the server
+  signal?: AbortSignal
+  // Server-side deadline in seconds, capped by the server's own limit
+  timeout?: number
+  // Send the query with the other batched queries of the table issued at the same time
+  // through /api/query/batch; aborting then only abandons this query's result
+  batch?: boolean
+}
+
+interface QueryRequest {
+  query: string
+  queryEngine: string
+  tablePath: string
+  queryId?: string
+  timeout?: number
+}
+
+interface BatchQueryResult extends QueryResult {
+  // Position of the query in the batch
+  index: number
+  cached?: boolean
+  // Number of queries answered by the same scan on the server
+  combined?: number
+}
+
+interface BatchOptions {
+  // Run independent statements on this many server threads
+  parallelism?: number
+  // Called with each result as soon as the server streams it
+  onResult?: (result: BatchQueryResult) => void
+  signal?: AbortSignal
+  timeout?: number
+}
+
+interface StreamOptions {
+  // Called with the rows received so far, while the rest are still arriving
+  onRows?: (result: QueryResult) => void
+  // Stop after this many rows, capped by the server's own limit
+  maxRows?: number
+  signal?: AbortSignal
+  timeout?: number
+}
+
 interface ColumnMeta {
   column_name: string
   duckdbType: string
@@ -41,7 +88,8 @@ export async function executeQuery(
   sqlKey: string,
   dispatch: AppDispatch,
   queryEngine: string,
-  tablePath: string
+  tablePath: string,
+  options: QueryOptions = {}
 ): Promise<QueryResult> {
   if (!sqlQuery.trim()) {
     throw new Error('Query cannot be empty')
@@ -56,28 +104,25 @@ export async function executeQuery(
   }
   dispatch(addExecution({ sqlKey, query: sqlQuery.trim(), result: runningResult }))
 
-  const requestData = {
+  const requestData: QueryRequest = {
     query: sqlQuery.trim(),
     queryEngine,
-    tablePath
+    tablePath,
+    timeout: options.timeout,
   }
 
-  // Executing SQL query
+  // A cancellable query needs an id known before the server answers
+  const { signal } = options
+  const cancel = () => cancelQuery(requestData.queryId as string)
+  if (signal && !options.batch) {
+    requestData.queryId = generateSqlKey('query')
+    signal.addEventListener('abort', cancel)
+  }
 
   try {
-    const response = await fetch(`${API_PREFIX}/query`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify(requestData),
-    })
-
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`)
-    }
-
-    const data = await response.json()
+    const data = options.batch
+      ? await abandonOnAbort(enqueueBatchedQuery(requestData), signal)
+      : await fetchQueryResult(requestData, signal)
 
     // Save successful result to Redux store
     dispatch(addExecution({ sqlKey, query: sqlQuery.trim(), result: data }))
@@ -97,18 +142,320 @@ export async function executeQuery(
     dispatch(addExecution({ sqlKey, query: sqlQuery.trim(), result: errorResult }))
     
     return errorResult
+  } finally {
+    signal?.removeEventListener('abort', cancel)
   }
 }
 
+/**
+ * Ask the server to interrupt a query started with the given queryId.
+ * Resolves to whether the query was still running.
+ */
+export async function cancelQuery(queryId: string): Promise<boolean> {
+  try {
+    const response = await fetch(`${API_PREFIX}/query/cancel`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ queryId }),
+    })
+    const data = await response.json()
+    return Boolean(data.was_running)
+  } catch (error) {
+    console.warn(`Failed to cancel query ${queryId}:`, error)
+    return false
+  }
+}
+
+/**
+ * POST the query, preferring an Arrow IPC stream and falling back to JSON.
+ * The server answers with JSON for errors or when it cannot produce Arrow.
+ * A stream that cannot be decoded fails the query instead of running it again.
+ */
+async function fetchQueryResult(
+  requestData: QueryRequest,
+  signal?: AbortSignal
+): Promise<QueryResult> {
+  const response = await fetch(`${API_PREFIX}/query`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': `${ARROW_STREAM_MIMETYPE}, application/json;q=0.9`,
+    },
+    body: JSON.stringify(requestData),
+    ...(signal ? { signal } : {}),
+  })
+
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`)
+  }
+
+  if (!response.headers?.get('Content-Type')?.startsWith(ARROW_STREAM_MIMETYPE)) {
+    return response.json()
+  }
+
+  const { column_names, rows } = await readArrowStream(
+    response.body ?? new Uint8Array(await response.arrayBuffer())
+  )
+  return {
+    column_names,
+    rows: rows as QueryResult['rows'],
+    runtime: Number(response.headers.get('X-Query-Runtime') ?? 0),
+    status: 'success',
+  }
+}
+
+/**
+ * Run several queries against one table with a single request to /api/query/batch.
+ * The server combines aggregate queries over the table into one scan and streams each
+ * result (newline-delimited JSON) as soon as it is ready. Resolves to the results in
+ * the order of the queries.
+ */
+export async function executeQueryBatch(
+  queries: string[],
+  queryEngine: string,
+  tablePath: string,
+  options: BatchOptions = {}
+): Promise<BatchQueryResult[]> {
+  const { onResult, signal, parallelism, timeout } = options
+  const results: BatchQueryResult[] = new Array(queries.length)
+  if (queries.length === 0) {
+    return results
+  }
+
+  const response = await fetch(`${API_PREFIX}/query/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'application/x-ndjson',
+    },
+    body: JSON.stringify({
+      queries: queries.map((query) => query.trim()),
+      queryEngine,
+      tablePath,
+      parallelism,
+      timeout,
+    }),
+    ...(signal ? { signal } : {}),
+  })
+
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`)
+  }
+
+  await readNdjson(response, (line) => {
+    const result = line as BatchQueryResult
+    results[result.index] = result
+    onResult?.(result)
+  })
+  return results
+}
+
+interface PendingBatch {
+  queryEngine: string
+  tablePath: string
+  requests: QueryRequest[]
+  resolvers: ((result: QueryResult) => void)[]
+}
+
+// How long batched queries wait for other queries of the same table, in milliseconds
+const BATCH_WINDOW_MS = 10
+
+// Batched queries not sent yet, by query engine and table
+const pendingBatches = new Map<string, PendingBatch>()
+
+/**
+ * Queue a query to be sent with the other queries of its table issued within
+ * BATCH_WINDOW_MS, so that the server can answer them with shared scans.
+ */
+function enqueueBatchedQuery(request: QueryRequest): Promise<QueryResult> {
+  const key = JSON.stringify([request.queryEngine, request.tablePath])
+  let batch = pendingBatches.get(key)
+  if (!batch) {
+    const scheduled: PendingBatch = {
+      queryEngine: request.queryEngine,
+      tablePath: request.tablePath,
+      requests: [],
+      resolvers: [],
+    }
+    pendingBatches.set(key, scheduled)
+    setTimeout(() => {
+      pendingBatches.delete(key)
+      sendBatch(scheduled)
+    }, BATCH_WINDOW_MS)
+    batch = scheduled
+  }
+  const { requests, resolvers } = batch
+  requests.push(request)
+  return new Promise((resolve) => resolvers.push(resolve))
+}
+
+async function sendBatch(batch: PendingBatch): Promise<void> {
+  const { requests, resolvers } = batch
+  // One deadline for the whole batch: the longest asked for, or none if a query has none
+  const timeouts = requests.map((request) => request.timeout)
+  const timeout = timeouts.every((value) => value !== undefined)
+    ? Math.max(...(timeouts as number[]))
+    : undefined
+  let error = 'Query batch ended without a result for the query'
+  try {
+    await executeQueryBatch(
+      requests.map((request) => request.query),
+      batch.queryEngine,
+      batch.tablePath,
+      { timeout, onResult: (result) => resolvers[result.index]?.(result) }
+    )
+  } catch (batchError) {
+    error = batchError instanceof Error ? batchError.message : 'Unknown error occurred'
+  }
+  // Resolving again is a no-op for the queries that got their result
+  resolvers.forEach((resolve) =>
+    resolve({ column_names: [], rows: [], runtime: 0, status: 'error', error })
+  )
+}
+
+function abandonOnAbort<T>(promise: Promise<T>, signal?: AbortSignal): Promise<T> {
+  if (!signal) {
+    return promise
+  }
+  return new Promise((resolve, reject) => {
+    const abort = () => reject(new Error('Query aborted'))
+    if (signal.aborted) {
+      abort()
+      return
+    }
+    signal.addEventListener('abort', abort)
+    promise.then(resolve, reject).finally(() => signal.removeEventListener('abort', abort))
+  })
+}
+
+/**
+ * Run a query through /api/query/stream, which sends the rows as newline-delimited JSON
+ * while the server reads them instead of buffering the whole result.
+ * `onRows` is called with the rows received so far after each chunk, so that the first
+ * rows can be shown before the query finishes. Resolves to the complete result.
+ */
+export async function executeQueryStream(
+  sqlQuery: string,
+  sqlKey: string,
+  dispatch: AppDispatch,
+  queryEngine: string,
+  tablePath: string,
+  options: StreamOptions = {}
+): Promise<QueryResult> {
+  if (!sqlQuery.trim()) {
+    throw new Error('Query cannot be empty')
+  }
+  const { onRows, maxRows, signal, timeout } = options
+  const query = sqlQuery.trim()
+  const result: QueryResult = {
+    column_names: [],
+    rows: [],
+    runtime: 0,
+    status: 'running'
+  }
+  // The store freezes what it is given, so it must not share the rows appended below
+  dispatch(addExecution({ sqlKey, query, result: { ...result, rows: [] } }))
+
+  const queryId = generateSqlKey('query')
+  const cancel = () => cancelQuery(queryId)
+  signal?.addEventListener('abort', cancel)
+  try {
+    const response = await fetch(`${API_PREFIX}/query/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'application/x-ndjson',
+      },
+      body: JSON.stringify({ query, queryEngine, tablePath, queryId, maxRows, timeout }),
+      ...(signal ? { signal } : {}),
+    })
+    if (!response.ok) {
+      let message = `HTTP error! status: ${response.status}`
+      try {
+        message = (await response.json())?.error || message
+      } catch {
+        // Keep the status as the message
+      }
+      throw new Error(message)
+    }
+
+    await readNdjson(response, (line) => {
+      if (line.type === 'schema') {
+        result.column_names = line.column_names as string[]
+      } else if (line.type === 'rows') {
+        // Appended in place: copying every chunk would be quadratic in the result size
+        result.rows.push(...(line.rows as QueryResult['rows']))
+        onRows?.({ ...result })
+      } else if (line.type === 'end') {
+        result.status = line.status as QueryResult['status']
+        result.runtime = line.runtime as number
+        result.truncated = Boolean(line.truncated)
+        if (line.error) {
+          result.error = line.error as string
+        }
+      }
+    })
+    if (result.status === 'running') {
+      throw new Error('Query stream ended unexpectedly')
+    }
+  } catch (error) {
+    result.status = 'error'
+    result.error = error instanceof Error ? error.message : 'Unknown error occurred'
+  } finally {
+    signal?.removeEventListener('abort', cancel)
+  }
+
+  dispatch(addExecution({ sqlKey, query, result: { ...result } }))
+  return result
+}
+
+/**
+ * Call `handleLine` with each parsed line of a newline-delimited JSON response as it
+ * arrives, or with all of them at once when the response body cannot be streamed.
+ */
+export async function readNdjson(
+  response: Response,
+  handleLine: (line: Record<string, unknown>) => void
+): Promise<void> {
+  const handleText = (text: string) => {
+    if (text.trim()) {
+      handleLine(JSON.parse(text))
+    }
+  }
+
+  const reader = response.body?.getReader()
+  if (!reader) {
+    (await response.text()).split('\n').forEach(handleText)
+    return
+  }
+
+  const decoder = new TextDecoder()
+  let buffered = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) {
+      break
+    }
+    buffered += decoder.decode(value, { stream: true })
+    const lines = buffered.split('\n')
+    buffered = lines.pop() ?? ''
+    lines.forEach(handleText)
+  }
+  handleText(buffered + decoder.decode())
+}
+
 export async function executeQueryAsListOfDict(
   sqlQuery: string,
   sqlKey: string,
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
   dispatch: any,
   queryEngine: string,
-  tablePath: string
+  tablePath: string,
+  options: QueryOptions = {}
 ): Promise<RowObject[]> {
-  const rawResult = await executeQuery(sqlQuery, sqlKey, dispatch, queryEngine, tablePath)
+  const rawResult = await executeQuery(sqlQuery, sqlKey, dispatch, queryEngine, tablePath, options)
 
   if (rawResult.status === 'error') {
     throw new Error(rawResult.error || 'Query failed')
@@ -303,6 +650,10 @@ export function generateSqlKey(prefix = 'sql'): string {
 
 export type { 
   QueryResult, 
+  QueryOptions,
+  BatchQueryResult,
+  BatchOptions,
+  StreamOptions,
   RowObject, 
   DictOfList, 
   ColumnMeta,
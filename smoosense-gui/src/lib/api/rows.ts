@@ -0,0 +1,144 @@
+import { API_PREFIX, rememberSignedUrls } from '@/lib/utils/urlUtils'
+
+export interface RowSort {
+  field: string
+  direction: 'asc' | 'desc'
+}
+
+export interface RowPageRequest {
+  tablePath: string
+  queryEngine: string
+  /** SQL condition the rows must match, without WHERE */
+  condition: string | null
+  sorting: RowSort[]
+  pageSize: number
+  pageNumber: number
+  /** Ask for presigned URLs of the S3 URLs in the rows, see SignedUrls */
+  signUrls?: boolean
+}
+
+export interface RowPageResult extends SignedUrls {
+  column_names: string[]
+  rows: unknown[][]
+  /** Server-side cursor of the view, null when the table is paged with LIMIT/OFFSET */
+  cursor_id: string | null
+  cursor_reused: boolean
+  /** 'scan' | 'positions' when paged through a cursor, 'offset' otherwise */
+  strategy: string
+  /** Number of rows of the view, null when unknown */
+  num_rows: number | null
+  page_number: number
+  page_size: number
+  runtime: number
+}
+
+export interface RowSampleRequest {
+  tablePath: string
+  queryEngine: string
+  /** SQL condition the sampled rows must match, without WHERE */
+  condition: string | null
+  size: number
+  /** Same seed, same rows; a random seed is picked by the server when omitted */
+  seed?: number
+  /** Ask for presigned URLs of the S3 URLs in the rows, see SignedUrls */
+  signUrls?: boolean
+}
+
+/** Presigned URLs of the S3 URLs in the rows, sent when the request has signUrls */
+export interface SignedUrls {
+  /** Signed URL of each S3 URL */
+  signed_urls?: Record<string, string>
+  /** Seconds since the epoch until which the signed URLs can be used, null without URLs */
+  signed_urls_expire_at?: number | null
+}
+
+export interface RowSampleResult extends SignedUrls {
+  column_names: string[]
+  rows: unknown[][]
+  seed: number
+  /** 'blocks' when sampled from random row groups or fragments, 'reservoir' otherwise */
+  strategy: string
+  runtime: number
+}
+
+// Cursor of this session; the server replaces it when the view changes
+let sessionCursorId: string | null = null
+
+/**
+ * Fetch a page of rows from /api/rows/page.
+ *
+ * Deep pages are read through a server-side cursor instead of LIMIT/OFFSET, so paging to
+ * row 40,000,000 costs about the same as paging to row 40. The cursor of the previous page
+ * is sent along and reused by the server as long as the table, filter and sorting are the same.
+ */
+export async function fetchRowPage(
+  request: RowPageRequest,
+  signal?: AbortSignal
+): Promise<RowPageResult> {
+  const response = await fetch(`${API_PREFIX}/rows/page`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ ...request, cursorId: sessionCursorId }),
+    ...(signal ? { signal } : {}),
+  })
+
+  await throwIfNotOk(response)
+  const result = (await response.json()) as RowPageResult
+  sessionCursorId = result.cursor_id
+  rememberRowSignedUrls(result)
+  return result
+}
+
+/**
+ * Fetch a random sample of rows from /api/rows/sample.
+ *
+ * Parquet and Lance tables are sampled from random row groups or fragments instead of
+ * sorting the whole table by random(), and filters are met by oversampling.
+ */
+export async function fetchRowSample(
+  request: RowSampleRequest,
+  signal?: AbortSignal
+): Promise<RowSampleResult> {
+  const response = await fetch(`${API_PREFIX}/rows/sample`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+    ...(signal ? { signal } : {}),
+  })
+
+  await throwIfNotOk(response)
+  const result = (await response.json()) as RowSampleResult
+  rememberRowSignedUrls(result)
+  return result
+}
+
+// Media cells then load straight from S3 instead of through a redirect of /api/s3-proxy each
+function rememberRowSignedUrls(result: SignedUrls): void {
+  if (result.signed_urls) {
+    rememberSignedUrls(result.signed_urls, result.signed_urls_expire_at ?? null)
+  }
+}
+
+export async function throwIfNotOk(response: Response): Promise<void> {
+  if (response.ok) {
+    return
+  }
+  let message = `HTTP error! status: ${response.status}`
+  try {
+    const body = await response.json()
+    if (body?.error) {
+      message = body.error
+    }
+  } catch {
+    // Keep the status as the message
+  }
+  throw new Error(message)
+}
+
+export function resetRowCursor(): void {
+  sessionCursorId = null
+}
@@ -0,0 +1,65 @@
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+import { throwIfNotOk } from './rows'
+
+export interface VectorSearchRequest {
+  tablePath: string
+  /** Vector column; may be omitted when the table has a single one */
+  column?: string
+  /** Query vector; exactly one of vector and rowId */
+  vector?: number[]
+  /** Search from the vector of this row, the _rowid of a previous result */
+  rowId?: number
+  k?: number
+  /** SQL condition the neighbors must match, without WHERE */
+  filter?: string | null
+  /** Filter before the search (default), so that k matching rows are found */
+  prefilter?: boolean
+  nprobes?: number
+  refineFactor?: number
+  /** Columns to return; all but the vector column when omitted */
+  columns?: string[]
+  /** false forces a flat scan, even when the column has an ANN index */
+  useIndex?: boolean
+  /** Compare the result with a flat scan, to measure the recall of the index */
+  report?: boolean
+}
+
+export interface VectorSearchReport {
+  latency: number
+  flat_latency: number
+  /** Share of the exact k nearest neighbors found by the search */
+  recall: number
+}
+
+export interface VectorSearchResult {
+  /** Requested columns, then _distance and _rowid */
+  column_names: string[]
+  rows: unknown[][]
+  column: string
+  k: number
+  /** 'index' when searched through an ANN index, 'flat' otherwise */
+  strategy: string
+  index: { name: string; type: string } | null
+  report: VectorSearchReport | null
+  runtime: number
+}
+
+/**
+ * Find the rows of a Lance table nearest to a vector, or to the vector of a row, via /api/lance/search.
+ */
+export async function searchVectors(
+  request: VectorSearchRequest,
+  signal?: AbortSignal
+): Promise<VectorSearchResult> {
+  const response = await fetch(`${API_PREFIX}/lance/search`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+    ...(signal ? { signal } : {}),
+  })
+
+  await throwIfNotOk(response)
+  return (await response.json()) as VectorSearchResult
+}
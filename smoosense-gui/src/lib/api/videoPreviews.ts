@@ -0,0 +1,70 @@
+import { backendMediaPath } from '@/lib/utils/urlUtils'
+import { throwIfNotOk } from './rows'
+
+export type VideoPreviewKind = 'poster' | 'sprite' | 'info'
+
+/** Description of the sprite sheet of a video: a row of `tiles` keyframes */
+export interface VideoPreviewInfo {
+  duration: number
+  width: number
+  height: number
+  tiles: number
+  tile_width: number
+  tile_height: number
+  timestamps: number[]
+}
+
+/**
+ * URL of the poster frame, sprite sheet or sprite description of a video served by the backend
+ * @returns null for videos the browser fetches directly
+ */
+export function videoPreviewUrl(url: string, kind: VideoPreviewKind): string | null {
+  const media = backendMediaPath(url)
+  if (!media) {
+    return null
+  }
+  const params = new URLSearchParams({ path: media.path, kind })
+  return `${media.apiPrefix}/video-preview?${params.toString()}`
+}
+
+export async function fetchVideoPreviewInfo(
+  url: string,
+  signal?: AbortSignal
+): Promise<VideoPreviewInfo> {
+  const infoUrl = videoPreviewUrl(url, 'info')
+  if (!infoUrl) {
+    throw new Error(`No preview for ${url}`)
+  }
+  const response = await fetch(infoUrl, { ...(signal ? { signal } : {}) })
+  await throwIfNotOk(response)
+  return response.json()
+}
+
+/**
+ * Ask the backend to make the previews of videos in the background, e.g. of a page of rows,
+ * so that they are ready when the gallery shows them
+ * @returns The number of videos scheduled
+ */
+export async function prefetchVideoPreviews(urls: string[]): Promise<number> {
+  const byPrefix = new Map<string, string[]>()
+  urls.forEach((url) => {
+    const media = backendMediaPath(url)
+    if (media) {
+      byPrefix.set(media.apiPrefix, [...(byPrefix.get(media.apiPrefix) ?? []), media.path])
+    }
+  })
+  const requests: Promise<number>[] = []
+  byPrefix.forEach((paths, apiPrefix) => {
+    requests.push((async () => {
+      const response = await fetch(`${apiPrefix}/video-preview/prefetch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ paths }),
+      })
+      await throwIfNotOk(response)
+      return (await response.json()).scheduled as number
+    })())
+  })
+  const scheduled = await Promise.all(requests)
+  return scheduled.reduce((total, count) => total + count, 0)
+}
@@ -3,10 +3,12 @@ import cardinalityReducer, {
   setCardinality,
   clearColumnError,
   inferCardinalityFromMetadata,
+  inferCardinalityFromTableStats,
   type CardinalityState,
   type ColumnCardinality
 } from '../cardinalitySlice'
 import type { ColumnMeta } from '@/lib/api/queries'
+import type { TableColumnStats, TableColumnStatsEntry } from '@/lib/api/columnStats'
 
 // Create a test store
 function createTestStore(preloadedState?: CardinalityState) {
@@ -209,4 +211,35 @@ describe('cardinalitySlice', () => {
     expect(state['col1'].error).toBeNull()
   })
 
-})
\ No newline at end of file
+  it('should infer cardinality from table column stats', () => {
+    const entry = (approxCntD: number | null, cntD: number | null): TableColumnStatsEntry => ({
+      duckdb_type: 'VARCHAR',
+      cnt_null: 20,
+      cnt_not_null: 80,
+      min: 'a',
+      max: 'z',
+      approx_cnt_distinct: approxCntD,
+      cnt_distinct: cntD,
+      top_values: null
+    })
+    const tableStats: TableColumnStats = {
+      table_path: '/data/t.parquet',
+      cnt_all: 100,
+      cached: true,
+      columns: { low: entry(4, 5), high: entry(5000, null), nested: entry(null, null) }
+    }
+
+    expect(inferCardinalityFromTableStats(tableStats, 'low')).toEqual({
+      approxCntD: 4,
+      cntD: 5,
+      distinctRatio: 0.05,
+      cardinality: 'low',
+      source: 'from column stats'
+    })
+    expect(inferCardinalityFromTableStats(tableStats, 'high')?.cardinality).toBe('high')
+    expect(inferCardinalityFromTableStats(tableStats, 'high')?.cntD).toBeNull()
+    expect(inferCardinalityFromTableStats(tableStats, 'nested')).toBeNull()
+    expect(inferCardinalityFromTableStats(tableStats, 'missing')).toBeNull()
+    expect(inferCardinalityFromTableStats(null, 'low')).toBeNull()
+  })
+})
@@ -1,5 +1,7 @@
 import { createSlice, createAsyncThunk, PayloadAction } from '@reduxjs/toolkit'
 import { executeQuery, generateSqlKey } from '@/lib/api/queries'
+import { fetchTableColumnStats } from '@/lib/api/columnStats'
+import type { TableColumnStats } from '@/lib/api/columnStats'
 import type { ColumnMeta } from '@/lib/api/queries'
 import type { AppDispatch, RootState } from '@/lib/store'
 import { sanitizeName } from '@/lib/utils/sql/helpers'
@@ -8,7 +10,7 @@ import { sanitizeName } from '@/lib/utils/sql/helpers'
 export type CardinalityLevel = 'high' | 'low' | 'unknown'
 
 // Sources for cardinality determination
-export type CardinalitySource = 'from metadata' | 'from query' | 'query timeout' | 'query error'
+export type CardinalitySource = 'from metadata' | 'from column stats' | 'from query' | 'query timeout' | 'query error'
 
 // Cardinality information for a single column
 export interface ColumnCardinality {
@@ -31,6 +33,9 @@ export type CardinalityState = Record<string, ColumnCardinalityState>
 
 const initialState: CardinalityState = {}
 
+// Columns with at most this many distinct values are low cardinality
+const CARDINALITY_CUTOFF = 1000
+
 // Helper function to infer cardinality from metadata
 export function inferCardinalityFromMetadata(column: ColumnMeta): ColumnCardinality | null {
   // Boolean columns always have cardinality of 2 (or less)
@@ -85,6 +90,26 @@ export function inferCardinalityFromMetadata(column: ColumnMeta): ColumnCardinal
   return null
 }
 
+// Helper function to infer cardinality from the server-side table statistics
+export function inferCardinalityFromTableStats(
+  tableStats: TableColumnStats | null,
+  columnName: string
+): ColumnCardinality | null {
+  const entry = tableStats?.columns[columnName]
+  if (!entry || entry.approx_cnt_distinct === null) {
+    return null
+  }
+  const approxCntD = entry.approx_cnt_distinct
+  const isLow = approxCntD <= CARDINALITY_CUTOFF
+  return {
+    approxCntD,
+    cntD: isLow ? entry.cnt_distinct : null,
+    distinctRatio: entry.cnt_not_null > 0 ? approxCntD / entry.cnt_not_null : null,
+    cardinality: isLow ? 'low' : 'high',
+    source: 'from column stats'
+  }
+}
+
 // Async thunk to query cardinality
 export const queryCardinality = createAsyncThunk<
   { columnName: string; cardinality: ColumnCardinality },
@@ -95,7 +120,16 @@ export const queryCardinality = createAsyncThunk<
   async ({ columnName, tablePath }, { dispatch, getState }) => {
     const state = getState()
     const queryEngine = state.ui.queryEngine
-    const cutoff = 1000
+    const cutoff = CARDINALITY_CUTOFF
+
+    const fromTableStats = inferCardinalityFromTableStats(
+      await fetchTableColumnStats(tablePath, queryEngine),
+      columnName
+    )
+    if (fromTableStats) {
+      return { columnName, cardinality: fromTableStats }
+    }
+
     // Use lance_table when queryEngine is lance, otherwise use tablePath
     const tableRef = queryEngine === 'lance' ? 'lance_table' : `'${tablePath}'`
     const sqlQuery = `
@@ -114,16 +148,23 @@ export const queryCardinality = createAsyncThunk<
       WHERE ${sanitizeName(columnName)} IS NOT NULL
     `.trim()
 
-    // Set up timeout controller
+    // Set up timeout controller; aborting also cancels the query on the server
+    const timeoutSeconds = 5
     const controller = new AbortController()
 
     try {
       const timeoutId = setTimeout(() => {
         controller.abort()
-      }, 5000) // 5 second timeout
+      }, timeoutSeconds * 1000)
 
       const sqlKey = generateSqlKey(`cardinality_${columnName}`)
-      const result = await executeQuery(sqlQuery, sqlKey, dispatch, queryEngine, tablePath)
+      const result = await executeQuery(sqlQuery, sqlKey, dispatch, queryEngine, tablePath, {
+        signal: controller.signal,
+        // Server-side deadline of the batch, since a batched query cannot be cancelled alone
+        timeout: timeoutSeconds + 1,
+        // Sent with the cardinality queries of the other columns, to share scans of the table
+        batch: true,
+      })
       clearTimeout(timeoutId)
 
       if (controller.signal.aborted) {
@@ -1,6 +1,7 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit'
 import type { AppDispatch, RootState } from '@/lib/store'
-import { queryColumnStats } from './statsUtils'
+import { fetchTableColumnStats } from '@/lib/api/columnStats'
+import { columnStatsFromTableStats, queryColumnStats } from './statsUtils'
 import { createCommonReducers, addCommonExtraReducers } from './sliceUtils'
 import { FilterType } from '@/lib/features/filters/types'
 import type {
@@ -45,6 +46,13 @@ export const queryBaseColumnStats = createAsyncThunk<
       throw new Error('tablePath is required')
     }
 
+    // Base stats are unfiltered, so the server-side table statistics can answer them without a scan
+    const tableStats = await fetchTableColumnStats(tablePath, queryEngine)
+    const stats = columnStatsFromTableStats(tableStats, columnName, filterType)
+    if (stats) {
+      return { columnName, stats }
+    }
+
     return queryColumnStats({
       columnName,
       dispatch,
@@ -1,4 +1,5 @@
 import { executeQueryAsListOfDict, generateSqlKey } from '@/lib/api/queries'
+import type { TableColumnStats } from '@/lib/api/columnStats'
 import type { AppDispatch } from '@/lib/store'
 import { FilterType } from '@/lib/features/filters/types'
 import { padItems } from './utils'
@@ -67,6 +68,36 @@ export function transformStatsResult(
   return stats
 }
 
+/**
+ * Builds unfiltered column statistics from the server-side table statistics.
+ * Returns null when they cannot answer the stats type, e.g. histograms, whose bins depend
+ * on UI settings, categorical stats of columns without value counts, or nested columns.
+ */
+export function columnStatsFromTableStats(
+  tableStats: TableColumnStats | null,
+  columnName: string,
+  filterType: FilterType
+): ColumnStats | null {
+  const entry = tableStats?.columns[columnName]
+  if (!tableStats || !entry) {
+    return null
+  }
+  const base = {
+    range: { min: entry.min, max: entry.max },
+    cnt_all: tableStats.cnt_all,
+    cnt_null: entry.cnt_null,
+    cnt_not_null: entry.cnt_not_null
+  }
+  if (filterType === FilterType.ENUM && entry.top_values) {
+    return { type: FilterType.ENUM, ...base, cnt_values: entry.top_values } as CategoricalStats
+  }
+  // min/max are only computed for primitive columns
+  if ((filterType === FilterType.TEXT || filterType === FilterType.NONE) && entry.approx_cnt_distinct !== null) {
+    return { type: FilterType.TEXT, ...base, cnt_values: [] } as TextStats
+  }
+  return null
+}
+
 /**
  * Common logic for querying column statistics
  */
@@ -96,7 +127,10 @@ export async function queryColumnStats({
     }, 15000) // 15 second timeout
 
     const sqlKey = generateSqlKey(`${keyPrefix}_${columnName}`)
-    const result = await executeQueryAsListOfDict(sqlQuery, sqlKey, dispatch, queryEngine, tablePath)
+    // Sent with the stats queries of the other columns, to share scans of the table
+    const result = await executeQueryAsListOfDict(sqlQuery, sqlKey, dispatch, queryEngine, tablePath, {
+      batch: true
+    })
     clearTimeout(timeoutId)
 
     if (controller.signal.aborted) {
@@ -1,4 +1,10 @@
-import { executeQueryAsListOfDict } from '@/lib/api/queries'
+import _ from 'lodash'
+import {
+  fetchRowPage,
+  fetchRowSample,
+  type RowPageRequest,
+  type RowSampleRequest
+} from '@/lib/api/rows'
 import { createAsyncDataSlice, type BaseAsyncDataState } from '@/lib/utils/createAsyncDataSlice'
 import { setSamplingCondition } from '@/lib/features/viewing/viewingSlice'
 import type { AppDispatch, RootState } from '@/lib/store'
@@ -6,26 +12,26 @@ import type { AppDispatch, RootState } from '@/lib/store'
 export type RowDataState = BaseAsyncDataState<Record<string, unknown>[]>
 
 interface FetchRowDataParams {
-  query: string
-  tablePath: string
-  queryEngine: string
+  // Page of the table, read through a server-side cursor
+  page: RowPageRequest | null
+  // Random sample of the table, drawn when the page is null
+  sample: RowSampleRequest | null
 }
 
 // Row data fetch function
 const fetchRowDataFunction = async (
-  { query, tablePath, queryEngine }: FetchRowDataParams,
-  // eslint-disable-next-line @typescript-eslint/no-explicit-any
-  dispatch: any
+  { page, sample }: FetchRowDataParams
 ): Promise<Record<string, unknown>[]> => {
-  // Fetch the raw row data only
-  const rowData = await executeQueryAsListOfDict(query, 'rowData', dispatch, queryEngine, tablePath)
-  return rowData
+  const result = page ? await fetchRowPage(page) : await fetchRowSample(sample as RowSampleRequest)
+  return result.rows.map((row, index) => ({
+    ..._.zipObject(result.column_names, row),
+    rowIndex: index
+  }))
 }
 
-// Should wait condition - check if query is provided
-const rowDataShouldWait = ({ query }: FetchRowDataParams) => {
-  // Only proceed if we have a valid query
-  return !!query && query.trim() !== ''
+// Should wait condition - check if a page or a sample is requested
+const rowDataShouldWait = ({ page, sample }: FetchRowDataParams) => {
+  return !!page || !!sample
 }
 
 // Create the slice using the factory
@@ -0,0 +1,33 @@
+import { fetchParquetRowCount } from '../useTotalRows'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+// Mock fetch for testing
+global.fetch = jest.fn()
+
+const mockFetch = global.fetch as jest.MockedFunction<typeof fetch>
+
+describe('fetchParquetRowCount', () => {
+  beforeEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('should read the row count from the footer stats without scanning', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      json: async () => ({ cnt_all: 1234, columns: {} }),
+    } as Response)
+
+    expect(await fetchParquetRowCount('/data/t.parquet')).toBe(1234)
+    expect(mockFetch).toHaveBeenCalledWith(
+      `${API_PREFIX}/parquet/stats?filePath=%2Fdata%2Ft.parquet&allowScan=false`
+    )
+  })
+
+  it('should return null when the footer cannot be read', async () => {
+    mockFetch.mockResolvedValueOnce({ ok: false } as Response)
+    expect(await fetchParquetRowCount('/data/*.parquet')).toBeNull()
+
+    mockFetch.mockRejectedValueOnce(new Error('Network error'))
+    expect(await fetchParquetRowCount('/data/t.parquet')).toBeNull()
+  })
+})
@@ -2,7 +2,7 @@ import { useAppSelector } from '@/lib/hooks'
 import { fetchRowData, setNeedRefresh as setNeedRefreshAction } from '@/lib/features/rowData/rowDataSlice'
 import { useAsyncData } from './useAsyncData'
 import { extractSqlFilterFromState } from '@/lib/utils/state/filterUtils'
-import { sanitizeName } from '@/lib/utils/sql/helpers'
+import type { RowPageRequest, RowSampleRequest } from '@/lib/api/rows'
 import { useMemo } from 'react'
 
 interface UseRowDataResult {
@@ -21,41 +21,31 @@ export function useRowData(): UseRowDataResult {
   const sqlCondition = useAppSelector((state) => extractSqlFilterFromState(state))
   const samplingCondition = useAppSelector((state) => state.viewing.samplingCondition)
 
-  // Build the SQL query
-  const query = useMemo(() => {
-    if (!tablePath) return null
-
-    // Use lance_table when queryEngine is lance, otherwise use tablePath
-    const tableRef = queryEngine === 'lance' ? 'lance_table' : `'${tablePath}'`
-
-    const offset = (pageNumber - 1) * pageSize
-
-    // Combine SQL condition with sampling condition using AND
-    let combinedCondition = ''
-    if (sqlCondition && samplingCondition) {
-      combinedCondition = ` WHERE (${sqlCondition}) AND (${samplingCondition})`
-    } else if (sqlCondition) {
-      combinedCondition = ` WHERE ${sqlCondition}`
-    } else if (samplingCondition) {
-      combinedCondition = ` WHERE ${samplingCondition}`
+  // Random samples, drawn by the server without sorting the table by random()
+  const sample = useMemo((): RowSampleRequest | null => {
+    if (!tablePath || !queryEngine || samplingCondition === null) return null
+    return {
+      tablePath,
+      queryEngine,
+      // Combine SQL condition with sampling condition using AND
+      condition: sqlCondition ? `(${sqlCondition}) AND (${samplingCondition})` : samplingCondition,
+      size: pageSize,
+      signUrls: true,
     }
+  }, [tablePath, queryEngine, pageSize, sqlCondition, samplingCondition])
 
-    // When samplingCondition is not null, use reservoir sampling
-    if (samplingCondition !== null) {
-      return `SELECT *
-    FROM (SELECT * FROM ${tableRef}${combinedCondition})
-    ORDER BY random()  --- Changed from reservoir to random. Reservoir does not work for large dataset.
-    LIMIT ${pageSize}`
+  // Otherwise read the page through a server-side cursor instead of LIMIT/OFFSET
+  const page = useMemo((): RowPageRequest | null => {
+    if (!tablePath || !queryEngine || samplingCondition !== null) return null
+    return {
+      tablePath,
+      queryEngine,
+      condition: sqlCondition || null,
+      sorting: sorting || [],
+      pageSize,
+      pageNumber,
+      signUrls: true,
     }
-
-    // Normal query with sorting when samplingCondition is null
-    let orderByClause = ''
-    if (sorting && sorting.length > 0) {
-      const sortClauses = sorting.map(sort => `${sanitizeName(sort.field)} ${sort.direction.toUpperCase()}`)
-      orderByClause = ` ORDER BY ${sortClauses.join(', ')}`
-    }
-
-    return `SELECT * FROM ${tableRef}${combinedCondition}${orderByClause} LIMIT ${pageSize} OFFSET ${offset}`
   }, [tablePath, queryEngine, pageSize, pageNumber, sqlCondition, samplingCondition, sorting])
 
   const { data, loading, error, setNeedRefresh } = useAsyncData({
@@ -63,10 +53,10 @@ export function useRowData(): UseRowDataResult {
     fetchAction: fetchRowData,
     setNeedRefreshAction: setNeedRefreshAction,
     buildParams: () => {
-      if (!query || !tablePath || !queryEngine) return null
-      return { query, tablePath, queryEngine }
+      if (!page && !sample) return null
+      return { page, sample }
     },
-    dependencies: [query]
+    dependencies: [page, sample]
   })
 
   return {
@@ -3,6 +3,24 @@ import { useAppSelector, useAppDispatch } from '@/lib/hooks'
 import { setTotalRows } from '@/lib/features/viewing/viewingSlice'
 import { executeQueryAsListOfDict } from '@/lib/api/queries'
 import { extractSqlFilterFromState } from '@/lib/utils/state/filterUtils'
+import { API_PREFIX } from '@/lib/utils/urlUtils'
+
+/**
+ * Row count of a Parquet file read from its footer, or null if it is not available
+ */
+export async function fetchParquetRowCount(tablePath: string): Promise<number | null> {
+  try {
+    const params = new URLSearchParams({ filePath: tablePath, allowScan: 'false' })
+    const response = await fetch(`${API_PREFIX}/parquet/stats?${params}`)
+    if (!response.ok) {
+      return null
+    }
+    const data = await response.json()
+    return typeof data.cnt_all === 'number' ? data.cnt_all : null
+  } catch {
+    return null
+  }
+}
 
 export function useTotalRows(): number | null {
   const dispatch = useAppDispatch()
@@ -20,12 +38,24 @@ export function useTotalRows(): number | null {
       }
 
       try {
+        // Without filters, a single Parquet file knows its row count from the footer
+        if (!filterCondition && queryEngine === 'duckdb' && tablePath.toLowerCase().endsWith('.parquet')) {
+          const footerRowCount = await fetchParquetRowCount(tablePath)
+          if (footerRowCount !== null) {
+            dispatch(setTotalRows(footerRowCount))
+            return
+          }
+        }
+
         // Build COUNT query with filter conditions
         // Use lance_table when queryEngine is lance, otherwise use tablePath
         const tableRef = queryEngine === 'lance' ? 'lance_table' : `'${tablePath}'`
         const whereCondition = filterCondition ? ` WHERE ${filterCondition}` : ''
         const countQuery = `SELECT COUNT(*) as total FROM ${tableRef}${whereCondition}`
-        const result = await executeQueryAsListOfDict(countQuery, 'totalRows', dispatch, queryEngine, tablePath)
+        // Sent with the column statistics queries of the page load, to share scans of the table
+        const result = await executeQueryAsListOfDict(
+          countQuery, 'totalRows', dispatch, queryEngine, tablePath, { batch: true }
+        )
         
         if (result && result.length > 0) {
           const total = Number(result[0].total)
@@ -0,0 +1,50 @@
+import { TextDecoder } from 'util'
+import { readArrowStream } from '../arrowIpc'
+
+// jsdom does not provide TextDecoder
+Object.assign(global, { TextDecoder })
+
+// Streams written by the server for DuckDB results (serialize_arrow_ipc)
+const PRIMITIVES = '/////wgBAAAQAAAAAAAKAAwABgAFAAgACgAAAAABBAAMAAAACAAIAAAABAAIAAAABAAAAAQAAACkAAAAZAAAADAAAAAEAAAAfP///wAAAQYQAAAAGAAAAAQAAAAAAAAABAAAAGZsYWcAAAAAqP///6T///8AAAEDEAAAABwAAAAEAAAAAAAAAAUAAABzY29yZQAGAAgABgAGAAAAAAACANT///8AAAEFEAAAABwAAAAEAAAAAAAAAAQAAABuYW1lAAAAAAQABAAEAAAAEAAUAAgABgAHAAwAAAAQABAAAAAAAAECEAAAABwAAAAEAAAAAAAAAAIAAABpZAAACAAMAAgABwAIAAAAAAAAASAAAAD/////KAEAABQAAAAAAAAADAAWAAYABQAIAAwADAAAAAADBAAYAAAASAAAAAAAAAAAAAoAGAAMAAQACAAKAAAArAAAABAAAAACAAAAAAAAAAAAAAAJAAAAAAAAAAAAAAABAAAAAAAAAAgAAAAAAAAACAAAAAAAAAAQAAAAAAAAAAEAAAAAAAAAGAAAAAAAAAAMAAAAAAAAACgAAAAAAAAAAQAAAAAAAAAwAAAAAAAAAAAAAAAAAAAAMAAAAAAAAAAQAAAAAAAAAEAAAAAAAAAAAAAAAAAAAABAAAAAAAAAAAEAAAAAAAAAAAAAAAQAAAACAAAAAAAAAAEAAAAAAAAAAgAAAAAAAAABAAAAAAAAAAIAAAAAAAAAAAAAAAAAAAACAAAAAAAAAAAAAAAAAAAA/QAAAAAAAAABAAAAAAAAAP0AAAAAAAAAAAAAAAEAAAABAAAAAAAAAGEAAAAAAAAAAAAAAAAA+D8AAAAAAAD4f/0AAAAAAAAA/////wAAAAA='
+const TEMPORAL = '/////wgBAAAQAAAAAAAKAAwABgAFAAgACgAAAAABBAAMAAAACAAIAAAABAAIAAAABAAAAAQAAACgAAAAYAAAADQAAAAEAAAAgP///wAAAQQQAAAAHAAAAAQAAAAAAAAABwAAAHBheWxvYWQABAAEAAQAAACs////AAABChAAAAAUAAAABAAAAAAAAAACAAAAdHMAANr///8AAAIA1P///wAAAQgQAAAAGAAAAAQAAAAAAAAAAQAAAGQABgAIAAYABgAAAAAAAAAQABQACAAGAAcADAAAABAAEAAAAAAAAQcQAAAAIAAAAAQAAAAAAAAABQAAAHByaWNlAAAACAAMAAQACAAIAAAACgAAAAMAAAD/////KAEAABQAAAAAAAAADAAWAAYABQAIAAwADAAAAAADBAAYAAAAMAAAAAAAAAAAAAoAGAAMAAQACAAKAAAArAAAABAAAAABAAAAAAAAAAAAAAAJAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAEAAAAAAAAABgAAAAAAAAAAAAAAAAAAAAYAAAAAAAAAAgAAAAAAAAAIAAAAAAAAAAAAAAAAAAAACAAAAAAAAAACAAAAAAAAAAoAAAAAAAAAAMAAAAAAAAAAAAAAAQAAAABAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAAAAAAAAABAAAAAAAAAAAAAAAAAAAAQOIBAAAAAAAAAAAAAAAAAEtNAAAAAAAAADzTEekSBgAAAAAAAwAAAGFiYwAAAAAA/////wAAAAA='
+const NESTED = '/////1ACAAAQAAAAAAAKAAwABgAFAAgACgAAAAABBAAMAAAACAAIAAAABAAIAAAABAAAAAQAAACsAQAAKAEAAGgAAAAUAAAAEAAYAAgABgAHAAwAEAAUABAAAAAAAAEFFAAAAEAAAAAkAAAABAAAAAAAAAAIAAAAY2F0ZWdvcnkAAAAACAAKAAAABAAIAAAADAAAAAAABgAIAAQABgAAAAgAAACY/v//lP7//wAAAREUAAAAGAAAAAQAAAABAAAAEAAAAAEAAABtAAAAwP7//6D///8AAAANGAAAACAAAAAEAAAAAgAAAFgAAAAUAAAABwAAAGVudHJpZXMA8P7//+z+//8AAAECEAAAABgAAAAEAAAAAAAAAAUAAAB2YWx1ZQAAAOD+//8AAAABIAAAABAAFAAIAAAABwAMAAAAEAAQAAAAAAAABRAAAAAUAAAABAAAAAAAAAADAAAAa2V5AFT///9Q////AAABDRgAAAAgAAAABAAAAAIAAAA8AAAAFAAAAAUAAABwb2ludAAAAIT///+A////AAABBRAAAAAUAAAABAAAAAAAAAABAAAAeQAAAKj///+k////AAABAhAAAAAUAAAABAAAAAAAAAABAAAAeAAAAJT///8AAAABIAAAAND///8AAAEMFAAAACAAAAAEAAAAAQAAACgAAAAEAAAAdGFncwAAAAAEAAQABAAAABAAFAAIAAYABwAMAAAAEAAQAAAAAAABAhAAAAAcAAAABAAAAAAAAAABAAAAbAAAAAgADAAIAAcACAAAAAAAAAEgAAAA/////6gAAAAUAAAAAAAAAAwAFAAGAAUACAAMAAwAAAAAAgQAFAAAABgAAAAAAAAACAAKAAAABAAIAAAAEAAAAAAACgAYAAwABAAIAAoAAABMAAAAEAAAAAIAAAAAAAAAAAAAAAMAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAMAAAAAAAAABAAAAAAAAAAAgAAAAAAAAAAAAAAAQAAAAIAAAAAAAAAAAAAAAAAAAAAAAAAAQAAAAIAAAAAAAAAYWIAAAAAAAD/////OAIAABQAAAAAAAAADAAWAAYABQAIAAwADAAAAAADBAAYAAAAUAAAAAAAAAAAAAoAGAAMAAQACAAKAAAAXAEAABAAAAABAAAAAAAAAAAAAAAUAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAACAAAAAAAAAAIAAAAAAAAAAAAAAAAAAAACAAAAAAAAAAIAAAAAAAAABAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAEAAAAAAAAABgAAAAAAAAAAAAAAAAAAAAYAAAAAAAAAAgAAAAAAAAAIAAAAAAAAAABAAAAAAAAACgAAAAAAAAAAAAAAAAAAAAoAAAAAAAAAAgAAAAAAAAAMAAAAAAAAAAAAAAAAAAAADAAAAAAAAAAAAAAAAAAAAAwAAAAAAAAAAgAAAAAAAAAOAAAAAAAAAABAAAAAAAAAEAAAAAAAAAAAAAAAAAAAABAAAAAAAAAAAQAAAAAAAAASAAAAAAAAAAAAAAAAAAAAEgAAAAAAAAAAQAAAAAAAAAAAAAACgAAAAEAAAAAAAAAAAAAAAAAAAACAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAAAAAAAAABAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAAAAAAAAABAAAAAAAAAAAAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAAAAAAAAAAAAAAAgAAAAEAAAACAAAAAQAAAAAAAAAAAAAAAQAAAGEAAAAAAAAAAAAAAAEAAAAAAAAAAQAAAGsAAAAAAAAAAQAAAAAAAAAAAAAAAAAAAP////8AAAAA'
+const BIG_INT64 = '/////3gAAAAQAAAAAAAKAAwABgAFAAgACgAAAAABBAAMAAAACAAIAAAABAAIAAAABAAAAAEAAAAUAAAAEAAUAAgABgAHAAwAAAAQABAAAAAAAAECEAAAABwAAAAEAAAAAAAAAAMAAABiaWcACAAMAAgABwAIAAAAAAAAAUAAAAD/////iAAAABQAAAAAAAAADAAWAAYABQAIAAwADAAAAAADBAAYAAAAEAAAAAAAAAAAAAoAGAAMAAQACAAKAAAAPAAAABAAAAACAAAAAAAAAAAAAAACAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAAAAAQAAAAIAAAAAAAAAAAAAAAAAAAABAAAAAAAAEPv//////////////wAAAAA='
+
+const decode = (base64: string) => readArrowStream(new Uint8Array(Buffer.from(base64, 'base64')))
+
+describe('readArrowStream', () => {
+  it('decodes primitive columns with nulls', async () => {
+    await expect(decode(PRIMITIVES)).resolves.toEqual({
+      column_names: ['id', 'name', 'score', 'flag'],
+      rows: [
+        [1, 'a', 1.5, true],
+        [null, null, null, false],
+      ],
+    })
+  })
+
+  it('formats decimals, dates and binaries like the JSON response', async () => {
+    await expect(decode(TEMPORAL)).resolves.toEqual({
+      column_names: ['price', 'd', 'ts', 'payload'],
+      rows: [['123.456', 'Tue, 05 Mar 2024 00:00:00 GMT', 'Tue, 05 Mar 2024 12:34:56 GMT', 'Bytes 3']],
+    })
+  })
+
+  it('decodes lists, structs, maps and dictionaries', async () => {
+    await expect(decode(NESTED)).resolves.toEqual({
+      column_names: ['tags', 'point', 'm', 'category'],
+      rows: [[[1, 2], { x: 1, y: 'a' }, { k: 1 }, 'a']],
+    })
+  })
+
+  it('keeps 64-bit integers above 2^53 exact', async () => {
+    await expect(decode(BIG_INT64)).resolves.toEqual({
+      column_names: ['big'],
+      rows: [['1152921504606846977'], [-5]],
+    })
+  })
+
+  it('rejects input without a schema', async () => {
+    await expect(readArrowStream(new Uint8Array(8))).rejects.toThrow()
+  })
+})
@@ -1,4 +1,13 @@
-import { getScheme, needProxy, proxyedUrl, isOnCloud } from '../urlUtils'
+import {
+  getScheme,
+  needProxy,
+  proxyedUrl,
+  isOnCloud,
+  thumbnailSize,
+  thumbnailUrl,
+  rememberSignedUrls,
+  forgetSignedUrls,
+} from '../urlUtils'
 import { getFileUrl } from '../apiUtils'
 
 describe('urlUtils', () => {
@@ -96,6 +105,17 @@ describe('urlUtils', () => {
       expect(proxyedUrl(url)).toBe(expected)
     })
 
+    it('should return remembered signed URLs until they expire', () => {
+      const url = 's3://bucket/signed.jpg'
+      const signed = 'https://bucket.s3.amazonaws.com/signed.jpg?X-Amz-Signature=abc'
+      rememberSignedUrls({ [url]: signed }, Date.now() / 1000 + 60)
+      expect(proxyedUrl(url)).toBe(signed)
+
+      rememberSignedUrls({ [url]: signed }, Date.now() / 1000 - 1)
+      expect(proxyedUrl(url)).toBe(`./api/s3-proxy?url=${encodeURIComponent(url)}`)
+      forgetSignedUrls()
+    })
+
     it('should properly encode URL parameters', () => {
       const url = 's3://bucket/path with spaces/file.txt'
       const expected = `./api/s3-proxy?url=${encodeURIComponent(url)}`
@@ -167,4 +187,33 @@ describe('urlUtils', () => {
       expect(isOnCloud('azure://container/file.txt')).toBe('azure')
     })
   })
-})
\ No newline at end of file
+
+  describe('thumbnailUrl', () => {
+    it('should make thumbnails of S3 images', () => {
+      expect(thumbnailUrl('s3://bucket/image.jpg', 256)).toBe(
+        './api/thumbnail?path=s3%3A%2F%2Fbucket%2Fimage.jpg&size=256'
+      )
+    })
+
+    it('should make thumbnails of local files served through get-file', () => {
+      const url = 'http://localhost:8000/./api/get-file?path=%2Fdata%2Fimage.png&redirect=false'
+      expect(thumbnailUrl(url, 128)).toBe(
+        'http://localhost:8000/./api/thumbnail?path=%2Fdata%2Fimage.png&size=128'
+      )
+    })
+
+    it('should return null for images fetched directly', () => {
+      expect(thumbnailUrl('https://example.com/image.jpg', 256)).toBeNull()
+      expect(thumbnailUrl('data:image/png;base64,AAAA', 256)).toBeNull()
+    })
+  })
+
+  describe('thumbnailSize', () => {
+    it('should round up to a power of two within bounds', () => {
+      expect(thumbnailSize(100)).toBe(128)
+      expect(thumbnailSize(128)).toBe(128)
+      expect(thumbnailSize(10)).toBe(64)
+      expect(thumbnailSize(5000)).toBe(1024)
+    })
+  })
+})
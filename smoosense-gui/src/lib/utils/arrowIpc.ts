@@ -0,0 +1,145 @@
+/**
+ * Reader for Arrow IPC streams returned by /api/query, built on apache-arrow.
+ *
+ * Record batches are decoded as they arrive and turned into rows shaped like the JSON response,
+ * so callers cannot tell which format was used:
+ * - NaN / Infinity become null and binaries become "Bytes N", like the server-side serializer
+ * - Dates and timestamps become HTTP date strings, like Flask's JSON encoder
+ * - Decimals (including DuckDB HUGEINT) become strings
+ * - 64-bit integers become numbers when they are exact, strings otherwise, so that no digit is
+ *   lost above 2^53
+ *
+ * Types without a JSON counterpart are converted with apache-arrow's own JSON representation.
+ */
+import { DataType, RecordBatchReader, type Field, type RecordBatch } from 'apache-arrow'
+
+export const ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+export type ArrowValue = string | number | boolean | null | ArrowValue[] | { [key: string]: ArrowValue }
+
+export interface ArrowRows {
+  column_names: string[]
+  rows: ArrowValue[][]
+}
+
+// Units of Time values (TimeUnit: second, millisecond, microsecond, nanosecond)
+const TIME_UNIT_PER_MS = [1 / 1000, 1, 1000, 1000000]
+
+const MAX_SAFE = BigInt(Number.MAX_SAFE_INTEGER)
+
+// Integer as a number when it is exact, as a string otherwise
+function integerValue(value: bigint | number): number | string {
+  if (typeof value === 'number') return value
+  return value <= MAX_SAFE && value >= -MAX_SAFE ? Number(value) : value.toString()
+}
+
+// Milliseconds since the epoch, from the numbers or Dates apache-arrow returns for temporal types
+function epochMs(value: unknown): number {
+  return value instanceof Date ? value.getTime() : Number(value)
+}
+
+// Decimal from its unscaled value: two's complement 32-bit words, least significant first
+function decimalValue(value: unknown, scale: number): string {
+  let unscaled: bigint
+  if (typeof value === 'bigint' || typeof value === 'number') {
+    unscaled = BigInt(value)
+  } else {
+    const words = value as Uint32Array
+    unscaled = BigInt(0)
+    for (let i = words.length - 1; i >= 0; i--) {
+      unscaled = (unscaled << BigInt(32)) + BigInt(words[i])
+    }
+    if (words.length > 0 && words[words.length - 1] & 0x80000000) {
+      unscaled -= BigInt(1) << BigInt(32 * words.length)
+    }
+  }
+  const negative = unscaled < BigInt(0)
+  const digits = (negative ? -unscaled : unscaled).toString().padStart(scale + 1, '0')
+  const integerPart = digits.slice(0, digits.length - scale)
+  const fractionPart = scale > 0 ? `.${digits.slice(digits.length - scale)}` : ''
+  return `${negative ? '-' : ''}${integerPart}${fractionPart}`
+}
+
+function timeValue(value: unknown, unit: number): string {
+  const micros = Math.round((Number(value) / TIME_UNIT_PER_MS[unit]) * 1000)
+  const seconds = Math.floor(micros / 1000000)
+  const pad = (n: number) => String(n).padStart(2, '0')
+  const hms = `${pad(Math.floor(seconds / 3600))}:${pad(Math.floor(seconds / 60) % 60)}:${pad(seconds % 60)}`
+  const fraction = micros % 1000000
+  return fraction ? `${hms}.${String(fraction).padStart(6, '0')}` : hms
+}
+
+// Values without a dedicated conversion, through their JSON representation
+function jsonValue(value: unknown): ArrowValue {
+  if (value === null || value === undefined) return null
+  if (typeof value === 'bigint') return integerValue(value)
+  if (typeof value === 'number') return Number.isFinite(value) ? value : null
+  if (typeof value === 'string' || typeof value === 'boolean') return value
+  if (ArrayBuffer.isView(value)) return Array.from(value as unknown as ArrayLike<number | bigint>, jsonValue)
+  const json = (value as { toJSON?: () => unknown }).toJSON?.()
+  if (json !== undefined && json !== value) return jsonValue(json)
+  if (Array.isArray(value)) return value.map(jsonValue)
+  return Object.fromEntries(Object.entries(value as object).map(([key, item]) => [key, jsonValue(item)]))
+}
+
+// Values of List and FixedSizeList cells, which apache-arrow returns as vectors
+function listValue(value: unknown, childType: DataType): ArrowValue[] {
+  return Array.from(value as Iterable<unknown>, (item) => toValue(childType, item))
+}
+
+function toValue(type: DataType, value: unknown): ArrowValue {
+  if (value === null || value === undefined) return null
+  if (DataType.isDictionary(type)) return toValue(type.dictionary, value)
+  if (DataType.isInt(type)) return integerValue(value as bigint | number)
+  if (DataType.isFloat(type)) return Number.isFinite(value) ? (value as number) : null
+  if (DataType.isBinary(type) || DataType.isLargeBinary(type) || DataType.isFixedSizeBinary(type)) {
+    return `Bytes ${(value as Uint8Array).length}`
+  }
+  if (DataType.isUtf8(type) || DataType.isLargeUtf8(type) || DataType.isBool(type)) {
+    return value as string | boolean
+  }
+  if (DataType.isDecimal(type)) return decimalValue(value, type.scale)
+  if (DataType.isDate(type) || DataType.isTimestamp(type)) return new Date(epochMs(value)).toUTCString()
+  if (DataType.isTime(type)) return timeValue(value, type.unit)
+  if (DataType.isList(type) || DataType.isFixedSizeList(type)) return listValue(value, type.children[0].type)
+  if (DataType.isStruct(type)) {
+    const row = value as Record<string, unknown>
+    return Object.fromEntries(type.children.map((child) => [child.name, toValue(child.type, row[child.name])]))
+  }
+  if (DataType.isMap(type)) {
+    // Mirror DuckDB's Python representation of MAP, a dict keyed by the map keys
+    const [keyField, valueField] = type.children[0].type.children
+    return Object.fromEntries(
+      Array.from(value as Iterable<[unknown, unknown]>, ([key, item]) => [
+        String(toValue(keyField.type, key)),
+        toValue(valueField.type, item),
+      ])
+    )
+  }
+  return jsonValue(value)
+}
+
+function batchRows(batch: RecordBatch, fields: Field[]): ArrowValue[][] {
+  const columns = fields.map((field, j) => {
+    const vector = batch.getChildAt(j)
+    return Array.from({ length: batch.numRows }, (_, i) => toValue(field.type, vector?.get(i)))
+  })
+  return Array.from({ length: batch.numRows }, (_, i) => columns.map((column) => column[i]))
+}
+
+/**
+ * Decode an Arrow IPC stream into column names and row arrays, one record batch at a time,
+ * so that the body of a response is never held in memory as a whole
+ */
+export async function readArrowStream(source: ReadableStream<Uint8Array> | Uint8Array): Promise<ArrowRows> {
+  const reader = await RecordBatchReader.from(source)
+  await reader.open()
+  if (!reader.schema) throw new Error('Arrow stream has no schema')
+
+  const fields = reader.schema.fields
+  const result: ArrowRows = { column_names: fields.map((field) => field.name), rows: [] }
+  for await (const batch of reader) {
+    for (const row of batchRows(batch, fields)) result.rows.push(row)
+  }
+  return result
+}
@@ -17,6 +17,33 @@ export const needProxy = (url: string): boolean => {
   return !['http', 'https', ''].includes(scheme);
 }
 
+// Most signed URLs remembered from row responses
+const MAX_SIGNED_URLS = 50000
+
+// Presigned URLs handed out by the server with rows, and when they stop being usable (ms)
+const signedUrls = new Map<string, { url: string, expiresAt: number }>()
+
+/**
+ * Remember presigned URLs sent along with rows, so that proxyedUrl() returns them directly
+ * instead of a redirect through /api/s3-proxy until they are about to expire
+ */
+export const rememberSignedUrls = (urls: Record<string, string>, expireAt: number | null): void => {
+  if (expireAt === null) return
+  for (const [url, signedUrl] of Object.entries(urls)) {
+    signedUrls.delete(url)
+    signedUrls.set(url, { url: signedUrl, expiresAt: expireAt * 1000 })
+  }
+  // Maps iterate in insertion order, so the oldest URLs go first
+  for (const url of signedUrls.keys()) {
+    if (signedUrls.size <= MAX_SIGNED_URLS) break
+    signedUrls.delete(url)
+  }
+}
+
+export const forgetSignedUrls = (): void => {
+  signedUrls.clear()
+}
+
 export const proxyedUrl = (url: string): string => {
   // Assert that relative URLs should have been handled before this stage
   if (url.startsWith('./') || url.startsWith('/') || url.startsWith('~/')) {
@@ -27,11 +54,55 @@ export const proxyedUrl = (url: string): string => {
   if (!needProxy(url)) {
     return url
   } else {
+    const signed = signedUrls.get(url)
+    if (signed && signed.expiresAt > Date.now()) {
+      return signed.url
+    }
     // Proxy cloud storage URLs (s3://, etc.)
     return `${API_PREFIX}/s3-proxy?url=${encodeURIComponent(url)}`
   }
 }
 
+export const MIN_THUMBNAIL_SIZE = 64
+export const MAX_THUMBNAIL_SIZE = 1024
+
+/**
+ * Thumbnail size covering a tile of the given CSS pixels on this screen, rounded up to a power
+ * of two so that tiles of close sizes share the thumbnails cached by the server
+ */
+export const thumbnailSize = (cssPixels: number): number => {
+  const ratio = typeof window !== 'undefined' ? window.devicePixelRatio || 1 : 1
+  const size = 2 ** Math.ceil(Math.log2(Math.max(cssPixels * ratio, 1)))
+  return Math.min(MAX_THUMBNAIL_SIZE, Math.max(MIN_THUMBNAIL_SIZE, size))
+}
+
+/**
+ * Path of a media file the backend can read, and the API prefix to request it from: cloud
+ * storage URLs, and local files served through get-file (see tablePathToUrl).
+ * @returns null for media the browser fetches directly
+ */
+export const backendMediaPath = (url: string): { apiPrefix: string, path: string } | null => {
+  const getFileIndex = url.indexOf('/get-file?')
+  if (getFileIndex >= 0) {
+    const path = new URLSearchParams(url.substring(getFileIndex + '/get-file?'.length)).get('path')
+    return path ? { apiPrefix: url.substring(0, getFileIndex), path } : null
+  }
+  return getScheme(url) === 's3' ? { apiPrefix: API_PREFIX, path: url } : null
+}
+
+/**
+ * URL of a server-side thumbnail of an image served by the backend (see backendMediaPath).
+ * @returns The thumbnail URL, or null for images the browser fetches directly
+ */
+export const thumbnailUrl = (url: string, size: number): string | null => {
+  const media = backendMediaPath(url)
+  if (!media) {
+    return null
+  }
+  const params = new URLSearchParams({ path: media.path, size: String(size) })
+  return `${media.apiPrefix}/thumbnail?${params.toString()}`
+}
+
 export const isOnCloud = (fullPath: string): string => {
   const scheme = getScheme(fullPath);
   return scheme;
@@ -0,0 +1,97 @@
+"""
+Compare `serialize(result.fetchall())` with the vectorized `table_rows(con, result.arrow())` on
+the tables generated by dummy_data/, next to a plain `fetchall()` as the lower bound.
+
+Each table is repeated to --rows rows; the wide case repeats the columns of
+dummy_data_various_types.parquet to --columns columns, e.g. a 10k-row page of 100 columns.
+
+Usage:
+    uv run python benchmarks/bench_serialization.py [--rows 10000] [--columns 100]
+"""
+
+import argparse
+import glob
+import os
+from timeit import default_timer
+from typing import Any, Callable
+
+import duckdb
+
+from smoosense.utils.serialization import serialize, table_rows
+
+PWD = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(PWD, "../../data"))
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        timings.append(default_timer() - start)
+    return min(timings)
+
+
+def repeated_query(
+    con: duckdb.DuckDBPyConnection, path: str, rows: int, columns: int, max_bytes: int
+) -> str:
+    names = [desc[0] for desc in con.execute(f"SELECT * FROM '{path}' LIMIT 0").description]
+    num_rows = con.execute(f"SELECT COUNT(*) FROM '{path}'").fetchone()[0]  # type: ignore[index]
+    # Tables of images are repeated to fewer rows, to stay within memory
+    rows = min(rows, max_bytes * num_rows // max(os.path.getsize(path), 1))
+    select = ", ".join(
+        f'"{names[i % len(names)]}" AS "c{i}"' for i in range(max(columns, len(names)))
+    )
+    copies = -(-rows // max(num_rows, 1))
+    return f"SELECT {select} FROM '{path}', range({copies}) LIMIT {rows}"
+
+
+def bench_query(con: duckdb.DuckDBPyConnection, query: str, repeat: int) -> list[float]:
+    """Seconds to fetch the result as is, with serialize() and with table_rows()."""
+    assert serialize(con.execute(query).fetchall()) == [
+        list(row) for row in table_rows(con, con.execute(query).arrow())
+    ]
+    return [
+        best_of(repeat, lambda: con.execute(query).fetchall()),
+        best_of(repeat, lambda: serialize(con.execute(query).fetchall())),
+        best_of(repeat, lambda: table_rows(con, con.execute(query).arrow())),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--columns", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-mb", type=int, default=100, help="Most file bytes per table")
+    args = parser.parse_args()
+
+    con = duckdb.connect()
+    max_bytes = args.max_mb * 1024 * 1024
+    cases = [
+        (os.path.basename(path), repeated_query(con, path, args.rows, 0, max_bytes))
+        for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.parquet")))
+    ]
+    various_types = os.path.join(DATA_DIR, "dummy_data_various_types.parquet")
+    cases.append(
+        (
+            f"various_types x {args.columns} columns",
+            repeated_query(con, various_types, args.rows, args.columns, max_bytes),
+        )
+    )
+
+    print(f"Best of {args.repeat}")
+    print(
+        f"{'table':<40} {'rows':>6} {'fetchall':>9} {'serialize':>10} {'table_rows':>10} {'speedup':>8}"
+    )
+    for name, query in cases:
+        num_rows = con.execute(f"SELECT COUNT(*) FROM ({query})").fetchone()[0]  # type: ignore[index]
+        fetch, before, after = bench_query(con, query, args.repeat)
+        print(
+            f"{name:<40} {num_rows:>6} {fetch:>8.3f}s {before:>9.3f}s {after:>9.3f}s "
+            f"{before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
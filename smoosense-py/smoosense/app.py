@@ -8,13 +8,28 @@ from botocore.client import BaseClient
 from flask import Flask
 from pydantic import ConfigDict, validate_call
 
+from smoosense.handlers.column_stats import column_stats_bp
 from smoosense.handlers.fs import fs_bp
 from smoosense.handlers.lance import lance_bp
+from smoosense.handlers.media import media_bp
 from smoosense.handlers.pages import pages_bp
 from smoosense.handlers.parquet import parquet_bp
 from smoosense.handlers.query import query_bp
+from smoosense.handlers.rows import rows_bp
 from smoosense.handlers.s3 import s3_bp
-from smoosense.utils.duckdb_connections import duckdb_connection_using_s3
+from smoosense.lance.db_client import TableInfoCache
+from smoosense.lance.table_cache import LanceTableCache
+from smoosense.lance.version_history import VersionSnapshotCache
+from smoosense.utils.column_stats import ColumnStatsIndex
+from smoosense.utils.duckdb_connections import DuckdbConnectionPool, duckdb_connection_using_s3
+from smoosense.utils.media_cache import MediaCache
+from smoosense.utils.query_cache import QueryResultCache
+from smoosense.utils.query_registry import QueryRegistry
+from smoosense.utils.row_cursor import RowCursorStore
+from smoosense.utils.serving import serve
+from smoosense.utils.signed_urls import DEFAULT_EXPIRES_IN, SignedUrlCache
+from smoosense.utils.thumbnails import DEFAULT_THUMBNAIL_WORKERS, Thumbnailer
+from smoosense.utils.video_previews import DEFAULT_VIDEO_PREVIEW_WORKERS, VideoPreviewer
 
 PWD = os.path.dirname(os.path.abspath(__file__))
 
@@ -31,6 +46,21 @@ class SmooSenseApp:
         s3_client: Optional[BaseClient] = None,
         s3_prefix_to_save_shareable_link: str = "",
         folder_shortcuts: Optional[dict[str, str]] = None,
+        duckdb_pool_size: int = 8,
+        query_cache_max_bytes: int = 256 * 1024 * 1024,
+        query_timeout: float = 300.0,
+        lance_table_cache_max_bytes: int = 1024 * 1024 * 1024,
+        column_stats_dir: Optional[str] = None,
+        row_cursor_max_bytes: int = 256 * 1024 * 1024,
+        media_cache_dir: Optional[str] = None,
+        media_cache_max_bytes: int = 2 * 1024 * 1024 * 1024,
+        thumbnail_cache_dir: Optional[str] = None,
+        thumbnail_cache_max_bytes: int = 512 * 1024 * 1024,
+        thumbnail_workers: int = DEFAULT_THUMBNAIL_WORKERS,
+        video_preview_dir: Optional[str] = None,
+        video_preview_max_bytes: int = 512 * 1024 * 1024,
+        video_preview_workers: int = DEFAULT_VIDEO_PREVIEW_WORKERS,
+        signed_url_expires_in: int = DEFAULT_EXPIRES_IN,
     ):
         self.s3_client = s3_client if s3_client is not None else boto3.client("s3")
         has_s3_config = any(
@@ -42,9 +72,42 @@ class SmooSenseApp:
         )
 
         if has_s3_config:
-            self.duckdb_connection_maker = duckdb_connection_using_s3(s3_client=s3_client)
+            self.duckdb_connection_maker = duckdb_connection_using_s3(s3_client=self.s3_client)
         else:
             self.duckdb_connection_maker = lambda: duckdb.connect()
+        self.duckdb_connection_pool = DuckdbConnectionPool(
+            self.duckdb_connection_maker,
+            max_size=duckdb_pool_size,
+            s3_client=self.s3_client if has_s3_config else None,
+        )
+        self.query_result_cache = QueryResultCache(max_bytes=query_cache_max_bytes)
+        self.query_registry = QueryRegistry(default_timeout=query_timeout)
+        self.lance_table_cache = LanceTableCache(max_bytes=lance_table_cache_max_bytes)
+        self.lance_table_info_cache = TableInfoCache()
+        self.lance_version_cache = VersionSnapshotCache()
+        self.column_stats_index = ColumnStatsIndex(stats_dir=column_stats_dir)
+        self.row_cursor_store = RowCursorStore(max_bytes=row_cursor_max_bytes)
+        # Proxied S3 and HTTP files are cached on disk, unless media_cache_max_bytes is 0
+        self.media_cache = (
+            MediaCache(cache_dir=media_cache_dir, max_bytes=media_cache_max_bytes)
+            if media_cache_max_bytes > 0
+            else None
+        )
+        self.thumbnailer = Thumbnailer(
+            cache_dir=thumbnail_cache_dir,
+            max_bytes=thumbnail_cache_max_bytes,
+            max_workers=thumbnail_workers,
+        )
+        self.signed_url_cache = SignedUrlCache(
+            self.s3_client,
+            expires_in=signed_url_expires_in,
+            min_remaining=signed_url_expires_in // 6,
+        )
+        self.video_previewer = VideoPreviewer(
+            cache_dir=video_preview_dir,
+            max_bytes=video_preview_max_bytes,
+            max_workers=video_preview_workers,
+        )
 
         if url_prefix:
             assert url_prefix.startswith("/"), "url_prefix must start with /"
@@ -61,6 +124,18 @@ class SmooSenseApp:
         # Store the s3_client in app config so blueprints can access it
         app.config["S3_CLIENT"] = self.s3_client
         app.config["DUCKDB_CONNECTION_MAKER"] = self.duckdb_connection_maker
+        app.config["DUCKDB_CONNECTION_POOL"] = self.duckdb_connection_pool
+        app.config["QUERY_RESULT_CACHE"] = self.query_result_cache
+        app.config["QUERY_REGISTRY"] = self.query_registry
+        app.config["LANCE_TABLE_CACHE"] = self.lance_table_cache
+        app.config["LANCE_TABLE_INFO_CACHE"] = self.lance_table_info_cache
+        app.config["LANCE_VERSION_CACHE"] = self.lance_version_cache
+        app.config["COLUMN_STATS_INDEX"] = self.column_stats_index
+        app.config["ROW_CURSOR_STORE"] = self.row_cursor_store
+        app.config["MEDIA_CACHE"] = self.media_cache
+        app.config["THUMBNAILER"] = self.thumbnailer
+        app.config["VIDEO_PREVIEWER"] = self.video_previewer
+        app.config["SIGNED_URL_CACHE"] = self.signed_url_cache
         app.config["PASSOVER_CONFIG"] = self.passover_config
 
         # Register blueprints with url_prefix
@@ -68,8 +143,17 @@ class SmooSenseApp:
         app.register_blueprint(fs_bp, url_prefix=f"{self.url_prefix}/api")
         app.register_blueprint(lance_bp, url_prefix=f"{self.url_prefix}/api")
         app.register_blueprint(parquet_bp, url_prefix=f"{self.url_prefix}/api")
+        app.register_blueprint(column_stats_bp, url_prefix=f"{self.url_prefix}/api")
+        app.register_blueprint(rows_bp, url_prefix=f"{self.url_prefix}/api")
         app.register_blueprint(pages_bp, url_prefix=self.url_prefix)
         app.register_blueprint(s3_bp, url_prefix=f"{self.url_prefix}/api")
+        app.register_blueprint(media_bp, url_prefix=f"{self.url_prefix}/api")
+
+        # Pre-warm DuckDB so the first query does not pay for extension installs and settings
+        try:
+            self.duckdb_connection_pool.warm_up()
+        except Exception as e:
+            logger.warning(f"Failed to pre-warm DuckDB connection pool: {e}")
 
         return app
 
@@ -84,3 +168,32 @@ class SmooSenseApp:
         app = self.create_app()
         # Enable threaded mode for concurrent requests in development
         app.run(host=host, port=port, threaded=threaded, debug=debug)
+
+    def serve(
+        self,
+        *,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        threads: Optional[int] = None,
+        shutdown_timeout: float = 30.0,
+    ) -> None:
+        """
+        Serve the app for production use, handling requests concurrently.
+
+        Requests run on a thread pool of a single process: running queries, row cursors and
+        caches live in the memory of the process, so a cancel or the next page of a cursor
+        must reach the process that started it.
+
+        Args:
+            host: Host to listen on
+            port: Port to listen on
+            threads: Number of requests handled concurrently (default: CPU count + 4, up to 32)
+            shutdown_timeout: Seconds to let in-flight requests finish on SIGTERM/SIGINT
+        """
+        serve(
+            self.create_app(),
+            host=host,
+            port=port,
+            threads=threads,
+            shutdown_timeout=shutdown_timeout,
+        )
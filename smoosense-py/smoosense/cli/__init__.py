@@ -17,7 +17,13 @@ from smoosense.cli.utils import get_package_version, server_options
 @click.option("--version", "-v", is_flag=True, help="Show the version and exit.")
 @server_options
 @click.pass_context
-def main(ctx: click.Context, version: bool, port: Optional[int], url_prefix: str) -> None:
+def main(
+    ctx: click.Context,
+    version: bool,
+    port: Optional[int],
+    url_prefix: str,
+    threads: Optional[int],
+) -> None:
     """Smoothly make sense of your large-scale multi-modal tabular data.
 
     SmooSense provides a web interface for exploring and analyzing your data files.
@@ -30,6 +36,7 @@ def main(ctx: click.Context, version: bool, port: Optional[int], url_prefix: str
         sense table /path/to/file.csv          # Open table viewer
         sense db /path/to/db                   # Open database browser
         sense --port 8080                      # Use custom port
+        sense --threads 16                     # Serve more requests concurrently
         sense --version                        # Show version information
     """
     if version:
@@ -38,13 +45,13 @@ def main(ctx: click.Context, version: bool, port: Optional[int], url_prefix: str
 
     # If no subcommand is provided, default to 'folder .'
     if ctx.invoked_subcommand is None:
-        ctx.invoke(folder, path=".", port=port, url_prefix=url_prefix)
+        ctx.invoke(folder, path=".", port=port, url_prefix=url_prefix, threads=threads)
 
 
 @main.command()
 @click.argument("path", type=click.Path(exists=True), default=".")
 @server_options
-def folder(path: str, port: Optional[int], url_prefix: str) -> None:
+def folder(path: str, port: Optional[int], url_prefix: str, threads: Optional[int]) -> None:
     """Open folder browser for the specified directory.
 
     \b
@@ -56,13 +63,18 @@ def folder(path: str, port: Optional[int], url_prefix: str) -> None:
     # Convert to absolute path
     abs_path = os.path.abspath(path)
     page_path = f"/FolderBrowser?rootFolder={abs_path}"
-    run_app(page_path=page_path, port=port, url_prefix=url_prefix)
+    run_app(
+        page_path=page_path,
+        port=port,
+        url_prefix=url_prefix,
+        threads=threads,
+    )
 
 
 @main.command()
 @click.argument("path", type=click.Path(exists=True))
 @server_options
-def table(path: str, port: Optional[int], url_prefix: str) -> None:
+def table(path: str, port: Optional[int], url_prefix: str, threads: Optional[int]) -> None:
     """Open table viewer for the specified file.
 
     \b
@@ -74,13 +86,18 @@ def table(path: str, port: Optional[int], url_prefix: str) -> None:
     # Convert to absolute path
     abs_path = os.path.abspath(path)
     page_path = f"/Table?tablePath={abs_path}"
-    run_app(page_path=page_path, port=port, url_prefix=url_prefix)
+    run_app(
+        page_path=page_path,
+        port=port,
+        url_prefix=url_prefix,
+        threads=threads,
+    )
 
 
 @main.command()
 @click.argument("path", type=click.Path(exists=True), default=".")
 @server_options
-def db(path: str, port: Optional[int], url_prefix: str) -> None:
+def db(path: str, port: Optional[int], url_prefix: str, threads: Optional[int]) -> None:
     """Open database browser for the specified directory.
 
     Scans the directory for Lance database folders (*.lance) and opens the DB viewer.
@@ -111,7 +128,12 @@ def db(path: str, port: Optional[int], url_prefix: str) -> None:
         pass
 
     page_path = f"/DB?dbPath={abs_path}&dbType={db_type}"
-    run_app(page_path=page_path, port=port, url_prefix=url_prefix)
+    run_app(
+        page_path=page_path,
+        port=port,
+        url_prefix=url_prefix,
+        threads=threads,
+    )
 
 
 __all__ = ["main"]
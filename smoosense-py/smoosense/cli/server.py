@@ -22,7 +22,12 @@ from smoosense.utils.port import find_available_port
 logger = getLogger(__name__)
 
 
-def run_app(page_path: str, port: Optional[int] = None, url_prefix: str = "") -> None:
+def run_app(
+    page_path: str,
+    port: Optional[int] = None,
+    url_prefix: str = "",
+    threads: Optional[int] = None,
+) -> None:
     """
     Run the SmooSense application server.
 
@@ -33,6 +38,7 @@ def run_app(page_path: str, port: Optional[int] = None, url_prefix: str = "") ->
         page_path: Page path with query params (e.g., '/FolderBrowser?rootFolder=/path')
         port: Port number to run the server on (auto-selected if None)
         url_prefix: URL prefix for the application (e.g., '/smoosense')
+        threads: Number of requests handled concurrently (auto if None)
     """
     # Check if server is already running
     running_server = get_running_server()
@@ -83,4 +89,4 @@ def run_app(page_path: str, port: Optional[int] = None, url_prefix: str = "") ->
 
     # Create app with url_prefix if provided
     app = SmooSenseApp(url_prefix=url_prefix)
-    app.run(host="localhost", port=port)
+    app.serve(host="localhost", port=port, threads=threads)
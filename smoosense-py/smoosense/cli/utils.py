@@ -36,10 +36,15 @@ def server_options(f: Callable) -> Callable:
     """
     Add common server options to a CLI command.
 
-    Adds --port and --url-prefix options to the decorated command.
+    Adds --port, --url-prefix and --threads options to the decorated command.
     Note: Decorators are applied in reverse order, so these will appear
     after any other decorators applied before this one.
     """
+    f = click.option(
+        "--threads",
+        type=click.IntRange(min=1),
+        help="Requests handled concurrently (default: CPU count + 4, up to 32)",
+    )(f)
     f = click.option(
         "--url-prefix",
         type=str,
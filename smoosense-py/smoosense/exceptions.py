@@ -4,3 +4,7 @@ class InvalidInputException(Exception):
 
 class AccessDeniedException(Exception):
     pass
+
+
+class QueryInterruptedException(Exception):
+    pass
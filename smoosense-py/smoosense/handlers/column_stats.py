@@ -0,0 +1,59 @@
+import logging
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from timeit import default_timer
+
+from duckdb import DuckDBPyConnection
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.wrappers import Response
+
+from smoosense.exceptions import InvalidInputException
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.utils.api import handle_api_errors, require_arg
+from smoosense.utils.column_stats import ColumnStatsIndex
+
+logger = logging.getLogger(__name__)
+column_stats_bp = Blueprint("column_stats", __name__)
+
+
+@column_stats_bp.get("/column-stats")
+@handle_api_errors
+def column_stats() -> Response:
+    """
+    Get base statistics of every column of a table.
+
+    Statistics are computed in one pass over the table and persisted in a sidecar file keyed by
+    the table fingerprint, so reopening an unchanged table does not scan it again.
+    """
+    time_start = default_timer()
+    table_path = require_arg("tablePath")
+    query_engine = request.args.get("queryEngine", "duckdb")
+    refresh = request.args.get("refresh", "false").lower() == "true"
+    if query_engine not in ("duckdb", "lance"):
+        raise InvalidInputException(f"Unsupported query engine: {query_engine}")
+
+    index: ColumnStatsIndex = current_app.config["COLUMN_STATS_INDEX"]
+    stats, from_sidecar = index.get_or_compute(
+        table_path,
+        query_engine,
+        lambda: _connection(table_path, query_engine),
+        s3_client=current_app.config["S3_CLIENT"],
+        refresh=refresh,
+    )
+    return jsonify({**stats, "cached": from_sidecar, "runtime": default_timer() - time_start})
+
+
+def _connection(table_path: str, query_engine: str) -> AbstractContextManager[DuckDBPyConnection]:
+    if query_engine == "lance":
+        return _lance_connection(table_path)
+    return current_app.config["DUCKDB_CONNECTION_POOL"].connection()  # type: ignore[no-any-return]
+
+
+@contextmanager
+def _lance_connection(table_path: str) -> Iterator[DuckDBPyConnection]:
+    try:
+        lance_client = LanceTableClient.from_table_path(table_path)
+    except ValueError as e:
+        raise InvalidInputException(str(e)) from e
+    with lance_client.duckdb_connection(current_app.config["LANCE_TABLE_CACHE"]) as con:
+        yield con
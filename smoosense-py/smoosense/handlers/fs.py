@@ -1,34 +1,61 @@
 import logging
 import os
 import pathlib
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from datetime import datetime
+from typing import Any, Callable, Optional, Union
+from urllib.parse import urlparse
 
 import requests
 from botocore.exceptions import ClientError
 from flask import Blueprint, current_app, jsonify, request, send_file
 from flask import Response as FlaskResponse
+from werkzeug.http import is_resource_modified, unquote_etag
 from werkzeug.wrappers import Response
 
 from smoosense.exceptions import AccessDeniedException, InvalidInputException
 from smoosense.utils.api import handle_api_errors, require_arg
+from smoosense.utils.byte_ranges import (
+    EXPOSED_HEADERS,
+    RangeNotSatisfiable,
+    format_byte_range,
+    if_range_matches,
+    not_satisfiable_response,
+    parse_byte_ranges,
+    partial_response,
+    requested_ranges,
+    validator_headers,
+)
 from smoosense.utils.local_fs import LocalFileSystem
+from smoosense.utils.media_cache import Fetch, MediaCache, OriginObject, http_fetch, s3_fetch
 from smoosense.utils.s3_fs import S3FileSystem
 
 logger = logging.getLogger(__name__)
 fs_bp = Blueprint("fs", __name__)
 
+CHUNK_SIZE = 64 * 1024
+
+# Headers of range and conditional requests forwarded to HTTP origins, and of their responses
+FORWARDED_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+PROXIED_HEADERS = ("Accept-Ranges", "Content-Length", "Content-Range", "ETag", "Last-Modified")
+
 
 def create_streaming_response(
     content_iterator: Generator[bytes, None, None], content_type: str
 ) -> FlaskResponse:
     """Create a Flask response with streaming content and CORS headers."""
     flask_response = FlaskResponse(content_iterator, content_type=content_type)
-    flask_response.headers["Access-Control-Allow-Origin"] = "*"
-    flask_response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    flask_response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+    add_cors_headers(flask_response)
     return flask_response
 
 
+def add_cors_headers(response: Response) -> Response:
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Range"
+    return response
+
+
 @fs_bp.get("/ls")
 @handle_api_errors
 def get_ls() -> Response:
@@ -46,6 +73,12 @@ def get_ls() -> Response:
 @fs_bp.get("/get-file")
 @handle_api_errors
 def get_file() -> Response:
+    """
+    Serve a local, S3 or HTTP file.
+
+    Range requests (RFC 7233) are answered with the requested byte ranges, so that media
+    elements can seek without downloading the file from the start.
+    """
     path = require_arg("path")
     redirect_param = request.args.get("redirect", "false").lower() == "true"
     ext = os.path.splitext(path)[1].lower()
@@ -55,71 +88,275 @@ def get_file() -> Response:
     }
 
     if path.startswith("http://"):
+        cached = _send_cached_file(path, lambda: http_fetch(path), mime_type.get(ext))
+        if cached is not None:
+            return cached
         logger.info(f"Proxying HTTP URL {path}")
-        try:
-            response = requests.get(path, stream=True, timeout=30)
-            response.raise_for_status()
-
-            content_type = response.headers.get(
-                "content-type", mime_type.get(ext, "application/octet-stream")
-            )
-
-            def generate() -> Generator[bytes, None, None]:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        yield chunk
-
-            return create_streaming_response(generate(), content_type)
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch HTTP URL {path}: {e}")
-            raise InvalidInputException(f"Failed to fetch URL: {e}") from e
+        return _proxy_http_file(path, mime_type.get(ext))
 
     elif path.startswith("s3://"):
         s3_client = current_app.config["S3_CLIENT"]
-        s3_fs = S3FileSystem(s3_client)
 
         if redirect_param:
             logger.info(f"Redirecting to signed URL for {path}")
             from werkzeug.utils import redirect
 
-            signed_url = s3_fs.sign_get_url(path)
+            signed_url, _ = current_app.config["SIGNED_URL_CACHE"].sign(path)
             return redirect(signed_url)
         else:
+            cached = _send_cached_file(path, lambda: s3_fetch(s3_client, path), mime_type.get(ext))
+            if cached is not None:
+                return cached
             logger.info(f"Proxying S3 file {path}")
-            try:
-                from typing import Any
-                from urllib.parse import urlparse
-
-                parsed = urlparse(path)
-                bucket = parsed.netloc
-                key = parsed.path.lstrip("/")
-
-                s3_response: Any = s3_client.get_object(Bucket=bucket, Key=key)
-
-                def generate() -> Generator[bytes, None, None]:
-                    chunk_size = 8192
-                    while True:
-                        chunk = s3_response["Body"].read(chunk_size)
-                        if not chunk:
-                            break
-                        yield chunk
-
-                content_type = mime_type.get(ext, "application/octet-stream")
-                return create_streaming_response(generate(), content_type)
-            except Exception as e:
-                logger.error(f"Failed to proxy S3 file {path}: {e}")
-                raise InvalidInputException(f"Failed to read S3 file: {e}") from e
+            return _proxy_s3_file(s3_client, path, mime_type.get(ext))
 
     else:
         if path.startswith("~"):
             path = os.path.expanduser(path)
         logger.info(f"Sending file {path}")
-        file_response = send_file(path, mimetype=mime_type.get(ext, "application/octet-stream"))
-        # Add CORS headers for local file responses
-        file_response.headers["Access-Control-Allow-Origin"] = "*"
-        file_response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-        file_response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        return add_cors_headers(
+            _send_local_file(path, mime_type.get(ext, "application/octet-stream"))
+        )
+
+
+def _send_cached_file(
+    url: str, fetch: Callable[[], Fetch], content_type: Optional[str]
+) -> Optional[Response]:
+    """
+    Serve an S3 or HTTP file from the media cache, streaming it into the cache if needed.
+
+    A file missing from the cache is sent as the origin sends it, while it is written to the
+    cache. Range requests of a file missing from the cache are proxied instead, so that media
+    elements can start playing or seek without waiting for the whole file; the file is
+    fetched into the cache in the background when the range starts at the beginning of it.
+
+    Returns:
+        The response, or None to proxy the file: when there is no media cache or for ranges
+        of a file not cached yet
+    """
+    cache: Optional[MediaCache] = current_app.config.get("MEDIA_CACHE")
+    if cache is None:
+        return None
+    requested = parse_byte_ranges(request.headers.get("Range"))
+    if requested is not None and cache.peek(url) is None:
+        if requested[0][0] == 0:
+            cache.fill_in_background(url, fetch())
+        return None
+    try:
+        entry, origin, status = cache.lookup(url, fetch())
+    except ClientError as e:
+        logger.error(f"Failed to fetch S3 file {url}: {e}")
+        raise InvalidInputException(f"Failed to read S3 file: {e}") from e
+    except requests.RequestException as e:
+        logger.error(f"Failed to fetch HTTP URL {url}: {e}")
+        raise InvalidInputException(f"Failed to fetch URL: {e}") from e
+    if origin is not None:
+        if requested is not None:
+            # The cached file changed at its origin
+            origin.close()
+            cache.fill_in_background(url, fetch())
+            return None
+        logger.info(f"Sending {url} from its origin into the media cache")
+        return _send_origin_file(cache, url, origin, content_type)
+    assert entry is not None
+    logger.info(f"Sending {url} from the media cache ({status})")
+    response = _send_local_file(
+        cache.path(entry),
+        content_type or entry.content_type or "application/octet-stream",
+        etag=unquote_etag(entry.etag)[0] if entry.etag else True,
+        last_modified=entry.last_modified,
+    )
+    response.headers["X-Media-Cache"] = status
+    return add_cors_headers(response)
+
+
+def _send_origin_file(
+    cache: MediaCache, url: str, origin: OriginObject, content_type: Optional[str]
+) -> Response:
+    """Stream a file as its origin sends it, writing it to the media cache on the way."""
+    headers = validator_headers(origin.etag, origin.last_modified)
+    if not is_resource_modified(
+        request.environ,
+        etag=unquote_etag(origin.etag)[0] if origin.etag else None,
+        last_modified=origin.last_modified,
+    ):
+        origin.close()
+        response = FlaskResponse(status=304)
+        response.headers.update(headers)
+        return add_cors_headers(response)
+    response = FlaskResponse(
+        cache.tee(url, origin),
+        content_type=content_type or origin.content_type or "application/octet-stream",
+    )
+    response.headers.update(headers)
+    if origin.size is not None:
+        response.headers["Content-Length"] = str(origin.size)
+    response.headers["X-Media-Cache"] = "miss"
+    return add_cors_headers(response)
+
+
+def _send_local_file(
+    path: str,
+    content_type: str,
+    etag: Union[bool, str] = True,
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    # send_file sets the validators; ranges are answered below, as send_file does not
+    # support multiple ranges
+    file_response = send_file(
+        path, mimetype=content_type, conditional=False, etag=etag, last_modified=last_modified
+    )
+    quoted_etag = file_response.headers.get("ETag")
+    last_modified = file_response.last_modified
+    file_response.headers.update(validator_headers(quoted_etag, last_modified))
+    if not is_resource_modified(
+        request.environ,
+        etag=unquote_etag(quoted_etag)[0] if quoted_etag else None,
+        last_modified=last_modified,
+    ):
+        file_response.close()
+        response = FlaskResponse(status=304)
+        response.headers.update(validator_headers(quoted_etag, last_modified))
+        return response
+
+    size = os.path.getsize(path)
+    try:
+        ranges = requested_ranges(size) if if_range_matches(quoted_etag, last_modified) else None
+    except RangeNotSatisfiable:
+        file_response.close()
+        return not_satisfiable_response(size)
+    if ranges is None:
         return file_response
+    file_response.close()
+
+    def read_range(start: int, stop: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return partial_response(
+        ranges, size, content_type, read_range, validator_headers(quoted_etag, last_modified)
+    )
+
+
+def _proxy_s3_file(s3_client: Any, path: str, content_type: Optional[str]) -> Response:
+    parsed = urlparse(path)
+    bucket = parsed.netloc
+    key = parsed.path.lstrip("/")
+
+    # Conditional requests are answered by S3 itself
+    conditions: dict[str, Any] = {}
+    if request.headers.get("If-None-Match"):
+        conditions["IfNoneMatch"] = request.headers["If-None-Match"]
+    elif request.if_modified_since is not None:
+        conditions["IfModifiedSince"] = request.if_modified_since
+
+    def read_body(s3_response: Any) -> Iterator[bytes]:
+        yield from s3_response["Body"].iter_chunks(chunk_size=CHUNK_SIZE)
+
+    def read_range(start: int, stop: int) -> Iterator[bytes]:
+        yield from read_body(
+            s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{stop - 1}")
+        )
+
+    try:
+        requested = parse_byte_ranges(request.headers.get("Range"))
+        # The size of the object is needed to split it in parts, or to check If-Range first
+        if requested is not None and (len(requested) > 1 or request.headers.get("If-Range")):
+            head = s3_client.head_object(Bucket=bucket, Key=key, **conditions)
+            size = int(head["ContentLength"])
+            etag = head.get("ETag")
+            last_modified = head.get("LastModified")
+            content_type = content_type or head.get("ContentType") or "application/octet-stream"
+            ranges = requested_ranges(size) if if_range_matches(etag, last_modified) else None
+            if ranges is not None:
+                return add_cors_headers(
+                    partial_response(
+                        ranges,
+                        size,
+                        content_type,
+                        read_range,
+                        validator_headers(etag, last_modified),
+                    )
+                )
+            requested = None
+
+        # S3 answers a single range by itself
+        if requested is not None:
+            conditions["Range"] = format_byte_range(*requested[0])
+        s3_response: Any = s3_client.get_object(Bucket=bucket, Key=key, **conditions)
+    except RangeNotSatisfiable as e:
+        return add_cors_headers(not_satisfiable_response(e.size))
+    except ClientError as e:
+        error = e.response.get("Error", {})
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status == 304 or error.get("Code") in ("304", "NotModified"):
+            return add_cors_headers(FlaskResponse(status=304))
+        if status == 416 or error.get("Code") == "InvalidRange":
+            size = error.get("ActualObjectSize")
+            if size is None:
+                size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+            return add_cors_headers(not_satisfiable_response(int(size)))
+        if status == 404 or error.get("Code") in ("404", "NoSuchKey"):
+            raise FileNotFoundError(f"No such file: {path}") from e
+        logger.error(f"Failed to proxy S3 file {path}: {e}")
+        raise InvalidInputException(f"Failed to read S3 file: {e}") from e
+    except Exception as e:
+        logger.error(f"Failed to proxy S3 file {path}: {e}")
+        raise InvalidInputException(f"Failed to read S3 file: {e}") from e
+
+    response = FlaskResponse(
+        read_body(s3_response),
+        status=206 if s3_response.get("ContentRange") else 200,
+        content_type=content_type or s3_response.get("ContentType") or "application/octet-stream",
+    )
+    response.headers.update(
+        validator_headers(s3_response.get("ETag"), s3_response.get("LastModified"))
+    )
+    if s3_response.get("ContentLength") is not None:
+        response.headers["Content-Length"] = str(s3_response["ContentLength"])
+    if s3_response.get("ContentRange"):
+        response.headers["Content-Range"] = s3_response["ContentRange"]
+    return add_cors_headers(response)
+
+
+def _proxy_http_file(url: str, content_type: Optional[str]) -> Response:
+    # Range and conditional requests are forwarded to the origin
+    forwarded = {
+        name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers
+    }
+    try:
+        response = requests.get(url, stream=True, timeout=30, headers=forwarded)
+        if response.status_code not in (304, 416):
+            response.raise_for_status()
+    except requests.RequestException as e:
+        logger.error(f"Failed to fetch HTTP URL {url}: {e}")
+        raise InvalidInputException(f"Failed to fetch URL: {e}") from e
+
+    def generate() -> Generator[bytes, None, None]:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if chunk:
+                yield chunk
+
+    flask_response = create_streaming_response(
+        generate(),
+        response.headers.get("content-type", content_type or "application/octet-stream"),
+    )
+    flask_response.status_code = response.status_code
+    for name in PROXIED_HEADERS:
+        if name in response.headers:
+            flask_response.headers[name] = response.headers[name]
+    if response.headers.get("Content-Encoding"):
+        # iter_content decodes the body, so its length differs
+        flask_response.headers.pop("Content-Length", None)
+    flask_response.headers["Access-Control-Expose-Headers"] = EXPOSED_HEADERS
+    return flask_response
 
 
 @fs_bp.post("/upload")
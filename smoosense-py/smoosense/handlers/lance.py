@@ -1,58 +1,149 @@
 import logging
+from collections.abc import Iterator
+from timeit import default_timer
+from typing import Any, Optional
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
 from werkzeug.wrappers import Response
 
 from smoosense.exceptions import InvalidInputException
-from smoosense.lance.db_client import LanceDBClient
+from smoosense.lance.db_client import LanceDBClient, TableInfoCache
+from smoosense.lance.native_query import translate_filter
+from smoosense.lance.table_cache import LanceTableCache
 from smoosense.lance.table_client import LanceTableClient
+from smoosense.lance.vector_search import (
+    MAX_K,
+    VectorSearch,
+    row_vector,
+    vector_columns,
+    vector_index,
+)
 from smoosense.utils.api import handle_api_errors, require_arg
+from smoosense.utils.blob_summary import summarize_blobs
+from smoosense.utils.duckdb_connections import check_condition
+from smoosense.utils.serialization import NDJSON_MIMETYPE, table_rows
 
 logger = logging.getLogger(__name__)
 lance_bp = Blueprint("lance", __name__)
 
 
+def _lance_db_client(db_path: str) -> LanceDBClient:
+    db_type = request.args.get("dbType", "lance")
+    if db_type != "lance":
+        raise InvalidInputException(f"Unsupported database type: {db_type}")
+    try:
+        return LanceDBClient(db_path)
+    except ValueError as e:
+        raise InvalidInputException(str(e)) from e
+
+
 @lance_bp.get("/lance/list-tables")
 @handle_api_errors
 def list_tables() -> Response:
     """List all tables in a Lance database directory."""
     db_path = require_arg("dbPath")
-    db_type = request.args.get("dbType", "lance")
-
-    if db_type != "lance":
-        raise InvalidInputException(f"Unsupported database type: {db_type}")
+    client = _lance_db_client(db_path)
 
     try:
-        client = LanceDBClient(db_path)
-        tables_info = client.list_tables()
+        tables_info = client.list_tables(cache=current_app.config["LANCE_TABLE_INFO_CACHE"])
         return jsonify([table.model_dump() for table in tables_info])
-    except ValueError as e:
-        raise InvalidInputException(str(e)) from e
     except Exception as e:
         logger.error(f"Failed to list tables from {db_path}: {e}")
         raise InvalidInputException(f"Failed to list Lance tables: {e}") from e
 
 
+@lance_bp.get("/lance/list-tables/stream")
+@handle_api_errors
+def list_tables_stream() -> Response:
+    """
+    List all tables in a Lance database directory as NDJSON, table by table.
+
+    The first line has the names of the tables, so that they can be shown right away. Then
+    each table has a line with its info once it is computed, in no particular order. The last
+    line reports the runtime and how many infos came from the cache.
+    """
+    time_start = default_timer()
+    db_path = require_arg("dbPath")
+    client = _lance_db_client(db_path)
+    cache: TableInfoCache = current_app.config["LANCE_TABLE_INFO_CACHE"]
+
+    try:
+        table_names = client.table_names()
+    except Exception as e:
+        logger.error(f"Failed to list tables from {db_path}: {e}")
+        raise InvalidInputException(f"Failed to list Lance tables: {e}") from e
+
+    dumps = current_app.json.dumps
+
+    def generate() -> Iterator[str]:
+        hits_before = cache.stats()["hits"]
+        yield dumps({"type": "tables", "names": table_names}) + "\n"
+        for info in client.iter_tables(table_names, cache=cache):
+            yield dumps({"type": "table", **info.model_dump()}) + "\n"
+        yield (
+            dumps(
+                {
+                    "type": "end",
+                    "runtime": default_timer() - time_start,
+                    "cached": cache.stats()["hits"] - hits_before,
+                }
+            )
+            + "\n"
+        )
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def _int_arg(name: str) -> Optional[int]:
+    """Optional non-negative integer query argument."""
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise InvalidInputException(f"{name} must be a non-negative integer")
+    return number
+
+
 @lance_bp.get("/lance/list-versions")
 @handle_api_errors
 def list_versions() -> Response:
-    """List all versions of a table in a Lance database."""
+    """
+    List versions of a table in a Lance database.
+
+    All versions are listed by default. sinceVersion only lists the versions committed after
+    it, so that new commits can be fetched incrementally, and offset/limit page through them.
+    The number of versions after sinceVersion is in the X-Total-Versions header.
+    """
     db_path = require_arg("dbPath")
     table_name = require_arg("tableName")
     db_type = request.args.get("dbType", "lance")
+    since_version = _int_arg("sinceVersion")
+    offset = _int_arg("offset") or 0
+    limit = _int_arg("limit")
 
     if db_type != "lance":
         raise InvalidInputException(f"Unsupported database type: {db_type}")
 
     try:
         client = LanceTableClient(db_path, table_name)
-        versions_info = client.list_versions()
-        return jsonify([version.model_dump() for version in versions_info])
+        versions_info, num_versions = client.list_versions_page(
+            since_version=since_version,
+            offset=offset,
+            limit=limit,
+            cache=current_app.config["LANCE_VERSION_CACHE"],
+        )
     except ValueError as e:
         raise InvalidInputException(str(e)) from e
     except Exception as e:
         logger.error(f"Failed to list versions for table {table_name}: {e}")
         raise InvalidInputException(f"Failed to list versions: {e}") from e
+    response = jsonify([version.model_dump() for version in versions_info])
+    response.headers["X-Total-Versions"] = str(num_versions)
+    return response
 
 
 @lance_bp.get("/lance/list-indices")
@@ -97,3 +188,138 @@ def list_columns() -> Response:
     except Exception as e:
         logger.error(f"Failed to list columns for table {table_name}: {e}")
         raise InvalidInputException(f"Failed to list columns: {e}") from e
+
+
+@lance_bp.get("/lance/table-cache")
+@handle_api_errors
+def table_cache() -> Response:
+    """List the Lance tables held in memory and the cache metrics."""
+    cache: LanceTableCache = current_app.config["LANCE_TABLE_CACHE"]
+    return jsonify({"stats": cache.stats(), "entries": cache.entries()})
+
+
+@lance_bp.post("/lance/table-cache/drop")
+@handle_api_errors
+def drop_table_cache() -> Response:
+    """Drop cached Lance tables, optionally only those of a table path and version."""
+    cache: LanceTableCache = current_app.config["LANCE_TABLE_CACHE"]
+    body = request.get_json(silent=True) or {}
+    version = body.get("version")
+    if version is not None and not isinstance(version, int):
+        raise InvalidInputException(f"version must be an integer, got {version!r}")
+    dropped = cache.drop(table_path=body.get("tablePath"), version=version)
+    return jsonify({"dropped": dropped, "stats": cache.stats()})
+
+
+@lance_bp.post("/lance/search")
+@handle_api_errors
+def vector_search() -> Response:
+    """
+    Find the k rows nearest to a vector, or to the vector of a row, in a vector column.
+
+    The search runs through the ANN index of the column when it has one (strategy "index"),
+    and as a flat scan otherwise or when useIndex is false (strategy "flat"). With report,
+    the result is compared with a flat scan to measure the recall and latency of the index.
+    Rows come with their distance and their row id, which can be searched from in turn.
+    """
+    time_start = default_timer()
+    if not request.json:
+        raise InvalidInputException("JSON body is required")
+    body: dict[str, Any] = request.json
+    table_path = body.get("tablePath")
+    if not table_path:
+        raise InvalidInputException("tablePath is required")
+    try:
+        client = LanceTableClient.from_table_path(table_path)
+    except ValueError as e:
+        raise InvalidInputException(str(e)) from e
+    lance_dataset, schema = client.get_compatible_dataset()
+
+    candidates = vector_columns(schema)
+    column = body.get("column") or (candidates[0] if len(candidates) == 1 else None)
+    if column not in candidates:
+        raise InvalidInputException(f"column must be one of the vector columns {candidates}")
+    dimension = schema.field(column).type.list_size
+
+    k = _search_int(body, "k", MAX_K) or 10
+    nprobes = _search_int(body, "nprobes")
+    refine_factor = _search_int(body, "refineFactor")
+
+    vector = body.get("vector")
+    row_id = body.get("rowId")
+    if (vector is None) == (row_id is None):
+        raise InvalidInputException("Exactly one of vector and rowId is required")
+    if row_id is not None:
+        if not isinstance(row_id, int) or isinstance(row_id, bool) or row_id < 0:
+            raise InvalidInputException("rowId must be a non-negative integer")
+        vector = row_vector(lance_dataset, column, row_id)
+    if (
+        not isinstance(vector, list)
+        or len(vector) != dimension
+        or not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in vector)
+    ):
+        raise InvalidInputException(f"vector must be a list of {dimension} numbers")
+
+    columns = body.get("columns")
+    if columns is None:
+        columns = [name for name in schema.names if name != column]
+    if not isinstance(columns, list) or not all(name in schema.names for name in columns):
+        raise InvalidInputException(f"columns must be a list of columns of {schema.names}")
+    columns = list(dict.fromkeys(columns))
+
+    condition = body.get("filter") or None
+    lance_filter = None
+    if condition is not None:
+        check_condition(condition)
+        with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+            translated = translate_filter(con, condition, schema)
+        # Conditions beyond the translated subset are left to Lance's own SQL dialect
+        lance_filter = translated[0] if translated is not None else condition
+
+    search = VectorSearch(
+        lance_dataset,
+        column,
+        [float(x) for x in vector],
+        k,
+        columns,
+        lance_filter=lance_filter,
+        prefilter=body.get("prefilter", True) is not False,
+        nprobes=nprobes,
+        refine_factor=refine_factor,
+    )
+    try:
+        table, strategy, latency = search.run(use_index=body.get("useIndex", True) is not False)
+        report = search.report(table, latency) if body.get("report") else None
+    except ValueError as e:
+        raise InvalidInputException(f"Vector search failed: {e}") from e
+
+    with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+        relation = summarize_blobs(con.from_arrow(table))
+        result = relation.arrow()
+        rows = table_rows(con, result, relation.types)
+
+    index = vector_index(lance_dataset, column)
+    return jsonify(
+        {
+            "column_names": result.column_names,
+            "rows": rows,
+            "column": column,
+            "k": k,
+            "strategy": strategy,
+            "index": {"name": index["name"], "type": index["type"]} if index else None,
+            "report": report,
+            "runtime": default_timer() - time_start,
+        }
+    )
+
+
+def _search_int(body: dict[str, Any], name: str, cap: Optional[int] = None) -> Optional[int]:
+    """Optional positive integer option of a search, at most `cap`."""
+    value = body.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidInputException(f"{name} must be a positive integer")
+    if cap is not None and value > cap:
+        raise InvalidInputException(f"{name} must be at most {cap}")
+    return value
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+import pyarrow as pa
+import requests
+from botocore.exceptions import ClientError
+from flask import Blueprint, current_app, jsonify, request, send_file
+from werkzeug.wrappers import Response
+
+from smoosense.exceptions import InvalidInputException
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.utils.api import handle_api_errors, require_arg
+from smoosense.utils.column_stats import quote_identifier, quote_literal
+from smoosense.utils.media_cache import MediaCache, http_fetch, s3_fetch
+from smoosense.utils.query_cache import file_fingerprints
+from smoosense.utils.row_cursor import ParquetRowSource
+from smoosense.utils.thumbnails import MAX_SOURCE_BYTES, Thumbnailer
+from smoosense.utils.video_previews import VideoPreviewer, video_source
+
+logger = logging.getLogger(__name__)
+media_bp = Blueprint("media", __name__)
+
+DEFAULT_THUMBNAIL_SIZE = 256
+
+# Seconds browsers reuse a thumbnail before revalidating it by its ETag
+THUMBNAIL_MAX_AGE = 60
+
+# Videos scheduled by one prefetch request at most
+MAX_PREFETCH_VIDEOS = 500
+
+# Fingerprint of a source image and a function reading its bytes
+ImageSource = tuple[str, Callable[[], bytes]]
+
+
+@media_bp.get("/thumbnail")
+@handle_api_errors
+def thumbnail() -> Response:
+    """
+    Serve a downscaled WebP or JPEG copy of an image, for gallery tiles and table cells.
+
+    The image is either a file (`path`: local path, S3 or HTTP URL) or a BLOB cell of a Lance
+    or Parquet table (`tablePath`, `column` and `row`, the position of the row in the table).
+    `size` is the maximum width and height of the thumbnail, `format` is webp or jpeg.
+    """
+    size = _int_arg("size", DEFAULT_THUMBNAIL_SIZE)
+    image_format = request.args.get("format", "webp").lower()
+    path = request.args.get("path")
+    table_path = request.args.get("tablePath")
+    if bool(path) == bool(table_path):
+        raise InvalidInputException("Exactly one of path and tablePath is required")
+    if path:
+        source = _file_source(path)
+    else:
+        assert table_path is not None
+        column = request.args.get("column")
+        if not column:
+            raise InvalidInputException("Missing required parameter: column")
+        source = _blob_source(table_path, column, _int_arg("row", None))
+
+    thumbnailer: Optional[Thumbnailer] = current_app.config.get("THUMBNAILER")
+    if thumbnailer is None:
+        raise InvalidInputException("Thumbnails are disabled")
+    fingerprint, read_source = source
+    try:
+        entry, status = thumbnailer.thumbnail(fingerprint, read_source, size, image_format)
+    except ModuleNotFoundError as e:
+        raise InvalidInputException(
+            'Thumbnails require Pillow: pip install "smoosense[media]"'
+        ) from e
+    except ValueError as e:
+        raise InvalidInputException(str(e)) from e
+
+    response = send_file(
+        thumbnailer.cache.path(entry),
+        mimetype=entry.content_type,
+        conditional=True,
+        etag=entry.digest,
+        max_age=THUMBNAIL_MAX_AGE,
+    )
+    response.headers["X-Thumbnail-Cache"] = status
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+@media_bp.get("/video-preview")
+@handle_api_errors
+def video_preview() -> Response:
+    """
+    Serve the poster frame, sprite sheet or sprite description of a local, S3 or HTTP video.
+
+    `kind` is poster (JPEG), sprite (JPEG row of keyframe tiles) or info (JSON with the duration
+    of the video, the size of the tiles and the time of each tile). All three are made at once,
+    from a few byte ranges of the video, and cached.
+    """
+    path = require_arg("path")
+    kind = request.args.get("kind", "poster")
+    previewer = _video_previewer()
+    try:
+        entry = previewer.preview(video_source(path, current_app.config["S3_CLIENT"]), kind)
+    except ModuleNotFoundError as e:
+        raise InvalidInputException(
+            'Video previews require PyAV and Pillow: pip install "smoosense[media]"'
+        ) from e
+    except (ValueError, ClientError, requests.RequestException) as e:
+        raise InvalidInputException(str(e)) from e
+
+    response = send_file(
+        previewer.cache.path(entry),
+        mimetype=entry.content_type,
+        conditional=True,
+        etag=entry.digest,
+        max_age=THUMBNAIL_MAX_AGE,
+    )
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+@media_bp.post("/video-preview/prefetch")
+@handle_api_errors
+def prefetch_video_previews() -> Response:
+    """Schedule the previews of videos in the background, e.g. of a page of rows."""
+    paths = request.json.get("paths") if request.json else None
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        raise InvalidInputException("paths must be a list of strings")
+    previewer = _video_previewer()
+    s3_client = current_app.config["S3_CLIENT"]
+    scheduled = list(dict.fromkeys(paths))[:MAX_PREFETCH_VIDEOS]
+    for path in scheduled:
+        previewer.submit(video_source(path, s3_client))
+    return jsonify({"scheduled": len(scheduled)})
+
+
+def _video_previewer() -> VideoPreviewer:
+    previewer: Optional[VideoPreviewer] = current_app.config.get("VIDEO_PREVIEWER")
+    if previewer is None:
+        raise InvalidInputException("Video previews are disabled")
+    return previewer
+
+
+def _int_arg(name: str, default: Optional[int]) -> int:
+    value = request.args.get(name)
+    if value is None:
+        if default is None:
+            raise InvalidInputException(f"Missing required parameter: {name}")
+        return default
+    try:
+        return int(value)
+    except ValueError as e:
+        raise InvalidInputException(f"{name} must be an integer") from e
+
+
+def _read_file(path: str) -> bytes:
+    if os.path.getsize(path) > MAX_SOURCE_BYTES:
+        raise ValueError(f"{path} is too large for a thumbnail")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _file_source(path: str) -> ImageSource:
+    """Image file, fingerprinted by path, size and mtime, or by content when remote."""
+    if path.startswith(("s3://", "http://", "https://")):
+        return _remote_source(path)
+    path = os.path.abspath(os.path.expanduser(path))
+    stat = os.stat(path)
+    return f"file:{path}:{stat.st_size}:{stat.st_mtime_ns}", lambda: _read_file(path)
+
+
+def _remote_source(url: str) -> ImageSource:
+    """S3 or HTTP image, read through the media cache when there is one."""
+    fetch = (
+        s3_fetch(current_app.config["S3_CLIENT"], url)
+        if url.startswith("s3://")
+        else http_fetch(url)
+    )
+    cache: Optional[MediaCache] = current_app.config.get("MEDIA_CACHE")
+    try:
+        if cache is not None:
+            entry, _ = cache.get(url, fetch)
+            if entry is None:
+                raise InvalidInputException(f"{url} is too large for a thumbnail")
+            cached_path = cache.path(entry)
+            return f"sha256:{entry.digest}", lambda: _read_file(cached_path)
+
+        origin = fetch(None)
+        try:
+            data = bytearray()
+            for chunk in origin.chunks or []:
+                data.extend(chunk)
+                if len(data) > MAX_SOURCE_BYTES:
+                    raise InvalidInputException(f"{url} is too large for a thumbnail")
+        finally:
+            origin.close()
+    except (ClientError, requests.RequestException) as e:
+        logger.error(f"Failed to fetch {url}: {e}")
+        raise InvalidInputException(f"Failed to fetch {url}: {e}") from e
+    content = bytes(data)
+    return f"sha256:{hashlib.sha256(content).hexdigest()}", lambda: content
+
+
+def _blob_source(table_path: str, column: str, row: int) -> ImageSource:
+    """BLOB cell of a Lance or Parquet table, fingerprinted by the version of the table."""
+    if row < 0:
+        raise InvalidInputException("row must be a non-negative integer")
+    if table_path.rstrip("/").endswith(".lance"):
+        try:
+            lance_dataset = LanceTableClient.from_table_path(table_path).table.to_lance()
+        except ValueError as e:
+            raise InvalidInputException(str(e)) from e
+        if column not in lance_dataset.schema.names:
+            raise InvalidInputException(f"No column {column} in {table_path}")
+        if row >= lance_dataset.count_rows():
+            raise InvalidInputException(f"No row {row} in {table_path}")
+        fingerprint = f"lance:{lance_dataset.uri}:{lance_dataset.version}:{column}:{row}"
+        return fingerprint, lambda: _cell_bytes(
+            lance_dataset.take([row], columns=[column]).column(0), column
+        )
+
+    versions = file_fingerprints(quote_literal(table_path), current_app.config["S3_CLIENT"])
+    if versions is None:
+        raise FileNotFoundError(f"No such table: {table_path}")
+    digest = hashlib.sha256(json.dumps(versions, default=str).encode()).hexdigest()
+
+    def read() -> bytes:
+        with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+            source = ParquetRowSource(con, table_path)
+            if row >= source.num_rows:
+                raise InvalidInputException(f"No row {row} in {table_path}")
+            file_index = max(i for i, offset in enumerate(source.offsets) if offset <= row)
+            cell = con.execute(
+                f"SELECT {quote_identifier(column)} "
+                f"FROM read_parquet({quote_literal(source.files[file_index])}, file_row_number=true) "
+                f"WHERE file_row_number = {row - source.offsets[file_index]}"
+            ).fetch_arrow_table()
+        return _cell_bytes(cell.column(0), column)
+
+    return f"parquet:{digest}:{column}:{row}", read
+
+
+def _cell_bytes(values: pa.ChunkedArray, column: str) -> bytes:
+    if not (pa.types.is_binary(values.type) or pa.types.is_large_binary(values.type)):
+        raise InvalidInputException(f"Column {column} is not a BLOB column")
+    value = values[0].as_py() if len(values) else None
+    if value is None:
+        raise FileNotFoundError(f"No image in column {column}")
+    return bytes(value)
@@ -1,20 +1,32 @@
 import logging
 import os
+from timeit import default_timer
 from typing import Any
 
 import pyarrow.fs as pafs
 import pyarrow.parquet as pq
-from flask import Blueprint, current_app, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from werkzeug.wrappers import Response
 
 from smoosense.exceptions import InvalidInputException
 from smoosense.utils.api import handle_api_errors, require_arg
+from smoosense.utils.parquet_stats import footer_column_stats, scan_missing_stats
 from smoosense.utils.s3_fs import S3FileSystem
+from smoosense.utils.serialization import serialize
 
 logger = logging.getLogger(__name__)
 parquet_bp = Blueprint("parquet", __name__)
 
 
+def _open_parquet_file(file_path: str) -> pq.ParquetFile:
+    """Open a local or S3 Parquet file; only the footer is read until data is requested."""
+    if file_path.startswith("s3://"):
+        # Use PyArrow's S3 filesystem
+        return pq.ParquetFile(file_path[5:], filesystem=pafs.S3FileSystem())
+    # Local file - expand user path
+    return pq.ParquetFile(os.path.expanduser(file_path))
+
+
 @parquet_bp.get("/parquet/info")
 @handle_api_errors
 def parquet_info() -> Response:
@@ -22,22 +34,13 @@ def parquet_info() -> Response:
     file_path = require_arg("filePath")
 
     try:
-        # Check if file_path is S3 URL
-        is_s3 = file_path.startswith("s3://")
-
-        if is_s3:
-            # Use PyArrow's S3 filesystem
-            parquet_file = pq.ParquetFile(file_path[5:], filesystem=pafs.S3FileSystem())
-            metadata = parquet_file.metadata
-
+        parquet_file = _open_parquet_file(file_path)
+        metadata = parquet_file.metadata
+        if file_path.startswith("s3://"):
             # Get file size from S3
             file_size = S3FileSystem(current_app.config["S3_CLIENT"]).head_file(file_path).size
         else:
-            # Local file - expand user path
-            expanded_path = os.path.expanduser(file_path)
-            parquet_file = pq.ParquetFile(expanded_path)
-            metadata = parquet_file.metadata
-            file_size = os.path.getsize(expanded_path)
+            file_size = os.path.getsize(os.path.expanduser(file_path))
 
         # Calculate compression ratio
         total_uncompressed = sum(
@@ -73,3 +76,55 @@ def parquet_info() -> Response:
         return jsonify(info)
     except FileNotFoundError as e:
         raise InvalidInputException(f"File not found: {file_path}") from e
+
+
+@parquet_bp.get("/parquet/stats")
+@handle_api_errors
+def parquet_stats() -> Response:
+    """
+    Get the row count and per-column null counts, min and max of a Parquet file.
+
+    Answered from the row-group statistics in the footer without reading data pages. Only
+    the statistics missing from the footer (e.g. nested columns or files written without
+    statistics) are computed, with one scan of the affected columns. With allowScan=false they
+    are left null instead, so the response only costs a footer read.
+    """
+    time_start = default_timer()
+    file_path = require_arg("filePath")
+    allow_scan = request.args.get("allowScan", "true").lower() == "true"
+
+    try:
+        parquet_file = _open_parquet_file(file_path)
+    except FileNotFoundError as e:
+        raise InvalidInputException(f"File not found: {file_path}") from e
+
+    columns, missing = footer_column_stats(parquet_file)
+    scanned_columns = sorted(missing) if allow_scan else []
+    if scanned_columns:
+        logger.debug(f"Scanning {file_path} for statistics missing from the footer: {missing}")
+        scan_path = file_path if file_path.startswith("s3://") else os.path.expanduser(file_path)
+        with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+            scanned = scan_missing_stats(con, scan_path, missing)
+        for name, values in scanned.items():
+            columns[name].update(values)
+
+    cnt_all = parquet_file.metadata.num_rows
+    for name, column_stats in columns.items():
+        cnt_null = column_stats["cnt_null"]
+        column_stats["cnt_not_null"] = cnt_all - cnt_null if cnt_null is not None else None
+        if name not in missing:
+            column_stats["source"] = "footer"
+        else:
+            column_stats["source"] = "scan" if allow_scan else "missing"
+
+    return jsonify(
+        serialize(
+            {
+                "cnt_all": cnt_all,
+                "num_row_groups": parquet_file.metadata.num_row_groups,
+                "columns": columns,
+                "scanned_columns": scanned_columns,
+                "runtime": default_timer() - time_start,
+            }
+        )
+    )
@@ -1,16 +1,43 @@
 import logging
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import AbstractContextManager, closing, contextmanager
 from timeit import default_timer
+from typing import Any, Callable, Optional
 
-from flask import Blueprint, Response, current_app, jsonify, request
+import pyarrow as pa
+from duckdb import DuckDBPyConnection
+from duckdb.typing import DuckDBPyType
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 
+from smoosense.exceptions import InvalidInputException
 from smoosense.lance.table_client import LanceTableClient
 from smoosense.utils.api import handle_api_errors
+from smoosense.utils.blob_summary import execute_for_display, summarize_blobs
 from smoosense.utils.duckdb_connections import check_permissions
-from smoosense.utils.serialization import serialize
+from smoosense.utils.query_batch import BatchUnit, plan_batch
+from smoosense.utils.query_cache import QueryResultCache, query_cache_key
+from smoosense.utils.query_registry import QueryRegistry, socket_disconnect_check
+from smoosense.utils.serialization import (
+    ARROW_COMPRESSIONS,
+    ARROW_STREAM_MIMETYPE,
+    NDJSON_MIMETYPE,
+    stream_arrow_ipc,
+    table_rows,
+)
 
 logger = logging.getLogger(__name__)
 query_bp = Blueprint("query", __name__)
 
+MAX_BATCH_PARALLELISM = 8
+# Most rows and bytes of JSON text a streamed query sends; clients may ask for less
+MAX_STREAM_ROWS = 1_000_000
+MAX_STREAM_BYTES = 256 * 1024 * 1024
+STREAM_BATCH_ROWS = 2048
+# Rows per record batch of Arrow IPC responses
+ARROW_BATCH_ROWS = 65536
+
 
 @query_bp.post("/query")
 @handle_api_errors
@@ -27,40 +54,558 @@ def run_query() -> Response:
     check_permissions(query)
 
     query_engine = request.json.get("queryEngine", "duckdb")
+    query_id = str(request.json.get("queryId") or uuid.uuid4())
+
+    if _accepts_arrow():
+        compression = request.json.get("compression")
+        if compression is not None and compression not in ARROW_COMPRESSIONS:
+            raise InvalidInputException(
+                f"Unsupported compression: {compression}. Expecting one of {ARROW_COMPRESSIONS}"
+            )
+        return _run_query_as_arrow(query, query_engine, query_id, compression, time_start)
+
+    cache: QueryResultCache = current_app.config["QUERY_RESULT_CACHE"]
+    cache_key = _cache_key(cache, query, query_engine, "json")
+    cached = cache.get(cache_key) if cache_key else None
 
     column_names: list[str] = []
-    rows: list[tuple] = []
+    rows: list[Any] = []
     error = None
+    lance_scan = None
 
     try:
-        if query_engine == "lance":
-            # Lance query engine using DuckDB integration
-            table_path = request.json.get("tablePath")
-            if not table_path:
-                raise ValueError("tablePath is required when using lance query engine")
-
-            # Create Lance table client and execute query
-            lance_client = LanceTableClient.from_table_path(table_path)
-            column_names, rows = lance_client.run_duckdb_sql(query)
-
+        if cached is not None:
+            column_names, rows = cached
         else:
-            # DuckDB query engine (default)
-            connection_maker = current_app.config["DUCKDB_CONNECTION_MAKER"]
-            con = connection_maker()
-            result = con.execute(query)
-            column_names = [desc[0] for desc in result.description] if result.description else []
-            rows = result.fetchall()
+            with _tracked_connection(query_engine, query_id) as con:
+                reader, types, lance_scan = _display_reader(con, query, query_engine)
+                if reader is not None:
+                    table = reader.read_all()
+                    column_names = table.column_names
+                    rows = table_rows(con, table, types)
 
     except Exception as e:
         error = str(e)
         logger.error(f"Query execution failed: {error}")
 
-    return jsonify(
+    response = jsonify(
         {
             "status": "success" if not error else "error",
             "column_names": column_names,
-            "rows": serialize(rows),
+            "rows": rows,
             "runtime": default_timer() - time_start,
             "error": error,
+            "query_id": query_id,
         }
     )
+    if cache_key and cached is None and not error:
+        cache.put(cache_key, (column_names, rows), len(response.get_data()))
+    if cache_key:
+        response.headers["X-Query-Cache"] = "hit" if cached is not None else "miss"
+    if lance_scan:
+        response.headers["X-Lance-Scan"] = lance_scan
+    response.headers["X-Query-Id"] = query_id
+    return response
+
+
+@query_bp.post("/query/batch")
+@handle_api_errors
+def run_query_batch() -> Response:
+    """
+    Run several queries against one table and stream their results as they complete.
+
+    Aggregate queries over the same table are combined into a single scan. The statements run
+    on one pooled connection, or on cursors of it across a thread pool when `parallelism` > 1.
+    Each line of the newline-delimited JSON response is the result of one query, in the format
+    of /api/query plus its `index` in the batch. Statements are registered in the query
+    registry as "<batchId>:<n>" and are interrupted when the client disconnects.
+    """
+    time_start = default_timer()
+    if not request.json:
+        raise InvalidInputException("JSON body is required")
+    queries = request.json.get("queries")
+    if not isinstance(queries, list) or not all(isinstance(q, str) and q for q in queries):
+        raise InvalidInputException("queries must be a list of SQL strings")
+    for query in queries:
+        check_permissions(query)
+
+    query_engine = request.json.get("queryEngine", "duckdb")
+    batch_id = str(request.json.get("batchId") or uuid.uuid4())
+    parallelism = request.json.get("parallelism", 1)
+    if not isinstance(parallelism, int) or parallelism < 1:
+        raise InvalidInputException("parallelism must be a positive integer")
+    parallelism = min(parallelism, MAX_BATCH_PARALLELISM)
+    combine = request.json.get("combine", True) is not False
+
+    cache: QueryResultCache = current_app.config["QUERY_RESULT_CACHE"]
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    timeout = request.json.get("timeout")
+    is_disconnected = socket_disconnect_check(request.environ)
+    cache_keys = [_cache_key(cache, query, query_engine, "json") for query in queries]
+    open_connection = _connection_opener(query_engine)
+
+    dumps = current_app.json.dumps
+
+    def line(index: int, **result: Any) -> str:
+        result = {
+            "index": index,
+            "status": "success" if not result.get("error") else "error",
+            "column_names": [],
+            "rows": [],
+            "error": None,
+            **result,
+            "runtime": default_timer() - time_start,
+            "batch_id": batch_id,
+        }
+        return dumps(result) + "\n"
+
+    def generate() -> Iterator[str]:
+        pending: list[int] = []
+        for index, cache_key in enumerate(cache_keys):
+            cached = cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                column_names, rows = cached
+                yield line(index, column_names=column_names, rows=rows, cached=True)
+            else:
+                pending.append(index)
+        if not pending:
+            return
+        pending_queries = [queries[i] for i in pending]
+
+        def run(unit_index: int, unit: BatchUnit, con: DuckDBPyConnection) -> list[str]:
+            query_id = f"{batch_id}:{unit_index}"
+            try:
+                with registry.track(query_id, con, timeout, is_disconnected):
+                    results = _run_batch_unit(con, unit, pending_queries)
+            except Exception as e:
+                results = {member: ([], [], str(e)) for member, _ in unit.members}
+            lines = []
+            for member, (column_names, rows, error) in results.items():
+                index = pending[member]
+                cache_key = cache_keys[index]
+                lines.append(
+                    line(
+                        index,
+                        column_names=column_names,
+                        rows=rows,
+                        error=error,
+                        cached=False,
+                        combined=len(unit.members),
+                        query_id=query_id,
+                    )
+                )
+                if cache_key and error is None:
+                    cache.put(cache_key, (column_names, rows), len(lines[-1]))
+            return lines
+
+        with open_connection() as con:
+            try:
+                units = plan_batch(con, pending_queries, combine=combine)
+            except Exception as e:
+                logger.warning(f"Failed to plan query batch, running queries one by one: {e}")
+                units = [BatchUnit(query, [(n, None)]) for n, query in enumerate(pending_queries)]
+
+            if parallelism == 1 or len(units) == 1:
+                for unit_index, unit in enumerate(units):
+                    if query_engine == "lance":
+                        yield from run(unit_index, unit, con)
+                        continue
+                    # A cursor per unit, so that an interrupt can only reach its own statements
+                    with closing(con.cursor()) as cursor:
+                        yield from run(unit_index, unit, cursor)
+                return
+
+            def run_in_worker(unit_index: int, unit: BatchUnit) -> list[str]:
+                if query_engine == "lance":
+                    # Tables registered on a connection are not visible from its cursors
+                    with open_connection() as worker_con:
+                        return run(unit_index, unit, worker_con)
+                with closing(con.cursor()) as cursor:
+                    return run(unit_index, unit, cursor)
+
+            with ThreadPoolExecutor(
+                max_workers=min(parallelism, len(units)), thread_name_prefix="smoosense-batch"
+            ) as executor:
+                futures = [executor.submit(run_in_worker, i, unit) for i, unit in enumerate(units)]
+                for future in as_completed(futures):
+                    yield from future.result()
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers["X-Batch-Id"] = batch_id
+    return response
+
+
+@query_bp.post("/query/stream")
+@handle_api_errors
+def run_query_stream() -> Response:
+    """
+    Run a query and stream its rows as newline-delimited JSON while they are produced.
+
+    Unlike /api/query, the result is never buffered as a whole: record batches are fetched
+    from DuckDB and written out one by one. The first line carries the column names, each
+    following line a chunk of rows, and the last line the status, the number of rows sent and
+    whether the result was truncated. Results stop at `maxRows` rows or `maxBytes` bytes of
+    JSON, capped by MAX_STREAM_ROWS and MAX_STREAM_BYTES.
+    """
+    time_start = default_timer()
+    if not request.json:
+        raise InvalidInputException("JSON body is required")
+    query = request.json.get("query")
+    if not query:
+        raise InvalidInputException("query is required in JSON body")
+    check_permissions(query)
+
+    query_engine = request.json.get("queryEngine", "duckdb")
+    query_id = str(request.json.get("queryId") or uuid.uuid4())
+    max_rows = _stream_limit("maxRows", MAX_STREAM_ROWS)
+    max_bytes = _stream_limit("maxBytes", MAX_STREAM_BYTES)
+    dumps = current_app.json.dumps
+
+    def generate() -> Iterator[str]:
+        num_rows = 0
+        num_bytes = 0
+        truncated = False
+        error = None
+        try:
+            with (
+                _tracked_connection(query_engine, query_id) as con,
+                closing(con.cursor()) as convert_con,
+            ):
+                reader, types, _ = _display_reader(con, query, query_engine, STREAM_BATCH_ROWS)
+                column_names = reader.schema.names if reader is not None else []
+                line = dumps({"type": "schema", "column_names": column_names}) + "\n"
+                num_bytes += len(line)
+                yield line
+                for batch in reader or []:
+                    if num_rows >= max_rows:
+                        truncated = batch.num_rows > 0
+                        break
+                    # Converted on a cursor of its own, not to interrupt the stream of `con`
+                    rows = table_rows(convert_con, batch.slice(0, max_rows - num_rows), types)
+                    truncated = len(rows) < batch.num_rows
+                    line = _rows_line(dumps, rows)
+                    if num_bytes + len(line) > max_bytes:
+                        rows, line = _fitting_rows_line(dumps, rows, max_bytes - num_bytes)
+                        truncated = True
+                    if rows:
+                        num_rows += len(rows)
+                        num_bytes += len(line)
+                        yield line
+                    if truncated:
+                        break
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Query execution failed: {error}")
+        yield (
+            dumps(
+                {
+                    "type": "end",
+                    "status": "success" if not error else "error",
+                    "error": error,
+                    "num_rows": num_rows,
+                    "truncated": truncated,
+                    "runtime": default_timer() - time_start,
+                    "query_id": query_id,
+                }
+            )
+            + "\n"
+        )
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers["X-Query-Id"] = query_id
+    return response
+
+
+@query_bp.post("/query/cancel")
+@handle_api_errors
+def cancel_query() -> Response:
+    """
+    Interrupt a running query by the queryId it was submitted with.
+
+    Cancelling a query that has not started yet makes it fail as soon as it starts.
+    """
+    if not request.json or not request.json.get("queryId"):
+        raise InvalidInputException("queryId is required in JSON body")
+
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    query_id = str(request.json["queryId"])
+    return jsonify({"query_id": query_id, "was_running": registry.cancel(query_id)})
+
+
+@query_bp.get("/query/cache-stats")
+@handle_api_errors
+def query_cache_stats() -> Response:
+    """Hit/miss counters and size of the query result cache."""
+    cache: QueryResultCache = current_app.config["QUERY_RESULT_CACHE"]
+    return jsonify(cache.stats())
+
+
+@contextmanager
+def _tracked_connection(query_engine: str, query_id: str) -> Iterator[DuckDBPyConnection]:
+    """
+    Connection to run the query of the current request on, registered in the query registry.
+
+    The query is interrupted when cancelled, when its deadline passes or when the client
+    disconnects.
+    """
+    assert request.json is not None
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    timeout = request.json.get("timeout")
+    is_disconnected = socket_disconnect_check(request.environ)
+
+    if query_engine == "lance":
+        # Lance query engine using DuckDB integration
+        table_cache = current_app.config["LANCE_TABLE_CACHE"]
+        with _lance_client().duckdb_connection(table_cache) as con:
+            with registry.track(query_id, con, timeout, is_disconnected):
+                yield con
+    else:
+        # DuckDB query engine (default)
+        with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+            with registry.track(query_id, con, timeout, is_disconnected):
+                yield con
+
+
+def _connection_opener(
+    query_engine: str,
+) -> Callable[[], AbstractContextManager[DuckDBPyConnection]]:
+    """Open connections for the current request, to be used outside of the request context."""
+    assert request.json is not None
+    if query_engine == "lance":
+        lance_client = _lance_client()
+        table_cache = current_app.config["LANCE_TABLE_CACHE"]
+        return lambda: lance_client.duckdb_connection(table_cache)
+    pool = current_app.config["DUCKDB_CONNECTION_POOL"]
+    return lambda: pool.connection()
+
+
+def _lance_client() -> LanceTableClient:
+    """Client of the Lance table of the current request, opened once per request."""
+    assert request.json is not None
+    if "lance_client" not in g:
+        table_path = request.json.get("tablePath")
+        if not table_path:
+            raise InvalidInputException("tablePath is required when using lance query engine")
+        g.lance_client = LanceTableClient.from_table_path(table_path)
+    return g.lance_client  # type: ignore[no-any-return]
+
+
+def _display_reader(
+    con: DuckDBPyConnection,
+    query: str,
+    query_engine: str,
+    rows_per_batch: int = 1_000_000,
+    summarize: bool = True,
+) -> tuple[Optional[pa.RecordBatchReader], Optional[list[DuckDBPyType]], Optional[str]]:
+    """
+    Run a query whose rows are shown to the user.
+
+    Queries of the Lance engine with a simple shape run as native Lance scans.
+
+    Args:
+        summarize: Whether to summarize BLOB columns in SQL, for results serialized to JSON;
+            Arrow clients get the binary values as they are
+
+    Returns:
+        Reader of the result, or None for statements without one, the DuckDB types of its
+        columns when known, and for the Lance engine, how the table was scanned: "native"
+        (with the indices the filter can use) or "duckdb"
+    """
+    lance_scan = None
+    if query_engine == "lance":
+        native = _lance_client().native_relation(con, query, rows_per_batch)
+        if native is not None:
+            relation, indices = native
+            lance_scan = f"native; indices={','.join(indices)}" if indices else "native"
+            if summarize:
+                relation = summarize_blobs(relation)
+            return relation.fetch_arrow_reader(rows_per_batch), relation.types, lance_scan
+        lance_scan = "duckdb"
+    if summarize:
+        return (*execute_for_display(con, query, rows_per_batch), lance_scan)
+    result = con.execute(query)
+    if result.description is None:
+        return None, None, lance_scan
+    return result.fetch_record_batch(rows_per_batch), None, lance_scan
+
+
+def _rows_line(dumps: Callable[[Any], str], rows: list[Any]) -> str:
+    """Line of a chunk of rows in a streamed result."""
+    return dumps({"type": "rows", "rows": rows}) + "\n"
+
+
+def _fitting_rows_line(
+    dumps: Callable[[Any], str], rows: list[Any], max_bytes: int
+) -> tuple[list[Any], str]:
+    """
+    Longest prefix of the rows whose line fits in `max_bytes`, and that line.
+
+    Rows vary in size, so the prefix is found by bisecting on the length of the encoded line.
+    """
+    low, high = 0, len(rows)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(_rows_line(dumps, rows[:middle])) <= max_bytes:
+            low = middle
+        else:
+            high = middle - 1
+    return rows[:low], _rows_line(dumps, rows[:low])
+
+
+def _stream_limit(name: str, cap: int) -> int:
+    """Limit of a streamed query asked for in the request, capped by the server's own."""
+    assert request.json is not None
+    value = request.json.get(name)
+    if value is None:
+        return cap
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidInputException(f"{name} must be a positive integer")
+    return min(value, cap)
+
+
+def _run_batch_unit(
+    con: DuckDBPyConnection, unit: BatchUnit, queries: list[str]
+) -> dict[int, tuple[list[str], list[Any], Optional[str]]]:
+    """
+    Execute a statement of a batch and split its result among the queries it answers.
+
+    When a combined statement fails, its queries are retried one by one, so that a single
+    failing query does not fail the others.
+
+    Returns:
+        (column_names, rows, error) by index of the query
+    """
+    results: dict[int, tuple[list[str], list[Any], Optional[str]]] = {}
+    try:
+        # A relation, unlike a result, tells the DuckDB types of the columns
+        relation = con.sql(unit.sql)
+        column_names = relation.columns if relation is not None else []
+        rows = table_rows(con, relation.arrow(), relation.types) if relation is not None else []
+    except Exception as e:
+        if not unit.is_combined:
+            logger.error(f"Query execution failed: {e}")
+            return {unit.members[0][0]: ([], [], str(e))}
+        logger.warning(f"Combined batch statement failed, running its queries one by one: {e}")
+        for index, _ in unit.members:
+            results.update(
+                _run_batch_unit(con, BatchUnit(queries[index], [(index, None)]), queries)
+            )
+        return results
+
+    if not unit.is_combined:
+        return {unit.members[0][0]: (column_names, rows, None)}
+    start = 0
+    for index, width in unit.members:
+        assert width is not None
+        end = start + width
+        results[index] = (column_names[start:end], [list(row[start:end]) for row in rows], None)
+        start = end
+    return results
+
+
+def _cache_key(
+    cache: QueryResultCache, query: str, query_engine: str, response_format: str
+) -> Optional[str]:
+    """Result cache key of the query in the current request, or None if it must not be cached."""
+    if not cache.enabled:
+        return None
+    assert request.json is not None
+    return query_cache_key(
+        query,
+        query_engine,
+        response_format,
+        table_path=request.json.get("tablePath"),
+        s3_client=current_app.config["S3_CLIENT"],
+    )
+
+
+def _accepts_arrow() -> bool:
+    """Whether the client prefers an Arrow IPC stream over JSON (via the Accept header)."""
+    accept = request.accept_mimetypes
+    return accept[ARROW_STREAM_MIMETYPE] > accept["application/json"]
+
+
+def _run_query_as_arrow(
+    query: str,
+    query_engine: str,
+    query_id: str,
+    compression: Optional[str],
+    time_start: float,
+) -> Response:
+    """
+    Run the query and stream the result as an Arrow IPC stream, one record batch at a time.
+
+    The result never goes through Python objects, and BLOB columns keep their binary values.
+    Errors raised before the first batch are reported as JSON; an error while streaming
+    aborts the response, so that clients do not mistake a truncated result for a whole one.
+    Results are cached as long as they fit in the result cache.
+    """
+    cache: QueryResultCache = current_app.config["QUERY_RESULT_CACHE"]
+    cache_key = _cache_key(cache, query, query_engine, "arrow")
+    cached: Optional[pa.Table] = cache.get(cache_key) if cache_key else None
+    lance_scan = None
+
+    def generate() -> Iterator[bytes]:
+        nonlocal lance_scan
+        if cached is not None:
+            yield b""
+            yield from stream_arrow_ipc(
+                cached.schema, cached.to_batches(ARROW_BATCH_ROWS), compression
+            )
+            return
+        with _tracked_connection(query_engine, query_id) as con:
+            reader, _, lance_scan = _display_reader(
+                con, query, query_engine, ARROW_BATCH_ROWS, summarize=False
+            )
+            schema = reader.schema if reader is not None else pa.schema([])
+            batches: list[pa.RecordBatch] = []
+            cached_bytes = 0
+
+            def read_batches() -> Iterator[pa.RecordBatch]:
+                nonlocal cached_bytes
+                for batch in reader or []:
+                    if cache_key and cached_bytes <= cache.max_bytes:
+                        cached_bytes += batch.nbytes
+                        if cached_bytes <= cache.max_bytes:
+                            batches.append(batch)
+                        else:
+                            batches.clear()
+                    yield batch
+
+            # The query has run; what follows is the result
+            yield b""
+            try:
+                yield from stream_arrow_ipc(schema, read_batches(), compression)
+            except Exception as e:
+                logger.error(f"Query failed while streaming its result: {e}")
+                raise
+        if cache_key and cached_bytes <= cache.max_bytes:
+            cache.put(cache_key, pa.Table.from_batches(batches, schema), cached_bytes)
+
+    chunks = generate()
+    try:
+        next(chunks)
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Query execution failed: {error}")
+        response = jsonify(
+            {
+                "status": "error",
+                "column_names": [],
+                "rows": [],
+                "runtime": default_timer() - time_start,
+                "error": error,
+                "query_id": query_id,
+            }
+        )
+        response.headers["X-Query-Id"] = query_id
+        return response
+
+    response = Response(stream_with_context(chunks), mimetype=ARROW_STREAM_MIMETYPE)
+    response.headers["X-Query-Runtime"] = str(default_timer() - time_start)
+    response.headers["X-Query-Id"] = query_id
+    if cache_key:
+        response.headers["X-Query-Cache"] = "hit" if cached is not None else "miss"
+    if lance_scan:
+        response.headers["X-Lance-Scan"] = lance_scan
+    return response
@@ -0,0 +1,347 @@
+import json
+import logging
+import random
+import uuid
+from timeit import default_timer
+from typing import Any, Optional
+
+import pyarrow as pa
+from duckdb import DuckDBPyConnection
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.wrappers import Response
+
+from smoosense.exceptions import InvalidInputException
+from smoosense.lance.native_query import translate_filter
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.utils.api import handle_api_errors
+from smoosense.utils.blob_summary import summarize_blobs
+from smoosense.utils.column_stats import quote_identifier, quote_literal
+from smoosense.utils.duckdb_connections import check_condition
+from smoosense.utils.query_cache import file_fingerprints
+from smoosense.utils.query_registry import QueryRegistry, socket_disconnect_check
+from smoosense.utils.row_cursor import (
+    LanceRowSource,
+    ParquetRowSource,
+    RowCursor,
+    RowCursorStore,
+)
+from smoosense.utils.row_sampler import RowSample, sample_rows
+from smoosense.utils.serialization import table_rows
+from smoosense.utils.signed_urls import SignedUrlCache, object_urls
+
+logger = logging.getLogger(__name__)
+rows_bp = Blueprint("rows", __name__)
+
+# Object store URLs signed inline by one response at most; the rest go through /api/s3-proxy
+MAX_SIGNED_URLS = 5000
+
+
+@rows_bp.post("/rows/page")
+@handle_api_errors
+def rows_page() -> Response:
+    """
+    Get a page of the rows of a table, optionally filtered and sorted.
+
+    Pages of Parquet and Lance tables are read through a server-side cursor instead of
+    LIMIT/OFFSET, so deep pages cost about the same as the first one. The response carries the
+    cursor_id to send back with the next page of the same view; a cursor built for another
+    filter, sorting or version of the table is replaced. Other tables, Parquet files that
+    cannot be fingerprinted and views whose cursor is too large to be kept fall back to
+    LIMIT/OFFSET.
+
+    With signUrls, the response also carries presigned URLs of the S3 URLs in the rows, see
+    _signed_urls.
+    """
+    time_start = default_timer()
+    table_path, query_engine, condition = _table_args()
+    assert request.json is not None
+    order_by = _order_by(request.json.get("sorting") or [])
+    page_size = _positive_int("pageSize", 100)
+    page_number = _positive_int("pageNumber", 1)
+    offset = (page_number - 1) * page_size
+
+    store: RowCursorStore = current_app.config["ROW_CURSOR_STORE"]
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    query_id = str(request.json.get("queryId") or uuid.uuid4())
+    timeout = request.json.get("timeout")
+    is_disconnected = socket_disconnect_check(request.environ)
+    cursor_id = request.json.get("cursorId")
+    cursor: Optional[RowCursor] = None
+    reused = False
+    kept = False
+
+    with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+        with registry.track(query_id, con, timeout, is_disconnected):
+            if query_engine == "lance":
+                lance_client = _lance_client(table_path)
+                lance_dataset, schema = lance_client.get_compatible_dataset()
+                view_key = _view_key(
+                    query_engine, table_path, condition, order_by, lance_dataset.version
+                )
+                cursor = store.get(cursor_id, view_key)
+                reused = kept = cursor is not None
+                if cursor is None and not store.is_oversized(view_key):
+                    lance_source = LanceRowSource(lance_dataset, schema)
+                    positions = None
+                    if condition or order_by:
+                        positions = _lance_positions(
+                            lance_client, lance_source, condition, order_by, query_id, timeout
+                        )
+                    cursor = RowCursor(view_key, lance_source, positions)
+                    kept = store.put(cursor)
+                if cursor is None:
+                    cache = current_app.config["LANCE_TABLE_CACHE"]
+                    with lance_client.duckdb_connection(cache) as lance_con:
+                        with registry.track(f"{query_id}:offset", lance_con, timeout):
+                            column_names, rows = _offset_page(
+                                lance_con, "lance_table", condition, order_by, page_size, offset
+                            )
+            elif _is_parquet(table_path):
+                fingerprint = file_fingerprints(
+                    quote_literal(table_path), current_app.config["S3_CLIENT"]
+                )
+                # Without a fingerprint, a change of the files could not be told apart
+                if fingerprint is not None:
+                    view_key = _view_key(query_engine, table_path, condition, order_by, fingerprint)
+                    cursor = store.get(cursor_id, view_key)
+                    reused = kept = cursor is not None
+                    if cursor is None and not store.is_oversized(view_key):
+                        parquet_source = ParquetRowSource(con, table_path)
+                        positions = None
+                        if condition or order_by:
+                            positions = parquet_source.positions(con, condition, order_by)
+                        cursor = RowCursor(view_key, parquet_source, positions)
+                        kept = store.put(cursor)
+
+            if cursor is not None:
+                column_names, rows = cursor.fetch_page(con, offset, page_size)
+            elif query_engine != "lance":
+                # Tables that cannot be read by position, e.g. CSV files, and views too large
+                # to keep a cursor of
+                column_names, rows = _offset_page(
+                    con, quote_literal(table_path), condition, order_by, page_size, offset
+                )
+
+    return jsonify(
+        {
+            "status": "success",
+            "column_names": column_names,
+            "rows": rows,
+            "error": None,
+            "cursor_id": cursor.cursor_id if cursor is not None and kept else None,
+            "cursor_reused": reused,
+            "strategy": cursor.strategy if cursor is not None else "offset",
+            "num_rows": cursor.num_rows if cursor is not None else None,
+            "page_number": page_number,
+            "page_size": page_size,
+            "query_id": query_id,
+            **_signed_urls(rows),
+            "runtime": default_timer() - time_start,
+        }
+    )
+
+
+@rows_bp.post("/rows/sample")
+@handle_api_errors
+def rows_sample() -> Response:
+    """
+    Get a random sample of the rows of a table, optionally filtered.
+
+    Parquet and Lance tables are sampled from random row groups or fragments instead of
+    sorting the whole table by random(). The response carries the seed of the sample; sending
+    it back returns the same rows as long as the table does not change. Other tables use
+    DuckDB's reservoir sample. signUrls works as for /rows/page.
+    """
+    time_start = default_timer()
+    table_path, query_engine, condition = _table_args()
+    assert request.json is not None
+    size = _positive_int("size", 100)
+    seed = request.json.get("seed")
+    if seed is None:
+        seed = random.randrange(2**31)
+    if not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+        raise InvalidInputException("seed must be a non-negative integer")
+
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    query_id = str(request.json.get("queryId") or uuid.uuid4())
+    timeout = request.json.get("timeout")
+    is_disconnected = socket_disconnect_check(request.environ)
+    sample: Optional[RowSample] = None
+
+    with current_app.config["DUCKDB_CONNECTION_POOL"].connection() as con:
+        with registry.track(query_id, con, timeout, is_disconnected):
+            if query_engine == "lance":
+                lance_source = LanceRowSource(*_lance_client(table_path).get_compatible_dataset())
+                sample = sample_rows(con, lance_source, size, seed, condition)
+            elif _is_parquet(table_path):
+                sample = sample_rows(con, ParquetRowSource(con, table_path), size, seed, condition)
+
+            if sample is not None:
+                column_names, rows = sample.column_names, sample.rows
+            else:
+                where = f" WHERE {condition}" if condition else ""
+                relation = summarize_blobs(
+                    con.sql(
+                        f"SELECT * FROM (SELECT * FROM {quote_literal(table_path)}{where}) "
+                        f"USING SAMPLE reservoir({size} ROWS) REPEATABLE ({seed})"
+                    )
+                )
+                column_names = relation.columns
+                rows = table_rows(con, relation.arrow(), relation.types)
+
+    return jsonify(
+        {
+            "status": "success",
+            "column_names": column_names,
+            "rows": rows,
+            "error": None,
+            "seed": seed,
+            "strategy": "blocks" if sample is not None else "reservoir",
+            "attempts": sample.attempts if sample is not None else None,
+            "candidates": sample.candidates if sample is not None else None,
+            "exhaustive": sample.exhaustive if sample is not None else None,
+            "query_id": query_id,
+            **_signed_urls(rows),
+            "runtime": default_timer() - time_start,
+        }
+    )
+
+
+@rows_bp.get("/rows/cursor-stats")
+@handle_api_errors
+def row_cursor_stats() -> Response:
+    """Hit/miss counters and size of the row cursors."""
+    store: RowCursorStore = current_app.config["ROW_CURSOR_STORE"]
+    return jsonify(store.stats())
+
+
+def _table_args() -> tuple[str, str, Optional[str]]:
+    """Table path, query engine and filter condition of the request."""
+    if not request.json:
+        raise InvalidInputException("JSON body is required")
+    table_path = request.json.get("tablePath")
+    if not table_path:
+        raise InvalidInputException("tablePath is required")
+    query_engine = request.json.get("queryEngine", "duckdb")
+    if query_engine not in ("duckdb", "lance"):
+        raise InvalidInputException(f"Unsupported query engine: {query_engine}")
+    condition = request.json.get("condition") or None
+    if condition is not None:
+        check_condition(condition)
+    return table_path, query_engine, condition
+
+
+def _signed_urls(rows: list[Any]) -> dict[str, Any]:
+    """
+    Presigned URLs of the S3 URLs in the rows, when the request asks for them with signUrls.
+
+    Media cells then load straight from S3 instead of each going through a redirect of
+    /api/s3-proxy. signed_urls maps the URLs to their signed URLs, which stay valid at least
+    until signed_urls_expire_at, in seconds since the epoch.
+    """
+    assert request.json is not None
+    if not request.json.get("signUrls"):
+        return {}
+    signed_url_cache: SignedUrlCache = current_app.config["SIGNED_URL_CACHE"]
+    signed = signed_url_cache.sign_many(object_urls(rows, MAX_SIGNED_URLS))
+    # URLs that could not be signed are left out and keep going through /api/s3-proxy
+    signed = {url: entry for url, entry in signed.items() if entry[0] != url}
+    expire_at = min((expires_at for _, expires_at in signed.values()), default=None)
+    return {
+        "signed_urls": {url: signed_url for url, (signed_url, _) in signed.items()},
+        "signed_urls_expire_at": (
+            expire_at - signed_url_cache.min_remaining if expire_at is not None else None
+        ),
+    }
+
+
+def _is_parquet(table_path: str) -> bool:
+    return table_path.lower().endswith(".parquet")
+
+
+def _lance_client(table_path: str) -> LanceTableClient:
+    try:
+        return LanceTableClient.from_table_path(table_path)
+    except ValueError as e:
+        raise InvalidInputException(str(e)) from e
+
+
+def _lance_positions(
+    lance_client: LanceTableClient,
+    source: LanceRowSource,
+    condition: Optional[str],
+    order_by: list[str],
+    query_id: str,
+    timeout: Optional[float],
+) -> pa.Array:
+    """
+    Positions of the matching rows of a Lance table.
+
+    Unsorted views with a filter Lance can evaluate are found by a native Lance scan, which
+    uses the scalar indices of the table. Others are computed by DuckDB, reading the table
+    through the table cache.
+    """
+    registry: QueryRegistry = current_app.config["QUERY_REGISTRY"]
+    with lance_client.duckdb_connection(current_app.config["LANCE_TABLE_CACHE"]) as lance_con:
+        if condition and not order_by:
+            translated = translate_filter(lance_con, condition, source.schema)
+            if translated is not None:
+                try:
+                    positions = source.filter_positions(translated[0])
+                    if positions is not None:
+                        return positions
+                except Exception as e:
+                    logger.debug(f"Lance cannot evaluate filter {translated[0]}: {e}")
+        with registry.track(f"{query_id}:positions", lance_con, timeout):
+            return source.positions(lance_con, condition, order_by)
+
+
+def _offset_page(
+    con: DuckDBPyConnection,
+    relation: str,
+    condition: Optional[str],
+    order_by: list[str],
+    page_size: int,
+    offset: int,
+) -> tuple[list[str], list[Any]]:
+    """Column names and rows of a page of a view, read with LIMIT/OFFSET."""
+    where = f" WHERE {condition}" if condition else ""
+    order = f" ORDER BY {', '.join(order_by)}" if order_by else ""
+    page = summarize_blobs(
+        con.sql(f"SELECT * FROM {relation}{where}{order} LIMIT {page_size} OFFSET {offset}")
+    )
+    return page.columns, table_rows(con, page.arrow(), page.types)
+
+
+def _order_by(sorting: Any) -> list[str]:
+    """ORDER BY expressions of the sorting of the GUI, e.g. [{"field": "a", "direction": "desc"}]."""
+    if not isinstance(sorting, list):
+        raise InvalidInputException("sorting must be a list")
+    order_by = []
+    for sort in sorting:
+        field = sort.get("field") if isinstance(sort, dict) else None
+        direction = str(sort.get("direction", "asc")).upper() if isinstance(sort, dict) else ""
+        if not isinstance(field, str) or not field.strip() or direction not in ("ASC", "DESC"):
+            raise InvalidInputException(f"Invalid sorting: {sort}")
+        # Dotted fields are struct members, as in the GUI
+        column = ".".join(quote_identifier(part) for part in field.strip().split("."))
+        order_by.append(f"{column} {direction}")
+    return order_by
+
+
+def _positive_int(name: str, default: int) -> int:
+    assert request.json is not None
+    value = request.json.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidInputException(f"{name} must be a positive integer")
+    return value
+
+
+def _view_key(
+    query_engine: str,
+    table_path: str,
+    condition: Optional[str],
+    order_by: list[str],
+    version: Any,
+) -> str:
+    return json.dumps([query_engine, table_path, condition, order_by, version], default=str)
@@ -4,8 +4,9 @@ from typing import Optional
 from flask import Blueprint, Response, current_app, jsonify, redirect, request
 from werkzeug.wrappers import Response as WerkzeugResponse
 
+from smoosense.exceptions import InvalidInputException
 from smoosense.utils.api import handle_api_errors
-from smoosense.utils.s3_fs import S3FileSystem
+from smoosense.utils.signed_urls import SignedUrlCache
 
 logger = logging.getLogger(__name__)
 s3_bp = Blueprint("s3", __name__)
@@ -18,12 +19,15 @@ def proxy() -> WerkzeugResponse:
     if not url:
         raise ValueError("url parameter is required")
 
-    # Get s3_client from app config
-    s3_client = current_app.config["S3_CLIENT"]
-
-    signed_url = S3FileSystem(s3_client).sign_get_url(url)
+    signed_urls: SignedUrlCache = current_app.config["SIGNED_URL_CACHE"]
+    signed_url, expires_at = signed_urls.sign(url)
     response = redirect(signed_url)
 
+    # Browsers follow the cached redirect while the signed URL is still valid for long enough
+    max_age = signed_urls.max_age(expires_at)
+    if max_age is not None:
+        response.headers["Cache-Control"] = f"private, max-age={max_age}"
+
     # Add CORS headers to allow cross-origin access from iframe
     response.headers["Access-Control-Allow-Origin"] = "*"
     response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
@@ -35,10 +39,18 @@ def proxy() -> WerkzeugResponse:
 @s3_bp.post("/s3-proxy")
 @handle_api_errors
 def batch_proxy() -> Response:
-    urls: list[str] = request.json.get("urls") if request.json else []
+    urls = request.json.get("urls") if request.json else []
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise InvalidInputException("urls must be a list of strings")
+
+    signed_urls: SignedUrlCache = current_app.config["SIGNED_URL_CACHE"]
+    signed = signed_urls.sign_many(urls)
+    return jsonify([signed[url][0] for url in urls])
 
-    # Get s3_client from app config
-    s3_client = current_app.config["S3_CLIENT"]
-    s3_fs = S3FileSystem(s3_client)
-    signed = [s3_fs.sign_get_url(url) for url in urls]
-    return jsonify(signed)
+
+@s3_bp.get("/s3-proxy/stats")
+@handle_api_errors
+def signed_url_stats() -> Response:
+    """Hit/miss counters and size of the signed URL cache."""
+    signed_urls: SignedUrlCache = current_app.config["SIGNED_URL_CACHE"]
+    return jsonify(signed_urls.stats())
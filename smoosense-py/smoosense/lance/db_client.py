@@ -1,12 +1,64 @@
 import logging
 import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional
 
-from pydantic import validate_call
+from pydantic import ConfigDict, validate_call
 
 from smoosense.lance.models import TableInfo
+from smoosense.utils.query_cache import lance_table_fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Most tables opened at once when listing a database
+MAX_LIST_TABLES_PARALLELISM = 16
+
+
+class TableInfoCache:
+    """
+    Infos of Lance tables, valid as long as the version manifests of the table are unchanged.
+
+    Every commit to a table writes a new manifest, so a cached info is returned only for the
+    version it was computed on. Least recently used infos are evicted first.
+
+    Args:
+        max_entries: Maximum number of cached table infos
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[list[Any], TableInfo]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, table_path: str, fingerprint: Optional[list[Any]]) -> Optional[TableInfo]:
+        """Info of the table computed at this fingerprint, or None."""
+        with self._lock:
+            entry = self._entries.get(table_path)
+            if entry is None or fingerprint is None or entry[0] != fingerprint:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(table_path)
+            return entry[1]
+
+    def put(self, table_path: str, fingerprint: Optional[list[Any]], info: TableInfo) -> None:
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._entries[table_path] = (fingerprint, info)
+            self._entries.move_to_end(table_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
 
 class LanceDBClient:
     """Client for interacting with a Lance database."""
@@ -33,43 +85,94 @@ class LanceDBClient:
         self.db = lancedb.connect(root_folder)
         logger.info(f"Connected to Lance database at {root_folder}")
 
-    @validate_call
-    def list_tables(self) -> list[TableInfo]:
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def list_tables(
+        self,
+        cache: Optional[TableInfoCache] = None,
+        parallelism: int = MAX_LIST_TABLES_PARALLELISM,
+    ) -> list[TableInfo]:
         """
         List all tables in the database.
 
+        Args:
+            cache: Cache of table infos, reused while the tables are unchanged
+            parallelism: Most tables opened at once
+
         Returns:
-            List of TableInfo models
+            List of TableInfo models, in the order of the table names
         """
-        table_names = self.db.table_names()
+        table_names = self.table_names()
+        infos = {info.name: info for info in self.iter_tables(table_names, cache, parallelism)}
+        return [infos[table_name] for table_name in table_names]
+
+    def table_names(self) -> list[str]:
+        table_names: list[str] = list(self.db.table_names())
         logger.info(f"Found {len(table_names)} tables: {table_names}")
+        return table_names
+
+    def iter_tables(
+        self,
+        table_names: list[str],
+        cache: Optional[TableInfoCache] = None,
+        parallelism: int = MAX_LIST_TABLES_PARALLELISM,
+    ) -> Iterator[TableInfo]:
+        """
+        Infos of the tables as they are computed: cached ones first, then the others in the
+        order they complete, computed across a thread pool.
 
-        tables_info: list[TableInfo] = []
+        Args:
+            table_names: Names of the tables
+            cache: Cache of table infos, reused while the tables are unchanged
+            parallelism: Most tables opened at once
+        """
+        pending: list[tuple[str, Optional[list[Any]]]] = []
         for table_name in table_names:
-            try:
-                table = self.db.open_table(table_name)
-                cnt_versions = len(table.list_versions())
-                cnt_indices = len(table.list_indices())
-
-                tables_info.append(
-                    TableInfo(
-                        name=table_name,
-                        cnt_rows=table.count_rows(),
-                        cnt_columns=len(table.schema),
-                        cnt_versions=cnt_versions,
-                        cnt_indices=cnt_indices,
-                    )
-                )
-            except Exception as e:
-                logger.warning(f"Failed to get info for table {table_name}: {e}")
-                tables_info.append(
-                    TableInfo(
-                        name=table_name,
-                        cnt_rows=None,
-                        cnt_columns=None,
-                        cnt_versions=None,
-                        cnt_indices=None,
-                    )
-                )
-
-        return tables_info
+            table_path = self._table_path(table_name)
+            fingerprint = lance_table_fingerprint(table_path)
+            cached = cache.get(table_path, fingerprint) if cache is not None else None
+            if cached is not None:
+                yield cached
+            else:
+                pending.append((table_name, fingerprint))
+        if not pending:
+            return
+
+        def compute(table_name: str, fingerprint: Optional[list[Any]]) -> TableInfo:
+            info = self._table_info(table_name)
+            if cache is not None and info.cnt_rows is not None:
+                cache.put(self._table_path(table_name), fingerprint, info)
+            return info
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(parallelism, MAX_LIST_TABLES_PARALLELISM, len(pending))),
+            thread_name_prefix="smoosense-lance-tables",
+        ) as executor:
+            futures = [executor.submit(compute, *item) for item in pending]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _table_path(self, table_name: str) -> str:
+        return os.path.abspath(os.path.join(self.root_folder, f"{table_name}.lance"))
+
+    def _table_info(self, table_name: str) -> TableInfo:
+        try:
+            table = self.db.open_table(table_name)
+            cnt_versions = len(table.list_versions())
+            cnt_indices = len(table.list_indices())
+
+            return TableInfo(
+                name=table_name,
+                cnt_rows=table.count_rows(),
+                cnt_columns=len(table.schema),
+                cnt_versions=cnt_versions,
+                cnt_indices=cnt_indices,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to get info for table {table_name}: {e}")
+            return TableInfo(
+                name=table_name,
+                cnt_rows=None,
+                cnt_columns=None,
+                cnt_versions=None,
+                cnt_indices=None,
+            )
@@ -0,0 +1,114 @@
+"""
+Arrow types of Lance columns as DuckDB reads them.
+
+DuckDB reads most Arrow types as they are, including strings, binaries and lists with 64-bit
+offsets and durations. Half floats it cannot read at all, and extension types only when it
+knows the extension. Columns of these types are cast to the nearest type DuckDB reads:
+float16 to float32 (also inside lists and structs, e.g. embeddings) and extension types to
+their storage type. Casts happen batch by batch on the columns a scan reads, so columns a
+query does not reference cost nothing.
+"""
+
+import logging
+from collections.abc import Iterator
+from typing import Union
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+def duckdb_type(data_type: pa.DataType) -> pa.DataType:
+    """Type DuckDB reads values of `data_type` as; `data_type` itself when DuckDB reads it."""
+    if isinstance(data_type, pa.BaseExtensionType):
+        return duckdb_type(data_type.storage_type)
+    if pa.types.is_float16(data_type):
+        return pa.float32()
+    if pa.types.is_fixed_size_list(data_type):
+        return pa.list_(_duckdb_field(data_type.value_field), data_type.list_size)
+    if pa.types.is_large_list(data_type):
+        return pa.large_list(_duckdb_field(data_type.value_field))
+    if pa.types.is_map(data_type):
+        return pa.map_(
+            _duckdb_field(data_type.key_field),
+            _duckdb_field(data_type.item_field),
+            data_type.keys_sorted,
+        )
+    if pa.types.is_list(data_type):
+        return pa.list_(_duckdb_field(data_type.value_field))
+    if pa.types.is_struct(data_type):
+        return pa.struct([_duckdb_field(field) for field in data_type])
+    if pa.types.is_dictionary(data_type):
+        return pa.dictionary(data_type.index_type, duckdb_type(data_type.value_type))
+    return data_type
+
+
+def _duckdb_field(field: pa.Field) -> pa.Field:
+    return field.with_type(duckdb_type(field.type))
+
+
+def duckdb_schema(schema: pa.Schema) -> tuple[pa.Schema, list[str]]:
+    """
+    Schema of the columns of a Lance table as DuckDB reads them.
+
+    Args:
+        schema: Arrow schema of the Lance table
+
+    Returns:
+        Tuple of (compatible_schema, incompatible_column_names), the latter being the columns
+        that cannot be cast to a type DuckDB reads
+    """
+    fields: list[pa.Field] = []
+    incompatible_columns: list[str] = []
+    for field in schema:
+        target = _duckdb_field(field)
+        if target.type != field.type:
+            try:
+                cast_array(pa.nulls(0, field.type), target.type)
+            except (pa.ArrowNotImplementedError, pa.ArrowInvalid) as e:
+                logger.debug(f"Skipping column '{field.name}' with unsupported type: {e}")
+                incompatible_columns.append(field.name)
+                continue
+        fields.append(target)
+    return pa.schema(fields, metadata=schema.metadata), incompatible_columns
+
+
+def cast_array(
+    array: Union[pa.Array, pa.ChunkedArray], data_type: pa.DataType
+) -> Union[pa.Array, pa.ChunkedArray]:
+    """Cast values to `data_type`, unwrapping extension arrays to their storage first."""
+    if array.type == data_type:
+        return array
+    if isinstance(array.type, pa.BaseExtensionType):
+        if isinstance(array, pa.ChunkedArray):
+            array = pa.chunked_array(
+                [chunk.storage for chunk in array.chunks], array.type.storage_type
+            )
+        else:
+            array = array.storage
+    return array if array.type == data_type else array.cast(data_type)
+
+
+def cast_table(table: pa.Table) -> pa.Table:
+    """Table with its columns cast to the types DuckDB reads; unchanged columns are not copied."""
+    schema = pa.schema([_duckdb_field(field) for field in table.schema], table.schema.metadata)
+    if schema.equals(table.schema):
+        return table
+    columns = [cast_array(column, field.type) for column, field in zip(table.columns, schema)]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def cast_reader(reader: pa.RecordBatchReader) -> pa.RecordBatchReader:
+    """Reader of batches with their columns cast to the types DuckDB reads, as they are read."""
+    schema = pa.schema([_duckdb_field(field) for field in reader.schema], reader.schema.metadata)
+    if schema.equals(reader.schema):
+        return reader
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        for batch in reader:
+            columns = [
+                cast_array(column, field.type) for column, field in zip(batch.columns, schema)
+            ]
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
@@ -0,0 +1,60 @@
+import logging
+from typing import Any, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from smoosense.lance.duckdb_types import cast_reader
+
+logger = logging.getLogger(__name__)
+
+
+class LazyLanceDataset(ds.Dataset):
+    """
+    Arrow dataset view of a Lance dataset that DuckDB can scan lazily.
+
+    Registering this with DuckDB streams record batches from Lance instead of materializing
+    the table. DuckDB pushes its projection and filters into `scanner()`, which forwards them
+    to the Lance scanner, so only the needed columns (and, when Lance supports the filter,
+    only the matching rows) are read. Memory use is bounded by the batches in flight.
+
+    Args:
+        lance_dataset: lance.LanceDataset to scan
+        schema: Schema exposed to DuckDB; a subset of the Lance dataset's columns, with the
+            types of duckdb_types.duckdb_schema
+    """
+
+    def __init__(self, lance_dataset: Any, schema: pa.Schema):
+        self._lance_dataset = lance_dataset
+        self._schema = schema
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self._schema
+
+    def scanner(
+        self,
+        columns: Optional[list[str]] = None,
+        filter: Optional[Any] = None,
+        batch_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> ds.Scanner:
+        """
+        Scan the requested columns of rows matching `filter`.
+
+        Filters that Lance cannot translate (e.g. on unsigned integers) are evaluated by
+        pyarrow on the projected batches instead. DuckDB includes the columns its filters
+        reference in `columns`. Only the read columns are cast to the types DuckDB reads.
+        """
+        columns = list(columns) if columns is not None else self._schema.names
+        if filter is not None:
+            try:
+                reader = self._lance_dataset.scanner(
+                    columns=columns, filter=filter, batch_size=batch_size
+                ).to_reader()
+                return ds.Scanner.from_batches(cast_reader(reader))
+            except Exception as e:
+                logger.debug(f"Lance cannot push down filter {filter}, filtering in Arrow: {e}")
+
+        reader = self._lance_dataset.scanner(columns=columns, batch_size=batch_size).to_reader()
+        return ds.Scanner.from_batches(cast_reader(reader), filter=filter)
@@ -0,0 +1,475 @@
+"""
+Native Lance scans answering the common shapes of queries on 'lance_table'.
+
+Most queries of the GUI count the rows matching a filter or read columns of the rows matching
+a filter, possibly sorted and paged. Such queries are parsed with DuckDB's own parser
+(json_serialize_sql) and, when every part of them has an equivalent in Lance, run as a Lance
+scan: the filter is evaluated by Lance, with the scalar indices of its columns, only the
+selected columns are read, and LIMIT/OFFSET stop the scan early. Everything else is left to
+DuckDB.
+
+Filters are translated for a known subset of expressions only: comparisons, BETWEEN, IN, LIKE,
+IS [NOT] NULL, AND/OR/NOT of top-level columns of numeric, string and boolean types against
+constants of the same kind.
+"""
+
+import decimal
+import json
+import logging
+import math
+import re
+from collections.abc import Iterator
+from typing import Any, Optional
+
+import pyarrow as pa
+from duckdb import DuckDBPyConnection
+
+from smoosense.lance.duckdb_types import cast_reader
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "lance_table"
+
+# Name DuckDB gives to an unaliased COUNT(*)
+COUNT_STAR_NAME = "count_star()"
+
+# Index types Lance uses to evaluate filters
+SCALAR_INDEX_TYPES = {"btree", "bitmap", "labellist", "label_list", "ngram", "zonemap"}
+
+COMPARISON_OPERATORS = {
+    "COMPARE_EQUAL": "=",
+    "COMPARE_NOTEQUAL": "<>",
+    "COMPARE_LESSTHAN": "<",
+    "COMPARE_GREATERTHAN": ">",
+    "COMPARE_LESSTHANOREQUALTO": "<=",
+    "COMPARE_GREATERTHANOREQUALTO": ">=",
+}
+# Operators of the comparison with the sides swapped
+SWAPPED_OPERATORS = {"=": "=", "<>": "<>", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+INTEGER_CONSTANT_TYPES = {"TINYINT", "SMALLINT", "INTEGER", "BIGINT", "UTINYINT", "USMALLINT"}
+INTEGER_CONSTANT_TYPES |= {"UINTEGER", "UBIGINT"}
+FLOAT_CONSTANT_TYPES = {"FLOAT", "DOUBLE"}
+
+# Column names Lance filters can quote with backticks
+QUOTABLE_NAME_PATTERN = re.compile(r"^[^`]+$")
+
+
+class NativeScan:
+    """
+    Lance scan answering a query on 'lance_table'.
+
+    Args:
+        output: Name and source column of each result column; empty when counting rows
+        lance_filter: Filter of the rows in Lance's SQL dialect, or None for all rows
+        filter_columns: Columns referenced by the filter
+        count_name: Name of the result column when the query is a COUNT(*)
+        order_by: Column, ascending and nulls first of each sort key
+        limit: Most rows to return, or None
+        offset: Rows to skip, or None
+    """
+
+    def __init__(
+        self,
+        output: list[tuple[str, str]],
+        lance_filter: Optional[str],
+        filter_columns: set[str],
+        count_name: Optional[str] = None,
+        order_by: Optional[list[tuple[str, bool, bool]]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ):
+        self.output = output
+        self.lance_filter = lance_filter
+        self.filter_columns = filter_columns
+        self.count_name = count_name
+        self.order_by = order_by or []
+        self.limit = limit
+        self.offset = offset
+
+    def indices(self, lance_dataset: Any) -> list[str]:
+        """Names of the scalar indices Lance can use to evaluate the filter."""
+        if not self.filter_columns:
+            return []
+        try:
+            indices = lance_dataset.list_indices()
+        except Exception as e:
+            logger.debug(f"Failed to list indices: {e}")
+            return []
+        return [
+            index["name"]
+            for index in indices
+            if str(index.get("type", "")).lower() in SCALAR_INDEX_TYPES
+            and set(index.get("fields", [])) & self.filter_columns
+        ]
+
+    def reader(self, lance_dataset: Any, batch_size: int) -> pa.RecordBatchReader:
+        """
+        Run the scan on a Lance dataset.
+
+        Raises:
+            Exception: When Lance rejects the scan, e.g. a filter it cannot evaluate
+        """
+        if self.count_name is not None:
+            num_rows = int(lance_dataset.count_rows(filter=self.lance_filter))
+            table = pa.table({self.count_name: pa.array([num_rows], pa.int64())})
+            return pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+
+        from lance.dataset import ColumnOrdering
+
+        order_by = [
+            ColumnOrdering(column, ascending, nulls_first)
+            for column, ascending, nulls_first in self.order_by
+        ]
+        reader = lance_dataset.scanner(
+            columns=list(dict.fromkeys(source for _, source in self.output)),
+            filter=self.lance_filter,
+            limit=self.limit,
+            offset=self.offset,
+            order_by=order_by or None,
+            batch_size=batch_size,
+            use_scalar_index=True,
+        ).to_reader()
+        reader = cast_reader(reader)
+        schema = pa.schema(
+            [reader.schema.field(source).with_name(name) for name, source in self.output]
+        )
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            for batch in reader:
+                yield pa.RecordBatch.from_arrays(
+                    [batch.column(source) for _, source in self.output], schema=schema
+                )
+
+        return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def plan_native_scan(
+    con: DuckDBPyConnection, query: str, schema: pa.Schema
+) -> Optional[NativeScan]:
+    """
+    Lance scan answering a query on 'lance_table', or None when the query needs DuckDB.
+
+    Args:
+        con: DuckDB connection used to parse the query
+        query: SQL query
+        schema: Columns of the table visible to DuckDB
+    """
+    node = _parse_select(con, query)
+    if node is None:
+        return None
+
+    lance_filter: Optional[str] = None
+    filter_columns: set[str] = set()
+    if node.get("where_clause") is not None:
+        lance_filter = _filter(node["where_clause"], schema, filter_columns)
+        if lance_filter is None:
+            return None
+
+    select_list = node["select_list"]
+    if len(select_list) == 1 and _is_count_star(select_list[0]):
+        if node.get("modifiers"):
+            return None
+        count_name = select_list[0].get("alias") or COUNT_STAR_NAME
+        return NativeScan([], lance_filter, filter_columns, count_name=count_name)
+
+    output: list[tuple[str, str]] = []
+    for expr in select_list:
+        if expr.get("class") == "STAR":
+            if not _is_plain_star(expr):
+                return None
+            output += [(name, name) for name in schema.names]
+            continue
+        column = _column_name(expr, schema)
+        if column is None:
+            return None
+        output.append((expr.get("alias") or column, column))
+    names = [name for name, _ in output]
+    if len(set(names)) < len(names):
+        return None
+
+    order_by: list[tuple[str, bool, bool]] = []
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    for modifier in node.get("modifiers", []):
+        if modifier.get("type") == "ORDER_MODIFIER":
+            for order in modifier.get("orders", []):
+                column = _column_name(order.get("expression"), schema)
+                if column is None or dict(output).get(column, column) != column:
+                    # Not a column, or an alias of another column
+                    return None
+                if order.get("type") not in ("ORDER_DEFAULT", "ASCENDING", "DESCENDING"):
+                    return None
+                if order.get("null_order") not in ("ORDER_DEFAULT", "NULLS_FIRST", "NULLS_LAST"):
+                    return None
+                # DuckDB sorts NULLs last by default, in either direction
+                order_by.append(
+                    (column, order["type"] != "DESCENDING", order["null_order"] == "NULLS_FIRST")
+                )
+        elif modifier.get("type") == "LIMIT_MODIFIER":
+            limit = _integer_constant(modifier.get("limit"))
+            offset = _integer_constant(modifier.get("offset"))
+            if (modifier.get("limit") is not None and limit is None) or (
+                modifier.get("offset") is not None and offset is None
+            ):
+                return None
+        else:
+            return None
+    return NativeScan(output, lance_filter, filter_columns, None, order_by, limit, offset)
+
+
+def translate_filter(
+    con: DuckDBPyConnection, condition: str, schema: pa.Schema
+) -> Optional[tuple[str, set[str]]]:
+    """
+    Translate a SQL condition to a Lance filter.
+
+    Returns:
+        Lance filter and the columns it references, or None when the condition is not
+        translatable
+    """
+    node = _parse_select(con, f"SELECT * FROM {TABLE_NAME} WHERE {condition}")
+    if node is None or node.get("modifiers") or node.get("where_clause") is None:
+        return None
+    columns: set[str] = set()
+    lance_filter = _filter(node["where_clause"], schema, columns)
+    return (lance_filter, columns) if lance_filter is not None else None
+
+
+def _parse_select(con: DuckDBPyConnection, query: str) -> Optional[dict[str, Any]]:
+    """Parsed SELECT node of a query reading 'lance_table' only, or None."""
+    row = con.execute("SELECT json_serialize_sql(?)", [query]).fetchone()
+    assert row is not None
+    parsed = json.loads(row[0])
+    if parsed.get("error") or len(parsed.get("statements", [])) != 1:
+        return None
+    node = parsed["statements"][0]["node"]
+    from_table = node.get("from_table") or {}
+    if (
+        node.get("type") != "SELECT_NODE"
+        or node.get("cte_map", {}).get("map")
+        or node.get("group_expressions")
+        or node.get("group_sets")
+        or node.get("having") is not None
+        or node.get("qualify") is not None
+        or node.get("sample") is not None
+        or node.get("aggregate_handling") != "STANDARD_HANDLING"
+        or from_table.get("type") != "BASE_TABLE"
+        or from_table.get("table_name", "").lower() != TABLE_NAME
+        or from_table.get("schema_name")
+        or from_table.get("catalog_name")
+        or from_table.get("sample") is not None
+        or from_table.get("at_clause") is not None
+        or from_table.get("column_name_alias")
+    ):
+        return None
+    return node  # type: ignore[no-any-return]
+
+
+def _is_count_star(expr: dict[str, Any]) -> bool:
+    return (
+        expr.get("class") == "FUNCTION"
+        and expr.get("function_name") == "count_star"
+        and not expr.get("children")
+        and expr.get("filter") is None
+        and not expr.get("distinct")
+        and not (expr.get("order_bys") or {}).get("orders")
+    )
+
+
+def _is_plain_star(expr: dict[str, Any]) -> bool:
+    return not (
+        expr.get("relation_name")
+        or expr.get("exclude_list")
+        or expr.get("replace_list")
+        or expr.get("columns")
+        or expr.get("expr") is not None
+        or expr.get("qualified_exclude_list")
+        or expr.get("rename_list")
+    )
+
+
+def _column_name(node: Any, schema: pa.Schema) -> Optional[str]:
+    """Name of a top-level column of the table referenced by an expression, or None."""
+    if not isinstance(node, dict) or node.get("class") != "COLUMN_REF":
+        return None
+    names = node.get("column_names", [])
+    if len(names) == 2 and names[0].lower() == TABLE_NAME:
+        names = names[1:]
+    if len(names) != 1 or names[0] not in schema.names:
+        return None
+    return names[0]  # type: ignore[no-any-return]
+
+
+def _kind(data_type: pa.DataType) -> Optional[str]:
+    """Kind of values of a column type that filters can compare to constants."""
+    if pa.types.is_integer(data_type) or pa.types.is_floating(data_type):
+        return "number"
+    if pa.types.is_string(data_type):
+        return "string"
+    if pa.types.is_boolean(data_type):
+        return "boolean"
+    return None
+
+
+def _quote_column(name: str) -> Optional[str]:
+    return f"`{name}`" if QUOTABLE_NAME_PATTERN.match(name) else None
+
+
+def _column_operand(
+    node: Any, schema: pa.Schema, columns: set[str]
+) -> Optional[tuple[str, Optional[str]]]:
+    """Quoted column and kind of values of an operand that is a column, or None."""
+    if isinstance(node, dict) and node.get("class") == "CAST":
+        # CAST(column AS VARCHAR) on a string column, as in the text filters of the GUI
+        operand = _column_operand(node.get("child"), schema, columns)
+        if operand is None or operand[1] != "string":
+            return None
+        if (node.get("cast_type") or {}).get("id") != "VARCHAR" or node.get("try_cast"):
+            return None
+        return operand
+    name = _column_name(node, schema)
+    if name is None:
+        return None
+    quoted = _quote_column(name)
+    if quoted is None:
+        return None
+    columns.add(name)
+    return quoted, _kind(schema.field(name).type)
+
+
+def _constant_operand(node: Any) -> Optional[tuple[str, str]]:
+    """Constant in Lance's SQL dialect and its kind, or None."""
+    if not isinstance(node, dict):
+        return None
+    if node.get("class") == "CAST":
+        # 'true'::BOOLEAN, as DuckDB parses TRUE in some positions
+        child = _constant_operand(node.get("child"))
+        cast_type = (node.get("cast_type") or {}).get("id")
+        if child is None or child[1] != "string" or cast_type != "BOOLEAN":
+            return None
+        text = child[0][1:-1].lower()
+        if text in ("t", "true"):
+            return "TRUE", "boolean"
+        if text in ("f", "false"):
+            return "FALSE", "boolean"
+        return None
+    if node.get("class") != "CONSTANT":
+        return None
+    value = node.get("value") or {}
+    if value.get("is_null"):
+        return None
+    type_id = (value.get("type") or {}).get("id")
+    raw = value.get("value")
+    if type_id in INTEGER_CONSTANT_TYPES and isinstance(raw, int):
+        return str(raw), "number"
+    if type_id in FLOAT_CONSTANT_TYPES and isinstance(raw, (int, float)) and math.isfinite(raw):
+        return repr(float(raw)), "number"
+    if type_id == "DECIMAL" and isinstance(raw, int):
+        scale = ((value.get("type") or {}).get("type_info") or {}).get("scale", 0)
+        return str(decimal.Decimal(raw).scaleb(-scale)), "number"
+    if type_id == "VARCHAR" and isinstance(raw, str):
+        return "'" + raw.replace("'", "''") + "'", "string"
+    if type_id == "BOOLEAN" and isinstance(raw, bool):
+        return ("TRUE" if raw else "FALSE"), "boolean"
+    return None
+
+
+def _filter(node: Any, schema: pa.Schema, columns: set[str]) -> Optional[str]:
+    """
+    Translate a boolean expression to a Lance filter.
+
+    Args:
+        node: Expression parsed by json_serialize_sql
+        schema: Columns of the table
+        columns: Collects the columns referenced by the filter
+
+    Returns:
+        Filter, or None when the expression is not translatable
+    """
+    if not isinstance(node, dict):
+        return None
+    node_class, node_type = node.get("class"), node.get("type")
+
+    if node_class == "CONJUNCTION" and node_type in ("CONJUNCTION_AND", "CONJUNCTION_OR"):
+        parts = [_filter(child, schema, columns) for child in node.get("children", [])]
+        if not parts or any(part is None for part in parts):
+            return None
+        operator = " AND " if node_type == "CONJUNCTION_AND" else " OR "
+        return "(" + operator.join(part for part in parts if part is not None) + ")"
+
+    if node_class == "OPERATOR":
+        children = node.get("children", [])
+        if node_type == "OPERATOR_NOT" and len(children) == 1:
+            inner = _filter(children[0], schema, columns)
+            return f"(NOT {inner})" if inner is not None else None
+        if node_type in ("OPERATOR_IS_NULL", "OPERATOR_IS_NOT_NULL") and len(children) == 1:
+            operand = _column_operand(children[0], schema, columns)
+            if operand is None:
+                return None
+            suffix = "IS NULL" if node_type == "OPERATOR_IS_NULL" else "IS NOT NULL"
+            return f"({operand[0]} {suffix})"
+        if node_type in ("COMPARE_IN", "COMPARE_NOT_IN") and len(children) >= 2:
+            operand = _column_operand(children[0], schema, columns)
+            constants = [_constant_operand(child) for child in children[1:]]
+            if operand is None or operand[1] is None:
+                return None
+            if any(constant is None or constant[1] != operand[1] for constant in constants):
+                return None
+            values = ", ".join(constant[0] for constant in constants if constant is not None)
+            operator = "IN" if node_type == "COMPARE_IN" else "NOT IN"
+            return f"({operand[0]} {operator} ({values}))"
+        return None
+
+    if node_class == "COMPARISON" and node_type in COMPARISON_OPERATORS:
+        operator = COMPARISON_OPERATORS[node_type]
+        left, right = node.get("left"), node.get("right")
+        if _column_operand(left, schema, set()) is None:
+            left, right, operator = right, left, SWAPPED_OPERATORS[operator]
+        operand = _column_operand(left, schema, columns)
+        if operand is None or operand[1] is None:
+            return None
+        other = _constant_operand(right) or _column_operand(right, schema, columns)
+        if other is None or other[1] != operand[1]:
+            return None
+        return f"({operand[0]} {operator} {other[0]})"
+
+    if node_class == "BETWEEN":
+        operand = _column_operand(node.get("input"), schema, columns)
+        lower, upper = _constant_operand(node.get("lower")), _constant_operand(node.get("upper"))
+        if operand is None or operand[1] is None or lower is None or upper is None:
+            return None
+        if lower[1] != operand[1] or upper[1] != operand[1]:
+            return None
+        return f"({operand[0]} BETWEEN {lower[0]} AND {upper[0]})"
+
+    if node_class == "FUNCTION" and node.get("function_name") in ("~~", "!~~"):
+        children = node.get("children", [])
+        if len(children) != 2:
+            return None
+        operand = _column_operand(children[0], schema, columns)
+        pattern = _constant_operand(children[1])
+        # Lance escapes LIKE patterns with backslashes, DuckDB does not
+        if operand is None or operand[1] != "string" or pattern is None:
+            return None
+        if pattern[1] != "string" or "\\" in pattern[0]:
+            return None
+        operator = "LIKE" if node["function_name"] == "~~" else "NOT LIKE"
+        return f"({operand[0]} {operator} {pattern[0]})"
+
+    if node_class == "COLUMN_REF":
+        operand = _column_operand(node, schema, columns)
+        return operand[0] if operand is not None and operand[1] == "boolean" else None
+
+    constant = _constant_operand(node)
+    return constant[0] if constant is not None and constant[1] == "boolean" else None
+
+
+def _integer_constant(node: Any) -> Optional[int]:
+    if not isinstance(node, dict) or node.get("class") != "CONSTANT":
+        return None
+    value = node.get("value") or {}
+    raw = value.get("value")
+    if value.get("is_null") or (value.get("type") or {}).get("id") not in INTEGER_CONSTANT_TYPES:
+        return None
+    return raw if isinstance(raw, int) and raw >= 0 else None
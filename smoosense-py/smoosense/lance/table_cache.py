@@ -0,0 +1,250 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import pyarrow as pa
+
+from smoosense.lance.duckdb_types import cast_reader
+
+logger = logging.getLogger(__name__)
+
+
+class CachedLanceTable:
+    def __init__(self, table_path: str, version: int, table: pa.Table):
+        self.table_path = table_path
+        self.version = version
+        self.table = table
+        self.nbytes: int = table.nbytes
+        self.loaded_at = time.time()
+        self.last_access = self.loaded_at
+        self.hits = 0
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "table_path": self.table_path,
+            "version": self.version,
+            "nbytes": self.nbytes,
+            "num_rows": self.table.num_rows,
+            "num_columns": self.table.num_columns,
+            "loaded_at": self.loaded_at,
+            "last_access": self.last_access,
+            "hits": self.hits,
+        }
+
+
+class LanceTableCache:
+    """
+    In-memory cache of Lance tables materialized as Arrow, bounded by a byte budget.
+
+    Entries are keyed by table path and Lance version, so a write to the table (which creates
+    a new version) is picked up by the next query and the previous versions are dropped.
+    Tables are read batch by batch and given up on as soon as their Arrow size exceeds the
+    budget, or without reading anything when Lance's on-disk statistics already exceed it or are
+    unavailable; such versions are remembered and callers scan them lazily instead. A single
+    thread loads a given version, the others wait for it and share the result.
+
+    Args:
+        max_bytes: Maximum total Arrow size (nbytes) of cached tables; 0 disables the cache
+    """
+
+    def __init__(self, max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, int], CachedLanceTable] = OrderedDict()
+        self._lock = threading.Lock()
+        # Versions too large to be cached, and locks of the versions being loaded
+        self._too_large: set[tuple[str, int]] = set()
+        self._loading: dict[tuple[str, int], threading.Lock] = {}
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._skipped_too_large = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+
+    def get_or_load(
+        self, table_path: str, lance_dataset: Any, schema: pa.Schema
+    ) -> Optional[pa.Table]:
+        """
+        Get the Arrow table of the dataset's current version, loading it if it fits the budget.
+
+        Args:
+            table_path: Path of the Lance table, used in the cache key
+            lance_dataset: lance.LanceDataset opened at the version to serve
+            schema: Columns to materialize
+
+        Returns:
+            Arrow table, or None if the table is too large to be cached
+        """
+        if self.max_bytes <= 0:
+            return None
+        key = (os.path.abspath(table_path), int(lance_dataset.version))
+        with self._lock:
+            if key in self._too_large:
+                self._skipped_too_large += 1
+                return None
+            table = self._get(key)
+            if table is not None:
+                return table
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            try:
+                # Another thread may have loaded the version while this one waited
+                with self._lock:
+                    if key in self._too_large:
+                        self._skipped_too_large += 1
+                        return None
+                    table = self._get(key)
+                    if table is not None:
+                        return table
+                    self._misses += 1
+                table = self._load(key, lance_dataset, schema)
+                if table is None:
+                    self._mark_too_large(key)
+                    return None
+                self.put(CachedLanceTable(key[0], key[1], table))
+                return table
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is load_lock:
+                        del self._loading[key]
+
+    def put(self, entry: CachedLanceTable) -> None:
+        """Cache a table, dropping other versions of it and evicting least recently used tables."""
+        if entry.nbytes > self.max_bytes:
+            self._mark_too_large((entry.table_path, entry.version))
+            return
+        with self._lock:
+            self._loads += 1
+            for key in [k for k in self._entries if k[0] == entry.table_path]:
+                self._remove(key)
+            self._entries[(entry.table_path, entry.version)] = entry
+            self._total_bytes += entry.nbytes
+            while self._total_bytes > self.max_bytes:
+                key = next(iter(self._entries))
+                self._evicted_bytes += self._remove(key)
+                self._evictions += 1
+
+    def drop(self, table_path: Optional[str] = None, version: Optional[int] = None) -> int:
+        """
+        Drop cached tables matching the table path and version (all of them when omitted).
+
+        Returns:
+            Number of dropped tables
+        """
+        path = os.path.abspath(os.path.expanduser(table_path)) if table_path else None
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if (path is None or key[0] == path) and (version is None or key[1] == version)
+            ]
+            for key in keys:
+                self._remove(key)
+            # Give versions found too large another chance, e.g. after the budget was raised
+            self._too_large = {
+                key
+                for key in self._too_large
+                if not ((path is None or key[0] == path) and (version is None or key[1] == version))
+            }
+            return len(keys)
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Cached tables, least recently used first."""
+        with self._lock:
+            return [entry.describe() for entry in self._entries.values()]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "loads": self._loads,
+                "skipped_too_large": self._skipped_too_large,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+                "entries": len(self._entries),
+                "too_large": len(self._too_large),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _get(self, key: tuple[str, int]) -> Optional[pa.Table]:
+        """Cached table of a version, counted as a hit; call with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        entry.last_access = time.time()
+        self._hits += 1
+        return entry.table
+
+    def _mark_too_large(self, key: tuple[str, int]) -> None:
+        """Remember a version as too large, forgetting older versions of the same table."""
+        with self._lock:
+            self._skipped_too_large += 1
+            self._too_large = {k for k in self._too_large if k[0] != key[0]}
+            self._too_large.add(key)
+
+    def _load(
+        self, key: tuple[str, int], lance_dataset: Any, schema: pa.Schema
+    ) -> Optional[pa.Table]:
+        """
+        Read the columns of a version into memory, giving up once they exceed the budget.
+
+        Returns:
+            Arrow table, or None if the version is too large to be cached
+        """
+        estimated_bytes = self._estimate_nbytes(lance_dataset, schema)
+        if estimated_bytes is None or estimated_bytes > self.max_bytes:
+            logger.debug(
+                f"Not caching {key[0]} version {key[1]}: on-disk size {estimated_bytes} "
+                f"is unknown or exceeds the budget"
+            )
+            return None
+
+        logger.info(f"Loading Lance table {key[0]} version {key[1]} into memory")
+        reader = cast_reader(lance_dataset.scanner(columns=schema.names).to_reader())
+        batches: list[pa.RecordBatch] = []
+        nbytes = 0
+        for batch in reader:
+            nbytes += batch.nbytes
+            if nbytes > self.max_bytes:
+                logger.info(
+                    f"Not caching {key[0]} version {key[1]}: more than {self.max_bytes} bytes"
+                )
+                return None
+            batches.append(batch)
+        return pa.Table.from_batches(batches, schema=reader.schema)
+
+    def _remove(self, key: tuple[str, int]) -> int:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.nbytes
+        return entry.nbytes
+
+    @staticmethod
+    def _estimate_nbytes(lance_dataset: Any, schema: pa.Schema) -> Optional[int]:
+        """
+        Lower bound of the in-memory size of the columns, from Lance's on-disk field statistics.
+
+        On-disk sizes are compressed, so this only rules out tables that are too large for sure.
+        """
+        try:
+            field_ids = {
+                field.id()
+                for field in lance_dataset.lance_schema.fields()
+                if field.name() in schema.names
+            }
+            return sum(
+                int(field.bytes_on_disk)
+                for field in lance_dataset.stats.data_stats().fields
+                if field.id in field_ids
+            )
+        except Exception as e:
+            logger.debug(f"Cannot estimate size of Lance dataset: {e}")
+            return None
@@ -1,12 +1,20 @@
+import bisect
 import logging
 import os
-from functools import lru_cache
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
 
 import duckdb
 import pyarrow as pa
-from pydantic import validate_call
+from pydantic import ConfigDict, validate_call
 
+from smoosense.lance.duckdb_types import duckdb_schema
+from smoosense.lance.lazy_dataset import LazyLanceDataset
 from smoosense.lance.models import ColumnInfo, IndexInfo, VersionInfo
+from smoosense.lance.native_query import plan_native_scan
+from smoosense.lance.table_cache import LanceTableCache
+from smoosense.lance.version_history import VersionSnapshotCache, version_snapshots
 
 logger = logging.getLogger(__name__)
 
@@ -73,118 +81,126 @@ class LanceTableClient:
         return LanceTableClient(root_folder, table_name)
 
     @staticmethod
-    def _filter_duckdb_incompatible_columns(arrow_table: pa.Table) -> tuple[pa.Table, list[str]]:
+    def _duckdb_compatible_schema(schema: pa.Schema) -> tuple[pa.Schema, list[str]]:
         """
-        Filter out columns with DuckDB-incompatible Arrow types.
+        Schema of the columns as DuckDB reads them, with half floats and extension types cast.
 
         Args:
-            arrow_table: PyArrow table to filter
+            schema: Arrow schema of the Lance table
 
         Returns:
-            Tuple of (filtered_arrow_table, incompatible_column_names)
+            Tuple of (compatible_schema, incompatible_column_names)
 
         Raises:
             ValueError: If no compatible columns found
         """
-        compatible_columns = []
-        incompatible_columns = []
-
-        for field in arrow_table.schema:
-            field_type = field.type
-
-            # Check for DuckDB-incompatible types
-            is_incompatible = (
-                # halffloat (float16) is not supported
-                pa.types.is_float16(field_type)
-                or
-                # Extension types are often not supported
-                isinstance(field_type, pa.ExtensionType)
-                or
-                # Duration types may not be supported
-                pa.types.is_duration(field_type)
-                or
-                # Large binary/string types (64-bit offsets)
-                pa.types.is_large_binary(field_type)
-                or pa.types.is_large_string(field_type)
-                or pa.types.is_large_list(field_type)
-            )
-
-            if is_incompatible:
-                incompatible_columns.append(field.name)
-                logger.warning(
-                    f"Skipping column '{field.name}' with unsupported type: {field_type}"
-                )
-            else:
-                compatible_columns.append(field.name)
-
-        if not compatible_columns:
+        compatible_schema, incompatible_columns = duckdb_schema(schema)
+        if len(compatible_schema) == 0:
             raise ValueError("No compatible columns found in Lance table for DuckDB")
+        return compatible_schema, incompatible_columns
 
-        # Select only compatible columns
-        filtered_arrow_table = arrow_table.select(compatible_columns)
-
-        return filtered_arrow_table, incompatible_columns
+    @property
+    def table_path(self) -> str:
+        return os.path.join(self.root_folder, f"{self.table_name}.lance")
 
-    @staticmethod
-    @lru_cache(maxsize=3)
-    def _load_and_filter_arrow_table(table_path: str) -> tuple[pa.Table, list[str]]:
+    def get_compatible_dataset(self) -> tuple[Any, pa.Schema]:
         """
-        Load and filter Arrow table with class-level LRU cache.
-
-        This is cached at the class level with maxsize=3, meaning it persists
-        across different LanceTableClient instances for the same table path.
+        Get the Lance dataset and the schema of its columns as DuckDB reads them.
 
-        Args:
-            table_path: Full path to the Lance table (e.g., /path/to/db/table_name.lance)
-
-        Returns:
-            Tuple of (filtered_arrow_table, incompatible_column_names)
+        Columns of types DuckDB cannot read are cast when they are scanned (see duckdb_types).
 
         Raises:
             ValueError: If no compatible columns found
         """
+        lance_dataset = self.table.to_lance()
+        schema, incompatible_columns = self._duckdb_compatible_schema(lance_dataset.schema)
+        if incompatible_columns:
+            logger.debug(
+                f"Filtered out {len(incompatible_columns)} incompatible column(s): {', '.join(incompatible_columns)}"
+            )
+        return lance_dataset, schema
 
-        logger.info(f"Loading Arrow table from {table_path} (cache miss)")
+    def _get_lazy_dataset(self) -> LazyLanceDataset:
+        """
+        Get a lazily scanned view of the table with its columns as DuckDB reads them.
 
-        # Connect and load
-        instance = LanceTableClient.from_table_path(table_path)
+        Returns:
+            Arrow dataset streaming from the Lance table
 
-        arrow_table = instance.table.to_arrow()
+        Raises:
+            ValueError: If no compatible columns found
+        """
+        lance_dataset, schema = self.get_compatible_dataset()
+        return LazyLanceDataset(lance_dataset, schema)
 
-        # Filter incompatible columns
-        filtered_arrow_table, incompatible_columns = (
-            LanceTableClient._filter_duckdb_incompatible_columns(arrow_table)
-        )
+    @contextmanager
+    def duckdb_connection(
+        self, table_cache: Optional[LanceTableCache] = None
+    ) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        Open a DuckDB connection with the table registered as 'lance_table'.
 
-        if incompatible_columns:
-            logger.warning(
-                f"Filtered out {len(incompatible_columns)} incompatible column(s): {', '.join(incompatible_columns)}"
-            )
+        With a table cache, the current version of the table is served from memory when it fits
+        the cache budget. Otherwise the table is scanned lazily, with DuckDB's projections and
+        filters pushed down to Lance.
 
-        return filtered_arrow_table, incompatible_columns
+        Args:
+            table_cache: Cache of materialized Lance tables to serve the table from
+        """
+        lance_dataset, schema = self.get_compatible_dataset()
+        table: Optional[pa.Table] = None
+        if table_cache is not None:
+            table = table_cache.get_or_load(self.table_path, lance_dataset, schema)
 
-    def _get_filtered_arrow_table(self) -> pa.Table:
+        con = duckdb.connect()
+        try:
+            if table is not None:
+                con.register("lance_table", table)
+            else:
+                con.register("lance_table", LazyLanceDataset(lance_dataset, schema))
+            yield con
+        finally:
+            con.close()
+
+    def native_relation(
+        self, con: duckdb.DuckDBPyConnection, query: str, rows_per_batch: int = 1_000_000
+    ) -> Optional[tuple[duckdb.DuckDBPyRelation, list[str]]]:
         """
-        Get the filtered Arrow table with DuckDB-compatible columns only.
+        Answer a query on 'lance_table' with a native Lance scan, when it has a simple shape.
 
-        Uses class-level LRU cache keyed by table path to persist across instances.
+        Counts and column reads of rows matching a filter, optionally sorted and paged, run in
+        Lance with the filter and projection pushed down, using the scalar indices of the
+        filtered columns. The result is handed to DuckDB so that its values are the same as
+        if DuckDB had run the query.
 
-        Returns:
-            Filtered PyArrow table
+        Args:
+            con: DuckDB connection to parse the query and read the result with
+            query: SQL query (use 'lance_table' to reference the table)
+            rows_per_batch: Number of rows of the batches read from Lance
 
-        Raises:
-            ValueError: If no compatible columns found
+        Returns:
+            Relation of the result and the names of the indices the filter can use, or None
+            when the query needs DuckDB
         """
-        table_path = os.path.join(self.root_folder, f"{self.table_name}.lance")
-        filtered_arrow_table, _ = self._load_and_filter_arrow_table(table_path)
-        return filtered_arrow_table
+        lance_dataset, schema = self.get_compatible_dataset()
+        try:
+            scan = plan_native_scan(con, query, schema)
+            if scan is None:
+                return None
+            reader = scan.reader(lance_dataset, rows_per_batch)
+        except Exception as e:
+            logger.debug(f"Cannot run query natively on Lance table {self.table_name}: {e}")
+            return None
+        indices = scan.indices(lance_dataset)
+        logger.debug(f"Running query natively on Lance table {self.table_name}, indices {indices}")
+        return con.from_arrow(reader), indices
 
     def run_duckdb_sql(self, query: str) -> tuple[list[str], list[tuple]]:
         """
         Execute a SQL query against the Lance table using DuckDB.
 
         The table is registered as 'lance_table' in DuckDB.
-        Uses cached Arrow table conversion to avoid repeated conversions on multiple queries.
+        The table is scanned lazily, so only the columns and rows the query needs are read.
 
         Args:
             query: SQL query to execute (use 'lance_table' to reference the table)
@@ -199,20 +215,10 @@ class LanceTableClient:
         """
         logger.debug(f"Executing DuckDB query on Lance table {self.table_name}")
 
-        # Get filtered Arrow table (uses cache if available)
-        filtered_arrow_table = self._get_filtered_arrow_table()
-
-        # Create DuckDB connection and register the filtered Arrow table
-        con = duckdb.connect()
-        con.register("lance_table", filtered_arrow_table)
-
-        # Execute the query
-        result = con.execute(query)
-        column_names = [desc[0] for desc in result.description] if result.description else []
-        rows = result.fetchall()
-
-        # Close the connection
-        con.close()
+        with self.duckdb_connection() as con:
+            result = con.execute(query)
+            column_names = [desc[0] for desc in result.description] if result.description else []
+            rows = result.fetchall()
 
         logger.debug(f"Query executed successfully: {len(rows)} rows, {len(column_names)} columns")
 
@@ -236,27 +242,64 @@ class LanceTableClient:
         except (ValueError, TypeError):
             return default
 
-    @validate_call
-    def list_versions(self) -> list[VersionInfo]:
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def list_versions(self, cache: Optional[VersionSnapshotCache] = None) -> list[VersionInfo]:
         """
         List all versions of the table.
 
+        Args:
+            cache: Memo of the columns and indices of versions
+
         Returns:
             List of VersionInfo models sorted by version number
         """
+        versions_info, _ = self.list_versions_page(cache=cache)
+        return versions_info
+
+    @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+    def list_versions_page(
+        self,
+        since_version: Optional[int] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cache: Optional[VersionSnapshotCache] = None,
+    ) -> tuple[list[VersionInfo], int]:
+        """
+        List versions of the table, with their changes compared to the previous version.
+
+        Only the manifests of the listed versions and of the version before them are read.
+
+        Args:
+            since_version: Only list the versions after this one
+            offset: Number of versions to skip, after since_version
+            limit: Maximum number of versions to list
+            cache: Memo of the columns and indices of versions
+
+        Returns:
+            VersionInfo models sorted by version number, and the number of versions after
+            since_version
+        """
         logger.info(f"Fetching versions for table {self.table_name}")
-        version_list = self.table.list_versions()
+        dataset = self.table.to_lance()
 
         # Ensure versions are sorted by version number increasingly
-        version_list = sorted(version_list, key=lambda v: int(v["version"]))
+        version_list = sorted(dataset.versions(), key=lambda v: int(v["version"]))
+        start = 0
+        if since_version is not None:
+            start = bisect.bisect_right([int(v["version"]) for v in version_list], since_version)
+        num_versions = len(version_list) - start
+        start += offset
+        stop = len(version_list) if limit is None else min(start + limit, len(version_list))
+        if start >= stop:
+            return [], num_versions
+
+        # The version before the page is only read to diff the first one
+        context = version_list[max(start - 1, 0) : stop]
+        snapshots = version_snapshots(dataset, context, cache=cache)
 
         versions_info: list[VersionInfo] = []
-        prev_data_rows = 0
-        prev_deletion_rows = 0
-        prev_columns: set[str] = set()
-        prev_indices: set[str] = set()
-
-        for version in version_list:
+        prev = version_list[start - 1] if start > 0 else None
+        for version in version_list[start:stop]:
             timestamp = version["timestamp"]
             # Convert datetime to Unix timestamp (epoch) if needed
             if hasattr(timestamp, "timestamp"):
@@ -265,53 +308,33 @@ class LanceTableClient:
                 timestamp = int(timestamp)
 
             metadata = version.get("metadata", {})
+            prev_metadata = prev.get("metadata", {}) if prev is not None else {}
 
             # Extract fields from metadata using helper function
             total_data_rows = self._extract_int_from_metadata(metadata, "total_data_file_rows")
-            total_deletion_rows = self._extract_int_from_metadata(
-                metadata, "total_deletion_file_rows"
-            )
             total_data_files = self._extract_int_from_metadata(metadata, "total_data_files")
 
             # Calculate diffs
-            rows_add = total_data_rows - prev_data_rows
-            rows_remove = total_deletion_rows - prev_deletion_rows
-
-            # Get schema and indices for this version
-            try:
-                # Use to_lance() to access the dataset at a specific version
-                dataset = self.table.to_lance()
-                version_dataset = dataset.checkout_version(version["version"])
-
-                # Get columns from schema
-                current_columns = set(version_dataset.schema.names)
-
-                # Get indices from the version dataset
-                current_indices = set()
-                try:
-                    indices_list = version_dataset.list_indices()
-                    # list_indices returns a list of dicts with 'name' key
-                    current_indices = {
-                        idx["name"] if isinstance(idx, dict) else idx.name for idx in indices_list
-                    }
-                except Exception as e:
-                    # list_indices may fail for some versions
-                    logger.debug(f"Failed to get indices for version {version['version']}: {e}")
-                    current_indices = set()
-            except Exception as e:
-                logger.warning(
-                    f"Failed to get schema/indices for version {version['version']}: {e}"
-                )
-                current_columns = set()
-                current_indices = set()
+            rows_add = total_data_rows - self._extract_int_from_metadata(
+                prev_metadata, "total_data_file_rows"
+            )
+            rows_remove = self._extract_int_from_metadata(
+                metadata, "total_deletion_file_rows"
+            ) - self._extract_int_from_metadata(prev_metadata, "total_deletion_file_rows")
 
             # Calculate column and index differences
             # Only skip showing additions/removals for the very first version
-            is_first_version = version["version"] == version_list[0]["version"]
-            columns_add = [] if is_first_version else list(current_columns - prev_columns)
-            columns_remove = [] if is_first_version else list(prev_columns - current_columns)
-            indices_add = [] if is_first_version else list(current_indices - prev_indices)
-            indices_remove = [] if is_first_version else list(prev_indices - current_indices)
+            columns_add: list[str] = []
+            columns_remove: list[str] = []
+            indices_add: list[str] = []
+            indices_remove: list[str] = []
+            if prev is not None:
+                columns, indices = snapshots[int(version["version"])]
+                prev_columns, prev_indices = snapshots[int(prev["version"])]
+                columns_add = [c for c in columns if c not in prev_columns]
+                columns_remove = [c for c in prev_columns if c not in columns]
+                indices_add = [i for i in indices if i not in prev_indices]
+                indices_remove = [i for i in prev_indices if i not in indices]
 
             versions_info.append(
                 VersionInfo(
@@ -327,15 +350,10 @@ class LanceTableClient:
                     indices_remove=indices_remove,
                 )
             )
+            prev = version
 
-            # Update previous values for next iteration
-            prev_data_rows = total_data_rows
-            prev_deletion_rows = total_deletion_rows
-            prev_columns = current_columns
-            prev_indices = current_indices
-
-        logger.info(f"Found {len(versions_info)} versions for table {self.table_name}")
-        return versions_info
+        logger.info(f"Listed {len(versions_info)} versions of table {self.table_name}")
+        return versions_info, num_versions
 
     @validate_call
     def list_indices(self) -> list[IndexInfo]:
@@ -0,0 +1,158 @@
+"""
+Nearest-neighbor search on the vector columns of Lance tables.
+
+Searches run through the ANN index of the column (IVF_PQ, IVF_HNSW_*, ...) when it has one,
+and as a flat scan computing every distance otherwise. The flat scan also serves as the ground
+truth of the latency/recall report used to tune the index (nprobes, refine factor).
+"""
+
+import logging
+from timeit import default_timer
+from typing import Any, Optional
+
+import pyarrow as pa
+
+from smoosense.lance.duckdb_types import cast_table
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_COLUMN = "_distance"
+ROW_ID_COLUMN = "_rowid"
+
+MAX_K = 1000
+
+
+def vector_columns(schema: pa.Schema) -> list[str]:
+    """Columns of fixed-size lists of floats, which Lance can search by distance."""
+    return [
+        field.name
+        for field in schema
+        if pa.types.is_fixed_size_list(field.type) and pa.types.is_floating(field.type.value_type)
+    ]
+
+
+def vector_index(lance_dataset: Any, column: str) -> Optional[dict[str, Any]]:
+    """The ANN index of a column, as listed by list_indices, or None."""
+    try:
+        indices = lance_dataset.list_indices()
+    except Exception as e:
+        logger.debug(f"Failed to list indices: {e}")
+        return None
+    for index in indices:
+        index_type = str(index.get("type", "")).upper()
+        if index.get("fields") == [column] and ("IVF" in index_type or "HNSW" in index_type):
+            return index  # type: ignore[no-any-return]
+    return None
+
+
+def row_vector(lance_dataset: Any, column: str, row_id: int) -> list[float]:
+    """
+    Vector of the row with the given Lance row id (the _rowid of search results).
+
+    Raises:
+        FileNotFoundError: If no row has the row id
+    """
+    table = cast_table(
+        lance_dataset.scanner(columns=[column], filter=f"{ROW_ID_COLUMN} = {row_id}").to_table()
+    )
+    if table.num_rows == 0:
+        raise FileNotFoundError(f"No row with row id {row_id}")
+    vector = table.column(column)[0].as_py()
+    if vector is None:
+        raise ValueError(f"Row {row_id} has no vector in column {column}")
+    return vector  # type: ignore[no-any-return]
+
+
+class VectorSearch:
+    """
+    Search of the k nearest neighbors of a vector in a column of a Lance dataset.
+
+    Args:
+        lance_dataset: lance.LanceDataset to search
+        column: Vector column
+        vector: Query vector
+        k: Number of neighbors
+        columns: Columns to return along with the distance and row id
+        lance_filter: Filter of the candidate rows, in Lance's SQL dialect
+        prefilter: Filter before the search, so that k rows matching the filter are found,
+            rather than filtering the k nearest rows
+        nprobes: Number of IVF partitions to search
+        refine_factor: Re-rank refine_factor * k candidates with exact distances
+    """
+
+    def __init__(
+        self,
+        lance_dataset: Any,
+        column: str,
+        vector: list[float],
+        k: int,
+        columns: list[str],
+        lance_filter: Optional[str] = None,
+        prefilter: bool = True,
+        nprobes: Optional[int] = None,
+        refine_factor: Optional[int] = None,
+    ):
+        self.lance_dataset = lance_dataset
+        self.column = column
+        self.vector = vector
+        self.k = k
+        self.columns = columns
+        self.lance_filter = lance_filter
+        self.prefilter = prefilter
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
+
+    def _scanner(self, use_index: bool) -> Any:
+        nearest: dict[str, Any] = {
+            "column": self.column,
+            "q": self.vector,
+            "k": self.k,
+            "use_index": use_index,
+        }
+        if self.nprobes is not None:
+            nearest["nprobes"] = self.nprobes
+        if self.refine_factor is not None:
+            nearest["refine_factor"] = self.refine_factor
+        return self.lance_dataset.scanner(
+            columns=[*self.columns, DISTANCE_COLUMN],
+            nearest=nearest,
+            filter=self.lance_filter,
+            prefilter=self.prefilter,
+            with_row_id=True,
+            disable_scoring_autoprojection=True,
+        )
+
+    def run(self, use_index: bool = True) -> tuple[pa.Table, str, float]:
+        """
+        Run the search.
+
+        Args:
+            use_index: Search through the ANN index of the column, if any
+
+        Returns:
+            Result sorted by distance, how it was searched ("index" or "flat"), and the
+            seconds it took
+        """
+        scanner = self._scanner(use_index)
+        strategy = "index" if use_index and "ANNSubIndex" in scanner.explain_plan() else "flat"
+        time_start = default_timer()
+        table = scanner.to_table()
+        latency = default_timer() - time_start
+        table = cast_table(table)
+        # Distance and row id last, whatever order Lance returns them in
+        table = table.select([*self.columns, DISTANCE_COLUMN, ROW_ID_COLUMN])
+        return table, strategy, latency
+
+    def report(self, result: pa.Table, latency: float) -> dict[str, Any]:
+        """
+        Compare a search result with the exact neighbors found by a flat scan.
+
+        Returns:
+            Latency of the search and of the flat scan, and the recall of the search: the
+            share of the exact neighbors it found
+        """
+        exact, _, flat_latency = self.run(use_index=False)
+        exact_ids = set(exact.column(ROW_ID_COLUMN).to_pylist())
+        found_ids = set(result.column(ROW_ID_COLUMN).to_pylist())
+        recall = len(exact_ids & found_ids) / len(exact_ids) if exact_ids else 1.0
+        return {"latency": latency, "flat_latency": flat_latency, "recall": recall}
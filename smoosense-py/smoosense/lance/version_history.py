@@ -0,0 +1,135 @@
+"""
+Version history of Lance tables.
+
+Each version of a table has a manifest with its schema and indices. Diffing versions means
+reading the manifests of consecutive versions, which is slow for tables with thousands of
+commits, mostly on object stores. Versions are immutable, so the columns and indices of each
+version are read once, in parallel, and memoized.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Most manifests read at once
+MAX_VERSION_PARALLELISM = 16
+
+# Columns and indices of a version, in schema and listing order
+VersionSnapshot = tuple[tuple[str, ...], tuple[str, ...]]
+
+
+class VersionSnapshotCache:
+    """
+    Columns and indices of table versions, keyed by table URI, version and commit timestamp.
+
+    The timestamp tells apart versions of a table that was deleted and recreated at the same
+    path. Least recently used snapshots are evicted first.
+
+    Args:
+        max_entries: Maximum number of cached versions
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, int, Any], VersionSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple[str, int, Any]) -> Optional[VersionSnapshot]:
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def put(self, key: tuple[str, int, Any], snapshot: VersionSnapshot) -> None:
+        with self._lock:
+            self._entries[key] = snapshot
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
+
+def read_version_snapshot(lance_dataset: Any, version: int) -> VersionSnapshot:
+    """
+    Columns and indices of a version of a dataset, read from its manifest.
+
+    Columns and indices that cannot be read are reported empty, as for versions whose
+    manifest is gone.
+    """
+    try:
+        version_dataset = lance_dataset.checkout_version(version)
+        columns = tuple(version_dataset.schema.names)
+    except Exception as e:
+        logger.warning(f"Failed to get schema for version {version}: {e}")
+        return (), ()
+    try:
+        indices = tuple(
+            idx["name"] if isinstance(idx, dict) else idx.name
+            for idx in version_dataset.list_indices()
+        )
+    except Exception as e:
+        # list_indices may fail for some versions
+        logger.debug(f"Failed to get indices for version {version}: {e}")
+        indices = ()
+    return columns, indices
+
+
+def version_snapshots(
+    lance_dataset: Any,
+    versions: list[dict[str, Any]],
+    cache: Optional[VersionSnapshotCache] = None,
+    parallelism: int = MAX_VERSION_PARALLELISM,
+) -> dict[int, VersionSnapshot]:
+    """
+    Columns and indices of versions of a dataset, reading the manifests missing from the cache
+    across a thread pool.
+
+    Args:
+        lance_dataset: lance.LanceDataset of the table
+        versions: Versions, as listed by LanceDataset.versions()
+        cache: Memo of the snapshots of versions
+        parallelism: Most manifests read at once
+
+    Returns:
+        Snapshot of each version number
+    """
+    snapshots: dict[int, VersionSnapshot] = {}
+    missing: list[tuple[int, tuple[str, int, Any]]] = []
+    for version in versions:
+        number = int(version["version"])
+        key = (lance_dataset.uri, number, version.get("timestamp"))
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            snapshots[number] = cached
+        else:
+            missing.append((number, key))
+    if not missing:
+        return snapshots
+
+    def read(number: int) -> VersionSnapshot:
+        return read_version_snapshot(lance_dataset, number)
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(parallelism, MAX_VERSION_PARALLELISM, len(missing))),
+        thread_name_prefix="smoosense-lance-versions",
+    ) as executor:
+        results = executor.map(read, [number for number, _ in missing])
+        for (number, key), snapshot in zip(missing, results):
+            snapshots[number] = snapshot
+            if cache is not None and snapshot[0]:
+                cache.put(key, snapshot)
+    logger.info(f"Read {len(missing)} version manifests of {lance_dataset.uri}")
+    return snapshots
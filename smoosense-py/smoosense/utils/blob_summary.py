@@ -0,0 +1,76 @@
+"""
+Summaries of BLOB columns computed in SQL for rows fetched for display.
+
+Binary cells are shown as "Bytes <length>". Replacing BLOB columns with that summary in the
+projection of the query lets DuckDB answer with the length of each value, instead of
+materializing whole images or audio clips, exporting them to Arrow and copying them into Python
+only to measure them.
+"""
+
+import logging
+from typing import Optional
+
+import pyarrow as pa
+from duckdb import DuckDBPyConnection, DuckDBPyRelation, StatementType
+from duckdb.typing import DuckDBPyType
+
+from smoosense.utils.column_stats import quote_identifier
+
+logger = logging.getLogger(__name__)
+
+BLOB_TYPE = "BLOB"
+
+
+def blob_summary(column_sql: str) -> str:
+    """SQL expression of the summary of a BLOB value, as `serialize` formats bytes."""
+    return f"'Bytes ' || octet_length({column_sql})"
+
+
+def summarize_blobs(relation: DuckDBPyRelation) -> DuckDBPyRelation:
+    """
+    Project the top-level BLOB columns of a relation to their summary.
+
+    Relations without BLOB columns, or with duplicate column names that a projection cannot
+    tell apart, are returned as is.
+    """
+    columns = relation.columns
+    types = [str(column_type) for column_type in relation.types]
+    if BLOB_TYPE not in types or len(set(columns)) < len(columns):
+        return relation
+    select_list = []
+    for column, column_type in zip(columns, types):
+        name = quote_identifier(column)
+        select_list.append(f"{blob_summary(name)} AS {name}" if column_type == BLOB_TYPE else name)
+    return relation.project(", ".join(select_list))
+
+
+def execute_for_display(
+    con: DuckDBPyConnection, query: str, rows_per_batch: int = 1_000_000
+) -> tuple[Optional[pa.RecordBatchReader], Optional[list[DuckDBPyType]]]:
+    """
+    Run a query whose rows are shown to the user, with its BLOB columns summarized in SQL.
+
+    Only a single SELECT statement can be projected; other statements run as they are.
+
+    Args:
+        con: Connection to run the query on
+        query: SQL query
+        rows_per_batch: Number of rows of the record batches of the reader
+
+    Returns:
+        Reader of the result, or None for statements without one, and the DuckDB types of
+        its columns, or None when only the statement's Arrow result tells them
+    """
+    try:
+        statements = con.extract_statements(query)
+    except Exception as e:
+        # Let the execution report the error
+        logger.debug(f"Failed to parse query, running it as is: {e}")
+        statements = []
+    if len(statements) == 1 and statements[0].type == StatementType.SELECT:
+        relation = summarize_blobs(con.sql(query))
+        return relation.fetch_arrow_reader(rows_per_batch), relation.types
+    result = con.execute(query)
+    if result.description is None:
+        return None, None
+    return result.fetch_record_batch(rows_per_batch), None
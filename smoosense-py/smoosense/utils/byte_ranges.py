@@ -0,0 +1,212 @@
+"""
+HTTP byte range requests (RFC 7233) for the files served by /api/get-file.
+
+Media elements request ranges of a file to seek in it (video scrubbing, audio seeking) rather
+than downloading it from the start. A single range is answered with the range itself, several
+ranges with a multipart/byteranges body, whatever the file is read from.
+"""
+
+import logging
+import uuid
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Callable, Optional
+
+from flask import Response, request
+from werkzeug.http import http_date, parse_date
+
+logger = logging.getLogger(__name__)
+
+# More ranges than this in one request are answered with the whole file
+MAX_RANGES = 16
+
+# Headers the browser may read from cross-origin responses of ranges
+EXPOSED_HEADERS = "Accept-Ranges, Content-Length, Content-Range, ETag, Last-Modified"
+
+# Reads the bytes from start (inclusive) to stop (exclusive) of a file, chunk by chunk
+ReadRange = Callable[[int, int], Iterator[bytes]]
+
+
+class RangeNotSatisfiable(Exception):
+    """None of the requested ranges overlaps the file."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Requested range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def parse_byte_ranges(value: Optional[str]) -> Optional[list[tuple[int, Optional[int]]]]:
+    """
+    Byte ranges of a Range header, in the requested order.
+
+    Malformed headers, units other than bytes, and requests of too many ranges are ignored,
+    as RFC 7233 allows.
+
+    Returns:
+        Start and stop (exclusive, None for the end of the file) of each range, with a negative
+        start for the last bytes of the file; or None to send the whole file
+    """
+    if not value:
+        return None
+    units, _, specs = value.partition("=")
+    if units.strip().lower() != "bytes":
+        return None
+    ranges: list[tuple[int, Optional[int]]] = []
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, dash, last = spec.partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last) or not (first.isdigit() or first == ""):
+            return None
+        if last and not last.isdigit():
+            return None
+        if not first:
+            ranges.append((-int(last), None))
+        elif not last:
+            ranges.append((int(first), None))
+        elif int(last) < int(first):
+            return None
+        else:
+            ranges.append((int(first), int(last) + 1))
+    if not ranges or len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def format_byte_range(start: int, stop: Optional[int]) -> str:
+    """Range header of one range, as from parse_byte_ranges."""
+    if start < 0:
+        return f"bytes=-{-start}"
+    return f"bytes={start}-" if stop is None else f"bytes={start}-{stop - 1}"
+
+
+def requested_ranges(size: int) -> Optional[list[tuple[int, int]]]:
+    """
+    Byte ranges of the Range header of the current request, resolved against the file size.
+
+    Overlapping ranges are coalesced.
+
+    Args:
+        size: Size of the file in bytes
+
+    Returns:
+        Start (inclusive) and stop (exclusive) of each range, or None to send the whole file
+
+    Raises:
+        RangeNotSatisfiable: If no range overlaps the file
+    """
+    requested = parse_byte_ranges(request.headers.get("Range"))
+    if requested is None:
+        return None
+    ranges: list[tuple[int, int]] = []
+    for start, stop in requested:
+        if start < 0:
+            start, stop = max(size + start, 0), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+    if not ranges:
+        raise RangeNotSatisfiable(size)
+
+    coalesced: list[tuple[int, int]] = []
+    for start, stop in sorted(ranges):
+        if coalesced and start <= coalesced[-1][1]:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], stop))
+        else:
+            coalesced.append((start, stop))
+    # Keep the requested order unless coalescing was needed
+    return ranges if len(coalesced) == len(ranges) else coalesced
+
+
+def if_range_matches(etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Whether the ranges of the current request apply to this version of the file.
+
+    A request with an If-Range header that does not match the file gets the whole file.
+    """
+    header = request.headers.get("If-Range")
+    if not header:
+        return True
+    if header.startswith(('"', "W/")):
+        # Weak validators cannot be used for ranges
+        return etag is not None and not header.startswith("W/") and header == etag
+    date = parse_date(header)
+    # HTTP dates have a precision of one second
+    return (
+        date is not None
+        and last_modified is not None
+        and date == last_modified.replace(microsecond=0)
+    )
+
+
+def validator_headers(etag: Optional[str], last_modified: Optional[datetime]) -> dict[str, str]:
+    """Headers letting browsers cache the file and resume ranges of the same version."""
+    headers = {"Accept-Ranges": "bytes", "Access-Control-Expose-Headers": EXPOSED_HEADERS}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_satisfiable_response(size: int) -> Response:
+    response = Response(status=416)
+    response.headers["Content-Range"] = f"bytes */{size}"
+    response.headers["Access-Control-Expose-Headers"] = EXPOSED_HEADERS
+    return response
+
+
+def partial_response(
+    ranges: list[tuple[int, int]],
+    size: int,
+    content_type: str,
+    read_range: ReadRange,
+    headers: dict[str, str],
+) -> Response:
+    """
+    206 response with the ranges of a file.
+
+    Args:
+        ranges: Start (inclusive) and stop (exclusive) of each range, as from requested_ranges
+        size: Size of the file in bytes
+        content_type: Content type of the file
+        read_range: Reads a range of the file, chunk by chunk
+        headers: Headers to add, e.g. from validator_headers
+    """
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        response = Response(read_range(start, stop), status=206, content_type=content_type)
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        response.headers["Content-Length"] = str(stop - start)
+    else:
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (
+                f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+            ).encode()
+            for start, stop in ranges
+        ]
+        closing = f"\r\n--{boundary}--\r\n".encode()
+        length = (
+            sum(len(part) for part in part_headers)
+            + sum(stop - start for start, stop in ranges)
+            + 2 * (len(ranges) - 1)
+            + len(closing)
+        )
+
+        def body() -> Iterator[bytes]:
+            for n, ((start, stop), part_header) in enumerate(zip(ranges, part_headers)):
+                yield (b"\r\n" if n > 0 else b"") + part_header
+                yield from read_range(start, stop)
+            yield closing
+
+        response = Response(
+            body(), status=206, content_type=f"multipart/byteranges; boundary={boundary}"
+        )
+        response.headers["Content-Length"] = str(length)
+    response.headers.update(headers)
+    return response
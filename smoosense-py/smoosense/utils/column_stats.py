@@ -0,0 +1,253 @@
+"""
+Base column statistics of a table, computed in one multi-column pass and persisted on disk.
+
+Statistics are stored as JSON sidecar files under ~/.smoosense/column-stats, keyed by the
+fingerprint of the table files (path, size and mtime for local files, ETag for S3 objects,
+version manifests for Lance tables). Reopening an unchanged table reads the sidecar instead
+of scanning the data again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from botocore.client import BaseClient
+from duckdb import DuckDBPyConnection
+
+from smoosense.utils.query_cache import file_fingerprints, lance_table_fingerprint
+from smoosense.utils.serialization import serialize
+
+logger = logging.getLogger(__name__)
+
+# Bump when the format of the statistics changes, so that stale sidecars are recomputed
+STATS_FORMAT_VERSION = 1
+
+# Columns with at most this many distinct values get exact value counts
+TOP_VALUES_LIMIT = 1000
+
+NESTED_TYPE_PATTERN = re.compile(r"\[|^(STRUCT|MAP|UNION)\(|^(BLOB|BIT)$")
+
+ConnectionFactory = Callable[[], AbstractContextManager[DuckDBPyConnection]]
+
+
+def default_stats_dir() -> str:
+    return str(Path.home() / ".smoosense" / "column-stats")
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def table_reference(table_path: str, query_engine: str) -> str:
+    """How the table is referenced in SQL, same as in queries built by the GUI."""
+    return "lance_table" if query_engine == "lance" else quote_literal(table_path)
+
+
+def is_primitive_type(duckdb_type: str) -> bool:
+    """Whether min/max and distinct counts are meaningful for the column type."""
+    return NESTED_TYPE_PATTERN.search(duckdb_type) is None
+
+
+def _chunks(items: list[Any], size: int) -> Iterator[list[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def compute_column_stats(
+    con: DuckDBPyConnection, table_ref: str, max_columns_per_pass: int = 200
+) -> dict[str, Any]:
+    """
+    Compute base statistics of every column of a table.
+
+    Counts, null counts, min, max and approximate distinct counts of all columns are computed
+    in a single scan. Exact value counts of the columns with at most TOP_VALUES_LIMIT distinct
+    values are then computed in a second scan, again for all of them at once.
+
+    Args:
+        con: DuckDB connection that can read the table
+        table_ref: Table reference in SQL, e.g. a quoted file path or 'lance_table'
+        max_columns_per_pass: Split very wide tables into scans of this many columns
+
+    Returns:
+        Dict with "cnt_all" and per-column statistics under "columns"
+    """
+    described = con.execute(f"DESCRIBE SELECT * FROM {table_ref}").fetchall()
+    column_types: dict[str, str] = {row[0]: row[1] for row in described}
+
+    cnt_all = 0
+    columns: dict[str, dict[str, Any]] = {}
+    for chunk in _chunks(list(column_types), max_columns_per_pass):
+        aggregates = ["COUNT(*)"]
+        for name in chunk:
+            column = quote_identifier(name)
+            aggregates.append(f"COUNT_IF({column} IS NULL)")
+            if is_primitive_type(column_types[name]):
+                aggregates += [
+                    f"MIN({column})",
+                    f"MAX({column})",
+                    f"approx_count_distinct({column})",
+                ]
+        row = con.execute(f"SELECT {', '.join(aggregates)} FROM {table_ref}").fetchone()
+        assert row is not None
+        values = iter(row)
+        cnt_all = next(values)
+        for name in chunk:
+            cnt_null = next(values)
+            stats: dict[str, Any] = {
+                "duckdb_type": column_types[name],
+                "cnt_null": cnt_null,
+                "cnt_not_null": cnt_all - cnt_null,
+                "min": None,
+                "max": None,
+                "approx_cnt_distinct": None,
+                "cnt_distinct": None,
+                "top_values": None,
+            }
+            if is_primitive_type(column_types[name]):
+                stats["min"], stats["max"], stats["approx_cnt_distinct"] = (
+                    next(values),
+                    next(values),
+                    next(values),
+                )
+            columns[name] = stats
+
+    low_cardinality = [
+        name
+        for name, stats in columns.items()
+        if stats["approx_cnt_distinct"] is not None
+        and stats["approx_cnt_distinct"] <= TOP_VALUES_LIMIT
+    ]
+    for chunk in _chunks(low_cardinality, max_columns_per_pass):
+        histograms = ", ".join(f"histogram({quote_identifier(name)})" for name in chunk)
+        row = con.execute(f"SELECT {histograms} FROM {table_ref}").fetchone()
+        assert row is not None
+        for name, histogram in zip(chunk, row):
+            counts = sorted((histogram or {}).items(), key=lambda kv: kv[1], reverse=True)
+            columns[name]["cnt_distinct"] = len(counts)
+            columns[name]["top_values"] = [
+                {"value": value, "cnt": cnt} for value, cnt in counts[:TOP_VALUES_LIMIT]
+            ]
+
+    return {"cnt_all": cnt_all, "columns": columns}
+
+
+class ColumnStatsIndex:
+    """
+    Sidecar store of base column statistics, one JSON file per table fingerprint.
+
+    Concurrent requests for the same table wait for a single computation.
+
+    Args:
+        stats_dir: Directory of the sidecar files, ~/.smoosense/column-stats by default
+    """
+
+    def __init__(self, stats_dir: Optional[str] = None):
+        self.stats_dir = stats_dir or default_stats_dir()
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def key(
+        self, table_path: str, query_engine: str, s3_client: Optional[BaseClient] = None
+    ) -> Optional[str]:
+        """Sidecar key of a table, or None if the table cannot be fingerprinted."""
+        if query_engine == "lance":
+            fingerprints = lance_table_fingerprint(table_path)
+        else:
+            fingerprints = file_fingerprints(quote_literal(table_path), s3_client)
+        if fingerprints is None:
+            return None
+        payload = json.dumps([STATS_FORMAT_VERSION, query_engine, fingerprints])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            with open(self._sidecar_path(key)) as f:
+                return json.load(f)  # type: ignore[no-any-return]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable column stats sidecar {key}: {e}")
+            return None
+
+    def save(self, key: str, stats: dict[str, Any]) -> None:
+        """Write the sidecar atomically, so concurrent readers never see a partial file."""
+        os.makedirs(self.stats_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.stats_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(stats, f)
+            os.replace(temp_path, self._sidecar_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get_or_compute(
+        self,
+        table_path: str,
+        query_engine: str,
+        connection_factory: ConnectionFactory,
+        s3_client: Optional[BaseClient] = None,
+        refresh: bool = False,
+    ) -> tuple[dict[str, Any], bool]:
+        """
+        Get the column statistics of a table, computing and persisting them when needed.
+
+        Args:
+            table_path: Path of the table file or Lance table
+            query_engine: "duckdb" or "lance"
+            connection_factory: Opens a DuckDB connection that can read the table
+            s3_client: boto3 S3 client used to fingerprint S3 objects
+            refresh: Recompute even if a sidecar exists
+
+        Returns:
+            Tuple of (statistics, whether they were read from the sidecar)
+        """
+        key = self.key(table_path, query_engine, s3_client)
+        if key is None:
+            logger.debug(f"Cannot fingerprint {table_path}, column stats are not persisted")
+            return self._compute(table_path, query_engine, connection_factory), False
+
+        with self._lock_for(key):
+            if not refresh:
+                stats = self.load(key)
+                if stats is not None:
+                    return stats, True
+            stats = self._compute(table_path, query_engine, connection_factory)
+            try:
+                self.save(key, stats)
+            except OSError as e:
+                logger.warning(f"Failed to persist column stats of {table_path}: {e}")
+            return stats, False
+
+    def _compute(
+        self, table_path: str, query_engine: str, connection_factory: ConnectionFactory
+    ) -> dict[str, Any]:
+        logger.info(f"Computing column stats of {table_path}")
+        time_start = time.time()
+        with connection_factory() as con:
+            stats = compute_column_stats(con, table_reference(table_path, query_engine))
+        stats["table_path"] = table_path
+        stats["computed_at"] = time_start
+        stats["compute_seconds"] = time.time() - time_start
+        # Round-trip through JSON so fresh and persisted statistics look the same
+        return json.loads(json.dumps(serialize(stats), default=str))  # type: ignore[no-any-return]
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _sidecar_path(self, key: str) -> str:
+        return os.path.join(self.stats_dir, f"{key}.json")
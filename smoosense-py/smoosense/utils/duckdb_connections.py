@@ -1,6 +1,10 @@
 import logging
 import os
-from typing import Callable, Optional
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from timeit import default_timer
+from typing import Any, Callable, Optional
 
 import boto3
 import duckdb
@@ -8,12 +12,38 @@ from botocore.client import BaseClient
 from duckdb import DuckDBPyConnection
 from pydantic import ConfigDict, validate_call
 
+from smoosense.exceptions import InvalidInputException
+
 logger = logging.getLogger(__name__)
 
 
 DuckdbConnectionMaker = Callable[[], DuckDBPyConnection]
 
 
+def get_s3_credentials(s3_client: BaseClient) -> tuple[str, str, Optional[str]]:
+    """Return (access_key, secret_key, token) currently used by the boto3 client."""
+    credentials = s3_client._request_signer._credentials
+    # Refreshable credentials rotate behind the client's back; freeze them to read a consistent set
+    if hasattr(credentials, "get_frozen_credentials"):
+        credentials = credentials.get_frozen_credentials()
+    # token may be None if not temporary credentials
+    return credentials.access_key, credentials.secret_key, credentials.token
+
+
+def apply_s3_credentials(con: DuckDBPyConnection, s3_client: BaseClient) -> None:
+    """
+    Configure DuckDB S3 settings from the boto3 client.
+
+    Settings are applied globally so that every cursor of the database picks them up.
+    """
+    aws_key, aws_secret, aws_token = get_s3_credentials(s3_client)
+    con.execute(f"SET GLOBAL s3_region='{s3_client.meta.region_name}'")
+    con.execute(f"SET GLOBAL s3_access_key_id='{aws_key}'")
+    con.execute(f"SET GLOBAL s3_secret_access_key='{aws_secret}'")
+    # Reset the token as well when rotating from temporary to long-term credentials
+    con.execute(f"SET GLOBAL s3_session_token='{aws_token or ''}'")
+
+
 @validate_call(config=ConfigDict(arbitrary_types_allowed=True))
 def duckdb_connection_using_s3(
     s3_client: Optional[BaseClient] = None,
@@ -23,11 +53,6 @@ def duckdb_connection_using_s3(
         s3_client = boto3.client("s3")
 
     def maker() -> DuckDBPyConnection:
-        credentials = s3_client._request_signer._credentials
-        region = s3_client.meta.region_name
-        aws_key = credentials.access_key
-        aws_secret = credentials.secret_key
-        aws_token = credentials.token  # May be None if not temporary credentials
         con = duckdb.connect()
         home_directory = os.getenv("HOME", "/tmp")
         temp_directory = os.path.join(home_directory, ".tmp")
@@ -36,27 +61,22 @@ def duckdb_connection_using_s3(
         os.makedirs(temp_directory, exist_ok=True)
 
         # Set home_directory and temp_directory before httpfs auto-installs
-        con.execute(f"SET home_directory='{home_directory}'")
-        con.execute(f"SET temp_directory='{temp_directory}'")
-        con.execute(f"SET memory_limit='{memory_limit}'")
+        con.execute(f"SET GLOBAL home_directory='{home_directory}'")
+        con.execute(f"SET GLOBAL temp_directory='{temp_directory}'")
+        con.execute(f"SET GLOBAL memory_limit='{memory_limit}'")
 
         # Now install and load the extension
         con.execute("INSTALL httpfs")
         con.execute("LOAD httpfs")
         # Configure DuckDB S3 settings
-        con.execute(f"SET s3_region='{region}'")
-        con.execute(f"SET s3_access_key_id='{aws_key}'")
-        con.execute(f"SET s3_secret_access_key='{aws_secret}'")
+        apply_s3_credentials(con, s3_client)
         aws_endpoint_url = os.getenv("AWS_ENDPOINT_URL", None)
         if aws_endpoint_url is not None:
             aws_endpoint = aws_endpoint_url.replace("https://", "")
-            con.execute(f"SET s3_endpoint='{aws_endpoint}'")
+            con.execute(f"SET GLOBAL s3_endpoint='{aws_endpoint}'")
             logger.warning(f'Using AWS endpoint "{aws_endpoint}"')
 
-        con.execute("SET parquet_metadata_cache=true")
-
-        if aws_token:
-            con.execute(f"SET s3_session_token='{aws_token}'")
+        con.execute("SET GLOBAL parquet_metadata_cache=true")
         return con
 
     return maker
@@ -74,20 +94,159 @@ def duckdb_connection_using_one_zone_s3(
         con = duckdb_connection_using_s3(s3_client)()
         region = s3_client.meta.region_name
         s3_endpoint = f"s3express-{zone}.{region}.amazonaws.com"
-        con.execute(f"SET s3_endpoint='{s3_endpoint}'")
+        con.execute(f"SET GLOBAL s3_endpoint='{s3_endpoint}'")
         return con
 
     return maker
 
 
+class DuckdbConnectionPool:
+    """
+    Bounded pool of DuckDB connections backed by one shared, pre-configured database.
+
+    Opening a database (and for S3, installing httpfs and applying all the settings) is expensive,
+    and dropping it after each query also drops the Parquet metadata cache. The pool opens the
+    database once and hands out cursors, which are cheap connections to the same database that
+    share its global settings, extensions, memory limit and caches.
+
+    Every checkout gets a fresh cursor, so session state (temp views, registered Arrow objects,
+    session settings) never leaks from one request into another. The catalog and the global
+    settings are shared by all cursors, which is why check_permissions() rejects user SQL that
+    would change them.
+    """
+
+    def __init__(
+        self,
+        connection_maker: DuckdbConnectionMaker,
+        max_size: int = 8,
+        s3_client: Optional[BaseClient] = None,
+        health_check_interval: float = 30.0,
+    ):
+        """
+        Args:
+            connection_maker: Creates and configures the shared database connection
+            max_size: Maximum number of connections checked out at the same time
+            s3_client: If provided, S3 credentials are re-applied whenever the boto3 session rotates them
+            health_check_interval: Minimum seconds between health checks of the shared database
+        """
+        assert max_size > 0, "max_size must be positive"
+        self.max_size = max_size
+        self._connection_maker = connection_maker
+        self._s3_client = s3_client
+        self._health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._database: Optional[DuckDBPyConnection] = None
+        self._credentials: Optional[tuple[str, str, Optional[str]]] = None
+        self._last_health_check = 0.0
+        self._cnt_in_use = 0
+
+    def warm_up(self) -> None:
+        """Open and configure the shared database ahead of the first request."""
+        with self._lock:
+            self._ensure_database()
+
+    @contextmanager
+    def connection(self) -> Iterator[DuckDBPyConnection]:
+        """
+        Check out a connection for the duration of the `with` block.
+
+        Blocks while `max_size` connections are already in use.
+        """
+        self._slots.acquire()
+        try:
+            with self._lock:
+                cursor = self._ensure_database().cursor()
+                self._cnt_in_use += 1
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+                with self._lock:
+                    self._cnt_in_use -= 1
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_size": self.max_size,
+            "in_use": self._cnt_in_use,
+            "database_open": self._database is not None,
+        }
+
+    def close(self) -> None:
+        """Close the shared database. It is re-opened on the next checkout."""
+        with self._lock:
+            self._close_database()
+
+    def _ensure_database(self) -> DuckDBPyConnection:
+        """Return a healthy shared database with fresh credentials. Caller must hold the lock."""
+        if self._database is not None and self._is_health_check_due():
+            try:
+                self._database.execute("SELECT 1").fetchall()
+            except Exception as e:
+                logger.warning(f"Shared DuckDB database failed health check, re-opening: {e}")
+                self._close_database()
+
+        if self._database is None:
+            time_start = default_timer()
+            self._database = self._connection_maker()
+            self._credentials = (
+                get_s3_credentials(self._s3_client) if self._s3_client is not None else None
+            )
+            self._last_health_check = default_timer()
+            logger.info(f"Opened shared DuckDB database in {default_timer() - time_start:.3f}s")
+        elif self._s3_client is not None:
+            credentials = get_s3_credentials(self._s3_client)
+            if credentials != self._credentials:
+                logger.info("S3 credentials rotated, updating shared DuckDB database")
+                apply_s3_credentials(self._database, self._s3_client)
+                self._credentials = credentials
+
+        return self._database
+
+    def _is_health_check_due(self) -> bool:
+        now = default_timer()
+        if now - self._last_health_check < self._health_check_interval:
+            return False
+        self._last_health_check = now
+        return True
+
+    def _close_database(self) -> None:
+        if self._database is not None:
+            try:
+                self._database.close()
+            except Exception as e:
+                logger.debug(f"Failed to close shared DuckDB database: {e}")
+            self._database = None
+
+
 def check_permissions(query: str) -> None:
-    tokens = [w.lower() for w in query.split() if w]
-    forbidden = ["copy", "export", "delete", "attach", "update"]
-    if any(w in tokens for w in forbidden):
+    """
+    Allow a single SELECT statement only, as parsed by DuckDB.
+
+    Other statements write files or change state shared by every cursor of the pooled database:
+    the catalog (tables, views, macros, attached databases), global settings such as the S3
+    credentials and memory_limit, and the loaded extensions.
+
+    Raises:
+        InvalidInputException: If the query cannot be parsed
+        PermissionError: If the query is not a single SELECT statement
+    """
+    try:
+        statements = duckdb.extract_statements(query)
+    except duckdb.ParserException as e:
+        raise InvalidInputException(str(e)) from e
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
         logger.warning(f"Forbidden query: {query}")
         raise PermissionError("You are only allowed to run readonly queries")
 
 
+def check_condition(condition: str) -> None:
+    """Allow a filter condition only if it is an expression of a single SELECT statement."""
+    check_permissions(f"SELECT 1 WHERE {condition}")
+
+
 if __name__ == "__main__":
     cm = duckdb_connection_using_one_zone_s3()
     con = cm()
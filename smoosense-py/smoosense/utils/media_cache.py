@@ -0,0 +1,533 @@
+"""
+On-disk cache of the media files that /api/get-file proxies from S3 and HTTP origins.
+
+Galleries show the same images and videos again and again as tables are scrolled back and
+forth. Proxied objects are kept on local disk, content-addressed by the SHA-256 of their bytes,
+with an index entry per URL holding the validators of the origin (ETag, Last-Modified). Entries
+younger than `revalidate_after` seconds are served as they are; older ones are revalidated
+with a conditional request, which costs no egress when the object has not changed.
+
+An object missing from the cache is streamed to the client while it is written to the cache
+(see `tee`), so the first byte is sent as soon as the origin sends it; concurrent requests of
+the object wait for it to be written and are served from the cache. Range requests of objects
+missing from the cache are proxied, and the object is fetched into the cache in the background.
+Least recently used entries are evicted when the cache grows beyond its size budget.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Generator, Iterator
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+from botocore.exceptions import ClientError
+from werkzeug.http import http_date, parse_date
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Objects fetched into the cache in the background at the same time, at most
+MAX_BACKGROUND_FILLS = 4
+
+
+def default_media_cache_dir() -> str:
+    return str(Path.home() / ".smoosense" / "media-cache")
+
+
+class OriginObject:
+    """
+    Response of an origin to a possibly conditional request of an object.
+
+    Args:
+        chunks: Bytes of the object, or None when the object has not changed
+        etag: ETag of the object, quoted as in HTTP headers
+        last_modified: Last modification time of the object
+        content_type: Content type of the object
+        size: Size of the object in bytes, if known up front
+        close: Releases the connection to the origin
+    """
+
+    def __init__(
+        self,
+        chunks: Optional[Iterator[bytes]],
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
+        content_type: Optional[str] = None,
+        size: Optional[int] = None,
+        close: Callable[[], None] = lambda: None,
+    ):
+        self.chunks = chunks
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.size = size
+        self.close = close
+
+    @property
+    def not_modified(self) -> bool:
+        return self.chunks is None
+
+
+# Requests an object from its origin, conditionally on an ETag if given
+Fetch = Callable[[Optional[str]], OriginObject]
+
+
+def s3_fetch(s3_client: Any, url: str) -> Fetch:
+    """
+    Fetch of an S3 object.
+
+    Raises:
+        FileNotFoundError: If the object does not exist
+    """
+    parsed = urlparse(url)
+    bucket = parsed.netloc
+    key = parsed.path.lstrip("/")
+
+    def fetch(etag: Optional[str]) -> OriginObject:
+        conditions = {"IfNoneMatch": etag} if etag else {}
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key, **conditions)
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            code = e.response.get("Error", {}).get("Code")
+            if status == 304 or code in ("304", "NotModified"):
+                return OriginObject(None, etag)
+            if status == 404 or code in ("404", "NoSuchKey"):
+                raise FileNotFoundError(f"No such file: {url}") from e
+            raise
+        body = response["Body"]
+        return OriginObject(
+            body.iter_chunks(chunk_size=CHUNK_SIZE),
+            etag=response.get("ETag"),
+            last_modified=response.get("LastModified"),
+            content_type=response.get("ContentType"),
+            size=response.get("ContentLength"),
+            close=body.close,
+        )
+
+    return fetch
+
+
+def http_fetch(url: str) -> Fetch:
+    """Fetch of an HTTP resource."""
+
+    def fetch(etag: Optional[str]) -> OriginObject:
+        headers = {"If-None-Match": etag} if etag else {}
+        response = requests.get(url, stream=True, timeout=30, headers=headers)
+        if response.status_code == 304:
+            response.close()
+            return OriginObject(None, etag)
+        response.raise_for_status()
+        length = response.headers.get("Content-Length")
+        return OriginObject(
+            response.iter_content(chunk_size=CHUNK_SIZE),
+            etag=response.headers.get("ETag"),
+            last_modified=parse_date(response.headers.get("Last-Modified")),
+            content_type=response.headers.get("Content-Type"),
+            # The body is decoded, so its length differs when it is encoded
+            size=int(length) if length and not response.headers.get("Content-Encoding") else None,
+            close=response.close,
+        )
+
+    return fetch
+
+
+class CachedMedia:
+    """
+    Object in the media cache.
+
+    Args:
+        url: S3 or HTTP URL of the object
+        digest: SHA-256 of the bytes of the object, which name its file in the cache
+        size: Size of the object in bytes
+        etag: ETag of the object at its origin
+        last_modified: Last modification time of the object at its origin
+        content_type: Content type of the object at its origin
+        validated_at: When the object was last fetched or revalidated (epoch seconds)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        digest: str,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[datetime],
+        content_type: Optional[str],
+        validated_at: float,
+    ):
+        self.url = url
+        self.digest = digest
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.validated_at = validated_at
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "digest": self.digest,
+            "size": self.size,
+            "etag": self.etag,
+            "last_modified": http_date(self.last_modified) if self.last_modified else None,
+            "content_type": self.content_type,
+            "validated_at": self.validated_at,
+        }
+
+    @staticmethod
+    def from_json(data: dict[str, Any]) -> "CachedMedia":
+        return CachedMedia(
+            url=data["url"],
+            digest=data["digest"],
+            size=int(data["size"]),
+            etag=data.get("etag"),
+            last_modified=parse_date(data.get("last_modified")),
+            content_type=data.get("content_type"),
+            validated_at=float(data["validated_at"]),
+        )
+
+
+class MediaCache:
+    """
+    Size-bounded on-disk cache of proxied objects, evicting least recently used ones.
+
+    Args:
+        cache_dir: Directory of the cache, ~/.smoosense/media-cache by default
+        max_bytes: Maximum total size of the cached objects
+        max_object_bytes: Objects larger than this are proxied without being cached
+        revalidate_after: Seconds an object is served without checking its origin
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        max_object_bytes: int = 64 * 1024 * 1024,
+        revalidate_after: float = 60.0,
+    ):
+        self.cache_dir = cache_dir or default_media_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_object_bytes = min(max_object_bytes, max_bytes)
+        self.revalidate_after = revalidate_after
+        self._entries: OrderedDict[str, CachedMedia] = OrderedDict()
+        self._nbytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        # Locks of the URLs being fetched, with the number of threads holding or waiting for them
+        self._locks: dict[str, tuple[threading.Lock, int]] = {}
+        self._filling: set[str] = set()
+        self._counts = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0, "skipped": 0}
+
+    def peek(self, url: str) -> Optional[CachedMedia]:
+        """Cached entry of a URL, without fetching or revalidating it."""
+        with self._lock:
+            self._load()
+            return self._entries.get(url)
+
+    def get(self, url: str, fetch: Fetch) -> tuple[Optional[CachedMedia], str]:
+        """
+        Cached object of a URL, fetched from its origin or revalidated when needed.
+
+        Concurrent calls for the same URL wait for a single fetch.
+
+        Args:
+            url: S3 or HTTP URL of the object
+            fetch: Requests the object from its origin
+
+        Returns:
+            The entry, or None when the object is too large to cache; and how it was served:
+            "hit", "revalidated", "miss" or "skipped"
+        """
+        with self._url_lock(url):
+            entry, origin, status = self._lookup(url, fetch)
+            if origin is None:
+                return entry, status
+            try:
+                fetched = _exhaust(self._fill(url, origin))
+            finally:
+                origin.close()
+            return (fetched, "miss") if fetched is not None else (None, "skipped")
+
+    def lookup(
+        self, url: str, fetch: Fetch
+    ) -> tuple[Optional[CachedMedia], Optional[OriginObject], str]:
+        """
+        Cached object of a URL, revalidated when needed, without downloading it on a miss.
+
+        On a miss, the lock of the URL is held until the response of the origin is closed,
+        which `tee` does once the object has been read, so concurrent lookups of the URL wait
+        for a single fetch and are then served from the cache.
+
+        Args:
+            url: S3 or HTTP URL of the object
+            fetch: Requests the object from its origin
+
+        Returns:
+            The entry, the response of the origin, and how the object was served: the entry
+            and None for "hit" and "revalidated"; None and the response of the origin, to be
+            read through `tee`, for "miss"
+        """
+        with ExitStack() as stack:
+            stack.enter_context(self._url_lock(url))
+            entry, origin, status = self._lookup(url, fetch)
+            if origin is None or (origin.size is not None and origin.size > self.max_object_bytes):
+                # Nothing will be cached for concurrent lookups to wait for
+                return entry, origin, status
+            unlock = stack.pop_all().close
+        close = origin.close
+
+        def close_and_unlock() -> None:
+            try:
+                close()
+            finally:
+                unlock()
+
+        origin.close = close_and_unlock
+        return entry, origin, status
+
+    def _lookup(
+        self, url: str, fetch: Fetch
+    ) -> tuple[Optional[CachedMedia], Optional[OriginObject], str]:
+        """`lookup`, with the lock of the URL held by the caller."""
+        entry = self.peek(url)
+        if entry is not None and not os.path.exists(self.path(entry)):
+            self._remove(url)
+            entry = None
+        if entry is not None and time.time() - entry.validated_at < self.revalidate_after:
+            return self._touch(entry, "hits"), None, "hit"
+
+        origin = fetch(entry.etag if entry is not None else None)
+        if entry is not None and origin.not_modified:
+            origin.close()
+            entry.validated_at = time.time()
+            self._save_index(entry)
+            return self._touch(entry, "revalidated"), None, "revalidated"
+        return None, origin, "miss"
+
+    def tee(self, url: str, origin: OriginObject) -> Iterator[bytes]:
+        """
+        Chunks of an object sent by its origin, written to the cache as they are read.
+
+        The object is added to the cache once it has been read to the end, unless it is too
+        large to cache; an object of known size too large to cache is not written at all.
+        """
+        try:
+            yield from self._fill(url, origin)
+        finally:
+            origin.close()
+
+    def fill_in_background(self, url: str, fetch: Fetch) -> None:
+        """Fetch an object into the cache in a thread, unless it is being fetched already."""
+        with self._lock:
+            if url in self._filling or len(self._filling) >= MAX_BACKGROUND_FILLS:
+                return
+            self._filling.add(url)
+
+        def run() -> None:
+            try:
+                self.get(url, fetch)
+            except Exception as e:
+                logger.warning(f"Failed to fetch {url} into the media cache: {e}")
+            finally:
+                with self._lock:
+                    self._filling.discard(url)
+
+        threading.Thread(target=run, name="smoosense-media-fill", daemon=True).start()
+
+    def path(self, entry: CachedMedia) -> str:
+        return os.path.join(self.cache_dir, "blobs", entry.digest[:2], entry.digest)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._load()
+            return {**self._counts, "entries": len(self._entries), "nbytes": self._nbytes}
+
+    def _fill(
+        self, url: str, origin: OriginObject
+    ) -> Generator[bytes, None, Optional[CachedMedia]]:
+        """
+        Pass the chunks of an object through while writing them to the cache.
+
+        Returns:
+            The new entry, or None if the object is too large to cache
+        """
+        if origin.chunks is None:
+            raise ValueError(f"Origin of {url} did not send the object")
+        if origin.size is not None and origin.size > self.max_object_bytes:
+            yield from origin.chunks
+            self._count("skipped")
+            return None
+        blob_dir = os.path.join(self.cache_dir, "blobs")
+        os.makedirs(blob_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=blob_dir, suffix=".tmp")
+        f: Optional[BinaryIO] = os.fdopen(fd, "wb")
+        try:
+            sha256 = hashlib.sha256()
+            size = 0
+            for chunk in origin.chunks:
+                if f is not None:
+                    size += len(chunk)
+                    if size > self.max_object_bytes:
+                        # Too large to cache after all, keep passing it through
+                        f.close()
+                        f = None
+                        os.unlink(temp_path)
+                    else:
+                        sha256.update(chunk)
+                        f.write(chunk)
+                yield chunk
+            if f is None:
+                self._count("skipped")
+                return None
+            f.close()
+            entry = CachedMedia(
+                url=url,
+                digest=sha256.hexdigest(),
+                size=size,
+                etag=origin.etag,
+                last_modified=origin.last_modified,
+                content_type=origin.content_type,
+                validated_at=time.time(),
+            )
+            os.makedirs(os.path.dirname(self.path(entry)), exist_ok=True)
+            os.replace(temp_path, self.path(entry))
+        except BaseException:
+            # Including GeneratorExit, when the client goes away before the end of the object
+            if f is not None:
+                f.close()
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._save_index(entry)
+        self._count("misses")
+        self._add(entry)
+        return entry
+
+    def _add(self, entry: CachedMedia) -> None:
+        with self._lock:
+            previous = self._entries.pop(entry.url, None)
+            if previous is not None:
+                self._nbytes -= previous.size
+            self._entries[entry.url] = entry
+            self._nbytes += entry.size
+            evicted: list[CachedMedia] = []
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                _, oldest = self._entries.popitem(last=False)
+                self._nbytes -= oldest.size
+                self._counts["evictions"] += 1
+                evicted.append(oldest)
+            digests = {e.digest for e in self._entries.values()}
+        if previous is not None and previous.digest not in digests:
+            self._delete_blob(previous)
+        for old in evicted:
+            self._delete_index(old.url)
+            if old.digest not in digests:
+                self._delete_blob(old)
+
+    def _remove(self, url: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self._nbytes -= entry.size
+        self._delete_index(url)
+
+    def _count(self, count: str) -> None:
+        with self._lock:
+            self._counts[count] += 1
+
+    def _touch(self, entry: CachedMedia, count: str) -> CachedMedia:
+        with self._lock:
+            self._counts[count] += 1
+            if entry.url in self._entries:
+                self._entries.move_to_end(entry.url)
+        return entry
+
+    def _load(self) -> None:
+        """Read the index left by previous runs, once. Callers hold self._lock."""
+        if self._loaded:
+            return
+        self._loaded = True
+        index_dir = os.path.join(self.cache_dir, "index")
+        if not os.path.isdir(index_dir):
+            return
+        entries: list[tuple[float, CachedMedia]] = []
+        for name in os.listdir(index_dir):
+            index_path = os.path.join(index_dir, name)
+            try:
+                with open(index_path) as f:
+                    entry = CachedMedia.from_json(json.load(f))
+                if os.path.exists(self.path(entry)):
+                    entries.append((os.path.getmtime(index_path), entry))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable media cache entry {name}: {e}")
+        for _, entry in sorted(entries, key=lambda item: item[0]):
+            self._entries[entry.url] = entry
+            self._nbytes += entry.size
+        logger.info(f"Loaded {len(self._entries)} media cache entries from {self.cache_dir}")
+
+    def _index_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "index", f"{key}.json")
+
+    def _save_index(self, entry: CachedMedia) -> None:
+        """Write the index entry atomically, so concurrent readers never see a partial file."""
+        index_dir = os.path.join(self.cache_dir, "index")
+        os.makedirs(index_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry.to_json(), f)
+            os.replace(temp_path, self._index_path(entry.url))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _delete_index(self, url: str) -> None:
+        try:
+            os.unlink(self._index_path(url))
+        except FileNotFoundError:
+            pass
+
+    def _delete_blob(self, entry: CachedMedia) -> None:
+        try:
+            os.unlink(self.path(entry))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _url_lock(self, url: str) -> Iterator[None]:
+        """Hold the lock of a URL, dropping it once no thread holds or waits for it."""
+        with self._lock:
+            lock, users = self._locks.get(url, (threading.Lock(), 0))
+            self._locks[url] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._locks[url]
+                if users > 1:
+                    self._locks[url] = (lock, users - 1)
+                else:
+                    del self._locks[url]
+
+
+def _exhaust(generator: Generator[Any, None, Any]) -> Any:
+    """Read a generator to the end, returning its return value."""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
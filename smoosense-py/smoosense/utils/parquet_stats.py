@@ -0,0 +1,140 @@
+import logging
+from typing import Any, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from duckdb import DuckDBPyConnection
+
+from smoosense.utils.column_stats import quote_identifier, quote_literal
+
+logger = logging.getLogger(__name__)
+
+
+def _json_value(value: Any) -> Any:
+    """Statistics decode timestamps, dates and decimals to Python objects; report them as text."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _has_comparable_values(arrow_type: pa.DataType) -> bool:
+    """Whether min/max are meaningful for the column; binary min/max are not reported."""
+    return not (
+        pa.types.is_binary(arrow_type)
+        or pa.types.is_large_binary(arrow_type)
+        or pa.types.is_fixed_size_binary(arrow_type)
+    )
+
+
+def _exact_min_max(statistics: pq.Statistics) -> bool:
+    """
+    Whether min/max of row-group statistics are values of the column rather than bounds.
+
+    Writers may truncate long byte array min/max and flag them as inexact. pyarrow versions
+    that do not expose these flags cannot tell, so byte array min/max are taken as inexact.
+    """
+    min_exact = getattr(statistics, "is_min_value_exact", None)
+    max_exact = getattr(statistics, "is_max_value_exact", None)
+    if min_exact is None or max_exact is None:
+        return statistics.physical_type not in ("BYTE_ARRAY", "FIXED_LEN_BYTE_ARRAY")
+    return bool(min_exact and max_exact)
+
+
+def footer_column_stats(
+    parquet_file: pq.ParquetFile,
+) -> tuple[dict[str, dict[str, Any]], dict[str, set[str]]]:
+    """
+    Aggregate the row-group statistics in the Parquet footer into per-column statistics.
+
+    Only top-level, non-nested columns are answered from the footer, since statistics of
+    nested columns describe their leaves. Floating point statistics exclude NaN, and
+    min/max that are not exact need a scan.
+
+    Args:
+        parquet_file: Opened Parquet file; only its metadata is read
+
+    Returns:
+        Tuple of (statistics per column, missing statistics per column) where missing
+        statistics are among "cnt_null", "min" and "max" and need a scan
+    """
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    leaf_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+
+    stats: dict[str, dict[str, Any]] = {}
+    missing: dict[str, set[str]] = {}
+    for field in schema:
+        column_stats: dict[str, Any] = {"cnt_null": None, "min": None, "max": None}
+        stats[field.name] = column_stats
+        index = leaf_index.get(field.name)
+        if pa.types.is_nested(field.type):
+            missing[field.name] = {"cnt_null"}
+            continue
+        if index is None:
+            missing[field.name] = {"cnt_null", "min", "max"}
+            continue
+        cnt_null: Optional[int] = 0
+        min_value: Any = None
+        max_value: Any = None
+        min_max_complete = True
+        for rg in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg)
+            statistics = row_group.column(index).statistics
+            if statistics is None or not statistics.has_null_count:
+                cnt_null = None
+            elif cnt_null is not None:
+                cnt_null += statistics.null_count
+            if statistics is not None and statistics.has_min_max:
+                if not _exact_min_max(statistics):
+                    min_max_complete = False
+                if min_value is None or statistics.min < min_value:
+                    min_value = statistics.min
+                if max_value is None or statistics.max > max_value:
+                    max_value = statistics.max
+            elif not (
+                statistics is not None
+                and statistics.has_null_count
+                and statistics.null_count == row_group.num_rows
+            ):
+                # Row groups of only nulls have no min/max, any other gap needs a scan
+                min_max_complete = False
+
+        column_stats["cnt_null"] = cnt_null
+        if cnt_null is None:
+            missing.setdefault(field.name, set()).add("cnt_null")
+        # Arrow reads float16 statistics as raw bytes
+        if pa.types.is_float16(field.type) or (
+            _has_comparable_values(field.type) and not min_max_complete
+        ):
+            missing.setdefault(field.name, set()).update({"min", "max"})
+        elif _has_comparable_values(field.type):
+            column_stats["min"] = _json_value(min_value)
+            column_stats["max"] = _json_value(max_value)
+    return stats, missing
+
+
+def scan_missing_stats(
+    con: DuckDBPyConnection, file_path: str, missing: dict[str, set[str]]
+) -> dict[str, dict[str, Any]]:
+    """Compute the statistics missing from the footer with a single scan of those columns."""
+    aggregates: list[str] = []
+    targets: list[tuple[str, str]] = []
+    for name, stat_names in missing.items():
+        column = quote_identifier(name)
+        for stat_name in sorted(stat_names):
+            expression = {
+                "cnt_null": f"COUNT_IF({column} IS NULL)",
+                "min": f"MIN({column})",
+                "max": f"MAX({column})",
+            }[stat_name]
+            aggregates.append(expression)
+            targets.append((name, stat_name))
+    if not aggregates:
+        return {}
+    query = f"SELECT {', '.join(aggregates)} FROM read_parquet({quote_literal(file_path)})"
+    row = con.execute(query).fetchone()
+    assert row is not None
+    scanned: dict[str, dict[str, Any]] = {}
+    for (name, stat_name), value in zip(targets, row):
+        scanned.setdefault(name, {})[stat_name] = _json_value(value)
+    return scanned
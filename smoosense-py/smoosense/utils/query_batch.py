@@ -0,0 +1,218 @@
+"""
+Planning of query batches: compatible aggregate queries are combined into one statement.
+
+Queries selecting only aggregates from the same table are answered by a single scan: their
+select lists are concatenated and, when their WHERE clauses differ, each query's condition
+moves into FILTER clauses of its aggregates. Queries are parsed with DuckDB's own parser
+(json_serialize_sql) and the combined statement is rendered back with json_deserialize_sql.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Optional
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+# Expression classes that reference rows outside of an aggregate, or cannot be combined
+NON_COMBINABLE_CLASSES = {"COLUMN_REF", "STAR", "SUBQUERY", "WINDOW", "LAMBDA", "PARAMETER"}
+
+_aggregate_functions: Optional[frozenset[str]] = None
+_aggregate_functions_lock = threading.Lock()
+
+
+class BatchUnit:
+    """
+    One statement executed for one or more queries of a batch.
+
+    Args:
+        sql: Statement to execute
+        members: Indices of the queries answered by the statement, with the number of
+            result columns of each (None for a statement running a single query as is)
+    """
+
+    def __init__(self, sql: str, members: list[tuple[int, Optional[int]]]):
+        self.sql = sql
+        self.members = members
+
+    @property
+    def is_combined(self) -> bool:
+        return len(self.members) > 1
+
+
+def aggregate_function_names(con: DuckDBPyConnection) -> frozenset[str]:
+    global _aggregate_functions
+    with _aggregate_functions_lock:
+        if _aggregate_functions is None:
+            rows = con.execute(
+                "SELECT DISTINCT function_name FROM duckdb_functions() "
+                "WHERE function_type = 'aggregate'"
+            ).fetchall()
+            _aggregate_functions = frozenset(row[0].lower() for row in rows) | {"count_star"}
+        return _aggregate_functions
+
+
+def _without_locations(node: Any) -> Any:
+    if isinstance(node, dict):
+        return {k: _without_locations(v) for k, v in node.items() if k != "query_location"}
+    if isinstance(node, list):
+        return [_without_locations(v) for v in node]
+    return node
+
+
+def _count_aggregates(node: Any, aggregates: frozenset[str]) -> Optional[int]:
+    """
+    Count the aggregates of an expression tree.
+
+    Returns:
+        Number of aggregates, or None if the expression uses row values outside of an aggregate
+    """
+    if isinstance(node, list):
+        total = 0
+        for child in node:
+            count = _count_aggregates(child, aggregates)
+            if count is None:
+                return None
+            total += count
+        return total
+    if not isinstance(node, dict):
+        return 0
+    node_class = node.get("class")
+    if node_class == "FUNCTION" and str(node.get("function_name", "")).lower() in aggregates:
+        return 1
+    if node_class in NON_COMBINABLE_CLASSES:
+        return None
+    return _count_aggregates([v for v in node.values() if isinstance(v, (dict, list))], aggregates)
+
+
+def _add_filter(node: Any, condition: dict[str, Any], aggregates: frozenset[str]) -> None:
+    """Restrict every aggregate of an expression tree to the rows matching `condition`."""
+    if isinstance(node, list):
+        for child in node:
+            _add_filter(child, condition, aggregates)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get("class") == "FUNCTION" and str(node.get("function_name", "")).lower() in aggregates:
+        if node.get("filter") is None:
+            node["filter"] = condition
+        else:
+            node["filter"] = {
+                "class": "CONJUNCTION",
+                "type": "CONJUNCTION_AND",
+                "alias": "",
+                "children": [node["filter"], condition],
+            }
+        return
+    for value in node.values():
+        if isinstance(value, (dict, list)):
+            _add_filter(value, condition, aggregates)
+
+
+def _combinable_select(con: DuckDBPyConnection, query: str) -> Optional[dict[str, Any]]:
+    """Parsed SELECT node of a query that only selects aggregates, or None."""
+    row = con.execute("SELECT json_serialize_sql(?)", [query]).fetchone()
+    assert row is not None
+    parsed = json.loads(row[0])
+    if parsed.get("error") or len(parsed.get("statements", [])) != 1:
+        return None
+    node = parsed["statements"][0]["node"]
+    if (
+        node.get("type") != "SELECT_NODE"
+        or node.get("modifiers")
+        or node.get("cte_map", {}).get("map")
+        or node.get("group_expressions")
+        or node.get("group_sets")
+        or node.get("having") is not None
+        or node.get("qualify") is not None
+        or node.get("sample") is not None
+        or node.get("aggregate_handling") != "STANDARD_HANDLING"
+        or node.get("from_table") is None
+        or node["from_table"].get("type") not in ("BASE_TABLE", "TABLE_FUNCTION")
+    ):
+        return None
+    # At least one aggregate, so that the query returns exactly one row
+    count = _count_aggregates(node["select_list"], aggregate_function_names(con))
+    if not count:
+        return None
+    return node  # type: ignore[no-any-return]
+
+
+def _render(con: DuckDBPyConnection, node: dict[str, Any]) -> str:
+    statement = {"error": False, "statements": [{"node": node, "named_param_map": []}]}
+    row = con.execute("SELECT json_deserialize_sql(?)", [json.dumps(statement)]).fetchone()
+    assert row is not None
+    return str(row[0])
+
+
+def _combine(con: DuckDBPyConnection, nodes: list[dict[str, Any]]) -> str:
+    combined = json.loads(json.dumps(nodes[0]))
+    combined["select_list"] = [expr for node in nodes for expr in node["select_list"]]
+    where_clauses = [_without_locations(node.get("where_clause")) for node in nodes]
+    if all(where == where_clauses[0] for where in where_clauses):
+        return _render(con, combined)
+
+    # Different WHERE clauses move into FILTER clauses, which would change the names of
+    # unaliased columns; keep the names they have in the original queries
+    combined["where_clause"] = None
+    described = con.execute(f"DESCRIBE {_render(con, combined)}").fetchall()
+    names = [row[0] for row in described]
+
+    aggregates = aggregate_function_names(con)
+    select_list = []
+    for node in nodes:
+        for expr in json.loads(json.dumps(node["select_list"])):
+            if node.get("where_clause") is not None:
+                _add_filter(expr, node["where_clause"], aggregates)
+            select_list.append(expr)
+    for expr, name in zip(select_list, names):
+        expr["alias"] = name
+    combined["select_list"] = select_list
+    return _render(con, combined)
+
+
+def plan_batch(
+    con: DuckDBPyConnection, queries: list[str], combine: bool = True
+) -> list[BatchUnit]:
+    """
+    Plan the statements answering a batch of queries.
+
+    Args:
+        con: DuckDB connection used to parse the queries
+        queries: SQL queries of the batch
+        combine: Whether to combine aggregate queries over the same table
+
+    Returns:
+        Statements to execute; each query is answered by exactly one of them
+    """
+    units: list[BatchUnit] = []
+    groups: dict[str, list[tuple[int, dict[str, Any]]]] = {}
+    for index, query in enumerate(queries):
+        node = None
+        if combine:
+            try:
+                node = _combinable_select(con, query)
+            except Exception as e:
+                logger.debug(f"Cannot parse query {index} of the batch: {e}")
+        if node is None:
+            units.append(BatchUnit(query, [(index, None)]))
+        else:
+            table_key = json.dumps(_without_locations(node["from_table"]), sort_keys=True)
+            groups.setdefault(table_key, []).append((index, node))
+
+    for members in groups.values():
+        if len(members) == 1:
+            index = members[0][0]
+            units.append(BatchUnit(queries[index], [(index, None)]))
+            continue
+        nodes = [node for _, node in members]
+        try:
+            sql = _combine(con, nodes)
+        except Exception as e:
+            logger.debug(f"Cannot combine queries {[i for i, _ in members]}: {e}")
+            units.extend(BatchUnit(queries[index], [(index, None)]) for index, _ in members)
+            continue
+        units.append(BatchUnit(sql, [(index, len(node["select_list"])) for index, node in members]))
+    return units
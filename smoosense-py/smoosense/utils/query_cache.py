@@ -0,0 +1,207 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from botocore.client import BaseClient
+
+logger = logging.getLogger(__name__)
+
+# Single-quoted string literals (with '' escapes) and double-quoted identifiers
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+
+# Functions and clauses whose result changes from one run to the next
+NON_DETERMINISTIC_PATTERN = re.compile(
+    r"\b(random|setseed|uuid|gen_random_uuid|now|today|current_date|current_time|"
+    r"current_timestamp|get_current_time|get_current_timestamp|transaction_timestamp)\b"
+    r"|\busing\s+sample\b|\btablesample\b",
+    re.IGNORECASE,
+)
+
+GLOB_CHARACTERS = ("*", "?", "[")
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside quoted literals and drop trailing semicolons."""
+    parts = []
+    position = 0
+    for match in QUOTED_PATTERN.finditer(query):
+        parts.append(" ".join(query[position : match.start()].split()))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(" ".join(query[position:].split()))
+    return " ".join(p for p in parts if p).rstrip("; ")
+
+
+def is_deterministic(query: str) -> bool:
+    """Whether running the query twice on unchanged files returns the same result."""
+    without_literals = QUOTED_PATTERN.sub("''", query)
+    return NON_DETERMINISTIC_PATTERN.search(without_literals) is None
+
+
+def _local_fingerprint(path: str) -> Optional[list[Any]]:
+    path = os.path.expanduser(path)
+    if any(c in path for c in GLOB_CHARACTERS):
+        paths = sorted(glob.glob(path, recursive=True))
+    elif os.path.exists(path):
+        paths = [path]
+    else:
+        return None
+    fingerprints: list[Any] = []
+    for p in paths:
+        stat = os.stat(p)
+        fingerprints.append([os.path.abspath(p), stat.st_size, stat.st_mtime_ns])
+    return fingerprints
+
+
+def _s3_fingerprint(url: str, s3_client: BaseClient) -> list[Any]:
+    parsed = urlparse(url)
+    response = s3_client.head_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+    return [url, response["ContentLength"], response["ETag"]]
+
+
+def file_fingerprints(query: str, s3_client: Optional[BaseClient]) -> Optional[list[Any]]:
+    """
+    Fingerprint every file referenced by the query.
+
+    Files are recognized as string literals that are S3/HTTP URLs or existing local paths
+    (globs are expanded). Local files are identified by path, size and mtime, S3 objects
+    by size and ETag.
+
+    Args:
+        query: SQL query
+        s3_client: boto3 S3 client used to read ETags
+
+    Returns:
+        List of fingerprints, or None if the query reads nothing that can be fingerprinted
+        (no files at all, S3 globs, HTTP URLs or S3 objects that cannot be inspected)
+    """
+    fingerprints: list[Any] = []
+    for match in QUOTED_PATTERN.finditer(query):
+        literal = match.group(0)
+        if not literal.startswith("'"):
+            continue
+        value = literal[1:-1].replace("''", "'")
+        if value.startswith(("http://", "https://")):
+            return None
+        if value.startswith("s3://"):
+            if s3_client is None or any(c in value for c in GLOB_CHARACTERS):
+                return None
+            try:
+                fingerprints.append(_s3_fingerprint(value, s3_client))
+            except Exception as e:
+                logger.debug(f"Cannot fingerprint {value}, skipping query cache: {e}")
+                return None
+            continue
+        local = _local_fingerprint(value)
+        if local:
+            fingerprints.extend(local)
+    return fingerprints or None
+
+
+def lance_table_fingerprint(table_path: str) -> Optional[list[Any]]:
+    """Fingerprint a local Lance table by its version manifests, which change on every commit."""
+    versions_dir = os.path.join(os.path.expanduser(table_path), "_versions")
+    if not os.path.isdir(versions_dir):
+        return None
+    stat = os.stat(versions_dir)
+    return [os.path.abspath(versions_dir), len(os.listdir(versions_dir)), stat.st_mtime_ns]
+
+
+def query_cache_key(
+    query: str,
+    query_engine: str,
+    response_format: str,
+    table_path: Optional[str] = None,
+    s3_client: Optional[BaseClient] = None,
+) -> Optional[str]:
+    """
+    Build the result cache key of a query.
+
+    Args:
+        query: SQL query
+        query_engine: "duckdb" or "lance"
+        response_format: Format the result is cached in, e.g. "json" or "arrow"
+        table_path: Lance table path, used when query_engine is "lance"
+        s3_client: boto3 S3 client used to read ETags
+
+    Returns:
+        Cache key, or None if the query result must not be cached
+    """
+    if not is_deterministic(query):
+        return None
+    if query_engine == "lance":
+        fingerprints = lance_table_fingerprint(table_path) if table_path else None
+    else:
+        fingerprints = file_fingerprints(query, s3_client)
+    if fingerprints is None:
+        return None
+    payload = json.dumps([normalize_sql(query), query_engine, response_format, fingerprints])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryResultCache:
+    """
+    Thread-safe LRU cache of query results, bounded by the total size of its entries.
+
+    Args:
+        max_bytes: Maximum total size of cached results; 0 disables the cache
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached result and mark it as recently used, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, nbytes: int) -> None:
+        """Cache a result of the given size, evicting least recently used results as needed."""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,210 @@
+import logging
+import socket
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from timeit import default_timer
+from typing import Any, Callable, Optional
+
+from smoosense.exceptions import QueryInterruptedException
+
+logger = logging.getLogger(__name__)
+
+DisconnectCheck = Callable[[], bool]
+
+
+def socket_disconnect_check(environ: dict[str, Any]) -> Optional[DisconnectCheck]:
+    """
+    Build a check telling whether the client of a WSGI request has closed its connection.
+
+    Works with servers exposing the raw socket in the WSGI environ (werkzeug, gunicorn).
+    TLS sockets cannot be peeked and are not supported.
+
+    Returns:
+        Callable returning True once the client is gone, or None if not supported
+    """
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if not isinstance(sock, socket.socket) or hasattr(sock, "context"):
+        return None
+
+    def is_disconnected() -> bool:
+        try:
+            # A readable socket with nothing to read means the peer closed the connection
+            return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+    return is_disconnected
+
+
+class RunningQuery:
+    def __init__(
+        self,
+        query_id: str,
+        connection: Any,
+        deadline: float,
+        is_disconnected: Optional[DisconnectCheck],
+    ):
+        self.query_id = query_id
+        self.connection = connection
+        self.deadline = deadline
+        self.is_disconnected = is_disconnected
+        self.interrupt_reason: Optional[str] = None
+
+    def interrupt(self, reason: str) -> None:
+        if self.interrupt_reason is not None:
+            return
+        self.interrupt_reason = reason
+        logger.info(f"Interrupting query {self.query_id}: {reason}")
+        self.repeat_interrupt()
+
+    def repeat_interrupt(self) -> None:
+        """
+        Interrupt the connection again; DuckDB drops an interrupt that arrives before a
+        statement starts, and a block may run several statements.
+        """
+        try:
+            self.connection.interrupt()
+        except Exception as e:
+            logger.warning(f"Failed to interrupt query {self.query_id}: {e}")
+
+
+class QueryRegistry:
+    """
+    Track running queries so they can be interrupted on cancel, deadline or client disconnect.
+
+    A single watcher thread checks deadlines and disconnects of all running queries.
+
+    Args:
+        default_timeout: Deadline in seconds of queries that do not ask for a shorter one
+        check_interval: Seconds between two checks of the watcher thread
+        cancel_retention: Seconds to remember cancellations of queries that have not started yet
+    """
+
+    def __init__(
+        self,
+        default_timeout: float = 300.0,
+        check_interval: float = 0.5,
+        cancel_retention: float = 60.0,
+    ):
+        self.default_timeout = default_timeout
+        self.check_interval = check_interval
+        self.cancel_retention = cancel_retention
+        self._running: dict[str, RunningQuery] = {}
+        self._early_cancels: dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._watcher: Optional[threading.Thread] = None
+
+    def resolve_timeout(self, timeout: Optional[float]) -> float:
+        """Clamp a client requested timeout to the server default."""
+        if timeout is None or timeout <= 0:
+            return self.default_timeout
+        return min(float(timeout), self.default_timeout)
+
+    @contextmanager
+    def track(
+        self,
+        query_id: str,
+        connection: Any,
+        timeout: Optional[float] = None,
+        is_disconnected: Optional[DisconnectCheck] = None,
+    ) -> Iterator[None]:
+        """
+        Register a query running on `connection` for the duration of the block.
+
+        Raises:
+            QueryInterruptedException: If the query was cancelled, timed out or its client left
+        """
+        timeout = self.resolve_timeout(timeout)
+        running = RunningQuery(query_id, connection, default_timer() + timeout, is_disconnected)
+        with self._condition:
+            if self._early_cancels.pop(query_id, None) is not None:
+                raise QueryInterruptedException(f"Query {query_id} was cancelled")
+            if query_id in self._running:
+                raise ValueError(f"Query {query_id} is already running")
+            self._running[query_id] = running
+            self._ensure_watcher()
+            self._condition.notify()
+        try:
+            yield
+        except Exception as e:
+            if running.interrupt_reason is not None:
+                raise QueryInterruptedException(
+                    f"Query {query_id} {running.interrupt_reason}"
+                ) from e
+            raise
+        finally:
+            with self._condition:
+                self._running.pop(query_id, None)
+
+    def cancel(self, query_id: str) -> bool:
+        """
+        Interrupt a running query.
+
+        A query that has not started yet is cancelled as soon as it starts.
+
+        Returns:
+            True if the query was running
+        """
+        with self._condition:
+            running = self._running.get(query_id)
+            if running is None:
+                self._early_cancels[query_id] = default_timer() + self.cancel_retention
+                self._ensure_watcher()
+                return False
+            running.interrupt("was cancelled")
+        return True
+
+    def running_query_ids(self) -> list[str]:
+        with self._condition:
+            return list(self._running)
+
+    def _ensure_watcher(self) -> None:
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(
+                target=self._watch, name="smoosense-query-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running and not self._early_cancels:
+                    self._condition.wait()
+                else:
+                    self._condition.wait(self.check_interval)
+                now = default_timer()
+                self._early_cancels = {
+                    query_id: expiry
+                    for query_id, expiry in self._early_cancels.items()
+                    if expiry > now
+                }
+                running = list(self._running.values())
+                # Under the lock, so that the connection cannot have moved on to another query
+                for query in running:
+                    if query.interrupt_reason is not None:
+                        query.repeat_interrupt()
+
+            # Checked outside of the lock, peeking the sockets of many clients takes a while
+            reasons: dict[RunningQuery, str] = {}
+            for query in running:
+                if query.interrupt_reason is not None:
+                    continue
+                if now >= query.deadline:
+                    reasons[query] = "exceeded its deadline"
+                elif query.is_disconnected is not None and query.is_disconnected():
+                    reasons[query] = "was abandoned by its client"
+            if reasons:
+                self._interrupt_if_running(reasons)
+
+    def _interrupt_if_running(self, reasons: dict[RunningQuery, str]) -> None:
+        """
+        Interrupt queries still registered, under the lock: once a tracked block ends, its
+        connection runs other queries, which a late interrupt would cancel instead.
+        """
+        with self._condition:
+            for query, reason in reasons.items():
+                if self._running.get(query.query_id) is query:
+                    query.interrupt(reason)
@@ -0,0 +1,474 @@
+"""
+Server-side cursors paging through the rows of a table view without LIMIT/OFFSET.
+
+Rows are addressed by position: their index in the scan order of the table, i.e. the
+concatenation of its Parquet files or the offsets of a Lance dataset. A page of the whole table
+is a range of positions; a filtered or sorted view is a list of positions in display order,
+computed once per view by a query reading only the filter and sort columns. Pages are then read
+by position: Parquet files prune row groups on file_row_number and Lance takes rows by offset,
+so the cost of a page does not depend on how deep it is.
+"""
+
+import bisect
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from duckdb import DuckDBPyConnection
+
+from smoosense.lance.duckdb_types import cast_table
+from smoosense.lance.lazy_dataset import LazyLanceDataset
+from smoosense.utils.blob_summary import summarize_blobs
+from smoosense.utils.column_stats import quote_literal
+from smoosense.utils.serialization import table_rows
+
+logger = logging.getLogger(__name__)
+
+POSITION_COLUMN = "__smoosense_position"
+PAGE_TABLE = "__smoosense_page"
+POSITIONS_TABLE = "__smoosense_positions"
+EXCLUDED_TABLE = "__smoosense_excluded"
+# Offset of a row in a Lance dataset, a virtual column of Lance scans
+LANCE_ROW_OFFSET = "_rowoffset"
+
+# Largest position stored as a 32-bit integer
+MAX_UINT32 = 2**32 - 1
+
+
+def _where(condition: Optional[str]) -> str:
+    return f" WHERE {condition}" if condition else ""
+
+
+def _sample_positions(
+    con: DuckDBPyConnection, positions_query: str, size: int, seed: int, exclude: set[int]
+) -> list[int]:
+    """Reservoir sample of `size` positions returned by a query, except `exclude`."""
+    con.register(EXCLUDED_TABLE, pa.table({POSITION_COLUMN: pa.array(sorted(exclude), pa.int64())}))
+    try:
+        # USING SAMPLE applies before WHERE, so the exclusion is done in a subquery
+        query = (
+            f"SELECT * FROM ({positions_query}) WHERE {POSITION_COLUMN} NOT IN "
+            f"(SELECT {POSITION_COLUMN} FROM {EXCLUDED_TABLE})"
+        )
+        sample = con.execute(
+            f"SELECT * FROM ({query}) USING SAMPLE reservoir({size} ROWS) REPEATABLE ({seed})"
+        )
+        return [int(position) for position in sample.fetch_arrow_table().column(0).to_pylist()]
+    finally:
+        con.unregister(EXCLUDED_TABLE)
+
+
+def _fetch_page(
+    con: DuckDBPyConnection, query: str
+) -> tuple[list[str], dict[int, tuple[Any, ...]]]:
+    """
+    Run a query whose first column is the position, returning the column names and the rows
+    by position, ready for JSON. BLOB columns are summarized in SQL.
+    """
+    relation = summarize_blobs(con.sql(query))
+    table = relation.arrow()
+    positions = table.column(0).to_pylist()
+    rows = table_rows(con, table.remove_column(0), relation.types[1:])
+    return table.column_names[1:], dict(zip(positions, rows))
+
+
+class ParquetRowSource:
+    """
+    Rows of one or more Parquet files, addressed by their index across the files.
+
+    Args:
+        con: DuckDB connection used to read the file footers
+        path: Path, URL or glob of the Parquet files
+    """
+
+    def __init__(self, con: DuckDBPyConnection, path: str):
+        self.path = path
+        files = con.execute(
+            f"SELECT file_name, num_rows FROM parquet_file_metadata({quote_literal(path)}) "
+            "ORDER BY file_name"
+        ).fetchall()
+        self.files: list[str] = [str(file_name) for file_name, _ in files]
+        self.offsets: list[int] = []
+        self.num_rows = 0
+        for _, num_rows in files:
+            self.offsets.append(self.num_rows)
+            self.num_rows += int(num_rows)
+
+    def positions(
+        self, con: DuckDBPyConnection, condition: Optional[str], order_by: list[str]
+    ) -> pa.Array:
+        """Positions of the rows matching `condition`, in the order given by `order_by`."""
+        order = ", ".join([*order_by, POSITION_COLUMN])
+        query = f"{self._positions_query(condition)} ORDER BY {order}"
+        return con.execute(query).fetch_arrow_table().column(0).combine_chunks()
+
+    def sample_positions(
+        self,
+        con: DuckDBPyConnection,
+        condition: Optional[str],
+        size: int,
+        seed: int,
+        exclude: set[int],
+    ) -> list[int]:
+        """Random sample of `size` positions of rows matching `condition`, except `exclude`."""
+        return _sample_positions(con, self._positions_query(condition), size, seed, exclude)
+
+    def _positions_query(self, condition: Optional[str]) -> str:
+        if len(self.files) == 1:
+            return (
+                f"SELECT file_row_number AS {POSITION_COLUMN} "
+                f"FROM read_parquet({quote_literal(self.path)}, file_row_number=true)"
+                f"{_where(condition)}"
+            )
+        offsets = ", ".join(
+            f"({quote_literal(file)}, {offset})" for file, offset in zip(self.files, self.offsets)
+        )
+        return (
+            f"SELECT file_row_number + {POSITION_COLUMN}_files.file_offset AS {POSITION_COLUMN} "
+            f"FROM read_parquet({quote_literal(self.path)}, filename=true, file_row_number=true) "
+            f"JOIN (VALUES {offsets}) AS {POSITION_COLUMN}_files(file_name, file_offset) "
+            f"ON filename = {POSITION_COLUMN}_files.file_name"
+            f"{_where(condition)}"
+        )
+
+    def blocks(self, con: DuckDBPyConnection) -> list[tuple[int, int]]:
+        """First position and number of rows of every row group, from the file footers."""
+        row_groups = con.execute(
+            "SELECT DISTINCT file_name, row_group_id, row_group_num_rows "
+            f"FROM parquet_metadata({quote_literal(self.path)}) ORDER BY file_name, row_group_id"
+        ).fetchall()
+        file_offsets = dict(zip(self.files, self.offsets))
+        blocks: list[tuple[int, int]] = []
+        start = 0
+        previous_file = None
+        for file_name, _, num_rows in row_groups:
+            if file_name != previous_file:
+                start = file_offsets[str(file_name)]
+                previous_file = file_name
+            blocks.append((start, int(num_rows)))
+            start += int(num_rows)
+        return blocks
+
+    def fetch(
+        self, con: DuckDBPyConnection, positions: list[int], condition: Optional[str] = None
+    ) -> tuple[list[str], list[tuple[Any, ...]]]:
+        """
+        Read the rows at `positions`, pruning row groups that hold none of them.
+
+        Returns:
+            Column names and the rows in the order of `positions`, only those matching
+            `condition` when given
+        """
+        by_file: dict[int, list[int]] = {}
+        for position in positions:
+            file_index = bisect.bisect_right(self.offsets, position) - 1
+            by_file.setdefault(file_index, []).append(position)
+
+        column_names: list[str] = []
+        rows: dict[int, tuple[Any, ...]] = {}
+        for file_index, file_positions in by_file.items():
+            offset = self.offsets[file_index]
+            row_numbers = ", ".join(str(position - offset) for position in sorted(file_positions))
+            column_names, file_rows = _fetch_page(
+                con,
+                f"SELECT file_row_number + {offset} AS {POSITION_COLUMN}, "
+                "* EXCLUDE (file_row_number) "
+                f"FROM read_parquet({quote_literal(self.files[file_index])}, file_row_number=true) "
+                f"WHERE file_row_number IN ({row_numbers})"
+                + (f" AND ({condition})" if condition else ""),
+            )
+            rows.update(file_rows)
+        return column_names, [rows[position] for position in positions if position in rows]
+
+
+class LanceRowSource:
+    """
+    Rows of a Lance dataset, addressed by their offset in the dataset.
+
+    Args:
+        lance_dataset: lance.LanceDataset opened at the version to page through
+        schema: DuckDB-compatible columns of the dataset
+    """
+
+    def __init__(self, lance_dataset: Any, schema: pa.Schema):
+        self.lance_dataset = lance_dataset
+        self.schema = schema
+        self.num_rows = int(lance_dataset.count_rows())
+
+    def positions(
+        self, con: DuckDBPyConnection, condition: Optional[str], order_by: list[str]
+    ) -> pa.Array:
+        """
+        Positions of the rows matching `condition`, in the order given by `order_by`.
+
+        Positions are the offsets Lance reports for the scanned rows (`_rowoffset`), so they
+        do not depend on the order in which the scan returns them.
+
+        Args:
+            con: Connection to run the query on; the dataset is registered on it meanwhile
+        """
+        order = ", ".join([*order_by, POSITION_COLUMN])
+        with self._positions_table(con):
+            query = f"{self._positions_query(condition)} ORDER BY {order}"
+            return con.execute(query).fetch_arrow_table().column(0).combine_chunks()
+
+    def sample_positions(
+        self,
+        con: DuckDBPyConnection,
+        condition: Optional[str],
+        size: int,
+        seed: int,
+        exclude: set[int],
+    ) -> list[int]:
+        """Random sample of `size` positions of rows matching `condition`, except `exclude`."""
+        with self._positions_table(con):
+            return _sample_positions(con, self._positions_query(condition), size, seed, exclude)
+
+    @contextmanager
+    def _positions_table(self, con: DuckDBPyConnection) -> Iterator[None]:
+        """Register the dataset with its row offsets as POSITIONS_TABLE, read lazily."""
+        schema = self.schema.append(pa.field(LANCE_ROW_OFFSET, pa.uint64()))
+        con.register(POSITIONS_TABLE, LazyLanceDataset(self.lance_dataset, schema))
+        try:
+            yield
+        finally:
+            con.unregister(POSITIONS_TABLE)
+
+    def _positions_query(self, condition: Optional[str]) -> str:
+        return (
+            f"SELECT {LANCE_ROW_OFFSET}::BIGINT AS {POSITION_COLUMN} FROM {POSITIONS_TABLE}"
+            f"{_where(condition)}"
+        )
+
+    def filter_positions(self, lance_filter: str) -> Optional[pa.Array]:
+        """
+        Positions of the rows matching a Lance filter, in scan order, found by Lance itself.
+
+        Lance evaluates the filter with the scalar indices of its columns and only reads the
+        row addresses of the matching rows. Row addresses are physical offsets in the
+        fragments, which are positions only as long as no row has been deleted.
+
+        Returns:
+            Positions, or None when the dataset has deleted rows
+        """
+        fragments = self.lance_dataset.get_fragments()
+        if any(fragment.metadata.deletion_file is not None for fragment in fragments):
+            return None
+        starts = [0] * (max((fragment.fragment_id for fragment in fragments), default=0) + 1)
+        start = 0
+        for fragment in fragments:
+            starts[fragment.fragment_id] = start
+            start += int(fragment.count_rows())
+        addresses = (
+            self.lance_dataset.scanner(
+                columns=[], filter=lance_filter, with_row_address=True, use_scalar_index=True
+            )
+            .to_table()
+            .column("_rowaddr")
+        )
+        fragment_ids = pc.shift_right(addresses, 32)
+        offsets = pc.bit_wise_and(addresses, 0xFFFFFFFF)
+        positions = pc.add(pc.take(pa.array(starts, pa.uint64()), fragment_ids), offsets).cast(
+            pa.int64()
+        )
+        positions = (
+            positions.combine_chunks() if isinstance(positions, pa.ChunkedArray) else positions
+        )
+        return pc.take(positions, pc.sort_indices(positions))
+
+    def blocks(self, con: DuckDBPyConnection) -> list[tuple[int, int]]:
+        """First position and number of rows of every fragment of the dataset."""
+        blocks: list[tuple[int, int]] = []
+        start = 0
+        for fragment in self.lance_dataset.get_fragments():
+            num_rows = int(fragment.count_rows())
+            blocks.append((start, num_rows))
+            start += num_rows
+        return blocks
+
+    def fetch(
+        self, con: DuckDBPyConnection, positions: list[int], condition: Optional[str] = None
+    ) -> tuple[list[str], list[tuple[Any, ...]]]:
+        """
+        Take the rows at `positions` from the dataset, converted to values as DuckDB reads them.
+
+        Returns:
+            Column names and the rows in the order of `positions`, only those matching
+            `condition` when given
+        """
+        if not positions:
+            return list(self.schema.names), []
+        unique_positions = sorted(set(positions))
+        table = cast_table(self.lance_dataset.take(unique_positions, columns=self.schema.names))
+        table = table.add_column(0, POSITION_COLUMN, pa.array(unique_positions, pa.int64()))
+        con.register(PAGE_TABLE, table)
+        try:
+            column_names, rows = _fetch_page(con, f"SELECT * FROM {PAGE_TABLE}{_where(condition)}")
+        finally:
+            con.unregister(PAGE_TABLE)
+        return column_names, [rows[position] for position in positions if position in rows]
+
+
+RowSource = Union[ParquetRowSource, LanceRowSource]
+
+
+class RowCursor:
+    """
+    Display order of the rows of one view (table, filter and sorting) of a table.
+
+    Args:
+        view_key: Identifies the view and the version of the table it was built on
+        source: Table the rows are read from
+        positions: Positions of the rows of the view in display order, or None when the view is
+            the whole table in scan order. They are kept as 32-bit integers when the table is
+            small enough, which halves the memory of the cursor.
+    """
+
+    def __init__(self, view_key: str, source: RowSource, positions: Optional[pa.Array] = None):
+        self.cursor_id = str(uuid.uuid4())
+        self.view_key = view_key
+        self.source = source
+        if positions is not None and source.num_rows <= MAX_UINT32 + 1:
+            positions = positions.cast(pa.uint32())
+        self.positions = positions
+        self.num_rows: int = len(positions) if positions is not None else source.num_rows
+        self.nbytes: int = positions.nbytes if positions is not None else 0
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.pages = 0
+
+    def page_positions(self, offset: int, limit: int) -> list[int]:
+        end = min(offset + limit, self.num_rows)
+        if offset >= end:
+            return []
+        if self.positions is None:
+            return list(range(offset, end))
+        return [int(p) for p in self.positions.slice(offset, end - offset).to_pylist()]
+
+    def fetch_page(
+        self, con: DuckDBPyConnection, offset: int, limit: int
+    ) -> tuple[list[str], list[tuple[Any, ...]]]:
+        """
+        Read `limit` rows of the view starting at `offset`.
+
+        Args:
+            con: Any DuckDB connection; the source reads the table by itself
+        """
+        self.pages += 1
+        return self.source.fetch(con, self.page_positions(offset, limit))
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "cursor_id": self.cursor_id,
+            "num_rows": self.num_rows,
+            "nbytes": self.nbytes,
+            "strategy": self.strategy,
+            "created_at": self.created_at,
+            "last_access": self.last_access,
+            "pages": self.pages,
+        }
+
+    @property
+    def strategy(self) -> str:
+        """'scan' when pages are ranges of the table, 'positions' for filtered or sorted views."""
+        return "scan" if self.positions is None else "positions"
+
+
+class RowCursorStore:
+    """
+    Cursors of the row viewer sessions, bounded by the size of their position lists.
+
+    Least recently used cursors are evicted first. A cursor is only returned for the view it was
+    built for; a session changing its filter or sorting, or a table changing on disk, gets a new
+    cursor. Views whose position list exceeds the whole budget are remembered, so that their
+    pages are read with LIMIT/OFFSET instead of computing the positions again for every page.
+
+    Args:
+        max_bytes: Maximum total size of the position lists of the cursors
+        max_entries: Maximum number of cursors
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 1000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._cursors: OrderedDict[str, RowCursor] = OrderedDict()
+        # View keys of the views too large to keep a cursor of, least recently added first
+        self._oversized: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, cursor_id: Optional[str], view_key: str) -> Optional[RowCursor]:
+        with self._lock:
+            cursor = self._cursors.get(cursor_id) if cursor_id else None
+            if cursor is None or cursor.view_key != view_key:
+                self._misses += 1
+                if cursor is not None:
+                    self._remove(cursor.cursor_id)
+                return None
+            self._hits += 1
+            self._cursors.move_to_end(cursor.cursor_id)
+            cursor.last_access = time.time()
+            return cursor
+
+    def is_oversized(self, view_key: str) -> bool:
+        """Whether a cursor of the view was too large to be kept."""
+        with self._lock:
+            return view_key in self._oversized
+
+    def put(self, cursor: RowCursor) -> bool:
+        """
+        Store a cursor; cursors larger than the whole budget are used once and not kept.
+
+        Returns:
+            Whether the cursor was kept
+        """
+        if cursor.nbytes > self.max_bytes:
+            logger.debug(f"Not keeping row cursor of {cursor.nbytes} bytes, over budget")
+            with self._lock:
+                self._oversized[cursor.view_key] = None
+                while len(self._oversized) > self.max_entries:
+                    self._oversized.popitem(last=False)
+            return False
+        with self._lock:
+            self._cursors[cursor.cursor_id] = cursor
+            self._total_bytes += cursor.nbytes
+            while self._cursors and (
+                self._total_bytes > self.max_bytes or len(self._cursors) > self.max_entries
+            ):
+                cursor_id = next(iter(self._cursors))
+                self._remove(cursor_id)
+                self._evictions += 1
+        return True
+
+    def drop(self, cursor_id: str) -> bool:
+        with self._lock:
+            return self._remove(cursor_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._cursors),
+                "oversized": len(self._oversized),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, cursor_id: str) -> bool:
+        cursor = self._cursors.pop(cursor_id, None)
+        if cursor is None:
+            return False
+        self._total_bytes -= cursor.nbytes
+        return True
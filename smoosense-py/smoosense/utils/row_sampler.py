@@ -0,0 +1,154 @@
+"""
+Random samples of table rows without sorting the table by random().
+
+Samples are drawn from a few randomly chosen blocks (Parquet row groups or Lance fragments),
+weighted by their number of rows, and only the sampled rows are read. With a filter, more
+candidates than needed are drawn and the draw is repeated, sized by the fraction of candidates
+that matched so far; only when that fails does the sampler draw a reservoir sample of the
+positions of all matching rows in DuckDB, which reads the filter columns but not the rest of
+the table.
+"""
+
+import logging
+import math
+import random
+from typing import Any, Optional
+
+from duckdb import DuckDBPyConnection
+
+from smoosense.utils.row_cursor import RowSource
+
+logger = logging.getLogger(__name__)
+
+# Blocks a sample is drawn from on each attempt; fewer blocks read less data, more are closer
+# to a uniform sample of the whole table
+MAX_BLOCKS_PER_ATTEMPT = 8
+MAX_ATTEMPTS = 4
+# Most candidate rows read by one attempt, whatever the selectivity of the filter
+MAX_CANDIDATES_PER_ATTEMPT = 100_000
+# Lowest fraction of matching rows assumed when sizing an attempt
+MIN_SELECTIVITY = 0.001
+
+
+class RowSample:
+    def __init__(
+        self,
+        column_names: list[str],
+        rows: list[tuple[Any, ...]],
+        seed: int,
+        attempts: int,
+        candidates: int,
+        exhaustive: bool,
+    ):
+        self.column_names = column_names
+        self.rows = rows
+        self.seed = seed
+        self.attempts = attempts
+        self.candidates = candidates
+        self.exhaustive = exhaustive
+
+
+class _BlockSampler:
+    """Draw fresh positions from random blocks, never returning a position twice."""
+
+    def __init__(self, blocks: list[tuple[int, int]], rng: random.Random):
+        self.rng = rng
+        self.blocks = [(start, num_rows) for start, num_rows in blocks if num_rows > 0]
+        self.drawn: dict[int, set[int]] = {}
+        self.remaining = sum(num_rows for _, num_rows in self.blocks)
+
+    def draw(self, count: int) -> list[int]:
+        # Weighted order of the blocks without replacement (Efraimidis-Spirakis)
+        order = sorted(
+            range(len(self.blocks)),
+            key=lambda i: self.rng.random() ** (1.0 / self.blocks[i][1]),
+            reverse=True,
+        )
+        per_block = max(1, math.ceil(count / min(MAX_BLOCKS_PER_ATTEMPT, len(self.blocks) or 1)))
+        positions: list[int] = []
+        for block_index in order:
+            if len(positions) >= count:
+                break
+            start, num_rows = self.blocks[block_index]
+            drawn = self.drawn.setdefault(block_index, set())
+            wanted = min(per_block, count - len(positions), num_rows - len(drawn))
+            if wanted <= 0:
+                continue
+            sampled = self.rng.sample(range(num_rows), min(num_rows, wanted + len(drawn)))
+            fresh = [offset for offset in sampled if offset not in drawn][:wanted]
+            drawn.update(fresh)
+            positions.extend(start + offset for offset in fresh)
+        self.remaining -= len(positions)
+        return positions
+
+    def drawn_positions(self) -> set[int]:
+        return {
+            self.blocks[block_index][0] + offset
+            for block_index, offsets in self.drawn.items()
+            for offset in offsets
+        }
+
+
+def sample_rows(
+    con: DuckDBPyConnection,
+    source: RowSource,
+    size: int,
+    seed: Optional[int] = None,
+    condition: Optional[str] = None,
+) -> RowSample:
+    """
+    Draw a random sample of the rows of a table.
+
+    Args:
+        con: DuckDB connection to read the rows with
+        source: Table to sample
+        size: Number of rows to sample
+        seed: Seed of the sample; the same seed gives the same rows for the same table version
+        condition: SQL condition the sampled rows must match
+
+    Returns:
+        Sampled rows in random order; fewer than `size` only if fewer rows match
+    """
+    if seed is None:
+        seed = random.randrange(2**31)
+    rng = random.Random(seed)
+    sampler = _BlockSampler(source.blocks(con), rng)
+
+    column_names: list[str] = []
+    rows: list[tuple[Any, ...]] = []
+    candidates = 0
+    matches = 0
+    attempts = 0
+    while len(rows) < size and sampler.remaining > 0 and attempts < MAX_ATTEMPTS:
+        attempts += 1
+        needed = size - len(rows)
+        if condition and candidates:
+            selectivity = max(matches / candidates, MIN_SELECTIVITY)
+            count = math.ceil(needed / selectivity * 1.2)
+        else:
+            # Without any match ratio yet, oversample twice when filtering
+            count = needed * 2 if condition else needed
+        positions = sampler.draw(min(count, MAX_CANDIDATES_PER_ATTEMPT))
+        candidates += len(positions)
+        column_names, matched = source.fetch(con, positions, condition)
+        matches += len(matched)
+        rows.extend(matched[:needed])
+
+    exhaustive = False
+    if len(rows) < size and sampler.remaining > 0:
+        logger.debug(
+            f"Sampled {len(rows)} of {size} rows from {candidates} candidates, "
+            "sampling the positions of all matching rows"
+        )
+        exhaustive = True
+        positions = source.sample_positions(
+            con, condition, size - len(rows), seed, sampler.drawn_positions()
+        )
+        column_names, matched = source.fetch(con, positions)
+        rows.extend(matched)
+
+    if not column_names:
+        column_names, _ = source.fetch(con, [])
+    # Rows come grouped by block
+    rng.shuffle(rows)
+    return RowSample(column_names, rows, seed, attempts, candidates, exhaustive)
@@ -1,9 +1,20 @@
+import io
 import logging
 import math
-from typing import Any
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from duckdb import DuckDBPyConnection
+from duckdb.typing import DuckDBPyType
 
 logger = logging.getLogger(__name__)
 
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MIMETYPE = "application/x-ndjson"
+ARROW_COMPRESSIONS = ("lz4", "zstd")
+
 
 def serialize(obj: Any) -> Any:
     if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
@@ -15,3 +26,223 @@ def serialize(obj: Any) -> Any:
     elif isinstance(obj, bytes):
         return f"Bytes {len(obj)}"
     return obj
+
+
+def table_rows(
+    con: DuckDBPyConnection,
+    table: Union[pa.Table, pa.RecordBatch],
+    types: Optional[Sequence[DuckDBPyType]] = None,
+) -> list[tuple[Any, ...]]:
+    """
+    Rows of an Arrow result as Python values ready for JSON, the vectorized counterpart of
+    `serialize(result.fetchall())`.
+
+    Columns are sanitized with Arrow compute kernels (see `sanitize_array`), then converted
+    to Python by DuckDB, which is faster at it than pyarrow for nested types and returns the
+    same values as `fetchall()`, e.g. dicts for maps.
+
+    Args:
+        con: Connection to convert the rows with; must not have a result being streamed
+        table: Result to convert
+        types: DuckDB types of the columns of the result, to tell HUGEINT values from
+            DECIMAL values; without them, all decimals are kept as they are
+    """
+    if table.num_columns == 0:
+        return []
+    column_types: list[Optional[DuckDBPyType]] = (
+        list(types) if types is not None else [None] * table.num_columns
+    )
+    columns = [
+        sanitize_array(column, column_type)
+        for column, column_type in zip(table.columns, column_types)
+    ]
+    names = [f"c{i}" for i in range(len(columns))]
+    return con.from_arrow(pa.table(columns, names=names)).fetchall()
+
+
+def sanitize_array(
+    array: Union[pa.Array, pa.ChunkedArray],
+    duckdb_type: Optional[DuckDBPyType] = None,
+) -> Union[pa.Array, pa.ChunkedArray]:
+    """
+    Make an Arrow array JSON-friendly, like `serialize` does for Python values.
+
+    - NaN and infinite floats become null
+    - Binary values become "Bytes <length>"
+    - Nanosecond timestamps, times and durations are truncated to microseconds, as DuckDB
+      returns them to Python
+    - HUGEINT values, e.g. the SUM of a BIGINT column, become integers when they fit, as
+      `fetchall()` returns them. DuckDB exports them as DECIMAL(38, 0), so only the DuckDB
+      type of the column, `duckdb_type`, tells them apart from DECIMAL values.
+
+    Structs, lists, maps and dictionaries are sanitized recursively. Arrays without any of these
+    types are returned as is.
+    """
+    if not _needs_sanitizing(array.type, duckdb_type):
+        return array
+    if isinstance(array, pa.ChunkedArray):
+        if array.num_chunks == 0:
+            empty = _sanitize(pa.array([], array.type), duckdb_type)
+            return pa.chunked_array([], empty.type)
+        return pa.chunked_array([_sanitize(chunk, duckdb_type) for chunk in array.chunks])
+    return _sanitize(array, duckdb_type)
+
+
+def _child_type(duckdb_type: Optional[DuckDBPyType], index: int) -> Optional[DuckDBPyType]:
+    """DuckDB type of a child of a nested type: a struct field, a list element, a map key/value."""
+    if duckdb_type is None or duckdb_type.id not in ("struct", "list", "array", "map"):
+        return None
+    return duckdb_type.children[index][1]  # type: ignore[no-any-return]
+
+
+def _is_hugeint(duckdb_type: Optional[DuckDBPyType]) -> bool:
+    return duckdb_type is not None and duckdb_type.id in ("hugeint", "uhugeint")
+
+
+def _needs_sanitizing(data_type: pa.DataType, duckdb_type: Optional[DuckDBPyType]) -> bool:
+    if (
+        pa.types.is_floating(data_type)
+        or pa.types.is_binary(data_type)
+        or pa.types.is_large_binary(data_type)
+        or pa.types.is_fixed_size_binary(data_type)
+    ):
+        return True
+    if pa.types.is_decimal(data_type):
+        return _is_hugeint(duckdb_type)
+    if pa.types.is_timestamp(data_type) or pa.types.is_time64(data_type):
+        return data_type.unit == "ns"  # type: ignore[no-any-return]
+    if pa.types.is_duration(data_type):
+        return data_type.unit == "ns"  # type: ignore[no-any-return]
+    if pa.types.is_struct(data_type):
+        return any(
+            _needs_sanitizing(field.type, _child_type(duckdb_type, i))
+            for i, field in enumerate(data_type)
+        )
+    if pa.types.is_map(data_type):
+        return _needs_sanitizing(data_type.key_type, _child_type(duckdb_type, 0)) or (
+            _needs_sanitizing(data_type.item_type, _child_type(duckdb_type, 1))
+        )
+    if (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    ):
+        return _needs_sanitizing(data_type.value_type, _child_type(duckdb_type, 0))
+    if pa.types.is_dictionary(data_type):
+        return _needs_sanitizing(data_type.value_type, None)
+    return False
+
+
+def _sanitize(array: pa.Array, duckdb_type: Optional[DuckDBPyType]) -> pa.Array:
+    data_type = array.type
+    if not _needs_sanitizing(data_type, duckdb_type):
+        return array
+    if pa.types.is_floating(data_type):
+        if pa.types.is_float16(data_type):
+            array = array.cast(pa.float32())
+        return pc.if_else(pc.is_finite(array), array, pa.scalar(None, array.type))
+    if pa.types.is_fixed_size_binary(data_type):
+        return _sanitize(array.cast(pa.binary()), None)
+    if pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+        lengths = pc.binary_length(array).cast(pa.string())
+        return pc.binary_join_element_wise("Bytes ", lengths, "")
+    if pa.types.is_decimal(data_type):
+        try:
+            return array.cast(pa.int64())
+        except pa.ArrowInvalid:
+            return array
+    if pa.types.is_timestamp(data_type):
+        return array.cast(pa.timestamp("us", data_type.tz), safe=False)
+    if pa.types.is_time64(data_type):
+        return array.cast(pa.time64("us"), safe=False)
+    if pa.types.is_duration(data_type):
+        return array.cast(pa.duration("us"), safe=False)
+    if pa.types.is_dictionary(data_type):
+        return pa.DictionaryArray.from_arrays(array.indices, _sanitize(array.dictionary, None))
+
+    mask = array.is_null() if array.null_count else None
+    if pa.types.is_struct(data_type):
+        children = [
+            _sanitize(child, _child_type(duckdb_type, i)) for i, child in enumerate(array.flatten())
+        ]
+        return pa.StructArray.from_arrays(children, fields=_fields(data_type, children), mask=mask)
+    element_type = _child_type(duckdb_type, 0)
+    if pa.types.is_fixed_size_list(data_type):
+        size = data_type.list_size
+        values = array.values.slice(array.offset * size, len(array) * size)
+        return pa.FixedSizeListArray.from_arrays(_sanitize(values, element_type), size, mask=mask)
+    offsets, values = _list_parts(array)
+    if pa.types.is_map(data_type):
+        keys = _sanitize(values.field(0), element_type)
+        items = _sanitize(values.field(1), _child_type(duckdb_type, 1))
+        return pa.MapArray.from_arrays(offsets, keys, items, mask=mask)
+    list_class = pa.LargeListArray if pa.types.is_large_list(data_type) else pa.ListArray
+    return list_class.from_arrays(offsets, _sanitize(values, element_type), mask=mask)
+
+
+def _list_parts(array: pa.Array) -> tuple[pa.Array, pa.Array]:
+    """Offsets and values of a list array, rebased when the array is a slice."""
+    offsets = array.offsets
+    if array.offset == 0:
+        return offsets, array.values
+    # Offsets of a slice still point into the values of the whole array
+    start = offsets[0].as_py()
+    end = offsets[-1].as_py()
+    return pc.subtract(offsets, start).cast(offsets.type), array.values.slice(start, end - start)
+
+
+def _fields(data_type: pa.StructType, children: list[pa.Array]) -> list[pa.Field]:
+    return [
+        pa.field(field.name, child.type, field.nullable)
+        for field, child in zip(data_type, children)
+    ]
+
+
+def stream_arrow_ipc(
+    schema: pa.Schema, batches: Iterable[pa.RecordBatch], compression: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Serialize record batches as an Arrow IPC stream, one batch at a time.
+
+    Args:
+        schema: Schema of the batches
+        batches: Record batches to serialize, consumed lazily
+        compression: Optional buffer compression, one of ARROW_COMPRESSIONS
+
+    Yields:
+        Bytes of the IPC stream as they are written: the schema message with the first
+        batch, then a message per batch, and the end-of-stream marker last
+    """
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since it was last drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
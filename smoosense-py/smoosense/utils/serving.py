@@ -0,0 +1,138 @@
+"""
+Production serving of the SmooSense WSGI app.
+
+Requests are handled by a bounded pool of threads in a single process. SIGTERM and SIGINT
+stop accepting new connections and let in-flight requests finish before exiting.
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, select_address_family
+
+logger = logging.getLogger(__name__)
+
+
+def default_thread_count() -> int:
+    """Same default as concurrent.futures.ThreadPoolExecutor."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    # One request per connection, so idle keep-alive connections never pin a pool thread
+    protocol_version = "HTTP/1.0"
+
+
+class ThreadPoolWSGIServer(BaseWSGIServer):
+    """
+    werkzeug WSGI server handling requests on a bounded pool of threads.
+
+    Args:
+        host: Host to listen on
+        port: Port to listen on
+        app: WSGI application
+        threads: Number of requests handled concurrently
+        fd: File descriptor of an already listening socket to use instead of binding
+    """
+
+    multithread = True
+    daemon_threads = True
+
+    def __init__(
+        self, host: str, port: int, app: Any, threads: int, fd: Optional[int] = None
+    ) -> None:
+        super().__init__(host, port, app, handler=PooledRequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="smoosense-request"
+        )
+        self._in_flight = 0
+        self._in_flight_condition = threading.Condition()
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        with self._in_flight_condition:
+            self._in_flight += 1
+        self.executor.submit(self._process_request_in_thread, request, client_address)
+
+    def _process_request_in_thread(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._in_flight_condition:
+                self._in_flight -= 1
+                self._in_flight_condition.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Wait for in-flight requests to finish.
+
+        Returns:
+            True if all requests finished within the timeout
+        """
+        with self._in_flight_condition:
+            finished = self._in_flight_condition.wait_for(lambda: self._in_flight == 0, timeout)
+        self.executor.shutdown(wait=finished)
+        return finished
+
+
+def _listen(host: str, port: int) -> socket.socket:
+    family = select_address_family(host, port)
+    return socket.create_server((host, port), family=family, backlog=1024)
+
+
+def _install_stop_handlers(stop: Callable[[], None]) -> None:
+    """Call `stop` on SIGTERM/SIGINT. Signal handlers can only be set from the main thread."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def handler(signum: int, frame: Optional[FrameType]) -> None:
+        logger.info(f"Received signal {signum}, shutting down gracefully")
+        stop()
+
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def serve(
+    app: Any,
+    *,
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    threads: Optional[int] = None,
+    shutdown_timeout: float = 30.0,
+) -> None:
+    """
+    Serve a WSGI app on a bounded thread pool until SIGTERM/SIGINT, then drain.
+
+    Args:
+        app: WSGI application
+        host: Host to listen on
+        port: Port to listen on
+        threads: Number of requests handled concurrently
+        shutdown_timeout: Seconds to let in-flight requests finish on shutdown
+    """
+    threads = threads or default_thread_count()
+    listener = _listen(host, port)
+    logger.info(f"Serving on {host}:{port} with {threads} thread(s)")
+    try:
+        server = ThreadPoolWSGIServer(host, port, app, threads, fd=listener.fileno())
+        # shutdown() waits for serve_forever() to return, so it must not run on the serving thread
+        _install_stop_handlers(
+            lambda: threading.Thread(target=server.shutdown, daemon=True).start()
+        )
+        try:
+            server.serve_forever()
+        finally:
+            if not server.drain(shutdown_timeout):
+                logger.warning(f"Requests still running after {shutdown_timeout}s, exiting anyway")
+            server.server_close()
+    finally:
+        listener.close()
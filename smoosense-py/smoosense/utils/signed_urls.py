@@ -0,0 +1,170 @@
+"""
+Cache of presigned S3 URLs.
+
+Galleries and tables ask for the same media URLs on every render, and signing each of them
+again costs CPU time and, worse, yields a new URL every time, so browsers download the same
+object again under a new signature. A signed URL is reused until it is about to expire, which
+keeps it stable for browser caches, and only the URLs missing from the cache are signed.
+
+Signing is CPU-bound and holds the GIL, so batches are signed in the calling thread.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from botocore.client import BaseClient
+
+from smoosense.utils.s3_fs import S3FileSystem
+
+logger = logging.getLogger(__name__)
+
+# Seconds a signed URL is valid for
+DEFAULT_EXPIRES_IN = 3600
+
+# Signed URLs expiring sooner than this are signed again, so that pages using them keep working
+DEFAULT_MIN_REMAINING = 600
+
+# Signed URL and the time it expires at, in seconds since the epoch
+SignedUrl = tuple[str, float]
+
+
+def needs_signing(url: str) -> bool:
+    """Whether the value is the S3 URL of an object, which browsers cannot fetch as is."""
+    return url.startswith("s3://") and url[len("s3://") :].split("/", 1)[0] != ""
+
+
+def object_urls(rows: Iterable[Iterable[Any]], limit: int) -> list[str]:
+    """
+    Distinct S3 URLs among the cells of rows, and in lists of strings in the cells.
+
+    Args:
+        rows: Rows of cell values
+        limit: Maximum number of URLs returned; further URLs are left out
+    """
+    urls: dict[str, None] = {}
+    for row in rows:
+        for cell in row:
+            for value in cell if isinstance(cell, list) else [cell]:
+                if isinstance(value, str) and needs_signing(value):
+                    urls[value] = None
+                    if len(urls) >= limit:
+                        return list(urls)
+    return list(urls)
+
+
+class SignedUrlCache:
+    """
+    Thread-safe LRU cache of presigned GET URLs, reused until they are about to expire.
+
+    Args:
+        s3_client: Client signing the URLs
+        max_entries: Maximum number of cached URLs
+        expires_in: Seconds a signed URL is valid for
+        min_remaining: Signed URLs valid for fewer seconds than this are signed again
+    """
+
+    def __init__(
+        self,
+        s3_client: BaseClient,
+        max_entries: int = 100_000,
+        expires_in: int = DEFAULT_EXPIRES_IN,
+        min_remaining: int = DEFAULT_MIN_REMAINING,
+    ):
+        if not 0 <= min_remaining < expires_in:
+            raise ValueError("min_remaining must be between 0 and expires_in")
+        self.s3_fs = S3FileSystem(s3_client)
+        self.max_entries = max_entries
+        self.expires_in = expires_in
+        self.min_remaining = min_remaining
+        self._entries: OrderedDict[str, SignedUrl] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._errors = 0
+
+    def sign(self, url: str) -> SignedUrl:
+        """
+        Signed URL of an object, from the cache while it is valid for long enough.
+
+        Values other than S3 URLs, and URLs that cannot be signed, are returned as is and
+        never expire.
+        """
+        return self.sign_many([url])[url]
+
+    def sign_many(self, urls: Iterable[str]) -> dict[str, SignedUrl]:
+        """
+        Signed URLs of a batch of objects, signing each distinct URL missing from the cache once.
+
+        A URL that cannot be signed, e.g. with an invalid bucket name, is returned as is, so that
+        it does not fail the whole batch.
+        """
+        now = time.time()
+        signed: dict[str, SignedUrl] = {}
+        missing: list[str] = []
+        with self._lock:
+            for url in dict.fromkeys(urls):
+                if not needs_signing(url):
+                    signed[url] = (url, float("inf"))
+                    continue
+                entry = self._entries.get(url)
+                if entry is not None and entry[1] - now > self.min_remaining:
+                    self._entries.move_to_end(url)
+                    self._hits += 1
+                    signed[url] = entry
+                    continue
+                if entry is not None:
+                    self._expired += 1
+                self._misses += 1
+                missing.append(url)
+
+        failed: set[str] = set()
+        for url in missing:
+            # Taken before signing, the signature is valid at least until then
+            expires_at = time.time() + self.expires_in
+            try:
+                signed_url = self.s3_fs.sign_get_url(url, expires_in=self.expires_in)
+            except Exception as e:
+                logger.warning(f"Cannot sign {url}: {e}")
+                failed.add(url)
+                signed[url] = (url, float("inf"))
+                continue
+            signed[url] = (signed_url, expires_at)
+        if failed:
+            with self._lock:
+                self._errors += len(failed)
+            missing = [url for url in missing if url not in failed]
+
+        if missing and self.max_entries > 0:
+            with self._lock:
+                for url in missing:
+                    self._entries[url] = signed[url]
+                    self._entries.move_to_end(url)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return signed
+
+    def max_age(self, expires_at: float) -> Optional[int]:
+        """Seconds a response handing out a signed URL may be cached, None if it never expires."""
+        if expires_at == float("inf"):
+            return None
+        return max(0, int(expires_at - time.time()) - self.min_remaining)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "errors": self._errors,
+            }
@@ -0,0 +1,174 @@
+"""
+Thumbnails of images for gallery tiles and table cells.
+
+Galleries render tiles of 100-200 pixels, yet full-resolution images weigh megabytes. Images are
+decoded, downscaled and re-encoded as WebP or JPEG in a pool of worker processes, so that
+decoding does not hold the GIL of the server, and the thumbnails are kept in a MediaCache under
+the fingerprint of their source, their size and their format. A source that has not changed is
+never decoded twice.
+
+Pillow is an optional dependency: pip install "smoosense[media]".
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from smoosense.utils.media_cache import CachedMedia, MediaCache, OriginObject
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+MIN_THUMBNAIL_SIZE = 16
+MAX_THUMBNAIL_SIZE = 1024
+THUMBNAIL_QUALITY = 80
+
+# Larger sources are not decoded
+MAX_SOURCE_BYTES = 64 * 1024 * 1024
+
+# Worker processes decoding images, unless specified
+DEFAULT_THUMBNAIL_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def default_thumbnail_cache_dir() -> str:
+    return str(Path.home() / ".smoosense" / "thumbnails")
+
+
+def render_thumbnail(
+    data: bytes, size: int, image_format: str, quality: int = THUMBNAIL_QUALITY
+) -> bytes:
+    """
+    Downscale an image to fit in a square of `size` pixels and encode it.
+
+    Runs in the worker processes of a Thumbnailer. Images smaller than `size` keep their size,
+    animated images their first frame. EXIF orientation is applied.
+
+    Args:
+        data: Encoded image, in any format Pillow reads
+        size: Maximum width and height of the thumbnail
+        image_format: "webp" or "jpeg"
+        quality: Encoder quality, from 1 to 100
+
+    Raises:
+        ValueError: If the data is not an image Pillow can decode
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEG images are decoded at the smallest scale still larger than the thumbnail
+            image.draft("RGB", (size, size))
+            thumbnail = ImageOps.exif_transpose(image) or image
+            thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError) as e:
+        raise ValueError(f"Cannot decode image: {e}") from e
+
+    has_alpha = thumbnail.mode in ("RGBA", "LA") or "transparency" in thumbnail.info
+    if image_format == "jpeg":
+        if has_alpha:
+            background = Image.new("RGB", thumbnail.size, "white")
+            background.paste(thumbnail.convert("RGBA"), mask=thumbnail.convert("RGBA"))
+            thumbnail = background
+        else:
+            thumbnail = thumbnail.convert("RGB")
+    elif thumbnail.mode not in ("RGB", "RGBA"):
+        thumbnail = thumbnail.convert("RGBA" if has_alpha else "RGB")
+
+    output = io.BytesIO()
+    thumbnail.save(output, format=image_format.upper(), quality=quality)
+    return output.getvalue()
+
+
+class Thumbnailer:
+    """
+    Renders thumbnails in a pool of worker processes, caching them on disk.
+
+    Args:
+        cache_dir: Directory of the cache, ~/.smoosense/thumbnails by default
+        max_bytes: Maximum total size of the cached thumbnails
+        max_workers: Number of worker processes, started on the first thumbnail
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_workers: int = DEFAULT_THUMBNAIL_WORKERS,
+    ):
+        # Thumbnails are keyed by the fingerprint of their source, so they never go stale
+        self.cache = MediaCache(
+            cache_dir=cache_dir or default_thumbnail_cache_dir(),
+            max_bytes=max_bytes,
+            revalidate_after=float("inf"),
+        )
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def thumbnail(
+        self,
+        fingerprint: str,
+        read_source: Callable[[], bytes],
+        size: int,
+        image_format: str,
+    ) -> tuple[CachedMedia, str]:
+        """
+        Cached thumbnail of an image, rendered if needed.
+
+        Args:
+            fingerprint: Identifies the source and changes whenever the source does
+            read_source: Reads the encoded source image, only called to render the thumbnail
+            size: Maximum width and height of the thumbnail
+            image_format: "webp" or "jpeg"
+
+        Returns:
+            The cache entry of the thumbnail, and whether it was a "hit" or a "miss"
+
+        Raises:
+            ValueError: If the size or format is not supported, or the source is not an image
+        """
+        if image_format not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unsupported thumbnail format: {image_format}")
+        if not MIN_THUMBNAIL_SIZE <= size <= MAX_THUMBNAIL_SIZE:
+            raise ValueError(
+                f"Thumbnail size must be between {MIN_THUMBNAIL_SIZE} and {MAX_THUMBNAIL_SIZE}"
+            )
+
+        def fetch(etag: Optional[str]) -> OriginObject:
+            data = read_source()
+            if len(data) > MAX_SOURCE_BYTES:
+                raise ValueError(f"Image of {len(data)} bytes is too large for a thumbnail")
+            rendered = self._executor().submit(render_thumbnail, data, size, image_format).result()
+            return OriginObject(
+                iter([rendered]),
+                etag=f'"{hashlib.sha256(rendered).hexdigest()[:32]}"',
+                content_type=THUMBNAIL_FORMATS[image_format],
+                size=len(rendered),
+            )
+
+        key = f"thumbnail:{image_format}:{size}:{fingerprint}"
+        entry, status = self.cache.get(key, fetch)
+        if entry is None:
+            raise ValueError(f"Thumbnail of {fingerprint} is too large to cache")
+        return entry, status
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a server running DuckDB and request threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
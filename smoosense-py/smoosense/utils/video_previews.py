@@ -0,0 +1,402 @@
+"""
+Poster frames and sprite sheets of videos, for instant previews and hover-scrubbing in galleries.
+
+Showing a frame of a video in a browser means loading the video. Instead, a pool of threads
+decodes a few keyframes of each video: the poster frame and a strip of evenly spaced tiles,
+with a JSON description of the tiles. Only keyframes are decoded, and the decoder seeks to them,
+so that S3 and HTTP videos are read by byte ranges: the index of the container and the
+keyframes, rather than the whole file. Previews are kept in a MediaCache under the fingerprint of
+their video.
+
+PyAV and Pillow are optional dependencies: pip install "smoosense[media]".
+"""
+
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+from urllib.parse import urlparse
+
+import requests
+from botocore.exceptions import ClientError
+
+from smoosense.utils.media_cache import CachedMedia, MediaCache, OriginObject
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_KINDS = {"poster": "image/jpeg", "sprite": "image/jpeg", "info": "application/json"}
+SPRITE_TILES = 10
+SPRITE_TILE_WIDTH = 160
+POSTER_WIDTH = 640
+JPEG_QUALITY = 80
+
+# Remote videos are read by blocks of this size, the last few of them kept in memory
+RANGE_BLOCK_SIZE = 1024 * 1024
+MAX_CACHED_BLOCKS = 16
+
+# Videos decoded at the same time, unless specified
+DEFAULT_VIDEO_PREVIEW_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def default_video_preview_dir() -> str:
+    return str(Path.home() / ".smoosense" / "video-previews")
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Seekable file reading a remote object by byte ranges, as the decoder seeks in it.
+
+    Args:
+        size: Size of the object in bytes
+        read_range: Reads the bytes from start (inclusive) to stop (exclusive) of the object
+        block_size: Size of the ranges requested
+    """
+
+    def __init__(
+        self,
+        size: int,
+        read_range: Callable[[int, int], bytes],
+        block_size: int = RANGE_BLOCK_SIZE,
+    ):
+        super().__init__()
+        self.size = size
+        self.read_range = read_range
+        self.block_size = block_size
+        self.bytes_read = 0
+        self._position = 0
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return self._position
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast("B")
+        if self._position >= self.size or len(view) == 0:
+            return 0
+        index, start = divmod(self._position, self.block_size)
+        block = self._block(index)
+        count = min(len(view), len(block) - start)
+        view[:count] = block[start : start + count]
+        self._position += count
+        return count
+
+    def _block(self, index: int) -> bytes:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        start = index * self.block_size
+        block = self.read_range(start, min(start + self.block_size, self.size))
+        self.bytes_read += len(block)
+        self._blocks[index] = block
+        if len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+
+class VideoSource:
+    """
+    A video and how to read it, without any I/O until a preview is made.
+
+    Args:
+        url: Local path, S3 or HTTP URL of the video
+        fingerprint: Identifies the video and changes whenever the video does
+        open: Opens the video, as a local path or a seekable file
+    """
+
+    def __init__(
+        self,
+        url: str,
+        fingerprint: Callable[[], str],
+        open: Callable[[], Union[str, io.RawIOBase]],
+    ):
+        self.url = url
+        self.fingerprint = fingerprint
+        self.open = open
+
+
+def video_source(path: str, s3_client: Any) -> VideoSource:
+    """
+    Source of a local, S3 or HTTP video. Remote videos are read by byte ranges.
+
+    Raises (when fingerprinted or opened):
+        FileNotFoundError: If the video does not exist
+        ValueError: If an HTTP server does not serve byte ranges
+    """
+    if path.startswith("s3://"):
+        return _s3_source(path, s3_client)
+    if path.startswith(("http://", "https://")):
+        return _http_source(path)
+    local_path = os.path.abspath(os.path.expanduser(path))
+
+    def fingerprint() -> str:
+        stat = os.stat(local_path)
+        return f"file:{local_path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    return VideoSource(path, fingerprint, lambda: local_path)
+
+
+def _s3_source(url: str, s3_client: Any) -> VideoSource:
+    parsed = urlparse(url)
+    bucket = parsed.netloc
+    key = parsed.path.lstrip("/")
+    head: dict[str, Any] = {}
+
+    def size_and_etag() -> tuple[int, str]:
+        if not head:
+            try:
+                head.update(s3_client.head_object(Bucket=bucket, Key=key))
+            except ClientError as e:
+                status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+                if status == 404 or e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                    raise FileNotFoundError(f"No such file: {url}") from e
+                raise
+        return int(head["ContentLength"]), str(head.get("ETag"))
+
+    def read_range(start: int, stop: int) -> bytes:
+        response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{stop - 1}")
+        return bytes(response["Body"].read())
+
+    def fingerprint() -> str:
+        size, etag = size_and_etag()
+        return f"s3:{url}:{size}:{etag}"
+
+    return VideoSource(url, fingerprint, lambda: RangeReader(size_and_etag()[0], read_range))
+
+
+def _http_source(url: str) -> VideoSource:
+    head: dict[str, str] = {}
+
+    def headers() -> dict[str, str]:
+        if not head:
+            response = requests.head(url, allow_redirects=True, timeout=30)
+            if response.status_code == 404:
+                raise FileNotFoundError(f"No such file: {url}")
+            response.raise_for_status()
+            if response.headers.get("Accept-Ranges") != "bytes":
+                raise ValueError(f"{url} is not served by byte ranges")
+            head.update(response.headers)
+        return head
+
+    def read_range(start: int, stop: int) -> bytes:
+        response = requests.get(url, headers={"Range": f"bytes={start}-{stop - 1}"}, timeout=30)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise ValueError(f"{url} is not served by byte ranges")
+        return response.content
+
+    def fingerprint() -> str:
+        h = headers()
+        version = h.get("ETag") or h.get("Last-Modified")
+        return f"http:{url}:{h.get('Content-Length')}:{version}"
+
+    return VideoSource(
+        url, fingerprint, lambda: RangeReader(int(headers()["Content-Length"]), read_range)
+    )
+
+
+def extract_previews(
+    file: Union[str, io.RawIOBase],
+    tiles: int = SPRITE_TILES,
+    tile_width: int = SPRITE_TILE_WIDTH,
+    poster_width: int = POSTER_WIDTH,
+) -> dict[str, bytes]:
+    """
+    Poster frame, sprite sheet and description of the sprite sheet of a video.
+
+    The sprite sheet is a row of `tiles` keyframes at evenly spaced times; the poster is the
+    first of them, which, unlike the first frame of the video, is rarely a black screen.
+
+    Args:
+        file: Local path or seekable file of the video
+
+    Returns:
+        Bytes of each kind of PREVIEW_KINDS
+
+    Raises:
+        ValueError: If the file has no decodable video stream
+    """
+    import av
+    from PIL import Image
+
+    try:
+        with av.open(file, "r") as container:
+            if not container.streams.video:
+                raise ValueError("No video stream")
+            stream = container.streams.video[0]
+            if stream.duration is not None and stream.time_base is not None:
+                duration = float(stream.duration * stream.time_base)
+            else:
+                duration = (container.duration or 0) / av.time_base
+            times = [duration * (i + 0.5) / tiles for i in range(tiles)] if duration > 0 else [0]
+            frames = _keyframes(container, stream, times, keyframes_only=True)
+            if not frames:
+                # Some codecs flag no frame as a keyframe
+                frames = _keyframes(container, stream, times, keyframes_only=False)
+    except av.FFmpegError as e:
+        raise ValueError(f"Cannot decode video: {e}") from e
+    if not frames:
+        raise ValueError("No frame could be decoded")
+
+    width, height = frames[0][1].size
+    tile_height = max(1, round(tile_width * height / width))
+    sprite = Image.new("RGB", (tile_width * len(frames), tile_height))
+    for i, (_, image) in enumerate(frames):
+        sprite.paste(image.convert("RGB").resize((tile_width, tile_height)), (i * tile_width, 0))
+    poster = frames[0][1].convert("RGB")
+    poster.thumbnail((poster_width, poster_width))
+
+    info = {
+        "duration": duration,
+        "width": width,
+        "height": height,
+        "tiles": len(frames),
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "timestamps": [time for time, _ in frames],
+    }
+    return {
+        "poster": _jpeg(poster),
+        "sprite": _jpeg(sprite),
+        "info": json.dumps(info).encode(),
+    }
+
+
+def _keyframes(
+    container: Any, stream: Any, times: list[float], keyframes_only: bool
+) -> list[tuple[float, Any]]:
+    """Time and image of the frame at or before each time, skipping repeated frames."""
+    stream.codec_context.skip_frame = "NONKEY" if keyframes_only else "DEFAULT"
+    start = stream.start_time or 0
+    frames: list[tuple[float, Any]] = []
+    for time in times:
+        container.seek(start + int(time / stream.time_base), stream=stream, backward=True)
+        for frame in container.decode(stream):
+            frame_time = float(frame.time) if frame.time is not None else time
+            if not frames or frame_time != frames[-1][0]:
+                frames.append((frame_time, frame.to_image()))
+            break
+    return frames
+
+
+def _jpeg(image: Any) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=JPEG_QUALITY)
+    return output.getvalue()
+
+
+class VideoPreviewer:
+    """
+    Makes previews of videos in a bounded pool of threads, caching them on disk.
+
+    Requests for a video already being previewed wait for the same preview.
+
+    Args:
+        cache_dir: Directory of the cache, ~/.smoosense/video-previews by default
+        max_bytes: Maximum total size of the cached previews
+        max_workers: Number of videos previewed at the same time
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_workers: int = DEFAULT_VIDEO_PREVIEW_WORKERS,
+    ):
+        # Previews are keyed by the fingerprint of their video, so they never go stale
+        self.cache = MediaCache(
+            cache_dir=cache_dir or default_video_preview_dir(),
+            max_bytes=max_bytes,
+            revalidate_after=float("inf"),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="video-preview"
+        )
+        self._pending: dict[str, Future[dict[str, CachedMedia]]] = {}
+        self._lock = threading.Lock()
+
+    def preview(self, source: VideoSource, kind: str) -> CachedMedia:
+        """
+        Cached preview of a video, made if needed.
+
+        Args:
+            source: The video
+            kind: One of PREVIEW_KINDS
+
+        Raises:
+            ValueError: If the kind is unknown or the video cannot be decoded
+        """
+        if kind not in PREVIEW_KINDS:
+            raise ValueError(f"Unknown preview kind: {kind}")
+        return self.submit(source).result()[kind]
+
+    def submit(self, source: VideoSource) -> "Future[dict[str, CachedMedia]]":
+        """Schedule the previews of a video, returning the pending ones if already scheduled."""
+        with self._lock:
+            future = self._pending.get(source.url)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._previews, source)
+            self._pending[source.url] = future
+        future.add_done_callback(lambda _: self._forget(source.url, future))
+        return future
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _forget(self, url: str, future: "Future[dict[str, CachedMedia]]") -> None:
+        with self._lock:
+            if self._pending.get(url) is future:
+                del self._pending[url]
+
+    def _previews(self, source: VideoSource) -> dict[str, CachedMedia]:
+        fingerprint = source.fingerprint()
+        rendered: dict[str, bytes] = {}
+
+        def fetch(kind: str) -> Callable[[Optional[str]], OriginObject]:
+            def fetch_kind(etag: Optional[str]) -> OriginObject:
+                if not rendered:
+                    rendered.update(self._render(source))
+                data = rendered[kind]
+                return OriginObject(iter([data]), content_type=PREVIEW_KINDS[kind], size=len(data))
+
+            return fetch_kind
+
+        entries: dict[str, CachedMedia] = {}
+        for kind in PREVIEW_KINDS:
+            entry, _ = self.cache.get(f"video-preview:{kind}:{fingerprint}", fetch(kind))
+            if entry is None:
+                raise ValueError(f"Preview of {source.url} is too large to cache")
+            entries[kind] = entry
+        return entries
+
+    @staticmethod
+    def _render(source: VideoSource) -> dict[str, bytes]:
+        file = source.open()
+        try:
+            logger.info(f"Making previews of {source.url}")
+            return extract_previews(file)
+        finally:
+            if not isinstance(file, str):
+                file.close()
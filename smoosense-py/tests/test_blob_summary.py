@@ -0,0 +1,95 @@
+import json
+import os
+import unittest
+
+import duckdb
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.blob_summary import execute_for_display, summarize_blobs
+
+PWD = os.path.dirname(__file__)
+IMAGES_PATH = os.path.abspath(os.path.join(PWD, "../../data/images.parquet"))
+
+
+class TestBlobSummary(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_summarize_blobs(self):
+        relation = summarize_blobs(
+            self.con.sql("SELECT 1 AS \"a b\", 'abc'::BLOB AS data, NULL::BLOB AS empty")
+        )
+        self.assertEqual(relation.columns, ["a b", "data", "empty"])
+        self.assertEqual(relation.fetchall(), [(1, "Bytes 3", None)])
+
+    def test_relations_without_blobs_are_unchanged(self):
+        relation = self.con.sql("SELECT 1 AS a")
+        self.assertIs(summarize_blobs(relation), relation)
+        relation = self.con.sql("SELECT 'x'::BLOB AS a, 'y'::BLOB AS a")
+        self.assertIs(summarize_blobs(relation), relation)
+
+    def test_execute_for_display(self):
+        reader, types = execute_for_display(self.con, f"SELECT image_bytes FROM '{IMAGES_PATH}'")
+        assert reader is not None
+        self.assertEqual(types, ["VARCHAR"])
+        table = reader.read_all()
+        self.assertEqual(table.schema.field("image_bytes").type, pa.string())
+        self.assertTrue(all(value.startswith("Bytes ") for value in table.column(0).to_pylist()))
+
+    def test_other_statements_run_as_is(self):
+        execute_for_display(self.con, "CREATE TABLE t AS SELECT 'x'::BLOB AS b")
+        reader, _ = execute_for_display(self.con, "SELECT 1; SELECT b FROM t")
+        assert reader is not None
+        self.assertEqual(reader.read_all().column(0).to_pylist(), [b"x"])
+        with self.assertRaises(duckdb.ParserException):
+            execute_for_display(self.con, "SELEC 1")
+
+
+class TestBlobSummaryEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = SmooSenseApp().create_app().test_client()
+        self.lengths = [
+            f"Bytes {length}"
+            for (length,) in duckdb.execute(
+                f"SELECT octet_length(image_bytes) FROM '{IMAGES_PATH}'"
+            ).fetchall()
+        ]
+
+    def test_query(self):
+        query = f"SELECT image_bytes FROM '{IMAGES_PATH}'"
+        response = self.client.post("/api/query", json={"query": query})
+        self.assertEqual(response.json["status"], "success", response.json)
+        self.assertEqual([row[0] for row in response.json["rows"]], self.lengths)
+
+        response = self.client.post(
+            "/api/query",
+            json={"query": query},
+            headers={"Accept": "application/vnd.apache.arrow.stream"},
+        )
+        # Arrow clients get the binary values
+        table = pa.ipc.open_stream(response.get_data()).read_all()
+        self.assertEqual(table.schema.field("image_bytes").type, pa.binary())
+        self.assertEqual(
+            [f"Bytes {len(value)}" for value in table.column(0).to_pylist()], self.lengths
+        )
+
+        response = self.client.post("/api/query/stream", json={"query": query})
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        rows = [row for line in lines if line["type"] == "rows" for row in line["rows"]]
+        self.assertEqual([row[0] for row in rows], self.lengths)
+
+    def test_row_page(self):
+        response = self.client.post(
+            "/api/rows/page", json={"tablePath": IMAGES_PATH, "pageSize": 10, "pageNumber": 1}
+        )
+        self.assertEqual(response.status_code, 200, response.json)
+        column = response.json["column_names"].index("image_bytes")
+        self.assertEqual([row[column] for row in response.json["rows"]], self.lengths)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -182,6 +182,22 @@ class TestCLI(unittest.TestCase):
             self.assertEqual(url_prefix, "/smoosense")
             self.assertEqual(result.exit_code, 0)
 
+    def test_sense_with_threads_option(self) -> None:
+        """Test 'sense folder . --threads 16' command."""
+        with patch("smoosense.cli.run_app") as mock_run_app:
+            result = self.runner.invoke(main, ["folder", ".", "--threads", "16"])
+
+            self.assertTrue(mock_run_app.called)
+            call_args = mock_run_app.call_args
+
+            self.assertEqual(call_args[1]["threads"], 16)
+            self.assertNotIn("workers", call_args[1])
+            self.assertEqual(result.exit_code, 0)
+
+        # Running queries and row cursors live in one process, so there is no --workers option
+        result = self.runner.invoke(main, ["folder", ".", "--workers", "2"])
+        self.assertNotEqual(result.exit_code, 0)
+
     def test_sense_folder_with_port_option(self) -> None:
         """Test 'sense folder' with --port option."""
         with patch("smoosense.cli.run_app") as mock_run_app:
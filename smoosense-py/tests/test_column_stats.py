@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.column_stats import ColumnStatsIndex, compute_column_stats
+
+PWD = os.path.dirname(__file__)
+
+
+class TestComputeColumnStats(unittest.TestCase):
+    def test_stats_of_all_columns(self):
+        con = duckdb.connect()
+        con.execute(
+            """
+            CREATE TABLE t AS SELECT
+                range AS "id",
+                CASE WHEN range % 4 = 0 THEN NULL ELSE 'v' || (range % 3) END AS "label",
+                [range] AS "nested"
+            FROM range(100)
+            """
+        )
+        stats = compute_column_stats(con, "t")
+        self.assertEqual(stats["cnt_all"], 100)
+
+        label = stats["columns"]["label"]
+        self.assertEqual((label["cnt_null"], label["cnt_not_null"]), (25, 75))
+        self.assertEqual((label["min"], label["max"]), ("v0", "v2"))
+        self.assertEqual(label["cnt_distinct"], 3)
+        self.assertEqual(sum(v["cnt"] for v in label["top_values"]), 75)
+
+        self.assertEqual((stats["columns"]["id"]["min"], stats["columns"]["id"]["max"]), (0, 99))
+        self.assertEqual(stats["columns"]["id"]["cnt_distinct"], 100)
+
+        nested = stats["columns"]["nested"]
+        self.assertEqual(nested["cnt_null"], 0)
+        self.assertIsNone(nested["min"])
+        self.assertIsNone(nested["top_values"])
+
+    def test_wide_tables_are_split(self):
+        con = duckdb.connect()
+        con.execute("CREATE TABLE t AS SELECT range AS a, range * 2 AS b, 'x' AS c FROM range(10)")
+        stats = compute_column_stats(con, "t", max_columns_per_pass=2)
+        self.assertEqual(stats["cnt_all"], 10)
+        self.assertEqual(stats["columns"]["b"]["max"], 18)
+        self.assertEqual(stats["columns"]["c"]["top_values"], [{"value": "x", "cnt": 10}])
+
+
+class TestColumnStatsIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.parquet_path = os.path.join(self.temp_dir.name, "data.parquet")
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(10)) TO '{self.parquet_path}'")
+        self.index = ColumnStatsIndex(os.path.join(self.temp_dir.name, "column-stats"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get(self):
+        return self.index.get_or_compute(self.parquet_path, "duckdb", duckdb.connect)
+
+    def test_persisted_until_the_file_changes(self):
+        stats, from_sidecar = self.get()
+        self.assertFalse(from_sidecar)
+        self.assertEqual(stats["columns"]["x"]["max"], 9)
+
+        with patch("smoosense.utils.column_stats.compute_column_stats") as compute:
+            self.assertEqual(
+                ColumnStatsIndex(self.index.stats_dir).get_or_compute(
+                    self.parquet_path, "duckdb", duckdb.connect
+                ),
+                (stats, True),
+            )
+            compute.assert_not_called()
+
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(20)) TO '{self.parquet_path}'")
+        os.utime(self.parquet_path, ns=(0, 0))
+        stats, from_sidecar = self.get()
+        self.assertFalse(from_sidecar)
+        self.assertEqual(stats["columns"]["x"]["max"], 19)
+
+
+class TestColumnStatsApi(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.client = SmooSenseApp(column_stats_dir=self.temp_dir.name).create_app().test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parquet_and_lance(self):
+        tables = {
+            "duckdb": os.path.join(PWD, "../../data/dummy_data_various_types.parquet"),
+            "lance": os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"),
+        }
+        for query_engine, table_path in tables.items():
+            params = {"tablePath": table_path, "queryEngine": query_engine}
+            response = self.client.get("/api/column-stats", query_string=params)
+            self.assertEqual(response.status_code, 200, response.json)
+            self.assertFalse(response.json["cached"])
+            self.assertEqual(response.json["columns"]["bool"]["cnt_distinct"], 2)
+
+            response = self.client.get("/api/column-stats", query_string=params)
+            self.assertTrue(response.json["cached"])
+            response = self.client.get(
+                "/api/column-stats", query_string={**params, "refresh": "true"}
+            )
+            self.assertFalse(response.json["cached"])
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 2)
+
+    def test_invalid_query_engine(self):
+        response = self.client.get(
+            "/api/column-stats", query_string={"tablePath": "x.parquet", "queryEngine": "spark"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
+import threading
 import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
 
+import duckdb
+
+from smoosense.exceptions import InvalidInputException
 from smoosense.my_logging import getLogger
-from smoosense.utils.duckdb_connections import check_permissions
+from smoosense.utils.duckdb_connections import DuckdbConnectionPool, check_permissions
 
 logger = getLogger(__name__)
 
@@ -12,16 +18,16 @@ class TestCheckPermissions(unittest.TestCase):
     def test_allowed_queries(self):
         """Test that normal SELECT queries are allowed"""
         allowed_queries = [
-            "SELECT * FROM table",
+            "SELECT * FROM tbl",
             "SELECT name, age FROM users WHERE age > 18",
             "SELECT COUNT(*) FROM orders",
             "SELECT DISTINCT category FROM products",
             "SELECT * FROM table1 JOIN table2 ON table1.id = table2.id",
-            "SELECT * FROM table WHERE name LIKE '%test%'",
-            "SELECT * FROM table ORDER BY name ASC",
-            "SELECT * FROM table GROUP BY category",
-            "SELECT * FROM table LIMIT 10",
-            "SELECT * FROM table OFFSET 5",
+            "SELECT * FROM tbl WHERE name LIKE '%test%'",
+            "SELECT * FROM tbl ORDER BY name ASC",
+            "SELECT * FROM tbl GROUP BY category",
+            "SELECT * FROM tbl LIMIT 10",
+            "SELECT * FROM tbl OFFSET 5",
         ]
 
         for query in allowed_queries:
@@ -32,14 +38,14 @@ class TestCheckPermissions(unittest.TestCase):
     def test_forbidden_copy_keyword(self):
         """Test that COPY queries are forbidden"""
         forbidden_queries = [
-            "COPY table TO 'file.csv'",
-            "COPY (SELECT * FROM table) TO 'output.csv'",
-            "COPY table TO 'file.csv' WITH (FORMAT csv)",
-            "COPY table FROM 'file.csv'",
-            "SELECT * FROM table; COPY table TO 'file.csv'",
-            "copy table to 'file.csv'",  # Case insensitive
-            "Copy Table To 'file.csv'",  # Mixed case
-            "COPY TABLE TO 'file.csv'",  # Upper case
+            "COPY tbl TO 'file.csv'",
+            "COPY (SELECT * FROM tbl) TO 'output.csv'",
+            "COPY tbl TO 'file.csv' WITH (FORMAT csv)",
+            "COPY tbl FROM 'file.csv'",
+            "SELECT * FROM tbl; COPY tbl TO 'file.csv'",
+            "copy tbl to 'file.csv'",  # Case insensitive
+            "Copy Tbl To 'file.csv'",  # Mixed case
+            "COPY TBL TO 'file.csv'",  # Upper case
         ]
 
         for query in forbidden_queries:
@@ -54,7 +60,7 @@ class TestCheckPermissions(unittest.TestCase):
         """Test that EXPORT queries are forbidden"""
         forbidden_queries = [
             "EXPORT DATABASE 'backup.db'",
-            "EXPORT TABLE table TO 'file.csv'",
+            "EXPORT DATABASE 'export_dir' (FORMAT csv)",
             "export database 'backup.db'",  # Case insensitive
             "Export Database 'backup.db'",  # Mixed case
             "EXPORT DATABASE 'backup.db'",  # Upper case
@@ -71,12 +77,12 @@ class TestCheckPermissions(unittest.TestCase):
     def test_forbidden_delete_keyword(self):
         """Test that DELETE queries are forbidden"""
         forbidden_queries = [
-            "DELETE FROM table",
-            "DELETE FROM table WHERE id = 1",
-            "DELETE FROM table WHERE name = 'test'",
-            "delete from table",  # Case insensitive
-            "Delete From Table",  # Mixed case
-            "DELETE FROM TABLE",  # Upper case
+            "DELETE FROM tbl",
+            "DELETE FROM tbl WHERE id = 1",
+            "DELETE FROM tbl WHERE name = 'test'",
+            "delete from tbl",  # Case insensitive
+            "Delete From Tbl",  # Mixed case
+            "DELETE FROM TBL",  # Upper case
         ]
 
         for query in forbidden_queries:
@@ -107,24 +113,23 @@ class TestCheckPermissions(unittest.TestCase):
 
     def test_edge_cases(self):
         """Test edge cases and boundary conditions"""
-        # Empty query
-        check_permissions("")
-
-        # Query with only whitespace
-        check_permissions("   \t\n  ")
+        # Empty query and query with only whitespace: no statement to run
+        for query in ["", "   \t\n  "]:
+            with self.assertRaises(PermissionError):
+                check_permissions(query)
 
         # Query with multiple spaces
-        check_permissions("SELECT    *    FROM    table")
+        check_permissions("SELECT    *    FROM    tbl")
 
         # Query with newlines
-        check_permissions("SELECT *\nFROM table\nWHERE id = 1")
+        check_permissions("SELECT *\nFROM tbl\nWHERE id = 1")
 
         # Query with tabs
-        check_permissions("SELECT\t*\tFROM\ttable")
+        check_permissions("SELECT\t*\tFROM\ttbl")
 
         # Query with mixed whitespace
         check_permissions(
-            "SELECT * FROM table WHERE name LIKE '%copy%'"
+            "SELECT * FROM tbl WHERE name LIKE '%copy%'"
         )  # 'copy' as part of a string
 
     def test_partial_matches(self):
@@ -136,11 +141,11 @@ class TestCheckPermissions(unittest.TestCase):
             "SELECT * FROM deleted_records",  # 'delete' as part of table name
             "SELECT * FROM attached_files",  # 'attach' as part of table name
             "SELECT * FROM updated_records",  # 'update' as part of table name
-            "SELECT * FROM table WHERE description LIKE '%copy%'",  # 'copy' in string literal
-            "SELECT * FROM table WHERE action = 'exported'",  # 'export' in string literal
-            "SELECT * FROM table WHERE status = 'deleted'",  # 'delete' in string literal
-            "SELECT * FROM table WHERE type = 'attached'",  # 'attach' in string literal
-            "SELECT * FROM table WHERE last_updated > '2023-01-01'",  # 'update' in string literal
+            "SELECT * FROM tbl WHERE description LIKE '%copy%'",  # 'copy' in string literal
+            "SELECT * FROM tbl WHERE action = 'exported'",  # 'export' in string literal
+            "SELECT * FROM tbl WHERE status = 'deleted'",  # 'delete' in string literal
+            "SELECT * FROM tbl WHERE type = 'attached'",  # 'attach' in string literal
+            "SELECT * FROM tbl WHERE last_updated > '2023-01-01'",  # 'update' in string literal
         ]
 
         for query in allowed_queries:
@@ -151,12 +156,12 @@ class TestCheckPermissions(unittest.TestCase):
     def test_forbidden_update_keyword(self):
         """Test that UPDATE queries are forbidden"""
         forbidden_queries = [
-            "UPDATE table SET column = 'value'",
-            "UPDATE table SET column = 'value' WHERE id = 1",
-            "UPDATE table SET col1 = 'val1', col2 = 'val2'",
-            "update table set column = 'value'",  # Case insensitive
-            "Update Table Set Column = 'Value'",  # Mixed case
-            "UPDATE TABLE SET COLUMN = 'VALUE'",  # Upper case
+            "UPDATE tbl SET col = 'value'",
+            "UPDATE tbl SET col = 'value' WHERE id = 1",
+            "UPDATE tbl SET col1 = 'val1', col2 = 'val2'",
+            "update tbl set col = 'value'",  # Case insensitive
+            "Update Tbl Set Col = 'Value'",  # Mixed case
+            "UPDATE TBL SET COL = 'VALUE'",  # Upper case
         ]
 
         for query in forbidden_queries:
@@ -170,12 +175,12 @@ class TestCheckPermissions(unittest.TestCase):
     def test_multiple_forbidden_keywords(self):
         """Test queries with multiple forbidden keywords"""
         forbidden_queries = [
-            "COPY table TO 'file.csv'; DELETE FROM table",
+            "COPY tbl TO 'file.csv'; DELETE FROM tbl",
             "EXPORT DATABASE 'backup.db'; ATTACH DATABASE 'other.db'",
-            "DELETE FROM table; COPY result TO 'output.csv'",
-            "ATTACH DATABASE 'db.db'; EXPORT TABLE table TO 'file.csv'",
-            "UPDATE table SET col = 'val'; DELETE FROM table",
-            "COPY table TO 'file.csv'; UPDATE table SET col = 'val'",
+            "DELETE FROM tbl; COPY result TO 'output.csv'",
+            "ATTACH DATABASE 'db.db'; EXPORT DATABASE 'export_dir' (FORMAT csv)",
+            "UPDATE tbl SET col = 'val'; DELETE FROM tbl",
+            "COPY tbl TO 'file.csv'; UPDATE tbl SET col = 'val'",
         ]
 
         for query in forbidden_queries:
@@ -186,6 +191,138 @@ class TestCheckPermissions(unittest.TestCase):
                     str(context.exception), "You are only allowed to run readonly queries"
                 )
 
+    def test_forbidden_shared_state(self):
+        """Test that statements changing the catalog or global settings are forbidden"""
+        forbidden_queries = [
+            "CREATE TABLE t AS SELECT 1",
+            "CREATE OR REPLACE MACRO f(x) AS x + 1",
+            "SELECT 1;CREATE VIEW v AS SELECT 2",
+            "DROP TABLE t",
+            "SET GLOBAL memory_limit='1GB'",
+            "SET s3_access_key_id='x'",
+            "RESET memory_limit",
+            "PRAGMA memory_limit='1GB'",
+            "INSTALL spatial",
+            "LOAD spatial",
+            "DETACH db",
+            "USE other",
+            "CALL dbgen(sf=1)",
+            "SELECT \"a'b\"; CREATE TABLE t AS SELECT 'x'",
+            "SELECT $$ ' $$; DROP TABLE t; SELECT ''",
+            "SELECT 1 -- '\n; DROP TABLE t; SELECT ''",
+        ]
+
+        for query in forbidden_queries:
+            with self.subTest(query=query):
+                with self.assertRaises(PermissionError):
+                    check_permissions(query)
+
+        # Keywords in string literals, quoted identifiers, comments and names are allowed
+        for query in [
+            "SELECT \"set\", 'create table' FROM t -- drop",
+            "SELECT * FROM dataset WHERE created_at > '2024-01-01' /* load */",
+            "SELECT set, use, load, call, reset AS total FROM t",
+        ]:
+            with self.subTest(query=query):
+                check_permissions(query)
+
+    def test_escape_string_cannot_hide_statements(self):
+        """An escaped quote in an E'...' string does not end the string for the check"""
+        query = "SELECT E'\\'' AS a; CREATE TABLE t AS SELECT 1 AS x; SELECT ''"
+        with self.assertRaises(PermissionError):
+            check_permissions(query)
+        check_permissions("SELECT E'\\'; CREATE TABLE t AS SELECT 1' AS a")
+
+    def test_unparsable_queries(self):
+        """Queries DuckDB cannot parse are rejected with the parser's error"""
+        with self.assertRaises(InvalidInputException):
+            check_permissions("SELEC 1")
+
+
+class FakeS3Client:
+    """Minimal stand-in for a boto3 client whose credentials can be rotated."""
+
+    def __init__(self, access_key: str):
+        self.meta = SimpleNamespace(region_name="us-west-2")
+        self._request_signer = SimpleNamespace(
+            _credentials=SimpleNamespace(access_key=access_key, secret_key="secret", token=None)
+        )
+
+
+class TestDuckdbConnectionPool(unittest.TestCase):
+    """Test cases for DuckdbConnectionPool"""
+
+    def test_database_is_shared_across_checkouts(self):
+        """Connections share one database, so global settings are configured only once"""
+        cnt_made = []
+
+        def maker():
+            cnt_made.append(1)
+            con = duckdb.connect()
+            con.execute("SET GLOBAL threads=3")
+            return con
+
+        pool = DuckdbConnectionPool(maker, max_size=2)
+        pool.warm_up()
+        for _ in range(3):
+            with pool.connection() as con:
+                self.assertEqual(con.execute("SELECT current_setting('threads')").fetchone()[0], 3)
+        self.assertEqual(len(cnt_made), 1)
+
+    def test_session_state_does_not_leak(self):
+        """Each checkout gets a fresh cursor without temp views of previous requests"""
+        pool = DuckdbConnectionPool(duckdb.connect)
+        with pool.connection() as con:
+            con.execute("CREATE TEMP VIEW leaked AS SELECT 1")
+        with pool.connection() as con:
+            with self.assertRaises(duckdb.CatalogException):
+                con.execute("SELECT * FROM leaked")
+
+    def test_max_size_bounds_concurrent_checkouts(self):
+        """A checkout blocks while max_size connections are in use"""
+        pool = DuckdbConnectionPool(duckdb.connect, max_size=1)
+        acquired = threading.Event()
+
+        def checkout():
+            with pool.connection():
+                acquired.set()
+
+        with pool.connection():
+            thread = threading.Thread(target=checkout)
+            thread.start()
+            self.assertFalse(acquired.wait(timeout=0.2))
+            self.assertEqual(pool.stats()["in_use"], 1)
+        thread.join(timeout=5)
+        self.assertTrue(acquired.is_set())
+
+    def test_unhealthy_database_is_reopened(self):
+        """A closed shared database is replaced on the next checkout"""
+        pool = DuckdbConnectionPool(duckdb.connect, health_check_interval=0)
+        pool.warm_up()
+        pool._database.close()
+        with pool.connection() as con:
+            self.assertEqual(con.execute("SELECT 42").fetchone()[0], 42)
+
+    def test_rotated_credentials_are_reapplied(self):
+        """New S3 credentials from the boto3 session are pushed into the shared database"""
+        s3_client = FakeS3Client("key-1")
+        applied = []
+        pool = DuckdbConnectionPool(duckdb.connect, s3_client=s3_client)
+        pool.warm_up()
+
+        with patch(
+            "smoosense.utils.duckdb_connections.apply_s3_credentials",
+            side_effect=lambda con, client: applied.append(
+                client._request_signer._credentials.access_key
+            ),
+        ):
+            with pool.connection():
+                pass
+            s3_client._request_signer._credentials.access_key = "key-2"
+            with pool.connection():
+                pass
+        self.assertEqual(applied, ["key-2"])
+
 
 if __name__ == "__main__":
     unittest.main()
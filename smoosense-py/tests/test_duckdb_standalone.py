@@ -9,16 +9,16 @@ class TestCheckPermissions(unittest.TestCase):
     def test_allowed_queries(self):
         """Test that normal SELECT queries are allowed"""
         allowed_queries = [
-            "SELECT * FROM table",
+            "SELECT * FROM tbl",
             "SELECT name, age FROM users WHERE age > 18",
             "SELECT COUNT(*) FROM orders",
             "SELECT DISTINCT category FROM products",
             "SELECT * FROM table1 JOIN table2 ON table1.id = table2.id",
-            "SELECT * FROM table WHERE name LIKE '%test%'",
-            "SELECT * FROM table ORDER BY name ASC",
-            "SELECT * FROM table GROUP BY category",
-            "SELECT * FROM table LIMIT 10",
-            "SELECT * FROM table OFFSET 5",
+            "SELECT * FROM tbl WHERE name LIKE '%test%'",
+            "SELECT * FROM tbl ORDER BY name ASC",
+            "SELECT * FROM tbl GROUP BY category",
+            "SELECT * FROM tbl LIMIT 10",
+            "SELECT * FROM tbl OFFSET 5",
         ]
 
         for query in allowed_queries:
@@ -29,14 +29,14 @@ class TestCheckPermissions(unittest.TestCase):
     def test_forbidden_copy_keyword(self):
         """Test that COPY queries are forbidden"""
         forbidden_queries = [
-            "COPY table TO 'file.csv'",
-            "COPY (SELECT * FROM table) TO 'output.csv'",
-            "COPY table TO 'file.csv' WITH (FORMAT csv)",
-            "COPY table FROM 'file.csv'",
-            "SELECT * FROM table; COPY table TO 'file.csv'",
-            "copy table to 'file.csv'",  # Case insensitive
-            "Copy Table To 'file.csv'",  # Mixed case
-            "COPY TABLE TO 'file.csv'",  # Upper case
+            "COPY tbl TO 'file.csv'",
+            "COPY (SELECT * FROM tbl) TO 'output.csv'",
+            "COPY tbl TO 'file.csv' WITH (FORMAT csv)",
+            "COPY tbl FROM 'file.csv'",
+            "SELECT * FROM tbl; COPY tbl TO 'file.csv'",
+            "copy tbl to 'file.csv'",  # Case insensitive
+            "Copy Tbl To 'file.csv'",  # Mixed case
+            "COPY TBL TO 'file.csv'",  # Upper case
         ]
 
         for query in forbidden_queries:
@@ -51,7 +51,7 @@ class TestCheckPermissions(unittest.TestCase):
         """Test that EXPORT queries are forbidden"""
         forbidden_queries = [
             "EXPORT DATABASE 'backup.db'",
-            "EXPORT TABLE table TO 'file.csv'",
+            "EXPORT DATABASE 'export_dir' (FORMAT csv)",
             "export database 'backup.db'",  # Case insensitive
             "Export Database 'backup.db'",  # Mixed case
             "EXPORT DATABASE 'backup.db'",  # Upper case
@@ -68,12 +68,12 @@ class TestCheckPermissions(unittest.TestCase):
     def test_forbidden_delete_keyword(self):
         """Test that DELETE queries are forbidden"""
         forbidden_queries = [
-            "DELETE FROM table",
-            "DELETE FROM table WHERE id = 1",
-            "DELETE FROM table WHERE name = 'test'",
-            "delete from table",  # Case insensitive
-            "Delete From Table",  # Mixed case
-            "DELETE FROM TABLE",  # Upper case
+            "DELETE FROM tbl",
+            "DELETE FROM tbl WHERE id = 1",
+            "DELETE FROM tbl WHERE name = 'test'",
+            "delete from tbl",  # Case insensitive
+            "Delete From Tbl",  # Mixed case
+            "DELETE FROM TBL",  # Upper case
         ]
 
         for query in forbidden_queries:
@@ -104,24 +104,23 @@ class TestCheckPermissions(unittest.TestCase):
 
     def test_edge_cases(self):
         """Test edge cases and boundary conditions"""
-        # Empty query
-        check_permissions("")
-
-        # Query with only whitespace
-        check_permissions("   \t\n  ")
+        # Empty query and query with only whitespace: no statement to run
+        for query in ["", "   \t\n  "]:
+            with self.assertRaises(PermissionError):
+                check_permissions(query)
 
         # Query with multiple spaces
-        check_permissions("SELECT    *    FROM    table")
+        check_permissions("SELECT    *    FROM    tbl")
 
         # Query with newlines
-        check_permissions("SELECT *\nFROM table\nWHERE id = 1")
+        check_permissions("SELECT *\nFROM tbl\nWHERE id = 1")
 
         # Query with tabs
-        check_permissions("SELECT\t*\tFROM\ttable")
+        check_permissions("SELECT\t*\tFROM\ttbl")
 
         # Query with mixed whitespace
         check_permissions(
-            "SELECT * FROM table WHERE name LIKE '%copy%'"
+            "SELECT * FROM tbl WHERE name LIKE '%copy%'"
         )  # 'copy' as part of a string
 
     def test_partial_matches(self):
@@ -132,10 +131,10 @@ class TestCheckPermissions(unittest.TestCase):
             "SELECT * FROM exported_data",  # 'export' as part of table name
             "SELECT * FROM deleted_records",  # 'delete' as part of table name
             "SELECT * FROM attached_files",  # 'attach' as part of table name
-            "SELECT * FROM table WHERE description LIKE '%copy%'",  # 'copy' in string literal
-            "SELECT * FROM table WHERE action = 'exported'",  # 'export' in string literal
-            "SELECT * FROM table WHERE status = 'deleted'",  # 'delete' in string literal
-            "SELECT * FROM table WHERE type = 'attached'",  # 'attach' in string literal
+            "SELECT * FROM tbl WHERE description LIKE '%copy%'",  # 'copy' in string literal
+            "SELECT * FROM tbl WHERE action = 'exported'",  # 'export' in string literal
+            "SELECT * FROM tbl WHERE status = 'deleted'",  # 'delete' in string literal
+            "SELECT * FROM tbl WHERE type = 'attached'",  # 'attach' in string literal
         ]
 
         for query in allowed_queries:
@@ -146,10 +145,10 @@ class TestCheckPermissions(unittest.TestCase):
     def test_multiple_forbidden_keywords(self):
         """Test queries with multiple forbidden keywords"""
         forbidden_queries = [
-            "COPY table TO 'file.csv'; DELETE FROM table",
+            "COPY tbl TO 'file.csv'; DELETE FROM tbl",
             "EXPORT DATABASE 'backup.db'; ATTACH DATABASE 'other.db'",
-            "DELETE FROM table; COPY result TO 'output.csv'",
-            "ATTACH DATABASE 'db.db'; EXPORT TABLE table TO 'file.csv'",
+            "DELETE FROM tbl; COPY result TO 'output.csv'",
+            "ATTACH DATABASE 'db.db'; EXPORT DATABASE 'export_dir' (FORMAT csv)",
         ]
 
         for query in forbidden_queries:
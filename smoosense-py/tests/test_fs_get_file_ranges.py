@@ -0,0 +1,153 @@
+import io
+import os
+import re
+import unittest
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from tests.base_fs_test import BaseFSTest
+
+CONTENT = bytes(range(256)) * 40
+S3_PATH = "s3://bucket/videos/clip.mp4"
+S3_ETAG = '"0123456789abcdef"'
+
+
+class FakeS3Client:
+    """S3 client serving one object, with the range and condition semantics of S3."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.last_modified = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.calls: list[dict] = []
+
+    def _check(self, IfNoneMatch=None, **kwargs):
+        if IfNoneMatch == S3_ETAG:
+            raise ClientError(
+                {"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}},
+                "GetObject",
+            )
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self.calls.append({"op": "head", **kwargs})
+        self._check(**kwargs)
+        return {
+            "ContentLength": len(self.content),
+            "ETag": S3_ETAG,
+            "LastModified": self.last_modified,
+            "ContentType": "video/mp4",
+        }
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self.calls.append({"op": "get", "Range": Range, **kwargs})
+        self._check(**kwargs)
+        size = len(self.content)
+        response = {"ETag": S3_ETAG, "LastModified": self.last_modified, "ContentType": "video/mp4"}
+        start, stop = 0, size
+        if Range is not None:
+            first, last = re.fullmatch(r"bytes=(\d*)-(\d*)", Range).groups()
+            if first == "":
+                start = max(size - int(last), 0)
+            else:
+                start, stop = int(first), min(int(last) + 1, size) if last else size
+            if start >= size:
+                raise ClientError(
+                    {
+                        "Error": {"Code": "InvalidRange", "ActualObjectSize": str(size)},
+                        "ResponseMetadata": {"HTTPStatusCode": 416},
+                    },
+                    "GetObject",
+                )
+            response["ContentRange"] = f"bytes {start}-{stop - 1}/{size}"
+        body = self.content[start:stop]
+        response["ContentLength"] = len(body)
+        response["Body"] = StreamingBody(io.BytesIO(body), len(body))
+        return response
+
+
+def multipart_parts(response):
+    """Content-Range and body of each part of a multipart/byteranges response."""
+    boundary = response.headers["Content-Type"].split("boundary=")[1]
+    data = response.get_data()
+    parts = []
+    for chunk in data.split(f"--{boundary}".encode())[1:-1]:
+        headers, body = chunk.strip(b"\r\n").split(b"\r\n\r\n", 1)
+        content_range = re.search(rb"Content-Range: (.*)", headers).group(1).decode()
+        parts.append((content_range, body))
+    return parts
+
+
+class TestGetFileRanges(BaseFSTest):
+    def setUp(self):
+        super().setUp()
+        self.media_file = os.path.join(self.temp_dir, "clip.mp4")
+        with open(self.media_file, "wb") as f:
+            f.write(CONTENT)
+        self.s3_client = FakeS3Client(CONTENT)
+        self.app.config["S3_CLIENT"] = self.s3_client
+
+    def get(self, path, **headers):
+        return self.client.get("/get-file", query_string={"path": path}, headers=headers)
+
+    def check_ranges(self, path):
+        size = len(CONTENT)
+        response = self.get(path, Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"], f"bytes 100-199/{size}")
+        self.assertEqual(response.get_data(), CONTENT[100:200])
+        self.assertEqual(response.headers["Accept-Ranges"], "bytes")
+        self.assertIn("ETag", response.headers)
+        self.assertIn("Last-Modified", response.headers)
+
+        response = self.get(path, Range="bytes=-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), CONTENT[-10:])
+
+        response = self.get(path, Range="bytes=0-9, 5000-, 20-29")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.get_data()))
+        self.assertEqual(
+            multipart_parts(response),
+            [
+                (f"bytes 0-9/{size}", CONTENT[:10]),
+                (f"bytes 5000-{size - 1}/{size}", CONTENT[5000:]),
+                (f"bytes 20-29/{size}", CONTENT[20:30]),
+            ],
+        )
+
+        response = self.get(path, Range=f"bytes={size}-, {size + 10}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["Content-Range"], f"bytes */{size}")
+
+        etag = self.get(path).headers["ETag"]
+        response = self.get(path, Range="bytes=0-9, 20-29", **{"If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+        response = self.get(path, Range="bytes=0-9, 20-29", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), CONTENT)
+
+        response = self.get(path, **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_local_file_ranges(self):
+        self.check_ranges(self.media_file)
+
+    def test_s3_file_ranges(self):
+        self.check_ranges(S3_PATH)
+        # Single ranges are read by S3 itself, without reading the object size first
+        self.s3_client.calls.clear()
+        self.get(S3_PATH, Range="bytes=100-199")
+        self.assertEqual(self.s3_client.calls, [{"op": "get", "Range": "bytes=100-199"}])
+
+    def test_s3_whole_file(self):
+        response = self.get(S3_PATH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), CONTENT)
+        self.assertEqual(response.headers["Content-Type"], "video/mp4")
+        self.assertEqual(response.headers["ETag"], S3_ETAG)
+        self.assertEqual(response.headers["Last-Modified"], "Tue, 02 Jan 2024 03:04:05 GMT")
+
+
+if __name__ == "__main__":
+    unittest.main()
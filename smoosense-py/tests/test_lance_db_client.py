@@ -0,0 +1,71 @@
+import json
+import tempfile
+import unittest
+
+import lancedb
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.db_client import LanceDBClient, TableInfoCache
+
+NUM_TABLES = 5
+
+
+class TestListTables(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = lancedb.connect(self.temp_dir.name)
+        for n in range(NUM_TABLES):
+            self.db.create_table(f"t{n}", pa.table({"i": list(range(n + 1)), "s": ["x"] * (n + 1)}))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_list_tables_in_order(self):
+        infos = LanceDBClient(self.temp_dir.name).list_tables(parallelism=3)
+        self.assertEqual([info.name for info in infos], [f"t{n}" for n in range(NUM_TABLES)])
+        self.assertEqual([info.cnt_rows for info in infos], list(range(1, NUM_TABLES + 1)))
+        self.assertTrue(all(info.cnt_columns == 2 for info in infos))
+        self.assertTrue(all(info.cnt_versions == 1 for info in infos))
+
+    def test_cache_until_table_changes(self):
+        client = LanceDBClient(self.temp_dir.name)
+        cache = TableInfoCache()
+        client.list_tables(cache=cache)
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": NUM_TABLES, "entries": NUM_TABLES})
+        client.list_tables(cache=cache)
+        self.assertEqual(cache.stats()["hits"], NUM_TABLES)
+
+        self.db.open_table("t0").add(pa.table({"i": [10], "s": ["y"]}))
+        infos = client.list_tables(cache=cache)
+        self.assertEqual(cache.stats()["hits"], 2 * NUM_TABLES - 1)
+        self.assertEqual((infos[0].cnt_rows, infos[0].cnt_versions), (2, 2))
+
+    def test_cache_eviction(self):
+        cache = TableInfoCache(max_entries=2)
+        LanceDBClient(self.temp_dir.name).list_tables(cache=cache)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_stream_endpoint(self):
+        client = SmooSenseApp().create_app().test_client()
+        for _ in range(2):
+            response = client.get(f"/api/lance/list-tables/stream?dbPath={self.temp_dir.name}")
+            self.assertEqual(response.status_code, 200)
+            lines = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual(
+                lines[0], {"type": "tables", "names": [f"t{n}" for n in range(NUM_TABLES)]}
+            )
+            tables = {line["name"]: line for line in lines[1:-1]}
+            self.assertEqual(tables["t3"]["cnt_rows"], 4)
+            self.assertEqual(lines[-1]["type"], "end")
+        self.assertEqual(lines[-1]["cached"], NUM_TABLES)
+
+        response = client.get(f"/api/lance/list-tables?dbPath={self.temp_dir.name}")
+        self.assertEqual([table["name"] for table in response.json], lines[0]["names"])
+
+        response = client.get("/api/lance/list-tables/stream?dbPath=/no/such/dir")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
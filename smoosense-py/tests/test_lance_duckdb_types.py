@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+
+import lance
+import numpy as np
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.duckdb_types import cast_reader, cast_table, duckdb_schema
+
+NUM_ROWS = 20
+
+
+def half_floats(values):
+    return pa.array(np.asarray(values, dtype="float16"))
+
+
+class TestDuckdbSchema(unittest.TestCase):
+    def test_types(self):
+        schema = pa.schema(
+            [
+                ("f16", pa.float16()),
+                ("embedding", pa.list_(pa.float16(), 4)),
+                ("nested", pa.struct([("x", pa.float16()), ("s", pa.large_string())])),
+                ("uuid", pa.uuid()),
+                ("text", pa.large_string()),
+                ("blob", pa.large_binary()),
+                ("lengths", pa.large_list(pa.int32())),
+                ("elapsed", pa.duration("ms")),
+            ]
+        )
+        compatible, incompatible = duckdb_schema(schema)
+        self.assertEqual(incompatible, [])
+        self.assertEqual(
+            compatible,
+            pa.schema(
+                [
+                    ("f16", pa.float32()),
+                    ("embedding", pa.list_(pa.float32(), 4)),
+                    ("nested", pa.struct([("x", pa.float32()), ("s", pa.large_string())])),
+                    ("uuid", pa.binary(16)),
+                    ("text", pa.large_string()),
+                    ("blob", pa.large_binary()),
+                    ("lengths", pa.large_list(pa.int32())),
+                    ("elapsed", pa.duration("ms")),
+                ]
+            ),
+        )
+
+    def test_only_cast_columns_are_copied(self):
+        table = pa.table({"f16": half_floats([1.5, 2.5]), "i": [1, 2]})
+        cast = cast_table(table)
+        self.assertEqual(cast.schema.field("f16").type, pa.float32())
+        self.assertEqual(cast.column("f16").to_pylist(), [1.5, 2.5])
+        self.assertEqual(
+            cast.column("i").chunk(0).buffers()[1].address,
+            table.column("i").chunk(0).buffers()[1].address,
+        )
+        unchanged = pa.table({"i": [1, 2]})
+        self.assertIs(cast_table(unchanged), unchanged)
+
+        reader = pa.RecordBatchReader.from_batches(table.schema, table.to_batches())
+        self.assertEqual(cast_reader(reader).read_all(), cast)
+
+
+class TestCastLanceColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        cls.embeddings = rng.standard_normal((NUM_ROWS, 4)).astype("float16")
+        table = pa.table(
+            {
+                "id": pa.array(range(NUM_ROWS), pa.int64()),
+                "score": half_floats(np.arange(NUM_ROWS) / 4),
+                "embedding": pa.FixedSizeListArray.from_arrays(pa.array(cls.embeddings.ravel()), 4),
+                "uuid": pa.ExtensionArray.from_storage(
+                    pa.uuid(), pa.array([bytes([i]) * 16 for i in range(NUM_ROWS)], pa.binary(16))
+                ),
+                "text": pa.array([f"text {i}" for i in range(NUM_ROWS)], pa.large_string()),
+            }
+        )
+        cls.path = os.path.join(cls.temp_dir.name, "t.lance")
+        lance.write_dataset(table, cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def test_query(self):
+        query = (
+            "SELECT id, score, embedding, text FROM lance_table "
+            "WHERE score > 3.5 AND text LIKE 'text 1%' ORDER BY id"
+        )
+        response = self.client.post(
+            "/api/query", json={"query": query, "queryEngine": "lance", "tablePath": self.path}
+        )
+        self.assertEqual(response.json["status"], "success", response.json)
+        rows = response.json["rows"]
+        self.assertEqual([row[0] for row in rows], list(range(15, 20)))
+        self.assertEqual(rows[0][1], 3.75)
+        self.assertEqual(rows[0][2], [float(x) for x in self.embeddings[15]])
+        self.assertEqual(rows[0][3], "text 15")
+
+    def test_row_page(self):
+        response = self.client.post(
+            "/api/rows/page",
+            json={"tablePath": self.path, "queryEngine": "lance", "pageSize": 2, "pageNumber": 2},
+        )
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(
+            response.json["column_names"], ["id", "score", "embedding", "uuid", "text"]
+        )
+        self.assertEqual([row[1] for row in response.json["rows"]], [0.5, 0.75])
+
+    def test_vector_search_on_half_floats(self):
+        response = self.client.post(
+            "/api/lance/search",
+            json={"tablePath": self.path, "rowId": 3, "k": 1, "columns": ["id", "score"]},
+        )
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json["column"], "embedding")
+        self.assertEqual(response.json["rows"][0][:2], [3, 0.75])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+
+import duckdb
+import lance
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.native_query import plan_native_scan, translate_filter
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.utils.row_cursor import LanceRowSource
+
+PWD = os.path.dirname(__file__)
+LANCE_PATH = os.path.abspath(os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"))
+
+SCHEMA = pa.schema(
+    [
+        ("i", pa.int64()),
+        ("f", pa.float64()),
+        ("s", pa.string()),
+        ("b", pa.bool_()),
+        ("t", pa.timestamp("us")),
+        ("a b", pa.int32()),
+    ]
+)
+
+
+class TestPlanNativeScan(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect()
+
+    def tearDown(self):
+        self.con.close()
+
+    def plan(self, query):
+        return plan_native_scan(self.con, query, SCHEMA)
+
+    def test_counts(self):
+        scan = self.plan("SELECT COUNT(*) AS total FROM lance_table WHERE i BETWEEN 1 AND 10")
+        self.assertEqual(scan.count_name, "total")
+        self.assertEqual(scan.lance_filter, "(`i` BETWEEN 1 AND 10)")
+        self.assertEqual(scan.filter_columns, {"i"})
+        self.assertEqual(self.plan("SELECT COUNT(*) FROM lance_table").count_name, "count_star()")
+
+    def test_projections(self):
+        scan = self.plan(
+            'SELECT s AS name, "a b" FROM lance_table ORDER BY i DESC LIMIT 5 OFFSET 10'
+        )
+        self.assertEqual(scan.output, [("name", "s"), ("a b", "a b")])
+        self.assertEqual(scan.order_by, [("i", False, False)])
+        self.assertEqual((scan.limit, scan.offset), (5, 10))
+        scan = self.plan("SELECT * FROM lance_table")
+        self.assertEqual([name for name, _ in scan.output], SCHEMA.names)
+
+    def test_filters(self):
+        condition = (
+            "(s IN ('a', 'b''c') OR s IS NULL) AND CAST(s AS VARCHAR) LIKE '%x%' "
+            "AND NOT b AND f >= -1.5 AND 3 < i AND t IS NOT NULL"
+        )
+        lance_filter, columns = translate_filter(self.con, condition, SCHEMA)
+        self.assertEqual(
+            lance_filter,
+            "(((`s` IN ('a', 'b''c')) OR (`s` IS NULL)) AND (`s` LIKE '%x%') AND (NOT `b`) "
+            "AND (`f` >= -1.5) AND (`i` > 3) AND (`t` IS NOT NULL))",
+        )
+        self.assertEqual(columns, {"s", "b", "f", "i", "t"})
+
+    def test_untranslatable_queries(self):
+        for query in [
+            "SELECT i + 1 FROM lance_table",
+            "SELECT DISTINCT s FROM lance_table",
+            "SELECT s, COUNT(*) FROM lance_table GROUP BY s",
+            "SELECT * FROM other_table",
+            "SELECT * FROM lance_table WHERE s = 1",
+            "SELECT * FROM lance_table WHERE t > '2020-01-01'",
+            "SELECT * FROM lance_table WHERE s LIKE 'a\\b'",
+            "SELECT * FROM lance_table WHERE lower(s) = 'a'",
+            "SELECT no_such_column FROM lance_table",
+            "SELECT i AS s, s AS i FROM lance_table ORDER BY i",
+            "SELECT 1; SELECT 2",
+        ]:
+            self.assertIsNone(self.plan(query), query)
+
+
+class TestNativeQueryEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def query(self, query):
+        response = self.client.post(
+            "/api/query", json={"query": query, "queryEngine": "lance", "tablePath": LANCE_PATH}
+        )
+        self.assertEqual(response.json["status"], "success", response.json)
+        return response
+
+    def duckdb_rows(self, query):
+        client = LanceTableClient.from_table_path(LANCE_PATH)
+        with client.duckdb_connection() as con:
+            return [list(row) for row in con.execute(query).fetchall()]
+
+    def test_filtered_count_uses_index(self):
+        query = "SELECT COUNT(*) AS total FROM lance_table WHERE idx_int BETWEEN 10 AND 50"
+        response = self.query(query)
+        self.assertEqual(response.headers["X-Lance-Scan"], "native; indices=idx_int_idx")
+        self.assertEqual(response.json["column_names"], ["total"])
+        self.assertEqual(response.json["rows"], self.duckdb_rows(query))
+
+    def test_page_matches_duckdb(self):
+        query = (
+            "SELECT idx_int, idx_str AS s, int_with_nulls FROM lance_table "
+            "WHERE bool = true ORDER BY int_with_nulls DESC NULLS FIRST, idx_str LIMIT 5 OFFSET 2"
+        )
+        response = self.query(query)
+        self.assertEqual(response.headers["X-Lance-Scan"], "native")
+        self.assertEqual(response.json["column_names"], ["idx_int", "s", "int_with_nulls"])
+        self.assertEqual(response.json["rows"], self.duckdb_rows(query))
+
+    def test_blobs_are_summarized(self):
+        response = self.query("SELECT blob FROM lance_table WHERE blob IS NOT NULL LIMIT 1")
+        self.assertEqual(response.headers["X-Lance-Scan"], "native")
+        self.assertTrue(response.json["rows"][0][0].startswith("Bytes "))
+
+    def test_complex_queries_fall_back_to_duckdb(self):
+        response = self.query("SELECT idx_int + 1 AS j FROM lance_table ORDER BY j LIMIT 2")
+        self.assertEqual(response.headers["X-Lance-Scan"], "duckdb")
+        self.assertEqual(len(response.json["rows"]), 2)
+
+
+class TestFilterPositions(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        table = pa.table({"i": pa.array(range(100), pa.int64())})
+        self.path = os.path.join(self.temp_dir.name, "t.lance")
+        self.dataset = lance.write_dataset(table, self.path, max_rows_per_file=30)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_positions_across_fragments(self):
+        source = LanceRowSource(self.dataset, self.dataset.schema)
+        positions = source.filter_positions("i % 7 = 0 OR i > 95")
+        expected = [i for i in range(100) if i % 7 == 0 or i > 95]
+        self.assertEqual(positions.to_pylist(), expected)
+
+    def test_deleted_rows(self):
+        self.dataset.delete("i = 3")
+        dataset = lance.dataset(self.path)
+        self.assertIsNone(LanceRowSource(dataset, dataset.schema).filter_positions("i > 10"))
+
+    def test_row_page(self):
+        client = SmooSenseApp().create_app().test_client()
+        response = client.post(
+            "/api/rows/page",
+            json={
+                "tablePath": self.path,
+                "queryEngine": "lance",
+                "condition": "i BETWEEN 40 AND 70",
+                "pageSize": 10,
+                "pageNumber": 2,
+            },
+        )
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json["num_rows"], 31)
+        self.assertEqual([row[0] for row in response.json["rows"]], list(range(50, 60)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import lance
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.table_cache import LanceTableCache
+from smoosense.lance.table_client import LanceTableClient
+
+
+def make_table(num_rows: int, offset: int = 0) -> pa.Table:
+    return pa.table({"x": pa.array(range(offset, offset + num_rows), pa.int64())})
+
+
+class TestLanceTableCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.table_path = os.path.join(self.temp_dir.name, "numbers.lance")
+        lance.write_dataset(make_table(1000), self.table_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def count(self, cache: LanceTableCache) -> int:
+        client = LanceTableClient.from_table_path(self.table_path)
+        with client.duckdb_connection(cache) as con:
+            return con.execute("SELECT COUNT(*) FROM lance_table").fetchone()[0]
+
+    def test_hits_and_new_versions(self):
+        cache = LanceTableCache(max_bytes=1024 * 1024)
+        self.assertEqual(self.count(cache), 1000)
+        self.assertEqual(self.count(cache), 1000)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["bytes"], 8000)
+
+        lance.write_dataset(make_table(500, 1000), self.table_path, mode="append")
+        self.assertEqual(self.count(cache), 1500)
+        entries = cache.entries()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["version"], 2)
+        self.assertEqual(entries[0]["num_rows"], 1500)
+
+    def test_too_large_tables_are_scanned_lazily(self):
+        cache = LanceTableCache(max_bytes=4000)
+        self.assertEqual(self.count(cache), 1000)
+        self.assertEqual(cache.stats()["skipped_too_large"], 1)
+        self.assertEqual(cache.entries(), [])
+
+    def test_reading_stops_past_the_budget(self):
+        # On-disk sizes are compressed, so the Arrow size is checked while reading
+        dataset = lance.dataset(self.table_path)
+        cache = LanceTableCache(max_bytes=4000)
+        with mock.patch.object(LanceTableCache, "_estimate_nbytes", return_value=0):
+            with mock.patch.object(cache, "_load", wraps=cache._load) as load:
+                self.assertIsNone(cache.get_or_load(self.table_path, dataset, dataset.schema))
+                self.assertIsNone(cache.get_or_load(self.table_path, dataset, dataset.schema))
+        self.assertEqual(load.call_count, 1)
+        stats = cache.stats()
+        self.assertEqual((stats["skipped_too_large"], stats["too_large"]), (2, 1))
+        self.assertEqual(stats["bytes"], 0)
+
+        cache.max_bytes = 1024 * 1024
+        self.assertEqual(cache.drop(table_path=self.table_path), 0)
+        self.assertEqual(self.count(cache), 1000)
+        self.assertEqual(cache.stats()["bytes"], 8000)
+
+    def test_unknown_size_is_not_loaded(self):
+        dataset = lance.dataset(self.table_path)
+        cache = LanceTableCache(max_bytes=1024 * 1024)
+        with mock.patch.object(LanceTableCache, "_estimate_nbytes", return_value=None):
+            self.assertIsNone(cache.get_or_load(self.table_path, dataset, dataset.schema))
+        self.assertEqual(cache.stats()["too_large"], 1)
+
+    def test_single_loader_per_version(self):
+        dataset = lance.dataset(self.table_path)
+        cache = LanceTableCache(max_bytes=1024 * 1024)
+        load = cache._load
+
+        def slow_load(*args):
+            time.sleep(0.2)
+            return load(*args)
+
+        results = []
+        with mock.patch.object(cache, "_load", side_effect=slow_load) as mocked:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(
+                        cache.get_or_load(self.table_path, dataset, dataset.schema)
+                    )
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual([table.num_rows for table in results], [1000] * 4)
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["hits"]), (1, 3))
+        self.assertEqual(cache._loading, {})
+
+    def test_evicts_least_recently_used(self):
+        cache = LanceTableCache(max_bytes=20000)
+        tables = {}
+        for name in ["a", "b", "c"]:
+            tables[name] = os.path.join(self.temp_dir.name, f"{name}.lance")
+            dataset = lance.write_dataset(make_table(1000), tables[name])
+            cache.get_or_load(tables[name], dataset, dataset.schema)
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["evicted_bytes"], 8000)
+        self.assertEqual([e["table_path"] for e in cache.entries()], [tables["b"], tables["c"]])
+
+        self.assertEqual(cache.drop(table_path=tables["b"], version=2), 0)
+        self.assertEqual(cache.drop(table_path=tables["b"]), 1)
+        self.assertEqual(cache.drop(), 1)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+
+class TestLanceTableCacheApi(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.table_path = os.path.join(self.temp_dir.name, "numbers.lance")
+        lance.write_dataset(make_table(100), self.table_path)
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_list_and_drop(self):
+        response = self.client.post(
+            "/api/query",
+            json={
+                "query": "SELECT SUM(x) FROM lance_table",
+                "queryEngine": "lance",
+                "tablePath": self.table_path,
+            },
+        )
+        self.assertEqual(response.json["rows"], [[4950]])
+
+        cache_info = self.client.get("/api/lance/table-cache").json
+        self.assertEqual(cache_info["stats"]["entries"], 1)
+        self.assertEqual(cache_info["entries"][0]["table_path"], self.table_path)
+
+        response = self.client.post(
+            "/api/lance/table-cache/drop", json={"tablePath": self.table_path, "version": "1"}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/api/lance/table-cache/drop", json={"tablePath": self.table_path, "version": 1}
+        )
+        self.assertEqual(response.json["dropped"], 1)
+        self.assertEqual(response.json["stats"]["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
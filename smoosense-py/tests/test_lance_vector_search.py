@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+import lance
+import numpy as np
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+
+NUM_ROWS = 3000
+DIMENSION = 8
+
+
+class TestVectorSearchEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.vectors = np.random.default_rng(0).standard_normal((NUM_ROWS, DIMENSION))
+        cls.vectors = cls.vectors.astype("float32")
+        table = pa.table(
+            {
+                "id": pa.array(range(NUM_ROWS), pa.int64()),
+                "label": [f"l{i % 3}" for i in range(NUM_ROWS)],
+                "image": pa.array([b"\x00" * 10] * NUM_ROWS, pa.binary()),
+                "vector": pa.FixedSizeListArray.from_arrays(
+                    pa.array(cls.vectors.ravel()), DIMENSION
+                ),
+            }
+        )
+        cls.indexed_path = os.path.join(cls.temp_dir.name, "indexed.lance")
+        dataset = lance.write_dataset(table, cls.indexed_path)
+        dataset.create_index("vector", index_type="IVF_PQ", num_partitions=4, num_sub_vectors=2)
+        cls.flat_path = os.path.join(cls.temp_dir.name, "flat.lance")
+        lance.write_dataset(table, cls.flat_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def search(self, status=200, **body):
+        response = self.client.post("/api/lance/search", json=body)
+        self.assertEqual(response.status_code, status, response.json)
+        return response.json
+
+    def exact_neighbors(self, query, k, mask=None):
+        distances = ((self.vectors - query) ** 2).sum(axis=1)
+        if mask is not None:
+            distances[~mask] = np.inf
+        return list(np.argsort(distances)[:k])
+
+    def test_flat_search(self):
+        result = self.search(tablePath=self.flat_path, vector=self.vectors[7].tolist(), k=5)
+        self.assertEqual(result["strategy"], "flat")
+        self.assertIsNone(result["index"])
+        self.assertEqual(result["column_names"], ["id", "label", "image", "_distance", "_rowid"])
+        self.assertEqual(
+            [row[0] for row in result["rows"]], self.exact_neighbors(self.vectors[7], 5)
+        )
+        self.assertEqual(result["rows"][0][2], "Bytes 10")
+
+    def test_index_search_with_report(self):
+        result = self.search(
+            tablePath=self.indexed_path,
+            vector=self.vectors[7].tolist(),
+            k=10,
+            nprobes=4,
+            refineFactor=10,
+            report=True,
+        )
+        self.assertEqual(result["strategy"], "index")
+        self.assertEqual(result["index"]["type"], "IVF_PQ")
+        self.assertEqual(result["rows"][0][0], 7)
+        self.assertGreaterEqual(result["report"]["recall"], 0.5)
+        self.assertGreater(result["report"]["flat_latency"], 0)
+
+        result = self.search(tablePath=self.indexed_path, vector=[0.0] * DIMENSION, useIndex=False)
+        self.assertEqual(result["strategy"], "flat")
+        self.assertEqual(len(result["rows"]), 10)
+
+    def test_search_from_row_with_filter(self):
+        first = self.search(tablePath=self.flat_path, vector=self.vectors[7].tolist(), k=1)
+        row_id = first["rows"][0][-1]
+        result = self.search(
+            tablePath=self.flat_path, rowId=row_id, k=5, filter="label = 'l1'", columns=["id"]
+        )
+        self.assertEqual(result["column_names"], ["id", "_distance", "_rowid"])
+        mask = np.array([i % 3 == 1 for i in range(NUM_ROWS)])
+        self.assertEqual(
+            [row[0] for row in result["rows"]], self.exact_neighbors(self.vectors[7], 5, mask)
+        )
+
+    def test_invalid_requests(self):
+        self.search(400, tablePath=self.flat_path, vector=[1.0, 2.0])
+        self.search(400, tablePath=self.flat_path, k=5)
+        self.search(400, tablePath=self.flat_path, vector=[0.0] * DIMENSION, k=0)
+        self.search(400, tablePath=self.flat_path, vector=[0.0] * DIMENSION, column="label")
+        self.search(400, tablePath=self.flat_path, vector=[0.0] * DIMENSION, columns=["nope"])
+        self.search(404, tablePath=self.flat_path, rowId=NUM_ROWS * 10)
+        self.search(403, tablePath=self.flat_path, rowId=0, filter="1; DELETE FROM t")
+
+
+if __name__ == "__main__":
+    unittest.main()
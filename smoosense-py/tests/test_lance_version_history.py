@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+
+import lancedb
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.lance.version_history import VersionSnapshotCache
+
+
+class TestListVersions(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db = lancedb.connect(self.temp_dir.name)
+        table = db.create_table("t", pa.table({"i": list(range(10)), "s": ["x"] * 10}))  # v1
+        table.add(pa.table({"i": [10, 11], "s": ["y", "y"]}))  # v2
+        table.create_scalar_index("i")  # v3
+        table.add_columns({"j": "i * 2"})  # v4
+        table.delete("i < 3")  # v5
+        table.drop_columns(["s"])  # v6
+        self.client = LanceTableClient(self.temp_dir.name, "t")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_diffs(self):
+        versions = self.client.list_versions()
+        self.assertEqual([v.version for v in versions], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([v.rows_add for v in versions[:2]], [10, 2])
+        self.assertEqual(versions[4].rows_remove, 3)
+        self.assertEqual(versions[2].indices_add, ["i_idx"])
+        self.assertEqual(versions[3].columns_add, ["j"])
+        self.assertEqual(versions[5].columns_remove, ["s"])
+        self.assertEqual(versions[0].columns_add, [])
+
+    def test_pages_match_full_listing(self):
+        full = [v.model_dump() for v in self.client.list_versions()]
+        page, total = self.client.list_versions_page(offset=2, limit=2)
+        self.assertEqual(total, 6)
+        self.assertEqual([v.model_dump() for v in page], full[2:4])
+
+        page, total = self.client.list_versions_page(since_version=3)
+        self.assertEqual(total, 3)
+        self.assertEqual([v.model_dump() for v in page], full[3:])
+
+        page, total = self.client.list_versions_page(since_version=6)
+        self.assertEqual((page, total), ([], 0))
+
+    def test_versions_are_memoized(self):
+        cache = VersionSnapshotCache()
+        self.client.list_versions(cache=cache)
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 6, "entries": 6})
+        self.client.list_versions_page(since_version=4, cache=cache)
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 6)
+
+    def test_endpoint(self):
+        client = SmooSenseApp().create_app().test_client()
+        url = f"/api/lance/list-versions?dbPath={self.temp_dir.name}&tableName=t"
+        response = client.get(f"{url}&sinceVersion=2&limit=3")
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.headers["X-Total-Versions"], "4")
+        self.assertEqual([v["version"] for v in response.json], [3, 4, 5])
+
+        response = client.get(f"{url}&limit=-1")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
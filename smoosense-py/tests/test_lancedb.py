@@ -1,7 +1,9 @@
 import os
 import unittest
+from unittest.mock import patch
 
 import lancedb
+from lance import LanceDataset
 
 from smoosense.lance.db_client import LanceDBClient
 from smoosense.lance.table_client import LanceTableClient
@@ -66,6 +68,41 @@ class TestLanceTableClient(unittest.TestCase):
         # Version 6 should have string_idx added
         self.assertIn("string_idx", versions_dict[6].indices_add)
 
+    def test_run_duckdb_sql_scans_lazily(self):
+        """Test that DuckDB queries stream from Lance with projection and filter pushdown"""
+        client = LanceTableClient(self.data_uri, self.table_name)
+        original_scanner = LanceDataset.scanner
+        scans = []
+
+        def recording_scanner(dataset, *args, **kwargs):
+            scans.append(kwargs)
+            return original_scanner(dataset, *args, **kwargs)
+
+        with (
+            patch.object(LanceDataset, "to_table", side_effect=AssertionError("materialized")),
+            patch.object(LanceDataset, "scanner", recording_scanner),
+        ):
+            column_names, rows = client.run_duckdb_sql(
+                "SELECT idx_int, string FROM lance_table WHERE idx_int >= 197 ORDER BY idx_int"
+            )
+
+        self.assertEqual(column_names, ["idx_int", "string"])
+        self.assertEqual(sorted({row[0] for row in rows}), [197, 198, 199])
+        self.assertEqual(sorted(scans[0]["columns"]), ["idx_int", "string"])
+        self.assertIsNotNone(scans[0]["filter"])
+
+    def test_run_duckdb_sql_filters_unsupported_by_lance(self):
+        """Test that filters Lance cannot push down are applied in Arrow"""
+        client = LanceTableClient(self.data_uri, self.table_name)
+        _, rows = client.run_duckdb_sql(
+            "SELECT COUNT(*) FROM lance_table WHERE uint8 IN (1, 2, 3) AND idx_int < 100"
+        )
+        _, expected = client.run_duckdb_sql(
+            "SELECT COUNT(*) FROM (SELECT * FROM lance_table LIMIT 1000000) "
+            "WHERE uint8 IN (1, 2, 3) AND idx_int < 100"
+        )
+        self.assertEqual(rows, expected)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,267 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from botocore.exceptions import ClientError
+
+from smoosense.utils.media_cache import MediaCache, OriginObject
+from tests.base_fs_test import BaseFSTest
+from tests.test_fs_get_file_ranges import CONTENT, S3_ETAG, S3_PATH, FakeS3Client
+
+
+class FakeOrigin:
+    """Origin serving versioned objects, counting the fetches."""
+
+    def __init__(self, delay: float = 0.0):
+        self.objects: dict[str, bytes] = {}
+        self.fetches: list[tuple[str, object]] = []
+        self.delay = delay
+
+    def fetch(self, url: str):
+        def fetch(etag):
+            self.fetches.append((url, etag))
+            time.sleep(self.delay)
+            content = self.objects[url]
+            current = f'"{hash(content)}"'
+            if etag == current:
+                return OriginObject(None, etag)
+            return OriginObject(iter([content[:3], content[3:]]), etag=current, size=len(content))
+
+        return fetch
+
+
+class TestMediaCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.origin = FakeOrigin()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def cache(self, **kwargs):
+        return MediaCache(cache_dir=self.temp_dir.name, **kwargs)
+
+    def read(self, cache, entry):
+        with open(cache.path(entry), "rb") as f:
+            return f.read()
+
+    def test_hit_and_revalidation(self):
+        cache = self.cache(revalidate_after=60)
+        self.origin.objects["a"] = b"hello world"
+        entry, status = cache.get("a", self.origin.fetch("a"))
+        self.assertEqual(status, "miss")
+        self.assertEqual(self.read(cache, entry), b"hello world")
+        self.assertEqual(cache.get("a", self.origin.fetch("a"))[1], "hit")
+        self.assertEqual(len(self.origin.fetches), 1)
+
+        # Stale entries are revalidated with their ETag
+        entry.validated_at -= 120
+        self.assertEqual(cache.get("a", self.origin.fetch("a"))[1], "revalidated")
+        self.assertEqual(self.origin.fetches[-1], ("a", entry.etag))
+
+        # and fetched again once changed
+        entry.validated_at -= 120
+        self.origin.objects["a"] = b"changed"
+        entry, status = cache.get("a", self.origin.fetch("a"))
+        self.assertEqual(status, "miss")
+        self.assertEqual(self.read(cache, entry), b"changed")
+
+    def test_content_addressed_and_persistent(self):
+        cache = self.cache()
+        self.origin.objects = {"a": b"same bytes", "b": b"same bytes"}
+        a, _ = cache.get("a", self.origin.fetch("a"))
+        b, _ = cache.get("b", self.origin.fetch("b"))
+        self.assertEqual(cache.path(a), cache.path(b))
+
+        reloaded = self.cache()
+        self.assertEqual(reloaded.stats()["entries"], 2)
+        self.assertEqual(reloaded.get("a", self.origin.fetch("a"))[1], "hit")
+
+    def test_lru_eviction(self):
+        cache = self.cache(max_bytes=25)
+        self.origin.objects = {url: url.encode() * 10 for url in "abc"}
+        a, _ = cache.get("a", self.origin.fetch("a"))
+        cache.get("b", self.origin.fetch("b"))
+        cache.get("a", self.origin.fetch("a"))
+        cache.get("c", self.origin.fetch("c"))
+        self.assertIsNone(cache.peek("b"))
+        self.assertIsNotNone(cache.peek("a"))
+        self.assertEqual(cache.stats()["nbytes"], 20)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir.name, "index"))), 2)
+
+    def test_large_objects_are_not_cached(self):
+        cache = self.cache(max_object_bytes=5)
+        self.origin.objects["a"] = b"too large"
+        self.assertEqual(cache.get("a", self.origin.fetch("a")), (None, "skipped"))
+        # Objects of unknown size are dropped once they grow too large
+        fetch = self.origin.fetch("a")
+        self.assertEqual(
+            cache.get("a", lambda etag: OriginObject(fetch(etag).chunks)), (None, "skipped")
+        )
+        self.assertIsNone(cache.peek("a"))
+        self.assertEqual([files for _, _, files in os.walk(self.temp_dir.name) if files], [])
+
+    def test_concurrent_requests_fetch_once(self):
+        cache = self.cache()
+        self.origin.delay = 0.1
+        self.origin.objects["a"] = b"hello"
+        statuses: list[str] = []
+        threads = [
+            threading.Thread(
+                target=lambda: statuses.append(cache.get("a", self.origin.fetch("a"))[1])
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.origin.fetches), 1)
+        self.assertEqual(sorted(statuses), ["hit"] * 7 + ["miss"])
+        self.assertEqual(cache._locks, {})
+
+    def test_misses_are_streamed_into_the_cache(self):
+        cache = self.cache()
+        self.origin.objects["a"] = b"hello world"
+        entry, origin, status = cache.lookup("a", self.origin.fetch("a"))
+        self.assertEqual((entry, status), (None, "miss"))
+        chunks = cache.tee("a", origin)
+        # The first chunk is sent before the object is read to the end
+        self.assertEqual(next(chunks), b"hel")
+        self.assertIsNone(cache.peek("a"))
+        self.assertEqual(b"".join(chunks), b"lo world")
+        self.assertEqual(self.read(cache, cache.peek("a")), b"hello world")
+        self.assertEqual(cache.lookup("a", self.origin.fetch("a"))[2], "hit")
+
+    def test_concurrent_misses_fetch_once(self):
+        cache = self.cache()
+        self.origin.delay = 0.1
+        self.origin.objects["a"] = b"hello"
+        results: list[tuple[str, bytes]] = []
+
+        def send():
+            entry, origin, status = cache.lookup("a", self.origin.fetch("a"))
+            if origin is not None:
+                results.append((status, b"".join(cache.tee("a", origin))))
+            else:
+                results.append((status, self.read(cache, entry)))
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.origin.fetches), 1)
+        self.assertEqual(sorted(results), [("hit", b"hello")] * 7 + [("miss", b"hello")])
+        self.assertEqual(cache._locks, {})
+
+    def test_interrupted_streams_are_not_cached(self):
+        cache = self.cache()
+        self.origin.objects["a"] = b"hello world"
+        _, origin, _ = cache.lookup("a", self.origin.fetch("a"))
+        chunks = cache.tee("a", origin)
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(cache.peek("a"))
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, "blobs")), [])
+
+    def test_large_objects_are_streamed_without_writing(self):
+        cache = self.cache(max_object_bytes=5)
+        self.origin.objects["a"] = b"too large"
+        _, origin, _ = cache.lookup("a", self.origin.fetch("a"))
+        self.assertEqual(b"".join(cache.tee("a", origin)), b"too large")
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        self.assertEqual(cache.stats()["skipped"], 1)
+
+
+class TestGetFileFromMediaCache(BaseFSTest):
+    def setUp(self):
+        super().setUp()
+        self.s3_client = FakeS3Client(CONTENT)
+        self.app.config["S3_CLIENT"] = self.s3_client
+        self.app.config["MEDIA_CACHE"] = MediaCache(
+            cache_dir=os.path.join(self.temp_dir, "media-cache")
+        )
+
+    def get(self, **headers):
+        return self.client.get("/get-file", query_string={"path": S3_PATH}, headers=headers)
+
+    def test_s3_file_is_served_from_cache(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Media-Cache"], "miss")
+        self.assertEqual(response.get_data(), CONTENT)
+        self.assertEqual(response.headers["ETag"], S3_ETAG)
+        self.assertEqual(response.headers["Last-Modified"], "Tue, 02 Jan 2024 03:04:05 GMT")
+        self.assertEqual(response.headers["Content-Type"], "video/mp4")
+
+        self.s3_client.calls.clear()
+        response = self.get(Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["X-Media-Cache"], "hit")
+        self.assertEqual(response.get_data(), CONTENT[100:200])
+        response = self.get(**{"If-None-Match": S3_ETAG})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.s3_client.calls, [])
+
+    def test_concurrent_misses_fetch_once(self):
+        get_object = self.s3_client.get_object
+        fetches = []
+
+        def slow_get_object(**kwargs):
+            fetches.append(kwargs)
+            time.sleep(0.1)
+            return get_object(**kwargs)
+
+        self.s3_client.get_object = slow_get_object
+        results: list[tuple[str, bytes]] = []
+
+        def send():
+            response = self.app.test_client().get("/get-file", query_string={"path": S3_PATH})
+            results.append((response.headers["X-Media-Cache"], response.get_data()))
+
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(sorted(results), [("hit", CONTENT)] * 3 + [("miss", CONTENT)])
+
+    def test_uncached_ranges_are_proxied(self):
+        response = self.get(Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertNotIn("X-Media-Cache", response.headers)
+        self.assertEqual(self.s3_client.calls, [{"op": "get", "Range": "bytes=100-199"}])
+
+    def test_ranges_from_the_start_fill_the_cache_in_the_background(self):
+        response = self.get(Range="bytes=0-")
+        self.assertEqual(response.status_code, 206)
+        self.assertNotIn("X-Media-Cache", response.headers)
+        self.assertEqual(response.get_data(), CONTENT)
+
+        cache = self.app.config["MEDIA_CACHE"]
+        deadline = time.time() + 5
+        while cache.peek(S3_PATH) is None and time.time() < deadline:
+            time.sleep(0.01)
+        response = self.get(Range="bytes=0-99")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["X-Media-Cache"], "hit")
+        self.assertEqual(response.get_data(), CONTENT[:100])
+
+    def test_missing_s3_file(self):
+        def get_object(**kwargs):
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}},
+                "GetObject",
+            )
+
+        self.s3_client.get_object = get_object
+        self.assertEqual(self.get().status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
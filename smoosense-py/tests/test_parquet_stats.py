@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.parquet_stats import footer_column_stats
+
+PWD = os.path.dirname(__file__)
+
+
+def int_file_with_statistics(statistics):
+    """Stand-in for a ParquetFile of one int64 column in one row group of 3 rows."""
+    row_group = SimpleNamespace(num_rows=3, column=lambda i: SimpleNamespace(statistics=statistics))
+    metadata = SimpleNamespace(
+        num_columns=1,
+        num_row_groups=1,
+        schema=SimpleNamespace(column=lambda i: SimpleNamespace(path="x")),
+        row_group=lambda rg: row_group,
+    )
+    return SimpleNamespace(metadata=metadata, schema_arrow=pa.schema([("x", pa.int64())]))
+
+
+class TestParquetStats(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "data.parquet")
+        table = pa.table(
+            {
+                "x": pa.array([None if i % 10 == 0 else i for i in range(100)], pa.int64()),
+                "label": pa.array([None] * 50 + [f"v{i % 3}" for i in range(50)]),
+                "no_stats": pa.array(range(100), pa.int32()),
+                "tags": pa.array([[i] if i % 4 else None for i in range(100)]),
+            }
+        )
+        pq.write_table(
+            table, self.file_path, row_group_size=25, write_statistics=["x", "label", "tags"]
+        )
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_footer_stats(self):
+        stats, missing = footer_column_stats(pq.ParquetFile(self.file_path))
+        self.assertEqual(stats["x"], {"cnt_null": 10, "min": 1, "max": 99})
+        # String min/max may be truncated by writers, without flags saying so they are scanned
+        self.assertEqual(stats["label"]["cnt_null"], 50)
+        self.assertEqual(
+            missing,
+            {
+                "label": {"min", "max"},
+                "no_stats": {"cnt_null", "min", "max"},
+                "tags": {"cnt_null"},
+            },
+        )
+
+    def test_inexact_min_max_are_scanned(self):
+        for min_exact, max_exact in [(True, True), (True, False), (False, True)]:
+            with self.subTest(min_exact=min_exact, max_exact=max_exact):
+                statistics = SimpleNamespace(
+                    has_null_count=True,
+                    null_count=0,
+                    has_min_max=True,
+                    min=1,
+                    max=3,
+                    physical_type="INT64",
+                    is_min_value_exact=min_exact,
+                    is_max_value_exact=max_exact,
+                )
+                stats, missing = footer_column_stats(int_file_with_statistics(statistics))
+                if min_exact and max_exact:
+                    self.assertEqual(stats["x"], {"cnt_null": 0, "min": 1, "max": 3})
+                    self.assertEqual(missing, {})
+                else:
+                    self.assertEqual(missing, {"x": {"min", "max"}})
+
+    def test_endpoint_scans_only_missing_stats(self):
+        with patch("smoosense.handlers.parquet.scan_missing_stats") as scan:
+            scan.return_value = {}
+            self.client.get("/api/parquet/stats", query_string={"filePath": self.file_path})
+        self.assertEqual(
+            scan.call_args.args[2],
+            {"label": {"min", "max"}, "no_stats": {"cnt_null", "min", "max"}, "tags": {"cnt_null"}},
+        )
+
+        response = self.client.get("/api/parquet/stats", query_string={"filePath": self.file_path})
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json["cnt_all"], 100)
+        self.assertEqual(response.json["num_row_groups"], 4)
+        self.assertEqual(response.json["scanned_columns"], ["label", "no_stats", "tags"])
+        columns = response.json["columns"]
+        self.assertEqual(
+            columns["x"],
+            {"cnt_null": 10, "cnt_not_null": 90, "min": 1, "max": 99, "source": "footer"},
+        )
+        self.assertEqual(
+            columns["no_stats"],
+            {"cnt_null": 0, "cnt_not_null": 100, "min": 0, "max": 99, "source": "scan"},
+        )
+        self.assertEqual((columns["label"]["min"], columns["label"]["max"]), ("v0", "v2"))
+        self.assertEqual(columns["tags"]["cnt_null"], 25)
+        self.assertIsNone(columns["tags"]["min"])
+
+    def test_footer_only(self):
+        response = self.client.get(
+            "/api/parquet/stats", query_string={"filePath": self.file_path, "allowScan": "false"}
+        )
+        self.assertEqual(response.json["scanned_columns"], [])
+        self.assertEqual(response.json["columns"]["x"]["source"], "footer")
+        self.assertEqual(response.json["columns"]["no_stats"]["source"], "missing")
+        self.assertIsNone(response.json["columns"]["no_stats"]["cnt_null"])
+
+    def test_matches_duckdb_on_various_types(self):
+        file_path = os.path.join(PWD, "../../data/dummy_data_various_types.parquet")
+        response = self.client.get("/api/parquet/stats", query_string={"filePath": file_path})
+        columns = response.json["columns"]
+        self.assertEqual(columns["datetime"]["min"], "2023-01-01 00:00:00")
+        self.assertEqual(columns["datetime"]["source"], "footer")
+        self.assertEqual(columns["struct_with_nulls"]["cnt_null"], 18)
+        self.assertIsNone(columns["np_nan"]["max"])
+        self.assertAlmostEqual(columns["halffloat"]["max"], 0.98876953125)
+
+    def test_file_not_found(self):
+        response = self.client.get(
+            "/api/parquet/stats", query_string={"filePath": "/not/found.parquet"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
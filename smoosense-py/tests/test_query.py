@@ -2,6 +2,8 @@ import json
 import os
 import unittest
 
+import pyarrow as pa
+
 from smoosense.app import SmooSenseApp
 from smoosense.my_logging import getLogger
 
@@ -41,6 +43,14 @@ class TestQueryEndpoint(unittest.TestCase):
         self.assertEqual(response_data["column_names"], ["test_column"])
         self.assertEqual(response_data["rows"], [[1]])
 
+    def test_decimal_and_hugeint_values(self):
+        """Test that DECIMAL values keep their type while HUGEINT sums are integers"""
+        query_payload = {"query": "SELECT 3::DECIMAL(18, 0) AS d, SUM(range) AS s FROM range(3)"}
+
+        response = self.client.post("/api/query", json=query_payload)
+
+        self.assertEqual(response.get_json()["rows"], [["3", 3]])
+
     def test_update_query_returns_403(self):
         """Test that an UPDATE query returns HTTP 403 (forbidden)"""
         query_payload = {"query": "UPDATE test_table SET column1 = 'value' WHERE id = 1"}
@@ -85,6 +95,76 @@ class TestQueryEndpoint(unittest.TestCase):
         self.assertIsInstance(response_data["rows"][0][0], int)
         self.assertGreater(response_data["rows"][0][0], 0)
 
+    def test_arrow_response(self):
+        """Test that the result is streamed as Arrow IPC when the client prefers it"""
+        query_payload = {"query": "SELECT 1 AS a, 'x' AS b, 'NaN'::DOUBLE AS c"}
+        headers = {"Accept": "application/vnd.apache.arrow.stream, application/json;q=0.9"}
+
+        response = self.client.post("/api/query", json=query_payload, headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/vnd.apache.arrow.stream")
+        self.assertIn("X-Query-Runtime", response.headers)
+        table = pa.ipc.open_stream(response.get_data()).read_all()
+        self.assertEqual(table.column_names, ["a", "b", "c"])
+        self.assertEqual(table.to_pylist()[0]["b"], "x")
+
+    def test_arrow_response_with_compression(self):
+        """Test that compressed Arrow IPC streams can be read back"""
+        for compression in ["lz4", "zstd"]:
+            with self.subTest(compression=compression):
+                query_payload = {
+                    "query": "SELECT range AS i FROM range(1000)",
+                    "compression": compression,
+                }
+                headers = {"Accept": "application/vnd.apache.arrow.stream"}
+
+                response = self.client.post("/api/query", json=query_payload, headers=headers)
+
+                self.assertEqual(response.status_code, 200)
+                table = pa.ipc.open_stream(response.get_data()).read_all()
+                self.assertEqual(table.num_rows, 1000)
+
+        response = self.client.post(
+            "/api/query",
+            json={"query": "SELECT 1", "compression": "gzip"},
+            headers={"Accept": "application/vnd.apache.arrow.stream"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_arrow_response_streams_record_batches(self):
+        """Test that large results are streamed as several record batches"""
+        query_payload = {"query": "SELECT range AS i FROM range(200000)"}
+        headers = {"Accept": "application/vnd.apache.arrow.stream"}
+
+        response = self.client.post("/api/query", json=query_payload, headers=headers)
+
+        self.assertTrue(response.is_streamed)
+        reader = pa.ipc.open_stream(response.get_data())
+        batches = list(reader)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(sum(batch.num_rows for batch in batches), 200000)
+
+    def test_arrow_response_error_is_json(self):
+        """Test that query errors are still reported as JSON in Arrow mode"""
+        query_payload = {"query": "SELECT * FROM non_existing_table"}
+        headers = {"Accept": "application/vnd.apache.arrow.stream"}
+
+        response = self.client.post("/api/query", json=query_payload, headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        response_data = response.get_json()
+        self.assertEqual(response_data["status"], "error")
+        self.assertIsNotNone(response_data["error"])
+
+    def test_json_is_default(self):
+        """Test that clients without a preference still get JSON"""
+        response = self.client.post(
+            "/api/query", json={"query": "SELECT 1 AS a"}, headers={"Accept": "*/*"}
+        )
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json()["rows"], [[1]])
+
 
 if __name__ == "__main__":
     unittest.main()
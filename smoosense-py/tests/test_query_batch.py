@@ -0,0 +1,139 @@
+import json
+import os
+import unittest
+
+import duckdb
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.query_batch import plan_batch
+
+PWD = os.path.dirname(__file__)
+PARQUET_PATH = os.path.abspath(os.path.join(PWD, "../../data/dummy_data_various_types.parquet"))
+LANCE_PATH = os.path.abspath(os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"))
+TABLE = f"read_parquet('{PARQUET_PATH}')"
+
+
+class TestPlanBatch(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_combines_aggregates_over_the_same_table(self):
+        queries = [
+            f"SELECT COUNT(*) FROM {TABLE}",
+            f"SELECT MIN(idx_int), MAX(idx_int) AS max_id FROM {TABLE} WHERE idx_int > 10",
+            f"SELECT COUNT(*) FILTER (WHERE idx_int < 50) + 1 FROM {TABLE} WHERE idx_int > 20",
+            f"SELECT idx_int FROM {TABLE} LIMIT 3",
+            "SELECT COUNT(*) FROM range(10)",
+        ]
+        units = plan_batch(self.con, queries)
+        self.assertEqual(len(units), 3)
+        combined = [unit for unit in units if unit.is_combined]
+        self.assertEqual(len(combined), 1)
+        self.assertEqual(combined[0].members, [(0, 1), (1, 2), (2, 1)])
+
+        # Results and column names match those of the standalone queries
+        result = self.con.execute(combined[0].sql)
+        names = [desc[0] for desc in result.description]
+        row = result.fetchone()
+        expected_names = []
+        expected_row = []
+        for query in queries[:3]:
+            standalone = self.con.execute(query)
+            expected_names.extend(desc[0] for desc in standalone.description)
+            expected_row.extend(standalone.fetchone())
+        self.assertEqual(names, expected_names)
+        self.assertEqual(list(row), expected_row)
+
+    def test_does_not_combine_grouped_or_row_queries(self):
+        queries = [
+            f"SELECT bool, COUNT(*) FROM {TABLE} GROUP BY bool",
+            f"SELECT COUNT(*) AS cnt, cnt + 1 FROM {TABLE}",
+            f"SELECT COUNT(*) FROM {TABLE}",
+        ]
+        units = plan_batch(self.con, queries)
+        self.assertEqual([unit.members for unit in units], [[(0, None)], [(1, None)], [(2, None)]])
+        self.assertEqual(len(plan_batch(self.con, queries[2:] * 2, combine=False)), 2)
+
+
+class TestQueryBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = SmooSenseApp().create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def post_batch(self, **body):
+        response = self.client.post("/api/query/batch", json=body)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.data.decode().splitlines() if line]
+        return response, sorted(lines, key=lambda line: line["index"])
+
+    def batch_queries(self, table=TABLE):
+        return [
+            f"SELECT COUNT(*) AS cnt FROM {table}",
+            f"SELECT COUNT(*) AS cnt FROM {table} WHERE bool",
+            f"SELECT no_such_column FROM {table}",
+            f"SELECT idx_int FROM {table} ORDER BY idx_int LIMIT 2",
+        ]
+
+    def assert_batch_results(self, lines):
+        self.assertEqual([line["index"] for line in lines], [0, 1, 2, 3])
+        self.assertEqual(lines[0]["column_names"], ["cnt"])
+        self.assertEqual(lines[0]["rows"], [[200]])
+        self.assertEqual(lines[1]["status"], "success")
+        self.assertEqual(lines[0]["combined"], 2)
+        # A failing query does not fail the others
+        self.assertEqual(lines[2]["status"], "error")
+        self.assertIn("no_such_column", lines[2]["error"])
+        self.assertEqual(lines[3]["status"], "success")
+        self.assertEqual(len(lines[3]["rows"]), 2)
+
+    def test_batch(self):
+        response, lines = self.post_batch(queries=self.batch_queries(), batchId="b1")
+        self.assertEqual(response.headers["X-Batch-Id"], "b1")
+        self.assert_batch_results(lines)
+        self.assertTrue(all(line["batch_id"] == "b1" for line in lines))
+
+    def test_parallel_batch(self):
+        _, lines = self.post_batch(queries=self.batch_queries(), parallelism=3)
+        self.assert_batch_results(lines)
+
+    def test_results_are_cached(self):
+        queries = self.batch_queries()
+        self.post_batch(queries=queries)
+        _, lines = self.post_batch(queries=queries)
+        self.assertEqual([line.get("cached") for line in lines], [True, True, False, True])
+
+        # Results are shared with /api/query
+        response = self.client.post("/api/query", json={"query": queries[0]})
+        self.assertEqual(response.headers.get("X-Query-Cache"), "hit")
+
+    def test_lance_batch(self):
+        _, lines = self.post_batch(
+            queries=self.batch_queries("lance_table"),
+            queryEngine="lance",
+            tablePath=LANCE_PATH,
+            parallelism=2,
+        )
+        self.assertEqual(lines[0]["rows"], [[203]])
+        self.assertEqual(lines[2]["status"], "error")
+        self.assertEqual(lines[3]["status"], "success")
+
+    def test_invalid_batches(self):
+        response = self.client.post("/api/query/batch", json={"queries": "SELECT 1"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/api/query/batch", json={"queries": ["SELECT 1"], "parallelism": 0}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            "/api/query/batch", json={"queries": ["SELECT 1", "DELETE FROM t"]}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
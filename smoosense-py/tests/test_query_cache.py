@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+
+import duckdb
+import pyarrow as pa
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.query_cache import (
+    QueryResultCache,
+    is_deterministic,
+    normalize_sql,
+    query_cache_key,
+)
+
+PWD = os.path.dirname(__file__)
+
+
+class TestQueryCacheKey(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.parquet_path = os.path.join(self.temp_dir.name, "data.parquet")
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(10)) TO '{self.parquet_path}'")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_normalize_sql_keeps_literals(self):
+        self.assertEqual(
+            normalize_sql("SELECT  x\n FROM 'a  b.parquet'\tWHERE y = 'c   d' ;"),
+            "SELECT x FROM 'a  b.parquet' WHERE y = 'c   d'",
+        )
+
+    def test_non_deterministic_queries(self):
+        self.assertFalse(is_deterministic("SELECT * FROM 't.parquet' ORDER BY random()"))
+        self.assertFalse(is_deterministic("SELECT * FROM 't.parquet' USING SAMPLE 10"))
+        self.assertFalse(is_deterministic("SELECT now()"))
+        self.assertTrue(is_deterministic("SELECT * FROM 'random().parquet'"))
+
+    def test_key_follows_file_changes(self):
+        query = f"SELECT COUNT(*) FROM '{self.parquet_path}'"
+        key = query_cache_key(query, "duckdb", "json")
+        self.assertIsNotNone(key)
+        self.assertEqual(
+            key, query_cache_key(f"SELECT  COUNT(*)\nFROM '{self.parquet_path}'", "duckdb", "json")
+        )
+        self.assertNotEqual(key, query_cache_key(query, "duckdb", "arrow"))
+
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(20)) TO '{self.parquet_path}'")
+        os.utime(self.parquet_path, ns=(0, 0))
+        self.assertNotEqual(key, query_cache_key(query, "duckdb", "json"))
+
+    def test_uncacheable_queries(self):
+        self.assertIsNone(query_cache_key("SELECT 1", "duckdb", "json"))
+        self.assertIsNone(
+            query_cache_key("SELECT * FROM 'https://example.com/a.parquet'", "duckdb", "json")
+        )
+        self.assertIsNone(
+            query_cache_key("SELECT * FROM 's3://bucket/a.parquet'", "duckdb", "json")
+        )
+
+    def test_lance_key(self):
+        table_path = os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance")
+        self.assertIsNotNone(
+            query_cache_key("SELECT * FROM lance_table", "lance", "json", table_path=table_path)
+        )
+        self.assertIsNone(query_cache_key("SELECT * FROM lance_table", "lance", "json"))
+
+
+class TestQueryResultCache(unittest.TestCase):
+    def test_lru_eviction_by_bytes(self):
+        cache = QueryResultCache(max_bytes=100)
+        cache.put("a", "A", 40)
+        cache.put("b", "B", 40)
+        self.assertEqual(cache.get("a"), "A")
+        cache.put("c", "C", 40)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(
+            cache.stats(),
+            {"hits": 3, "misses": 1, "entries": 2, "bytes": 80, "max_bytes": 100},
+        )
+
+    def test_oversized_entry_is_not_cached(self):
+        cache = QueryResultCache(max_bytes=10)
+        cache.put("a", "A", 11)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+
+class TestQueryCacheEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.parquet_path = os.path.join(self.temp_dir.name, "data.parquet")
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(10)) TO '{self.parquet_path}'")
+        self.app = SmooSenseApp().create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _count(self):
+        return self.client.post(
+            "/api/query", json={"query": f"SELECT COUNT(*) FROM '{self.parquet_path}'"}
+        )
+
+    def test_repeated_query_hits_cache(self):
+        first = self._count()
+        second = self._count()
+        self.assertEqual(first.headers["X-Query-Cache"], "miss")
+        self.assertEqual(second.headers["X-Query-Cache"], "hit")
+        self.assertEqual(second.get_json()["rows"], [[10]])
+
+        stats = self.client.get("/api/query/cache-stats").get_json()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_changed_file_invalidates_cache(self):
+        self._count()
+        duckdb.sql(f"COPY (SELECT range AS x FROM range(20)) TO '{self.parquet_path}'")
+        os.utime(self.parquet_path, ns=(0, 0))
+
+        response = self._count()
+        self.assertEqual(response.headers["X-Query-Cache"], "miss")
+        self.assertEqual(response.get_json()["rows"], [[20]])
+
+    def test_errors_are_not_cached(self):
+        query = {"query": f"SELECT missing_column FROM '{self.parquet_path}'"}
+        self.client.post("/api/query", json=query)
+        response = self.client.post("/api/query", json=query)
+        self.assertEqual(response.get_json()["status"], "error")
+        self.assertEqual(response.headers["X-Query-Cache"], "miss")
+
+    def test_streamed_arrow_result_is_cached(self):
+        query = {"query": f"SELECT x FROM '{self.parquet_path}' ORDER BY x"}
+        headers = {"Accept": "application/vnd.apache.arrow.stream"}
+        first = self.client.post("/api/query", json=query, headers=headers)
+        first_table = pa.ipc.open_stream(first.get_data()).read_all()
+        second = self.client.post("/api/query", json=query, headers=headers)
+
+        self.assertEqual(first.headers["X-Query-Cache"], "miss")
+        self.assertEqual(second.headers["X-Query-Cache"], "hit")
+        self.assertTrue(pa.ipc.open_stream(second.get_data()).read_all().equals(first_table))
+
+
+if __name__ == "__main__":
+    unittest.main()
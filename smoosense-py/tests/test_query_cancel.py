@@ -0,0 +1,121 @@
+import socket
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import duckdb
+
+from smoosense.app import SmooSenseApp
+from smoosense.exceptions import QueryInterruptedException
+from smoosense.utils.query_registry import QueryRegistry, socket_disconnect_check
+
+SLOW_QUERY = "SELECT COUNT(*) FROM range(100000000000) WHERE range % 7 = 3"
+
+
+class TestQueryRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = QueryRegistry(default_timeout=60, check_interval=0.05)
+        self.con = duckdb.connect()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_deadline_interrupts_query(self):
+        start = time.time()
+        with self.assertRaisesRegex(QueryInterruptedException, "exceeded its deadline"):
+            with self.registry.track("q1", self.con, timeout=0.2):
+                self.con.execute(SLOW_QUERY).fetchall()
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(self.registry.running_query_ids(), [])
+
+    def test_cancel_before_start(self):
+        self.assertFalse(self.registry.cancel("q2"))
+        with self.assertRaisesRegex(QueryInterruptedException, "was cancelled"):
+            with self.registry.track("q2", self.con):
+                self.fail("Cancelled query should not run")
+
+    def test_disconnect_interrupts_query(self):
+        with self.assertRaisesRegex(QueryInterruptedException, "abandoned"):
+            with self.registry.track("q3", self.con, is_disconnected=lambda: True):
+                self.con.execute(SLOW_QUERY).fetchall()
+
+    def test_late_interrupt_spares_the_next_query(self):
+        interrupts = []
+        connection = SimpleNamespace(interrupt=lambda: interrupts.append(time.time()))
+        checking, exited = threading.Event(), threading.Event()
+
+        def is_disconnected():
+            # The tracked block ends while the watcher decides to interrupt it
+            checking.set()
+            exited.wait(5)
+            return True
+
+        with self.registry.track("q4", connection, is_disconnected=is_disconnected):
+            self.assertTrue(checking.wait(5))
+        exited.set()
+        # By now the connection runs another query, which must not be interrupted
+        time.sleep(0.2)
+        self.assertEqual(interrupts, [])
+
+    def test_timeout_is_capped_by_default(self):
+        self.assertEqual(self.registry.resolve_timeout(None), 60)
+        self.assertEqual(self.registry.resolve_timeout(5), 5)
+        self.assertEqual(self.registry.resolve_timeout(600), 60)
+
+    def test_socket_disconnect_check(self):
+        server, client = socket.socketpair()
+        is_disconnected = socket_disconnect_check({"werkzeug.socket": server})
+        self.assertIsNotNone(is_disconnected)
+        self.assertFalse(is_disconnected())
+        client.close()
+        self.assertTrue(is_disconnected())
+        server.close()
+        self.assertIsNone(socket_disconnect_check({}))
+
+
+class TestQueryCancelEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = SmooSenseApp(query_timeout=30).create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def test_query_timeout(self):
+        response = self.client.post("/api/query", json={"query": SLOW_QUERY, "timeout": 0.3})
+        data = response.get_json()
+        self.assertEqual(data["status"], "error")
+        self.assertIn("exceeded its deadline", data["error"])
+
+    def test_cancel_running_query(self):
+        results = {}
+
+        def run():
+            results["response"] = self.client.post(
+                "/api/query", json={"query": SLOW_QUERY, "queryId": "slow-1"}
+            ).get_json()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        registry = self.app.config["QUERY_REGISTRY"]
+        for _ in range(100):
+            if "slow-1" in registry.running_query_ids():
+                break
+            time.sleep(0.05)
+
+        response = self.client.post("/api/query/cancel", json={"queryId": "slow-1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["was_running"])
+
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results["response"]["status"], "error")
+        self.assertEqual(results["response"]["query_id"], "slow-1")
+        self.assertIn("was cancelled", results["response"]["error"])
+
+    def test_cancel_requires_query_id(self):
+        response = self.client.post("/api/query/cancel", json={})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import os
+import unittest
+
+from smoosense.app import SmooSenseApp
+
+PWD = os.path.dirname(__file__)
+PARQUET_PATH = os.path.abspath(os.path.join(PWD, "../../data/dummy_data_various_types.parquet"))
+LANCE_PATH = os.path.abspath(os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"))
+
+
+class TestQueryStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = SmooSenseApp().create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def post_stream(self, **body):
+        response = self.client.post("/api/query/stream", json=body)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        return [json.loads(line) for line in response.data.decode().splitlines() if line]
+
+    def rows_of(self, lines):
+        return [row for line in lines if line["type"] == "rows" for row in line["rows"]]
+
+    def test_stream_matches_query(self):
+        query = f"SELECT idx_int, idx_str, float FROM '{PARQUET_PATH}' ORDER BY idx_int"
+        lines = self.post_stream(query=query, queryId="q1")
+        self.assertEqual(lines[0]["type"], "schema")
+        self.assertEqual(lines[0]["column_names"], ["idx_int", "idx_str", "float"])
+        end = lines[-1]
+        self.assertEqual(end["type"], "end")
+        self.assertEqual(end["status"], "success")
+        self.assertEqual(end["num_rows"], 200)
+        self.assertFalse(end["truncated"])
+        self.assertEqual(end["query_id"], "q1")
+
+        expected = self.client.post("/api/query", json={"query": query}).json
+        self.assertEqual(self.rows_of(lines), expected["rows"])
+
+    def test_rows_are_sent_in_chunks(self):
+        lines = self.post_stream(query="SELECT range AS i FROM range(5000)")
+        chunks = [line for line in lines if line["type"] == "rows"]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([row[0] for row in self.rows_of(lines)], list(range(5000)))
+
+    def test_row_cap(self):
+        lines = self.post_stream(query="SELECT range AS i FROM range(5000)", maxRows=2100)
+        self.assertEqual(len(self.rows_of(lines)), 2100)
+        self.assertTrue(lines[-1]["truncated"])
+
+        lines = self.post_stream(query="SELECT range AS i FROM range(2048)", maxRows=2048)
+        self.assertEqual(len(self.rows_of(lines)), 2048)
+        self.assertFalse(lines[-1]["truncated"])
+
+    def test_byte_cap(self):
+        lines = self.post_stream(
+            query="SELECT repeat('x', 100) AS s FROM range(5000)", maxBytes=10_000
+        )
+        self.assertLessEqual(sum(len(json.dumps(line)) for line in lines[:-1]), 10_000)
+        self.assertGreater(len(self.rows_of(lines)), 50)
+        self.assertTrue(lines[-1]["truncated"])
+
+    def test_byte_cap_with_uneven_rows(self):
+        # Large rows first: cutting by the average row size would overshoot the cap
+        query = "SELECT repeat('x', CASE WHEN range < 50 THEN 1000 ELSE 1 END) AS s FROM range(100)"
+        response = self.client.post("/api/query/stream", json={"query": query, "maxBytes": 20_000})
+        lines = response.data.decode().splitlines(keepends=True)
+        self.assertLessEqual(sum(len(line) for line in lines[:-1]), 20_000)
+        rows = self.rows_of([json.loads(line) for line in lines])
+        self.assertEqual(len(rows), 19)
+        self.assertTrue(json.loads(lines[-1])["truncated"])
+
+    def test_lance(self):
+        lines = self.post_stream(
+            query="SELECT idx_int FROM lance_table", queryEngine="lance", tablePath=LANCE_PATH
+        )
+        self.assertEqual(lines[-1]["num_rows"], 203)
+
+    def test_errors(self):
+        lines = self.post_stream(query=f"SELECT no_such_column FROM '{PARQUET_PATH}'")
+        self.assertEqual(lines[-1]["status"], "error")
+        self.assertIn("no_such_column", lines[-1]["error"])
+
+        response = self.client.post("/api/query/stream", json={"query": "SELECT 1", "maxRows": 0})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/query/stream", json={"query": "DELETE FROM t"})
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import duckdb
+import lance
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.row_cursor import (
+    LanceRowSource,
+    ParquetRowSource,
+    RowCursor,
+    RowCursorStore,
+)
+
+PWD = os.path.dirname(__file__)
+LANCE_PATH = os.path.abspath(os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"))
+
+
+class TestRowCursor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for i in range(3):
+            table = pa.table(
+                {
+                    "i": pa.array(range(i * 100, (i + 1) * 100), pa.int64()),
+                    "bucket": pa.array([(j * 7) % 10 for j in range(100)], pa.int64()),
+                }
+            )
+            pq.write_table(
+                table, os.path.join(self.temp_dir.name, f"part-{i}.parquet"), row_group_size=10
+            )
+        self.glob = os.path.join(self.temp_dir.name, "*.parquet")
+        self.file_path = os.path.join(self.temp_dir.name, "part-1.parquet")
+        self.con = duckdb.connect()
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def tearDown(self):
+        self.con.close()
+        self.temp_dir.cleanup()
+
+    def page(self, **body):
+        response = self.client.post("/api/rows/page", json=body)
+        self.assertEqual(response.status_code, 200, response.json)
+        return response.json
+
+    def expected(self, path, where="", order="", limit=7, offset=0):
+        return self.con.execute(
+            f"SELECT i FROM '{path}' {where} {order} LIMIT {limit} OFFSET {offset}"
+        ).fetchall()
+
+    def test_positions_across_files(self):
+        source = ParquetRowSource(self.con, self.glob)
+        self.assertEqual(source.offsets, [0, 100, 200])
+        self.assertEqual(source.num_rows, 300)
+        positions = source.positions(self.con, "bucket = 3", ['"i" DESC'])
+        self.assertEqual(len(positions), 30)
+        column_names, rows = source.fetch(self.con, positions.to_pylist()[:3])
+        self.assertEqual(column_names, ["i", "bucket"])
+        self.assertEqual(rows, [(299, 3), (289, 3), (279, 3)])
+
+    def test_pages_match_limit_offset(self):
+        for path in (self.file_path, self.glob):
+            response = self.page(tablePath=path, pageSize=7, pageNumber=5)
+            self.assertEqual(response["strategy"], "scan")
+            self.assertEqual(
+                [row[:1] for row in response["rows"]],
+                [list(row) for row in self.expected(path, offset=28)],
+            )
+
+            response = self.page(
+                tablePath=path,
+                pageSize=7,
+                pageNumber=3,
+                condition="bucket < 5",
+                sorting=[
+                    {"field": "bucket", "direction": "desc"},
+                    {"field": "i", "direction": "asc"},
+                ],
+            )
+            self.assertEqual(response["strategy"], "positions")
+            self.assertEqual(
+                response["num_rows"], len(self.expected(path, "WHERE bucket < 5", limit=1000))
+            )
+            expected = self.expected(path, "WHERE bucket < 5", "ORDER BY bucket DESC, i", offset=14)
+            self.assertEqual([row[:1] for row in response["rows"]], [list(row) for row in expected])
+
+    def test_cursor_is_reused_for_the_same_view_only(self):
+        sorting = [{"field": "bucket", "direction": "asc"}]
+        first = self.page(tablePath=self.glob, pageSize=5, sorting=sorting)
+        self.assertFalse(first["cursor_reused"])
+        second = self.page(
+            tablePath=self.glob,
+            pageSize=5,
+            pageNumber=2,
+            sorting=sorting,
+            cursorId=first["cursor_id"],
+        )
+        self.assertTrue(second["cursor_reused"])
+        self.assertEqual(second["cursor_id"], first["cursor_id"])
+
+        # Another sorting replaces the cursor
+        third = self.page(tablePath=self.glob, pageSize=5, cursorId=first["cursor_id"])
+        self.assertFalse(third["cursor_reused"])
+        self.assertNotEqual(third["cursor_id"], first["cursor_id"])
+
+        # So does a change of the files
+        pq.write_table(
+            pa.table({"i": [1], "bucket": [1]}), os.path.join(self.temp_dir.name, "part-3.parquet")
+        )
+        fourth = self.page(tablePath=self.glob, pageSize=5, cursorId=third["cursor_id"])
+        self.assertFalse(fourth["cursor_reused"])
+        self.assertEqual(fourth["num_rows"], 301)
+
+    def test_oversized_views_use_limit_offset(self):
+        app = SmooSenseApp().create_app()
+        app.config["ROW_CURSOR_STORE"] = RowCursorStore(max_bytes=100)
+        client = app.test_client()
+        sorting = [{"field": "i", "direction": "desc"}]
+        for query_engine, path in (("duckdb", self.glob), ("lance", LANCE_PATH)):
+            for page_number, strategy in ((1, "positions"), (2, "offset")):
+                response = client.post(
+                    "/api/rows/page",
+                    json={
+                        "tablePath": path,
+                        "queryEngine": query_engine,
+                        "condition": "true",
+                        "sorting": sorting if query_engine == "duckdb" else [],
+                        "pageSize": 5,
+                        "pageNumber": page_number,
+                    },
+                ).json
+                self.assertEqual(response["strategy"], strategy, response)
+                self.assertIsNone(response["cursor_id"])
+                self.assertEqual(len(response["rows"]), 5)
+            if query_engine == "duckdb":
+                expected = self.expected(path, order="ORDER BY i DESC", limit=5, offset=5)
+                self.assertEqual([row[:1] for row in response["rows"]], [list(r) for r in expected])
+        self.assertEqual(app.config["ROW_CURSOR_STORE"].stats()["oversized"], 2)
+
+    def test_no_cursor_without_fingerprint(self):
+        with mock.patch("smoosense.handlers.rows.file_fingerprints", return_value=None):
+            response = self.page(tablePath=self.glob, pageSize=5, pageNumber=2)
+        self.assertEqual(response["strategy"], "offset")
+        self.assertIsNone(response["cursor_id"])
+        self.assertEqual([row[:1] for row in response["rows"]], [[i] for i in range(5, 10)])
+
+    def test_past_the_last_page(self):
+        response = self.page(tablePath=self.file_path, pageSize=50, pageNumber=3)
+        self.assertEqual(response["rows"], [])
+
+    def test_lance_pages_match_limit_offset(self):
+        query_payload = {"queryEngine": "lance", "tablePath": LANCE_PATH}
+        for condition, order in [(None, ""), ("int8 > 0", "ORDER BY idx_str DESC")]:
+            sorting = [{"field": "idx_str", "direction": "desc"}] if order else []
+            response = self.page(
+                pageSize=5, pageNumber=4, condition=condition, sorting=sorting, **query_payload
+            )
+            where = f"WHERE {condition}" if condition else ""
+            expected = self.client.post(
+                "/api/query",
+                json={
+                    "query": f"SELECT * FROM lance_table {where} {order} LIMIT 5 OFFSET 15",
+                    **query_payload,
+                },
+            ).json
+            self.assertEqual(response["column_names"], expected["column_names"])
+            self.assertEqual(response["rows"], expected["rows"])
+
+    def test_lance_positions_are_row_offsets(self):
+        path = os.path.join(self.temp_dir.name, "deleted.lance")
+        lance.write_dataset(
+            pa.table({"i": pa.array(range(10), pa.int64())}), path, max_rows_per_file=4
+        )
+        dataset = lance.dataset(path)
+        dataset.delete("i IN (2, 5)")
+        dataset = lance.dataset(path)
+        source = LanceRowSource(dataset, dataset.schema)
+
+        positions = source.positions(self.con, "i % 2 = 1", ["i DESC"]).to_pylist()
+
+        # Offsets count the rows left after the deletion
+        self.assertEqual(positions, [7, 5, 2, 1])
+        self.assertEqual(source.fetch(self.con, positions)[1], [(9,), (7,), (3,), (1,)])
+
+    def test_other_tables_use_limit_offset(self):
+        csv_path = os.path.join(self.temp_dir.name, "data.csv")
+        self.con.execute(f"COPY (SELECT range AS a FROM range(7)) TO '{csv_path}'")
+        response = self.page(
+            tablePath=csv_path,
+            pageSize=3,
+            pageNumber=2,
+            sorting=[{"field": "a", "direction": "desc"}],
+        )
+        self.assertEqual(response["strategy"], "offset")
+        self.assertIsNone(response["cursor_id"])
+        self.assertEqual(response["rows"], [[3], [2], [1]])
+
+    def test_invalid_requests(self):
+        for body in [
+            {"tablePath": self.file_path, "pageSize": 0},
+            {"tablePath": self.file_path, "sorting": [{"field": "i", "direction": "up"}]},
+            {"pageSize": 10},
+        ]:
+            self.assertEqual(self.client.post("/api/rows/page", json=body).status_code, 400)
+        response = self.client.post(
+            "/api/rows/page", json={"tablePath": self.file_path, "condition": "1=1; DELETE FROM t"}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class TestRowCursorStore(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "data.parquet")
+        pq.write_table(pa.table({"i": range(100)}), self.file_path)
+        self.source = ParquetRowSource(self.con, self.file_path)
+
+    def tearDown(self):
+        self.con.close()
+        self.temp_dir.cleanup()
+
+    def cursor(self, view_key, num_positions):
+        return RowCursor(view_key, self.source, pa.array(range(num_positions), pa.int64()))
+
+    def test_eviction_by_bytes(self):
+        # Positions of tables under 2^32 rows take 4 bytes each
+        store = RowCursorStore(max_bytes=4 * 150)
+        first = self.cursor("a", 100)
+        second = self.cursor("b", 100)
+        self.assertEqual(first.positions.type, pa.uint32())
+        self.assertTrue(store.put(first))
+        self.assertTrue(store.put(second))
+        self.assertIsNone(store.get(first.cursor_id, "a"))
+        self.assertIs(store.get(second.cursor_id, "b"), second)
+        self.assertEqual(store.stats()["bytes"], 400)
+        self.assertEqual(store.stats()["evictions"], 1)
+
+        oversized = self.cursor("c", 200)
+        self.assertFalse(store.put(oversized))
+        self.assertTrue(store.is_oversized("c"))
+        self.assertIsNone(store.get(oversized.cursor_id, "c"))
+
+    def test_view_mismatch_drops_the_cursor(self):
+        store = RowCursorStore()
+        cursor = self.cursor("a", 10)
+        store.put(cursor)
+        self.assertIsNone(store.get(cursor.cursor_id, "b"))
+        self.assertIsNone(store.get(cursor.cursor_id, "a"))
+        self.assertEqual(store.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from smoosense.app import SmooSenseApp
+from smoosense.lance.table_client import LanceTableClient
+from smoosense.utils.row_cursor import LanceRowSource, ParquetRowSource
+from smoosense.utils.row_sampler import sample_rows
+
+PWD = os.path.dirname(__file__)
+LANCE_PATH = os.path.abspath(os.path.join(PWD, "../../data/lance/dummy_data_various_types.lance"))
+
+
+class TestRowSampler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for i in range(2):
+            table = pa.table({"i": pa.array(range(i * 1000, (i + 1) * 1000), pa.int64())})
+            pq.write_table(
+                table, os.path.join(self.temp_dir.name, f"part-{i}.parquet"), row_group_size=100
+            )
+        self.glob = os.path.join(self.temp_dir.name, "*.parquet")
+        self.con = duckdb.connect()
+        self.source = ParquetRowSource(self.con, self.glob)
+        self.client = SmooSenseApp().create_app().test_client()
+
+    def tearDown(self):
+        self.con.close()
+        self.temp_dir.cleanup()
+
+    def sample(self, **body):
+        response = self.client.post("/api/rows/sample", json=body)
+        self.assertEqual(response.status_code, 200, response.json)
+        return response.json
+
+    def test_blocks_are_row_groups(self):
+        blocks = self.source.blocks(self.con)
+        self.assertEqual(len(blocks), 20)
+        self.assertEqual(blocks[0], (0, 100))
+        self.assertEqual(blocks[10], (1000, 100))
+
+    def test_same_seed_same_sample(self):
+        first = sample_rows(self.con, self.source, 50, seed=7)
+        second = sample_rows(self.con, self.source, 50, seed=7)
+        other = sample_rows(self.con, self.source, 50, seed=8)
+        self.assertEqual(first.rows, second.rows)
+        self.assertNotEqual(first.rows, other.rows)
+        self.assertEqual(len({row[0] for row in first.rows}), 50)
+        self.assertEqual(first.attempts, 1)
+        # Only a few row groups are read
+        self.assertLessEqual(len({row[0] // 100 for row in first.rows}), 8)
+
+    def test_filter_oversamples_and_retries(self):
+        sample = sample_rows(self.con, self.source, 30, seed=1, condition="i % 10 = 0")
+        self.assertEqual(len(sample.rows), 30)
+        self.assertTrue(all(row[0] % 10 == 0 for row in sample.rows))
+        self.assertGreater(sample.attempts, 1)
+        self.assertFalse(sample.exhaustive)
+
+    def test_rare_matches_fall_back_to_matching_positions(self):
+        with patch("smoosense.utils.row_sampler.MAX_ATTEMPTS", 1):
+            sample = sample_rows(self.con, self.source, 5, seed=1, condition="i IN (3, 1503, 1999)")
+        self.assertTrue(sample.exhaustive)
+        self.assertEqual(sample.candidates, 10)
+        self.assertEqual(sorted(row[0] for row in sample.rows), [3, 1503, 1999])
+
+    def test_fallback_samples_positions_in_sql(self):
+        condition = "i % 50 = 0"
+        with (
+            patch("smoosense.utils.row_sampler.MAX_ATTEMPTS", 1),
+            patch.object(ParquetRowSource, "positions", side_effect=AssertionError),
+        ):
+            first = sample_rows(self.con, self.source, 30, seed=2, condition=condition)
+            second = sample_rows(self.con, self.source, 30, seed=2, condition=condition)
+        self.assertTrue(first.exhaustive)
+        values = [row[0] for row in first.rows]
+        self.assertEqual(len(set(values)), 30)
+        self.assertTrue(all(value % 50 == 0 for value in values))
+        self.assertEqual(sorted(values), sorted(row[0] for row in second.rows))
+
+    def test_lance_fallback(self):
+        source = LanceRowSource(
+            *LanceTableClient.from_table_path(LANCE_PATH).get_compatible_dataset()
+        )
+        # Go straight to the fallback
+        with patch("smoosense.utils.row_sampler.MAX_ATTEMPTS", 0):
+            sample = sample_rows(self.con, source, 5, seed=1, condition="int8 > 0")
+        self.assertTrue(sample.exhaustive)
+        self.assertEqual(len(sample.rows), 5)
+        int8 = sample.column_names.index("int8")
+        self.assertTrue(all(row[int8] > 0 for row in sample.rows))
+
+    def test_sample_larger_than_the_table(self):
+        sample = sample_rows(self.con, self.source, 5000, seed=1)
+        self.assertEqual(len(sample.rows), 2000)
+        self.assertEqual(len({row[0] for row in sample.rows}), 2000)
+
+    def test_endpoint(self):
+        first = self.sample(tablePath=self.glob, size=10, condition="i < 500")
+        self.assertEqual(first["strategy"], "blocks")
+        self.assertEqual(first["column_names"], ["i"])
+        self.assertTrue(all(row[0] < 500 for row in first["rows"]))
+        again = self.sample(tablePath=self.glob, size=10, condition="i < 500", seed=first["seed"])
+        self.assertEqual(again["rows"], first["rows"])
+
+    def test_lance(self):
+        query_payload = {"queryEngine": "lance", "tablePath": LANCE_PATH}
+        response = self.sample(size=20, seed=3, condition="int8 > 0", **query_payload)
+        self.assertEqual(len(response["rows"]), 20)
+        int8 = response["column_names"].index("int8")
+        self.assertTrue(all(row[int8] > 0 for row in response["rows"]))
+        expected = self.client.post(
+            "/api/query", json={"query": "SELECT * FROM lance_table LIMIT 1", **query_payload}
+        ).json
+        self.assertEqual(response["column_names"], expected["column_names"])
+
+    def test_other_tables_use_reservoir_sample(self):
+        csv_path = os.path.join(self.temp_dir.name, "data.csv")
+        self.con.execute(f"COPY (SELECT range AS a FROM range(100)) TO '{csv_path}'")
+        first = self.sample(tablePath=csv_path, size=5, seed=4)
+        self.assertEqual(first["strategy"], "reservoir")
+        self.assertEqual(len(first["rows"]), 5)
+        self.assertEqual(self.sample(tablePath=csv_path, size=5, seed=4)["rows"], first["rows"])
+
+    def test_invalid_seed(self):
+        response = self.client.post("/api/rows/sample", json={"tablePath": self.glob, "seed": -1})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
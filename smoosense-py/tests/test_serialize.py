@@ -1,9 +1,16 @@
+import json
+import os
 import unittest
 
+import duckdb
+import pyarrow as pa
+
 from smoosense.my_logging import getLogger
-from smoosense.utils.serialization import serialize
+from smoosense.utils.serialization import sanitize_array, serialize, table_rows
 
 logger = getLogger(__name__)
+PWD = os.path.dirname(__file__)
+PARQUET_PATH = os.path.abspath(os.path.join(PWD, "../../data/dummy_data_various_types.parquet"))
 
 
 class TestSerialize(unittest.TestCase):
@@ -38,5 +45,57 @@ class TestSerialize(unittest.TestCase):
         self.assertEqual(serialize(float("-inf")), None)
 
 
+class TestTableRows(unittest.TestCase):
+    def setUp(self):
+        self.con = duckdb.connect()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_matches_serialize(self):
+        for query in [
+            f"SELECT * FROM '{PARQUET_PATH}'",
+            "SELECT [1.5, 'nan'::DOUBLE, NULL] AS l, {'x': 'inf'::FLOAT, 'b': '\\x01'::BLOB} "
+            "AS s, MAP {'k': '-inf'::DOUBLE} AS m, ['1', 'nan']::DOUBLE[2] AS a FROM range(3)",
+        ]:
+            result = self.con.execute(query)
+            expected = serialize(result.fetchall())
+            rows = table_rows(self.con, self.con.execute(query).arrow())
+            self.assertEqual(json.dumps(rows, default=str), json.dumps(expected, default=str))
+
+    def test_sanitize_array(self):
+        floats = pa.array([1.0, float("nan"), None, float("-inf")], pa.float16())
+        self.assertEqual(sanitize_array(floats).to_pylist(), [1.0, None, None, None])
+        blobs = pa.chunked_array([[b"abc", None], [b""]], pa.large_binary())
+        self.assertEqual(sanitize_array(blobs).to_pylist(), ["Bytes 3", None, "Bytes 0"])
+        # HUGEINT, e.g. SUM(BIGINT), is exported as DECIMAL(38, 0)
+        relation = self.con.sql("SELECT SUM(range) AS s FROM range(100)")
+        sums = relation.arrow().column(0)
+        self.assertEqual(sanitize_array(sums, relation.types[0]).to_pylist(), [4950])
+        self.assertIs(sanitize_array(sums), sums)
+        ints = pa.array([1, 2])
+        self.assertIs(sanitize_array(ints), ints)
+
+    def test_hugeint_and_decimal_columns(self):
+        relation = self.con.sql(
+            "SELECT SUM(range) AS h, {'h': SUM(range)} AS s, [SUM(range)] AS l, "
+            "3::DECIMAL(18, 0) AS d18, 4::DECIMAL(38, 0) AS d38, [5::DECIMAL(38, 0)] AS dl "
+            "FROM range(3)"
+        )
+        rows = table_rows(self.con, relation.arrow(), relation.types)
+        self.assertEqual(rows, relation.fetchall())
+        self.assertEqual(json.dumps(rows, default=str), '[[3, {"h": 3}, [3], "3", "4", ["5"]]]')
+
+    def test_sliced_nested_arrays(self):
+        lists = pa.array([[9.0], [1.0, float("nan")], None, [2.0]]).slice(1)
+        self.assertEqual(sanitize_array(lists).to_pylist(), [[1.0, None], None, [2.0]])
+        structs = pa.array([{"a": b"y"}, {"a": b"xx"}, None]).slice(1)
+        self.assertEqual(sanitize_array(structs).to_pylist(), [{"a": "Bytes 2"}, None])
+        maps = pa.array(
+            [[("z", 1.0)], [("a", float("inf"))], None], pa.map_(pa.string(), pa.float64())
+        ).slice(1)
+        self.assertEqual(sanitize_array(maps).to_pylist(), [[("a", None)], None])
+
+
 if __name__ == "__main__":
     unittest.main()
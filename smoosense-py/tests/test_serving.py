@@ -0,0 +1,90 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from smoosense.utils.port import find_available_port
+from smoosense.utils.serving import ThreadPoolWSGIServer
+
+PWD = os.path.dirname(__file__)
+
+
+def slow_app(environ, start_response):
+    time.sleep(float(environ.get("QUERY_STRING") or 0))
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+
+
+def fetch(port, delay=0.0):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/?{delay}", timeout=10) as response:
+        return response.read().decode()
+
+
+class TestThreadPoolWSGIServer(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadPoolWSGIServer("127.0.0.1", 0, slow_app, threads=4)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.drain(5)
+        self.server.server_close()
+
+    def test_requests_run_concurrently(self):
+        start = time.time()
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lambda _: fetch(self.port, 0.5), range(4)))
+        self.assertEqual(len(results), 4)
+        self.assertLess(time.time() - start, 1.5)
+
+    def test_shutdown_drains_in_flight_requests(self):
+        with ThreadPoolExecutor(1) as executor:
+            pending = executor.submit(fetch, self.port, 0.5)
+            time.sleep(0.1)
+            self.server.shutdown()
+            self.assertTrue(self.server.drain(5))
+            self.assertEqual(pending.result(), str(os.getpid()))
+
+
+class TestServe(unittest.TestCase):
+    def test_serve_and_stop_gracefully(self):
+        port = find_available_port()
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from test_serving import slow_app;"
+            "from smoosense.utils.serving import serve;"
+            f"serve(slow_app, host='127.0.0.1', port={port}, threads=2)"
+        )
+        process = subprocess.Popen([sys.executable, "-c", script, PWD])
+        try:
+            for _ in range(50):
+                try:
+                    fetch(port)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            with ThreadPoolExecutor(4) as executor:
+                pids = set(executor.map(lambda _: fetch(port, 0.3), range(8)))
+            self.assertEqual(pids, {str(process.pid)})
+
+            with ThreadPoolExecutor(1) as executor:
+                pending = executor.submit(fetch, port, 0.5)
+                time.sleep(0.2)
+                process.send_signal(signal.SIGTERM)
+                self.assertEqual(pending.result(), str(process.pid))
+            self.assertEqual(process.wait(timeout=10), 0)
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+
+if __name__ == "__main__":
+    unittest.main()
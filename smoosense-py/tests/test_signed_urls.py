@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.signed_urls import SignedUrlCache, object_urls
+
+
+class FakeSigner:
+    """S3 client signing URLs with a counter, so that each signature is distinct."""
+
+    def __init__(self):
+        self.calls: list[tuple[str, int]] = []
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        if Params["Bucket"] == "broken":
+            raise ValueError("Invalid bucket name")
+        self.calls.append((f"s3://{Params['Bucket']}/{Params['Key']}", ExpiresIn))
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?sig={len(self.calls)}"
+
+
+class TestSignedUrlCache(unittest.TestCase):
+    def setUp(self):
+        self.signer = FakeSigner()
+        self.cache = SignedUrlCache(self.signer, expires_in=3600, min_remaining=600)
+
+    def test_reuse_until_near_expiry(self):
+        signed, expires_at = self.cache.sign("s3://bucket/a.jpg")
+        self.assertEqual(signed, "https://bucket.s3.amazonaws.com/a.jpg?sig=1")
+        self.assertEqual(self.cache.sign("s3://bucket/a.jpg"), (signed, expires_at))
+        self.assertEqual(self.signer.calls, [("s3://bucket/a.jpg", 3600)])
+        self.assertGreater(self.cache.max_age(expires_at), 2990)
+
+        # Signed again once valid for less than min_remaining
+        self.cache._entries["s3://bucket/a.jpg"] = (signed, expires_at - 3000)
+        signed_again, _ = self.cache.sign("s3://bucket/a.jpg")
+        self.assertEqual(signed_again, "https://bucket.s3.amazonaws.com/a.jpg?sig=2")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expired"]), (1, 2, 1))
+
+    def test_batches_sign_distinct_missing_urls(self):
+        self.cache.sign("s3://bucket/a.jpg")
+        urls = [
+            "s3://bucket/a.jpg",
+            "s3://bucket/b.jpg",
+            "https://x.com/c.jpg",
+            "s3://bucket/b.jpg",
+        ]
+        signed = self.cache.sign_many(urls)
+        self.assertEqual(len(signed), 3)
+        self.assertEqual(signed["https://x.com/c.jpg"], ("https://x.com/c.jpg", float("inf")))
+        self.assertIsNone(self.cache.max_age(float("inf")))
+        self.assertEqual([url for url, _ in self.signer.calls], urls[:2])
+
+    def test_lru_eviction(self):
+        cache = SignedUrlCache(self.signer, max_entries=2)
+        for url in ["s3://b/1", "s3://b/2", "s3://b/1", "s3://b/3"]:
+            cache.sign(url)
+        self.assertEqual(list(cache._entries), ["s3://b/1", "s3://b/3"])
+
+    def test_invalid_min_remaining(self):
+        with self.assertRaises(ValueError):
+            SignedUrlCache(self.signer, expires_in=600, min_remaining=600)
+
+    def test_unsignable_urls_are_left_as_is(self):
+        signed = self.cache.sign_many(["s3://broken/a.jpg", "s3://bucket/b.jpg"])
+        self.assertEqual(signed["s3://broken/a.jpg"], ("s3://broken/a.jpg", float("inf")))
+        self.assertEqual(
+            signed["s3://bucket/b.jpg"][0], "https://bucket.s3.amazonaws.com/b.jpg?sig=1"
+        )
+        self.assertNotIn("s3://broken/a.jpg", self.cache._entries)
+        self.assertEqual(self.cache.stats()["errors"], 1)
+
+    def test_object_urls(self):
+        rows = [
+            (1, "s3://b/a.jpg", ["s3://b/c.jpg", "gs://b/d.jpg"]),
+            (2, "s3://b/a.jpg", None),
+            (3, "https://x.com/e.jpg", ["not a url", "s3:///no-bucket.jpg"]),
+            (4, "see https://example.com/a.jpg", "https://x.com/f.jpg?next=s3://b/g.jpg"),
+        ]
+        self.assertEqual(object_urls(rows, 10), ["s3://b/a.jpg", "s3://b/c.jpg"])
+        self.assertEqual(object_urls(rows, 1), ["s3://b/a.jpg"])
+
+
+class TestSignedUrlEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.signer = FakeSigner()
+        app = SmooSenseApp().create_app()
+        app.config["SIGNED_URL_CACHE"] = SignedUrlCache(self.signer)
+        self.client = app.test_client()
+
+        self.table_path = os.path.join(self.temp_dir.name, "images.parquet")
+        table = pa.table(
+            {
+                "id": [0, 1, 2],
+                "image": ["s3://bucket/0.jpg", "s3://bucket/1.jpg", "s3://bucket/0.jpg"],
+                "caption": ["a", "see https://example.com/a.jpg", "s3://broken/c.jpg"],
+            }
+        )
+        pq.write_table(table, self.table_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_redirect_is_cached(self):
+        response = self.client.get("/api/s3-proxy", query_string={"url": "s3://bucket/a.jpg"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, "https://bucket.s3.amazonaws.com/a.jpg?sig=1")
+        self.assertRegex(response.headers["Cache-Control"], r"^private, max-age=\d+$")
+
+        response = self.client.get("/api/s3-proxy", query_string={"url": "s3://bucket/a.jpg"})
+        self.assertEqual(response.location, "https://bucket.s3.amazonaws.com/a.jpg?sig=1")
+        self.assertEqual(len(self.signer.calls), 1)
+
+    def test_batch(self):
+        urls = ["s3://bucket/a.jpg", "s3://bucket/b.jpg", "s3://bucket/a.jpg"]
+        response = self.client.post("/api/s3-proxy", json={"urls": urls})
+        self.assertEqual(response.status_code, 200)
+        signed = response.get_json()
+        self.assertEqual(signed[0], signed[2])
+        self.assertEqual(len(self.signer.calls), 2)
+
+        self.client.post("/api/s3-proxy", json={"urls": urls})
+        self.assertEqual(len(self.signer.calls), 2)
+        stats = self.client.get("/api/s3-proxy/stats").get_json()
+        self.assertEqual((stats["entries"], stats["hits"]), (2, 2))
+
+        response = self.client.post("/api/s3-proxy", json={"urls": "s3://bucket/a.jpg"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_carry_signed_urls(self):
+        body = {"tablePath": self.table_path, "sorting": [], "pageSize": 10, "pageNumber": 1}
+        response = self.client.post("/api/rows/page", json=body)
+        self.assertEqual(response.status_code, 200, response.get_data())
+        self.assertNotIn("signed_urls", response.get_json())
+        self.assertEqual(self.signer.calls, [])
+
+        for endpoint, extra in (("page", {}), ("sample", {"size": 10})):
+            response = self.client.post(
+                f"/api/rows/{endpoint}", json={**body, **extra, "signUrls": True}
+            )
+            self.assertEqual(response.status_code, 200, response.get_data())
+            result = response.get_json()
+            self.assertEqual(
+                result["signed_urls"],
+                {
+                    "s3://bucket/0.jpg": "https://bucket.s3.amazonaws.com/0.jpg?sig=1",
+                    "s3://bucket/1.jpg": "https://bucket.s3.amazonaws.com/1.jpg?sig=2",
+                },
+            )
+            self.assertIsInstance(result["signed_urls_expire_at"], float)
+        self.assertEqual(len(self.signer.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
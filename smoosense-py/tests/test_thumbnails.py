@@ -0,0 +1,129 @@
+import io
+import os
+import tempfile
+import unittest
+
+import lance
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.thumbnails import render_thumbnail
+
+
+def encoded_image(width, height, image_format="JPEG", mode="RGB"):
+    output = io.BytesIO()
+    Image.new(mode, (width, height), (200, 50, 50, 128)[: len(mode)]).save(
+        output, format=image_format
+    )
+    return output.getvalue()
+
+
+def decoded(data):
+    image = Image.open(io.BytesIO(data))
+    return image.format, image.size, image.mode
+
+
+class TestRenderThumbnail(unittest.TestCase):
+    def test_downscale(self):
+        data = render_thumbnail(encoded_image(800, 400), 200, "webp")
+        self.assertEqual(decoded(data), ("WEBP", (200, 100), "RGB"))
+
+    def test_small_images_keep_their_size(self):
+        data = render_thumbnail(encoded_image(40, 30), 200, "jpeg")
+        self.assertEqual(decoded(data), ("JPEG", (40, 30), "RGB"))
+
+    def test_transparency(self):
+        png = encoded_image(300, 300, "PNG", "RGBA")
+        self.assertEqual(decoded(render_thumbnail(png, 100, "webp"))[2], "RGBA")
+        self.assertEqual(decoded(render_thumbnail(png, 100, "jpeg"))[2], "RGB")
+
+    def test_not_an_image(self):
+        with self.assertRaises(ValueError):
+            render_thumbnail(b"not an image", 100, "webp")
+
+
+class TestThumbnailEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.sense = SmooSenseApp(
+            thumbnail_cache_dir=os.path.join(cls.temp_dir.name, "thumbnails"),
+            media_cache_dir=os.path.join(cls.temp_dir.name, "media-cache"),
+            thumbnail_workers=1,
+        )
+        cls.client = cls.sense.create_app().test_client()
+
+        images = [encoded_image(600, 300), encoded_image(300, 600, "PNG"), None]
+        cls.lance_path = os.path.join(cls.temp_dir.name, "images.lance")
+        table = pa.table({"id": [0, 1, 2], "image": pa.array(images, pa.large_binary())})
+        lance.write_dataset(table, cls.lance_path)
+        cls.parquet_path = os.path.join(cls.temp_dir.name, "images.parquet")
+        pq.write_table(table, cls.parquet_path, row_group_size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sense.thumbnailer.close()
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.image_path = os.path.join(self.temp_dir.name, "photo.jpg")
+        with open(self.image_path, "wb") as f:
+            f.write(encoded_image(1200, 900))
+
+    def get(self, headers=None, **params):
+        return self.client.get("/api/thumbnail", query_string=params, headers=headers)
+
+    def test_local_file(self):
+        response = self.get(path=self.image_path, size=120)
+        self.assertEqual(response.status_code, 200, response.get_data())
+        self.assertEqual(response.mimetype, "image/webp")
+        self.assertEqual(response.headers["X-Thumbnail-Cache"], "miss")
+        self.assertEqual(decoded(response.get_data())[:2], ("WEBP", (120, 90)))
+
+        response = self.get(path=self.image_path, size=120)
+        self.assertEqual(response.headers["X-Thumbnail-Cache"], "hit")
+        etag = response.headers["ETag"]
+        response = self.get(headers={"If-None-Match": etag}, path=self.image_path, size=120)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.get(path=self.image_path, size=64, format="jpeg")
+        self.assertEqual(response.headers["X-Thumbnail-Cache"], "miss")
+        self.assertEqual(decoded(response.get_data())[:2], ("JPEG", (64, 48)))
+
+        # A changed file gets a new thumbnail
+        with open(self.image_path, "wb") as f:
+            f.write(encoded_image(90, 120))
+        os.utime(self.image_path, ns=(1, 1))
+        response = self.get(path=self.image_path, size=120)
+        self.assertEqual(response.headers["X-Thumbnail-Cache"], "miss")
+        self.assertEqual(decoded(response.get_data())[1], (90, 120))
+
+    def test_blob_cells(self):
+        for table_path in (self.lance_path, self.parquet_path):
+            response = self.get(tablePath=table_path, column="image", row=1, size=100)
+            self.assertEqual(response.status_code, 200, response.get_data())
+            self.assertEqual(decoded(response.get_data())[:2], ("WEBP", (50, 100)))
+
+            response = self.get(tablePath=table_path, column="image", row=2)
+            self.assertEqual(response.status_code, 404)
+            response = self.get(tablePath=table_path, column="image", row=3)
+            self.assertEqual(response.status_code, 400)
+            response = self.get(tablePath=table_path, column="id", row=0)
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(path=self.image_path, size=4096).status_code, 400)
+        self.assertEqual(self.get(path=self.image_path, format="gif").status_code, 400)
+        self.assertEqual(self.get(path=self.image_path + ".missing").status_code, 404)
+
+        not_image = os.path.join(self.temp_dir.name, "notes.txt")
+        with open(not_image, "w") as f:
+            f.write("not an image")
+        self.assertEqual(self.get(path=not_image).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import av
+import numpy as np
+from PIL import Image
+
+from smoosense.app import SmooSenseApp
+from smoosense.utils.video_previews import RangeReader, extract_previews
+from tests.test_fs_get_file_ranges import FakeS3Client
+
+
+def encoded_video(seconds=4, fps=10, width=320, height=240):
+    """MPEG-4 video with a keyframe every second, each second of another shade."""
+    output = io.BytesIO()
+    with av.open(output, "w", format="mp4") as container:
+        stream = container.add_stream("mpeg4", rate=fps)
+        stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+        stream.codec_context.gop_size = fps
+        rng = np.random.default_rng(0)
+        for i in range(seconds * fps):
+            pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+            pixels[:, : width // 2] = 20 * (i // fps)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(pixels, format="rgb24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return output.getvalue()
+
+
+def decoded(data):
+    image = Image.open(io.BytesIO(data))
+    return image.format, image.size
+
+
+class TestExtractPreviews(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.video = encoded_video()
+
+    def test_previews(self):
+        previews = extract_previews(RangeReader(len(self.video), self.read_range), tiles=8)
+        info = json.loads(previews["info"])
+        self.assertEqual((info["width"], info["height"]), (320, 240))
+        self.assertAlmostEqual(info["duration"], 4.0, places=1)
+        # One tile per keyframe: tiles between the same keyframes are not repeated
+        self.assertEqual(info["tiles"], 4)
+        self.assertEqual(info["timestamps"], sorted(info["timestamps"]))
+        self.assertEqual((info["tile_width"], info["tile_height"]), (160, 120))
+        self.assertEqual(decoded(previews["sprite"]), ("JPEG", (4 * 160, 120)))
+        self.assertEqual(decoded(previews["poster"]), ("JPEG", (320, 240)))
+
+    def test_only_keyframes_are_read(self):
+        reader = RangeReader(len(self.video), self.read_range, block_size=4096)
+        extract_previews(reader, tiles=2)
+        self.assertLess(reader.bytes_read, len(self.video) * 0.75)
+
+    def test_not_a_video(self):
+        with self.assertRaises(ValueError):
+            extract_previews(RangeReader(100, lambda start, stop: b"\0" * (stop - start)))
+
+    def read_range(self, start, stop):
+        return self.video[start:stop]
+
+
+class TestVideoPreviewEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.video = encoded_video()
+        cls.video_path = os.path.join(cls.temp_dir.name, "clip.mp4")
+        with open(cls.video_path, "wb") as f:
+            f.write(cls.video)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.sense = SmooSenseApp(
+            video_preview_dir=tempfile.mkdtemp(dir=self.temp_dir.name), video_preview_workers=2
+        )
+        self.s3_client = FakeS3Client(self.video)
+        app = self.sense.create_app()
+        app.config["S3_CLIENT"] = self.s3_client
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.sense.video_previewer.close()
+
+    def get(self, path, kind, **headers):
+        return self.client.get(
+            "/api/video-preview", query_string={"path": path, "kind": kind}, headers=headers
+        )
+
+    def test_local_video(self):
+        response = self.get(self.video_path, "poster")
+        self.assertEqual(response.status_code, 200, response.get_data())
+        self.assertEqual(response.mimetype, "image/jpeg")
+        self.assertEqual(decoded(response.get_data())[0], "JPEG")
+
+        info = self.get(self.video_path, "info").json
+        self.assertEqual(info["tiles"], 4)
+        response = self.get(self.video_path, "sprite")
+        self.assertEqual(decoded(response.get_data())[1], (4 * info["tile_width"], 120))
+        # Poster, sprite and info are made at once
+        stats = self.sense.video_previewer.cache.stats()
+        self.assertEqual((stats["misses"], stats["hits"]), (3, 6))
+
+        etag = response.headers["ETag"]
+        response = self.get(self.video_path, "sprite", **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_s3_video_is_read_by_ranges(self):
+        url = "s3://bucket/videos/clip.mp4"
+        response = self.get(url, "info")
+        self.assertEqual(response.status_code, 200, response.get_data())
+        self.assertEqual(response.json["tiles"], 4)
+        gets = [call for call in self.s3_client.calls if call["op"] == "get"]
+        self.assertTrue(gets)
+        self.assertTrue(all(call["Range"] for call in gets))
+
+    def test_prefetch(self):
+        response = self.client.post(
+            "/api/video-preview/prefetch", json={"paths": [self.video_path, self.video_path]}
+        )
+        self.assertEqual(response.json, {"scheduled": 1})
+        self.assertEqual(self.get(self.video_path, "poster").status_code, 200)
+        self.assertEqual(self.sense.video_previewer.cache.stats()["misses"], 3)
+
+        response = self.client.post("/api/video-preview/prefetch", json={"paths": "clip.mp4"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.get(self.video_path, "gif").status_code, 400)
+        self.assertEqual(self.get(self.video_path + ".missing", "poster").status_code, 404)
+        not_video = os.path.join(self.temp_dir.name, "notes.txt")
+        with open(not_video, "w") as f:
+            f.write("not a video")
+        self.assertEqual(self.get(not_video, "poster").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()